@@ -1,66 +1,237 @@
-from fastapi import APIRouter, HTTPException
-from app.models.crypto import PredictionRequest, PredictionResponse, TechnicalAnalysis
-from app.services.technical_analysis import TechnicalAnalyzer
-from app.services.ai_predictor import AIPredictor
-from app.services.data_fetcher import DataFetcher
-from typing import List, Dict
-import pandas as pd
-from datetime import datetime, timedelta
+from fastapi import APIRouter, Header, HTTPException, Response, WebSocket
+from fastapi.responses import StreamingResponse
+from app.models.crypto import BatchAnalysisRequest, PredictionRequest, PredictionResponse, ScreenerResult, TechnicalAnalysis
+from app.services.indicator_matrix import get_indicator_matrix, parse_filters
+from app.services.indicator_snapshot import INDICATOR_INDEX, monitored_indicators
+from app.services.shared_state import create_indicator_store, create_signal_bus
+from app.services.candle_time import candle_length, last_closed_open_time
+from app.services.response_cache import ResponseCache, etag_matches
+from app.services.batch_stream import iter_completed, ndjson_line
+from app.services.signal_hub import get_signal_hub
+from app.services import metrics
+from app.core.config import get_settings
+from typing import TYPE_CHECKING, List, Dict, Optional
+import asyncio
+import time
+from datetime import datetime
+
+if TYPE_CHECKING:
+    import pandas as pd
+    from app.services.ai_predictor import AIPredictor
+    from app.services.data_fetcher import DataFetcher
+    from app.services.market_metadata import MarketMetadata
+    from app.services.technical_analysis import TechnicalAnalyzer
 
 router = APIRouter()
-technical_analyzer = TechnicalAnalyzer()
-ai_predictor = AIPredictor()
-data_fetcher = DataFetcher()
+settings = get_settings()
+indicator_matrix = get_indicator_matrix()
+# SHARED_STATE 启用时从 Redis 同步监控进程计算的指标
+indicator_store = create_indicator_store(settings)
+signal_hub = get_signal_hub()
+# SHARED_STATE 启用时订阅监控进程发布的信号，转发给 WebSocket/SSE 客户端
+signal_bus = create_signal_bus(settings)
+analysis_cache = ResponseCache(settings.analyze_cache_size, settings.analyze_stale_seconds, name='analyze')
+
+# 交易所客户端、AI模型和指标计算（pandas/ta）在第一次使用时才创建和导入，
+# 导入本模块不访问网络；服务启动后由 warm_up 在后台提前加载
+
+def get_data_fetcher() -> "DataFetcher":
+    from app.services.data_fetcher import get_data_fetcher
+    return get_data_fetcher()
+
+def get_ai_predictor() -> "AIPredictor":
+    from app.services.ai_predictor import get_ai_predictor
+    return get_ai_predictor()
+
+def get_market_metadata() -> "MarketMetadata":
+    from app.services.market_metadata import get_market_metadata
+    return get_market_metadata()
+
+def new_technical_analyzer() -> "TechnicalAnalyzer":
+    from app.services.technical_analysis import TechnicalAnalyzer
+    return TechnicalAnalyzer()
+
+def _load_services():
+    new_technical_analyzer()
+    get_ai_predictor()
+    fetcher = get_data_fetcher()
+    fetcher.cache  # 创建 Redis 客户端（连接在第一次读写时建立）
+    try:
+        fetcher.client
+    except Exception as e:
+        print(f"预热: 连接交易所失败，将在第一次请求时重试: {str(e)}")
+
+async def warm_up() -> float:
+    """
+    预热：在线程中导入指标计算依赖、加载本地模型并创建交易所客户端，再加载交易对元数据，返回耗时（秒）
+
+    服务启动后在后台执行，不影响开始接收请求；预热完成前到达的请求按需加载
+    """
+    started = time.perf_counter()
+    try:
+        await asyncio.to_thread(_load_services)
+    except Exception as e:
+        print(f"预热失败: {str(e)}")
+    try:
+        await get_market_metadata().get_snapshot()
+    except Exception as e:
+        print(f"预热: 加载交易对元数据失败，将在第一次请求时重试: {str(e)}")
+    return time.perf_counter() - started
+
+_warm_up_task: Optional[asyncio.Task] = None
+
+async def _start_warm_up():
+    global _warm_up_task
+    if settings.api_warm_up:
+        _warm_up_task = asyncio.create_task(warm_up())
+
+router.add_event_handler("startup", _start_warm_up)
+
+_relay_task: Optional[asyncio.Task] = None
+
+async def _start_signal_relay():
+    global _relay_task
+    if signal_bus is not None:
+        _relay_task = asyncio.create_task(signal_bus.relay(signal_hub))
+
+async def _stop_signal_relay():
+    if _relay_task is not None:
+        _relay_task.cancel()
+        await asyncio.gather(_relay_task, return_exceptions=True)
+
+router.add_event_handler("startup", _start_signal_relay)
+router.add_event_handler("shutdown", _stop_signal_relay)
+
+def _split(value: Optional[str]) -> Optional[List[str]]:
+    return [v.strip() for v in value.split(',') if v.strip()] if value else None
+
+async def _get_klines(symbol: str, interval: str, limit: int, last_open: Optional[int] = None) -> "pd.DataFrame":
+    """获取截至最近一根已收盘K线的 limit 根K线"""
+    length = candle_length(interval)
+    if last_open is None:
+        last_open = last_closed_open_time(interval, int(time.time() * 1000))
+    start_time = datetime.fromtimestamp((last_open - (limit - 1) * length) / 1000)
+    end_time = datetime.fromtimestamp((last_open + length - 1) / 1000)
+    return await get_data_fetcher().get_historical_klines(
+        symbol=symbol,
+        interval=interval,
+        limit=limit,
+        start_time=start_time,
+        end_time=end_time
+    )
+
+async def _compute_analysis(symbol: str, interval: str, limit: int, last_open: int) -> bytes:
+    df = await _get_klines(symbol, interval, limit, last_open)
+    # 指标计算放到线程中执行，多个交易对可以同时计算（每次使用独立的分析器）
+    indicators = await asyncio.to_thread(new_technical_analyzer().calculate_indicators, df)
+    indicator_matrix.update(symbol, interval, indicators)
+    analysis = TechnicalAnalysis(
+        symbol=symbol,
+        # 使用K线收盘时间，同一根K线的结果内容不变（ETag 也不变）
+        timestamp=datetime.fromtimestamp((last_open + candle_length(interval)) / 1000),
+        **indicators.to_dict(nan_as_none=True)
+    )
+    return analysis.model_dump_json().encode()
+
+async def _get_analysis(symbol: str, interval: str, limit: int):
+    """从缓存获取（或计算）最近一根已收盘K线的分析结果，返回 (缓存条目, 命中状态)"""
+    length = candle_length(interval)
+    last_open = last_closed_open_time(interval, int(time.time() * 1000))
+    return await analysis_cache.get_or_compute(
+        (symbol, interval, limit),
+        last_open,
+        lambda: _compute_analysis(symbol, interval, limit, last_open),
+        expires_at=(last_open + 2 * length) / 1000
+    )
 
 @router.post("/analyze", response_model=TechnicalAnalysis)
 async def analyze_technical_indicators(
     symbol: str,
     interval: str = '1h',
-    limit: int = 100
+    limit: int = 100,
+    if_none_match: Optional[str] = Header(None)
 ):
     """
     分析指定加密货币的技术指标
+
+    结果按最近一根已收盘K线缓存：同一根K线内的请求直接返回缓存，
+    支持 ETag/If-None-Match；新K线收盘后的短时间内先返回上一根K线的结果并在后台刷新
     """
+    symbol = symbol.upper()
     try:
-        # 获取历史数据
-        end_time = datetime.now()
-        start_time = end_time - timedelta(hours=limit)
-        df = await data_fetcher.get_historical_klines(
-            symbol=symbol,
-            interval=interval,
-            limit=limit,
-            start_time=start_time,
-            end_time=end_time
-        )
-        
-        # 计算技术指标
-        indicators = technical_analyzer.calculate_indicators(df)
-        
-        return TechnicalAnalysis(
-            symbol=symbol,
-            timestamp=datetime.now(),
-            **indicators
-        )
+        candle_length(interval)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        entry, status = await _get_analysis(symbol, interval, limit)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+    headers = {
+        'ETag': entry.etag,
+        'Cache-Control': f'max-age={entry.max_age()}, stale-while-revalidate={int(analysis_cache.stale_seconds)}',
+        'X-Cache': status,
+    }
+    if etag_matches(if_none_match, entry.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type='application/json', headers=headers)
+
+@router.post("/analyze/batch")
+async def analyze_batch(request: BatchAnalysisRequest):
+    """
+    批量分析多个交易对和周期
+
+    以 NDJSON 流式返回，每完成一个 交易对x周期 输出一行：
+    {"symbol": ..., "interval": ..., "analysis": {...}} 或 {"symbol": ..., "interval": ..., "error": ...}
+    与 /analyze 共用缓存，相同的请求只获取和计算一次
+    """
+    symbols = list(dict.fromkeys(s.upper() for s in request.symbols))
+    intervals = list(dict.fromkeys(request.intervals))
+    try:
+        for interval in intervals:
+            candle_length(interval)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if len(symbols) * len(intervals) > settings.batch_max_items:
+        raise HTTPException(status_code=400, detail=f"单次最多分析 {settings.batch_max_items} 个交易对x周期")
+
+    jobs = [
+        ((symbol, interval), lambda symbol=symbol, interval=interval: _get_analysis(symbol, interval, request.limit))
+        for symbol in symbols
+        for interval in intervals
+    ]
+
+    async def stream():
+        async for (symbol, interval), result, error in iter_completed(jobs, settings.batch_max_concurrency):
+            meta = {'symbol': symbol, 'interval': interval}
+            if error is not None:
+                yield ndjson_line({**meta, 'error': str(error)})
+            else:
+                yield ndjson_line(meta, 'analysis', result[0].body)
+
+    return StreamingResponse(stream(), media_type='application/x-ndjson')
+
 @router.post("/predict", response_model=PredictionResponse)
 async def predict_market_trend(request: PredictionRequest):
     """
     预测市场趋势
     """
     try:
-        # 获取技术分析数据
-        analysis = await analyze_technical_indicators(
-            symbol=request.symbol,
-            interval=request.timeframe
-        )
+        ai_predictor = get_ai_predictor()
+        # 只计算请求的指标（本地模型还需要模型特征）
+        names = list(request.indicators)
+        if ai_predictor.has_local_model:
+            names += ai_predictor.model.features
+        names = [name for name in dict.fromkeys(names) if name in INDICATOR_INDEX]
+        df = await _get_klines(request.symbol, request.timeframe, 100)
+        indicators = await asyncio.to_thread(new_technical_analyzer().calculate_indicators, df, names)
         
         # 准备预测数据
         prediction_data = {
             "symbol": request.symbol,
             "timeframe": request.timeframe,
-            "indicators": analysis.dict()
+            "indicators": indicators.to_dict(nan_as_none=True)
         }
         
         # 进行AI预测
@@ -77,16 +248,171 @@ async def predict_market_trend(request: PredictionRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/screener", response_model=List[ScreenerResult])
+async def screen_symbols(
+    interval: str = '1h',
+    filters: str = '',
+    sort: Optional[str] = None,
+    order: str = 'desc',
+    limit: int = 50,
+    fields: Optional[str] = None
+):
+    """
+    按最新指标筛选交易对
+
+    例如 /screener?interval=1h&filters=rsi<30,adx>25&sort=adx
+    SHARED_STATE 启用时包含监控进程的全部交易对，只能按监控计算的指标（SIGNAL_INDICATORS）筛选和排序；
+    否则只包含本进程中 /analyze 计算过的交易对
+    """
+    try:
+        conditions = parse_filters(filters)
+        field_names = _split(fields)
+        for name in ([sort] if sort else []) + (field_names or []):
+            if name not in INDICATOR_INDEX:
+                raise ValueError(f"未知指标: {name}")
+        monitored = monitored_indicators(settings.signal_indicators) if indicator_store is not None else None
+        if monitored is not None:
+            for name in [c[0] for c in conditions] + ([sort] if sort else []):
+                if name not in monitored:
+                    raise ValueError(f"监控未计算指标 {name}，请在 SIGNAL_INDICATORS 中加入")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if indicator_store is not None:
+        try:
+            await indicator_store.sync(indicator_matrix, interval)
+        except Exception as e:
+            print(f"同步共享指标失败，使用本进程的数据: {str(e)}")
+
+    results = indicator_matrix.query(
+        interval,
+        conditions,
+        sort_by=sort,
+        descending=order != 'asc',
+        limit=limit,
+        fields=field_names
+    )
+    return [
+        ScreenerResult(
+            symbol=r['symbol'],
+            interval=r['interval'],
+            updated_at=datetime.fromtimestamp(r['updated_at']),
+            values=r['values']
+        )
+        for r in results
+    ]
+
+WS_HEARTBEAT = '{"type":"ping"}'
+
+@router.websocket("/ws/signals")
+async def signal_websocket(
+    websocket: WebSocket,
+    symbols: Optional[str] = None,
+    intervals: Optional[str] = None,
+    policy: Optional[str] = None,
+    buffer: Optional[int] = None
+):
+    """
+    通过 WebSocket 推送监控信号
+
+    例如 /ws/signals?symbols=BTCUSDT,ETHUSDT&intervals=1h
+    每条消息为监控产生的 market_info（JSON）；客户端过慢时按 policy 丢弃或合并。
+    空闲 SIGNAL_STREAM_HEARTBEAT 秒发送心跳 {"type":"ping"}；客户端断开（收到关闭帧或心跳发送失败）后立即取消订阅
+    """
+    try:
+        subscription = signal_hub.subscribe(
+            _split(symbols), _split(intervals),
+            buffer or settings.signal_stream_buffer,
+            policy or settings.signal_stream_policy
+        )
+    except ValueError as e:
+        await websocket.close(code=1008, reason=str(e))
+        return
+
+    await websocket.accept()
+
+    async def receive():
+        # 客户端发送的消息忽略；读取才能及时收到关闭帧
+        while (await websocket.receive())['type'] != 'websocket.disconnect':
+            pass
+
+    async def send():
+        while True:
+            message = await subscription.get(timeout=settings.signal_stream_heartbeat)
+            await websocket.send_text(WS_HEARTBEAT if message is None else message)
+
+    tasks = [asyncio.create_task(receive()), asyncio.create_task(send())]
+    try:
+        # 任一方结束（断开、发送失败或订阅关闭）时结束连接
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        # 先取消订阅：连接被取消时之后的 await 不一定还能执行
+        subscription.close()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+@router.get("/signals/stream")
+async def signal_event_stream(
+    symbols: Optional[str] = None,
+    intervals: Optional[str] = None,
+    policy: Optional[str] = None,
+    buffer: Optional[int] = None
+):
+    """
+    通过 Server-Sent Events 推送监控信号（参数同 /ws/signals）
+    """
+    try:
+        subscription = signal_hub.subscribe(
+            _split(symbols), _split(intervals),
+            buffer or settings.signal_stream_buffer,
+            policy or settings.signal_stream_policy
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    async def events():
+        try:
+            while True:
+                message = await subscription.get(timeout=settings.signal_stream_heartbeat)
+                if message is None:
+                    yield ": ping\n\n"
+                else:
+                    yield f"event: signal\ndata: {message}\n\n"
+        except StopAsyncIteration:
+            pass
+        finally:
+            subscription.close()
+
+    return StreamingResponse(
+        events(),
+        media_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@router.get("/metrics")
+async def get_metrics():
+    """
+    Prometheus 格式的运行指标（各阶段耗时、缓存命中、上游请求权重）
+
+    只包含 API 进程的指标；监控进程的指标由 monitor_crypto.py 在 METRICS_PORT 上提供
+    """
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE)
+
 @router.get("/symbols", response_model=List[str])
-async def get_available_symbols():
+async def get_available_symbols(
+    status: Optional[str] = 'TRADING',
+    base_asset: Optional[str] = None,
+    quote_asset: Optional[str] = None
+):
     """
-    获取可用的交易对列表
+    获取可用的交易对列表（默认只返回交易中的交易对，可按基础资产和计价资产筛选）
     """
     try:
-        tickers = await data_fetcher.get_all_tickers()
-        return [ticker['symbol'] for ticker in tickers]
+        snapshot = await get_market_metadata().get_snapshot()
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    return snapshot.symbols(status=status or None, base_asset=base_asset, quote_asset=quote_asset)
 
 @router.get("/ticker/{symbol}", response_model=Dict)
 async def get_ticker_info(symbol: str):
@@ -94,10 +420,12 @@ async def get_ticker_info(symbol: str):
     获取指定交易对的详细信息
     """
     try:
-        info = await data_fetcher.get_symbol_info(symbol)
-        return info
+        info = await get_market_metadata().get_symbol(symbol)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    if info is None:
+        raise HTTPException(status_code=404, detail=f"交易对不存在: {symbol}")
+    return info.to_dict()
 
 @router.get("/trades/{symbol}", response_model=List[Dict])
 async def get_recent_trades(symbol: str, limit: int = 100):
@@ -105,7 +433,7 @@ async def get_recent_trades(symbol: str, limit: int = 100):
     获取最近的交易记录
     """
     try:
-        trades = await data_fetcher.get_recent_trades(symbol, limit)
+        trades = await get_data_fetcher().get_recent_trades(symbol, limit)
         return trades
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
@@ -0,0 +1,136 @@
+"""
+AI分析关键点提取基准测试
+
+对比逐个关键词做子串判断、多次 re.findall 的旧实现与单次扫描的
+KeyPointExtractor，先校验两者结果一致，再测量吞吐量。
+
+用法:
+    python -m benchmarks.bench_key_points [--corpus 文件] [--repeat 次数]
+
+语料为JSON数组或JSONL，每条记录包含 content 字段（AI返回的分析文本）。
+"""
+import argparse
+import json
+import os
+import re
+import time
+from typing import Dict, List
+from services.key_point_extractor import KeyPointExtractor
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(__file__), "data", "ai_responses.json")
+
+
+def legacy_extract_key_points(analysis: str) -> Dict:
+    """旧实现（AIAnalyzer._extract_key_points 原逻辑），作为结果和性能的对照"""
+    import re
+
+    def extract_price_levels(text: str, pattern: str) -> List[float]:
+        matches = re.findall(pattern, text)
+        return [float(price) for price in matches if price]
+
+    trend_patterns = {
+        "强势上涨": 3, "上涨": 2, "震荡偏多": 1, "震荡": 0,
+        "震荡偏空": -1, "下跌": -2, "强势下跌": -3
+    }
+    trend = "震荡"
+    trend_score = 0
+    for pattern, score in trend_patterns.items():
+        if pattern in analysis:
+            if abs(score) > abs(trend_score):
+                trend = pattern
+                trend_score = score
+
+    confidence = 50
+    confidence_patterns = {
+        "明确": 80, "强烈": 85, "很强": 85, "非常": 90,
+        "高概率": 75, "可能": 60, "或许": 55, "不确定": 40
+    }
+    for pattern, value in confidence_patterns.items():
+        if pattern in analysis:
+            confidence = max(confidence, value)
+
+    support_levels = extract_price_levels(analysis, r"支撑位?[在于]?[：:]?\s*(\d+\.?\d*)")
+    resistance_levels = extract_price_levels(analysis, r"阻力位?[在于]?[：:]?\s*(\d+\.?\d*)")
+    stop_loss_levels = extract_price_levels(analysis, r"止损[位]?[在于]?[：:]?\s*(\d+\.?\d*)")
+    take_profit_levels = extract_price_levels(analysis, r"目标[位]?[在于]?[：:]?\s*(\d+\.?\d*)")
+
+    return {
+        "trend": trend,
+        "trend_score": trend_score,
+        "confidence": confidence,
+        "support_levels": sorted(support_levels) if support_levels else None,
+        "resistance_levels": sorted(resistance_levels) if resistance_levels else None,
+        "stop_loss": min(stop_loss_levels) if stop_loss_levels else None,
+        "take_profit_levels": sorted(take_profit_levels) if take_profit_levels else None,
+        "risk_level": legacy_risk_level(analysis)
+    }
+
+
+def legacy_risk_level(analysis: str) -> int:
+    risk_words = {
+        "高风险": 5, "风险较大": 4, "谨慎": 3,
+        "注意风险": 3, "风险较小": 2, "低风险": 1
+    }
+    risk_level = 3
+    for word, level in risk_words.items():
+        if word in analysis:
+            risk_level = max(risk_level, level)
+    return risk_level
+
+
+def load_corpus(path: str) -> List[str]:
+    """读取语料，支持JSON数组和JSONL"""
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    if text.lstrip().startswith("["):
+        records = json.loads(text)
+    else:
+        records = [json.loads(line) for line in text.splitlines() if line.strip()]
+    return [r["content"] if isinstance(r, dict) else str(r) for r in records]
+
+
+def _measure(func, corpus: List[str], repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for text in corpus:
+            func(text)
+    return time.perf_counter() - started
+
+
+def run(corpus: List[str], repeat: int = 200) -> Dict:
+    extractor = KeyPointExtractor()
+
+    mismatches = [
+        i for i, text in enumerate(corpus)
+        if extractor.extract(text) != legacy_extract_key_points(text)
+    ]
+
+    legacy = _measure(legacy_extract_key_points, corpus, repeat)
+    compiled = _measure(extractor.extract, corpus, repeat)
+    count = len(corpus) * repeat
+    return {
+        "documents": len(corpus),
+        "characters": sum(len(t) for t in corpus),
+        "repeat": repeat,
+        "mismatches": mismatches,
+        "legacy_us_per_doc": legacy / count * 1e6,
+        "compiled_us_per_doc": compiled / count * 1e6,
+        "speedup": legacy / compiled if compiled else float("inf"),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="关键点提取基准测试")
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS, help="AI返回文本语料（JSON或JSONL）")
+    parser.add_argument("--repeat", type=int, default=200, help="语料重复次数")
+    args = parser.parse_args()
+
+    result = run(load_corpus(args.corpus), args.repeat)
+    print(f"语料: {result['documents']} 条, {result['characters']} 字符, 重复 {result['repeat']} 次")
+    print(f"旧实现:   {result['legacy_us_per_doc']:.1f} µs/条")
+    print(f"单次扫描: {result['compiled_us_per_doc']:.1f} µs/条")
+    print(f"加速比:   {result['speedup']:.2f}x")
+    if result["mismatches"]:
+        print(f"结果不一致的语料序号: {result['mismatches']}")
+        raise SystemExit(1)
+    print("结果一致")
@@ -0,0 +1,203 @@
+"""
+分析流水线基准测试
+
+用合成K线（benchmarks.synthetic）分别测量各阶段的吞吐量和内存峰值:
+
+    parse       JSON响应体 -> DataFrame（FuturesDataFetcher.klines_to_frame）
+    indicators  TechnicalAnalyzer.calculate_indicators（全部指标）
+    patterns    PatternRecognition.analyze_patterns
+    signals     SignalGenerator.generate_signals（AI分析只提交不执行）
+
+用法:
+    python -m benchmarks.bench_pipeline                         # 运行并与基线比较
+    python -m benchmarks.bench_pipeline --save-baseline         # 保存为新基线
+    python -m benchmarks.bench_pipeline --scenarios candles-1500,symbols-100 --threshold 0.3
+
+任一阶段的单根K线耗时比基线慢 threshold 以上（或内存峰值高出 memory_threshold 以上）时
+以退出码 1 结束。基线与机器相关，请在同一台机器上保存和比较。
+"""
+import argparse
+import asyncio
+import contextlib
+import gc
+import io
+import json
+import os
+import platform
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional
+import pandas as pd
+from services import indicator_kernels
+from services.ai_scheduler import SubmitOnlyScheduler
+from services.futures_data_fetcher import FuturesDataFetcher
+from services.pattern_recognition import PatternRecognition
+from services.signal_generator import SignalGenerator
+from services.technical_analysis import TechnicalAnalyzer
+from benchmarks.synthetic import synthetic_body
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baselines", "pipeline.json")
+STAGES = ("parse", "indicators", "patterns", "signals")
+
+# 场景名 -> (每个交易对的K线数量, 交易对数量)
+SCENARIOS = {
+    "candles-100": (100, 1),
+    "candles-1500": (1500, 1),
+    "candles-100k": (100_000, 1),
+    "symbols-100": (100, 100),
+    "symbols-1000": (100, 1000),
+}
+
+
+def _run_stage(stage: str, bodies: List[bytes], frames: List[pd.DataFrame]) -> Callable[[], None]:
+    fetcher = FuturesDataFetcher()
+    analyzer = TechnicalAnalyzer()
+    recognizer = PatternRecognition()
+    generator = SignalGenerator(ai_scheduler=SubmitOnlyScheduler())
+
+    def parse():
+        for body in bodies:
+            fetcher.klines_to_frame(json.loads(body))
+
+    def indicators():
+        for df in frames:
+            analyzer.calculate_indicators(df)
+
+    def patterns():
+        for df in frames:
+            recognizer.analyze_patterns(df)
+
+    def signals():
+        async def run():
+            for df in frames:
+                await generator.generate_signals(df, symbol="BENCHUSDT", interval="1m")
+        asyncio.run(run())
+
+    return {"parse": parse, "indicators": indicators, "patterns": patterns, "signals": signals}[stage]
+
+
+def _measure(func: Callable[[], None], repeat: int) -> Dict:
+    # signals 会打印日志，测量时丢弃输出
+    with contextlib.redirect_stdout(io.StringIO()):
+        func()  # 预热
+        best = float("inf")
+        for _ in range(repeat):
+            gc.collect()
+            started = time.perf_counter()
+            func()
+            best = min(best, time.perf_counter() - started)
+        # 内存峰值单独测量一次（tracemalloc 会显著拖慢执行）
+        gc.collect()
+        tracemalloc.start()
+        try:
+            func()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return {"seconds": best, "peak_kib": peak / 1024}
+
+
+def run_scenario(candles: int, symbols: int, stages=STAGES, repeat: int = 3, seed: int = 0) -> Dict[str, Dict]:
+    """运行一个场景，返回 阶段 -> 结果"""
+    bodies = [synthetic_body(candles, seed + i) for i in range(symbols)]
+    fetcher = FuturesDataFetcher()
+    frames = [fetcher.klines_to_frame(json.loads(body)) for body in bodies]
+    total = candles * symbols
+    results = {}
+    for stage in stages:
+        measured = _measure(_run_stage(stage, bodies, frames), repeat)
+        results[stage] = {
+            "candles": candles,
+            "symbols": symbols,
+            "seconds": measured["seconds"],
+            "us_per_candle": measured["seconds"] / total * 1e6,
+            "candles_per_sec": total / measured["seconds"] if measured["seconds"] else float("inf"),
+            "peak_kib": measured["peak_kib"],
+        }
+    return results
+
+
+def run(scenarios: List[str], stages=STAGES, repeat: int = 3, seed: int = 0) -> Dict:
+    results = {}
+    for name in scenarios:
+        candles, symbols = SCENARIOS[name]
+        # 大场景只跑一次计时
+        scenario_repeat = 1 if candles * symbols >= 100_000 else repeat
+        for stage, result in run_scenario(candles, symbols, stages, scenario_repeat, seed).items():
+            results[f"{name}/{stage}"] = result
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "kernels": indicator_kernels.BACKEND,
+            "machine": platform.machine(),
+            "seed": seed,
+        },
+        "results": results,
+    }
+
+
+def compare(baseline: Dict, current: Dict, threshold: float = 0.2, memory_threshold: float = 0.5) -> List[str]:
+    """返回超过阈值的回归说明（基线中没有的项不比较）"""
+    regressions = []
+    for key, result in current["results"].items():
+        base = baseline.get("results", {}).get(key)
+        if base is None:
+            continue
+        if result["us_per_candle"] > base["us_per_candle"] * (1 + threshold):
+            regressions.append(
+                f"{key}: {result['us_per_candle']:.2f} µs/K线，基线 {base['us_per_candle']:.2f} "
+                f"(+{(result['us_per_candle'] / base['us_per_candle'] - 1) * 100:.0f}%)"
+            )
+        if base["peak_kib"] > 0 and result["peak_kib"] > base["peak_kib"] * (1 + memory_threshold):
+            regressions.append(
+                f"{key}: 内存峰值 {result['peak_kib']:.0f} KiB，基线 {base['peak_kib']:.0f} KiB"
+            )
+    return regressions
+
+
+def load_baseline(path: str) -> Optional[Dict]:
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_baseline(path: str, result: Dict):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, indent=2, sort_keys=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="分析流水线基准测试")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"逗号分隔，可选 {', '.join(SCENARIOS)}")
+    parser.add_argument("--stages", default=",".join(STAGES))
+    parser.add_argument("--repeat", type=int, default=3, help="计时次数（取最快一次）")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="把本次结果保存为基线")
+    parser.add_argument("--threshold", type=float, default=0.2, help="耗时回归阈值（0.2 表示慢20%）")
+    parser.add_argument("--memory-threshold", type=float, default=0.5, help="内存峰值回归阈值")
+    args = parser.parse_args()
+
+    result = run(args.scenarios.split(","), tuple(args.stages.split(",")), args.repeat, args.seed)
+    print(f"{'场景/阶段':<28}{'K线/秒':>14}{'µs/K线':>10}{'内存峰值KiB':>14}")
+    for key, item in result["results"].items():
+        print(f"{key:<28}{item['candles_per_sec']:>14,.0f}{item['us_per_candle']:>10.2f}{item['peak_kib']:>14,.0f}")
+
+    if args.save_baseline:
+        save_baseline(args.baseline, result)
+        print(f"基线已保存到 {args.baseline}")
+    else:
+        baseline = load_baseline(args.baseline)
+        if baseline is None:
+            print(f"没有基线 {args.baseline}，使用 --save-baseline 保存")
+        else:
+            regressions = compare(baseline, result, args.threshold, args.memory_threshold)
+            if regressions:
+                print("性能回归:")
+                for line in regressions:
+                    print(f"  {line}")
+                raise SystemExit(1)
+            print("与基线相比没有回归")
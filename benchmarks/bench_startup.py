@@ -0,0 +1,113 @@
+"""
+启动耗时基准测试
+
+在新的解释器进程中测量 API（导入 api.endpoints）和监控程序（导入 monitor_crypto 并创建
+MarketMonitor）的冷启动耗时，并用 python -X importtime 列出累计耗时最多的模块。
+导入时不应访问网络，离线也能完成。
+
+用法:
+    python -m benchmarks.bench_startup [--targets api,bot] [--repeat 5] [--top 10] [--max-seconds 1]
+
+--max-seconds 设置后，任一目标的中位耗时超过该值时以状态码1退出。
+"""
+import argparse
+import os
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Set, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 代码按 app 包导入（api/endpoints.py 使用 app.* 导入），运行时在临时目录中把仓库链接为 app
+TARGETS = {
+    'api': "import app.api.endpoints",
+    'api+warm_up': "import asyncio, app.api.endpoints as e; asyncio.run(e.warm_up())",
+    'bot': "import monitor_crypto; from services.market_monitor import MarketMonitor; MarketMonitor()",
+}
+
+_IMPORT_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def _package_dir() -> str:
+    directory = tempfile.mkdtemp(prefix="bench-startup-")
+    os.symlink(ROOT, os.path.join(directory, "app"))
+    return directory
+
+
+def _run(code: str, package_dir: str, importtime: bool = False) -> Tuple[float, str]:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join([ROOT, package_dir, env.get("PYTHONPATH", "")]).rstrip(os.pathsep)
+    env["PYTHONDONTWRITEBYTECODE"] = "1"
+    command = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", code]
+    started = time.perf_counter()
+    result = subprocess.run(command, cwd=package_dir, env=env, capture_output=True, text=True)
+    elapsed = time.perf_counter() - started
+    if result.returncode != 0:
+        raise RuntimeError(f"启动失败: {code}\n{result.stderr[-2000:]}")
+    return elapsed, result.stderr
+
+
+def parse_importtime(output: str) -> List[Tuple[int, str, float]]:
+    """解析 -X importtime 输出，返回 (层级, 模块, 累计毫秒)"""
+    entries = []
+    for line in output.splitlines():
+        match = _IMPORT_LINE.match(line)
+        if match:
+            entries.append((len(match.group(3)) // 2, match.group(4), int(match.group(2)) / 1000))
+    return entries
+
+
+def top_imports(output: str, exclude: Set[str] = frozenset(), top: int = 10) -> List[Tuple[str, float]]:
+    """被测代码直接导入的模块及其下一层中累计耗时最多的（毫秒），exclude 为解释器启动时已导入的模块"""
+    entries = [(name, ms) for level, name, ms in parse_importtime(output) if level <= 1 and name not in exclude]
+    return sorted(entries, key=lambda item: item[1], reverse=True)[:top]
+
+
+def run(targets: List[str], repeat: int = 5, top: int = 10) -> Dict[str, Dict]:
+    """返回每个目标的耗时（秒，含解释器启动）和导入耗时最多的模块"""
+    package_dir = _package_dir()
+    try:
+        # 解释器本身的启动耗时，用于对比
+        baseline = min(_run("pass", package_dir)[0] for _ in range(repeat))
+        startup_modules = {name for _, name, _ in parse_importtime(_run("pass", package_dir, importtime=True)[1])}
+        results = {}
+        for name in targets:
+            code = TARGETS[name]
+            _run(code, package_dir)  # 预热文件系统缓存
+            samples = [_run(code, package_dir)[0] for _ in range(repeat)]
+            _, output = _run(code, package_dir, importtime=True)
+            results[name] = {
+                'median': statistics.median(samples),
+                'best': min(samples),
+                'interpreter': baseline,
+                'imports': top_imports(output, startup_modules, top),
+            }
+        return results
+    finally:
+        shutil.rmtree(package_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="启动耗时基准测试")
+    parser.add_argument("--targets", default="api,bot", help=f"逗号分隔，可选 {', '.join(TARGETS)}")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="列出导入耗时最多的模块数")
+    parser.add_argument("--max-seconds", type=float, default=None, help="中位耗时上限")
+    args = parser.parse_args()
+
+    results = run(args.targets.split(","), args.repeat, args.top)
+    slow = []
+    for name, item in results.items():
+        print(f"{name}: 中位 {item['median']:.3f}秒，最快 {item['best']:.3f}秒（解释器启动 {item['interpreter']:.3f}秒）")
+        for module, ms in item['imports']:
+            print(f"    {module:<40}{ms:>8.1f} ms")
+        if args.max_seconds is not None and item['median'] > args.max_seconds:
+            slow.append(name)
+    if slow:
+        print(f"超过 {args.max_seconds}秒: {', '.join(slow)}")
+        raise SystemExit(1)
@@ -0,0 +1,192 @@
+"""
+监控压测
+
+启动本地模拟的 Binance 合约接口（services.mock_binance_server），让 MarketMonitor
+对大量交易对运行指定轮数，报告吞吐量和各环节的尾延迟。AI分析只提交不执行。
+
+用法:
+    python -m benchmarks.load_monitor --symbols 2000 --intervals 15m,1h,4h --cycles 3 \
+        --latency 0.02 --jitter 0.03 --error-rate 0.01 --weight-limit 0
+
+    # 使用单独启动的模拟服务
+    python -m benchmarks.load_monitor --url http://127.0.0.1:8766 --symbols 500
+
+    # 4个实例分片（同一进程内，MemoryCoordinator 协调），比较与单实例的吞吐量
+    python -m benchmarks.load_monitor --symbols 1000 --latency 0.02 --instances 4
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import time
+from collections import Counter
+from typing import Dict, List, Optional
+import numpy as np
+import pandas as pd
+from services.ai_scheduler import SubmitOnlyScheduler
+from services.market_monitor import MarketMonitor
+from services.mock_binance_server import MockBinanceServer, symbol_names
+from services.shard_coordinator import MemoryCoordinator, ShardMember
+
+
+class _StayingShardMember(ShardMember):
+    """压测期间不退出分片：先跑完的实例退出后，其他实例会接管并再分析一次同一根K线"""
+
+    async def leave(self):
+        pass
+
+
+class LoadTestMonitor(MarketMonitor):
+    """记录每个交易对获取K线和每个周期分析耗时的 MarketMonitor"""
+
+    def __init__(self, base_url: str, shard: Optional[ShardMember] = None):
+        super().__init__()
+        self.data_fetcher.base_url = base_url
+        self.shard = shard
+        # 不请求AI接口，也不写入共享状态
+        self.ai_scheduler = None
+        self.signal_generator.ai_scheduler = SubmitOnlyScheduler()
+        self.signal_bus = None
+        self.indicator_store = None
+        self.fetch_seconds: List[float] = []
+        self.analyze_seconds: List[float] = []
+        self.fetch_errors = 0
+        self.analyzed: List[tuple] = []
+
+    async def _fetch_klines(self, symbol: str, intervals: List[str], base_interval: Optional[str]) -> Dict[str, pd.DataFrame]:
+        started = time.perf_counter()
+        try:
+            return await super()._fetch_klines(symbol, intervals, base_interval)
+        except Exception:
+            self.fetch_errors += 1
+            raise
+        finally:
+            self.fetch_seconds.append(time.perf_counter() - started)
+
+    async def _analyze(self, symbol: str, interval: str, df: pd.DataFrame):
+        started = time.perf_counter()
+        self.analyzed.append((symbol, interval))
+        try:
+            await super()._analyze(symbol, interval, df)
+        finally:
+            self.analyze_seconds.append(time.perf_counter() - started)
+
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    """毫秒为单位的 p50/p95/p99/max"""
+    if not values:
+        return {'p50': 0.0, 'p95': 0.0, 'p99': 0.0, 'max': 0.0}
+    array = np.asarray(values) * 1000
+    p50, p95, p99 = np.percentile(array, [50, 95, 99])
+    return {'p50': float(p50), 'p95': float(p95), 'p99': float(p99), 'max': float(array.max())}
+
+
+async def run_load_test(
+    symbols: int = 1000,
+    intervals: Optional[List[str]] = None,
+    cycles: int = 2,
+    url: Optional[str] = None,
+    quiet: bool = True,
+    instances: int = 1,
+    **server_options
+) -> Dict:
+    """
+    运行压测并返回结果
+
+    参数:
+        url: 已启动的模拟服务地址，为空时在本进程内启动
+        instances: 大于1时在本进程内运行多个分片监控实例
+        server_options: 传给 MockBinanceServer 的参数（latency、jitter、error_rate、weight_limit 等）
+    """
+    intervals = intervals or ['15m', '1h', '4h']
+    names = symbol_names(symbols)
+    server = None
+    if url is None:
+        server = MockBinanceServer(symbols=names, **server_options)
+        url = await server.start()
+
+    if instances > 1:
+        coordinator = MemoryCoordinator()
+        monitors = [LoadTestMonitor(url, _StayingShardMember(coordinator, f"instance-{i}")) for i in range(instances)]
+        # 先全部加入，第一轮就按实例数分配
+        for monitor in monitors:
+            await monitor.shard.join()
+    else:
+        monitors = [LoadTestMonitor(url)]
+    started = time.perf_counter()
+    try:
+        # 监控每个周期都会打印日志，压测时丢弃
+        with contextlib.redirect_stdout(io.StringIO()) if quiet else contextlib.nullcontext():
+            await asyncio.gather(*(
+                monitor.start_monitoring(names, intervals, update_interval=0, cycles=cycles)
+                for monitor in monitors
+            ))
+    finally:
+        elapsed = time.perf_counter() - started
+        if server is not None:
+            await server.stop()
+
+    fetch_seconds = [s for monitor in monitors for s in monitor.fetch_seconds]
+    analyze_seconds = [s for monitor in monitors for s in monitor.analyze_seconds]
+    # 同一 交易对x周期 被多个实例分析的数量（分片时应为0）
+    owners = Counter(pair for monitor in monitors for pair in set(monitor.analyzed))
+    analyses = len(analyze_seconds)
+    return {
+        'symbols': symbols,
+        'intervals': intervals,
+        'cycles': cycles,
+        'instances': instances,
+        'seconds': elapsed,
+        'seconds_per_cycle': elapsed / cycles,
+        'fetches': len(fetch_seconds),
+        'fetch_errors': sum(monitor.fetch_errors for monitor in monitors),
+        'analyses': analyses,
+        'analyses_per_sec': analyses / elapsed if elapsed else 0.0,
+        'symbols_per_sec': len(fetch_seconds) / elapsed if elapsed else 0.0,
+        'fetch_ms': percentiles(fetch_seconds),
+        'analyze_ms': percentiles(analyze_seconds),
+        'pairs_per_instance': [len(set(monitor.analyzed)) for monitor in monitors],
+        'duplicate_pairs': sum(1 for count in owners.values() if count > 1),
+        'server': dict(server.stats) if server is not None else None,
+    }
+
+
+def print_report(result: Dict):
+    print(f"{result['symbols']} 个交易对 x {','.join(result['intervals'])}，{result['cycles']} 轮，"
+          f"用时 {result['seconds']:.1f}秒（每轮 {result['seconds_per_cycle']:.1f}秒）")
+    if result['instances'] > 1:
+        print(f"{result['instances']} 个分片实例，各自分析的交易对x周期: {result['pairs_per_instance']}，"
+              f"重复分析: {result['duplicate_pairs']}")
+    print(f"吞吐量: {result['symbols_per_sec']:.1f} 交易对/秒，{result['analyses_per_sec']:.1f} 次分析/秒")
+    print(f"获取失败: {result['fetch_errors']} / {result['fetches']}")
+    for name in ('fetch_ms', 'analyze_ms'):
+        p = result[name]
+        print(f"{name:<12} p50 {p['p50']:8.1f}  p95 {p['p95']:8.1f}  p99 {p['p99']:8.1f}  max {p['max']:8.1f}")
+    if result['server'] is not None:
+        stats = result['server']
+        print(f"模拟服务: {stats['requests']} 个请求，注入错误 {stats['errors']}，限流 {stats['rate_limited']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="MarketMonitor 压测")
+    parser.add_argument("--symbols", type=int, default=1000)
+    parser.add_argument("--intervals", default="15m,1h,4h")
+    parser.add_argument("--cycles", type=int, default=2, help="第一轮会下载完整历史K线")
+    parser.add_argument("--url", default=None, help="使用已启动的模拟服务")
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--weight-limit", type=int, default=2400, help="0表示不限制")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--instances", type=int, default=1, help="分片监控实例数")
+    parser.add_argument("--verbose", action="store_true", help="显示监控日志")
+    args = parser.parse_args()
+
+    options = {}
+    if args.url is None:
+        options = dict(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                       weight_limit=args.weight_limit, seed=args.seed)
+    print_report(asyncio.run(run_load_test(
+        args.symbols, args.intervals.split(","), args.cycles, args.url, quiet=not args.verbose,
+        instances=args.instances, **options
+    )))
@@ -0,0 +1,103 @@
+"""
+基准测试用的合成K线
+
+价格为对数随机游走，波动率在低/中/高三种状态之间按马尔可夫链切换，
+同一个种子总是生成相同的数据。输出格式与 Binance /fapi/v1/klines 响应相同。
+"""
+import json
+from bisect import bisect_right
+from typing import Dict, List, Optional
+import numpy as np
+import pandas as pd
+from services.futures_data_fetcher import FuturesDataFetcher
+
+# 波动率状态（每根K线对数收益率的标准差）和状态转移矩阵
+REGIME_VOLATILITY = np.array([0.001, 0.004, 0.012])
+REGIME_TRANSITIONS = np.array([
+    [0.98, 0.015, 0.005],
+    [0.02, 0.96, 0.02],
+    [0.01, 0.09, 0.90],
+])
+START_MS = 1704067200000   # 2024-01-01 00:00 UTC
+
+
+def regimes(n: int, rng: np.random.Generator) -> np.ndarray:
+    """波动率状态序列"""
+    cumulative = REGIME_TRANSITIONS.cumsum(axis=1).tolist()
+    last = len(REGIME_VOLATILITY) - 1
+    states = np.empty(n, dtype=np.int64)
+    state = 1
+    for i, draw in enumerate(rng.random(n).tolist()):
+        state = min(bisect_right(cumulative[state], draw), last)
+        states[i] = state
+    return states
+
+
+def synthetic_arrays(n: int, seed: int = 0, price: float = 100.0) -> Dict[str, np.ndarray]:
+    """
+    生成 n 根K线的数值列（不含时间）
+
+    返回 open/high/low/close/volume/quote_volume/trades/taker_buy_volume/taker_buy_quote_volume
+    """
+    rng = np.random.default_rng(seed)
+    volatility = REGIME_VOLATILITY[regimes(n, rng)]
+    returns = rng.normal(0.0, volatility)
+    close = price * np.exp(np.cumsum(returns))
+    open_ = np.r_[price, close[:-1]]
+    # 影线长度与当前波动率成正比
+    high = np.maximum(open_, close) * np.exp(np.abs(rng.normal(0.0, volatility * 0.5)))
+    low = np.minimum(open_, close) * np.exp(-np.abs(rng.normal(0.0, volatility * 0.5)))
+    # 成交量在高波动时放大
+    volume = rng.lognormal(3.0, 0.5, n) * (volatility / REGIME_VOLATILITY[0])
+    quote_volume = volume * (open_ + close) / 2
+    taker_ratio = rng.uniform(0.3, 0.7, n)
+    trades = (volume * rng.uniform(5, 15, n)).astype(np.int64) + 1
+    return {
+        'open': open_, 'high': high, 'low': low, 'close': close, 'volume': volume,
+        'quote_volume': quote_volume, 'trades': trades,
+        'taker_buy_volume': volume * taker_ratio, 'taker_buy_quote_volume': quote_volume * taker_ratio,
+    }
+
+
+def format_klines(arrays: Dict[str, np.ndarray], open_time: np.ndarray, interval_ms: int) -> List[list]:
+    """把数值列格式化为接口返回的原始K线（数值为字符串）"""
+    columns = [
+        arrays['open'].tolist(), arrays['high'].tolist(), arrays['low'].tolist(), arrays['close'].tolist(),
+        arrays['volume'].tolist(), arrays['quote_volume'].tolist(), arrays['trades'].tolist(),
+        arrays['taker_buy_volume'].tolist(), arrays['taker_buy_quote_volume'].tolist(),
+    ]
+    return [
+        [t, f"{o:.4f}", f"{h:.4f}", f"{l:.4f}", f"{c:.4f}", f"{v:.3f}", t + interval_ms - 1,
+         f"{qv:.4f}", int(n), f"{bv:.3f}", f"{bqv:.4f}", "0"]
+        for t, o, h, l, c, v, qv, n, bv, bqv in zip(open_time.tolist(), *columns)
+    ]
+
+
+def synthetic_klines(
+    n: int,
+    seed: int = 0,
+    interval_ms: int = 60_000,
+    start_ms: int = START_MS,
+    price: float = 100.0
+) -> List[list]:
+    """
+    生成 n 根原始K线（数值为字符串，与交易所响应一致）
+
+    参数:
+        seed: 随机种子
+        interval_ms: K线周期（毫秒）
+        start_ms: 第一根K线的开盘时间
+        price: 初始价格
+    """
+    open_time = start_ms + np.arange(n, dtype=np.int64) * interval_ms
+    return format_klines(synthetic_arrays(n, seed, price), open_time, interval_ms)
+
+
+def synthetic_body(n: int, seed: int = 0, **kwargs) -> bytes:
+    """原始K线的JSON响应体"""
+    return json.dumps(synthetic_klines(n, seed, **kwargs), separators=(',', ':')).encode()
+
+
+def synthetic_frame(n: int, seed: int = 0, fetcher: Optional[FuturesDataFetcher] = None, **kwargs) -> pd.DataFrame:
+    """与 FuturesDataFetcher.get_klines 格式相同的合成K线"""
+    return (fetcher or FuturesDataFetcher()).klines_to_frame(synthetic_klines(n, seed, **kwargs))
@@ -8,12 +8,43 @@ load_dotenv()
 class Settings(BaseSettings):
     # API Keys
     deepseek_api_key: str = os.getenv("DEEPSEEK_API_KEY", "")
+    deepseek_api_base: str = os.getenv("DEEPSEEK_API_BASE", "https://api.deepseek.com")
     binance_api_key: str = os.getenv("BINANCE_API_KEY", "")
     binance_api_secret: str = os.getenv('BINANCE_API_SECRET',"")
+    binance_futures_base_url: str = os.getenv("BINANCE_FUTURES_BASE_URL", "https://fapi.binance.com")
     enable_ai_analysis: bool = os.getenv('ENABLE_AI_ANALYSIS',"")
     klines_limit: int = os.getenv('KLINES_LIMIT',250)
     ai_confidence_threshold: float = os.getenv('AI_CONFIDENCE_THRESHOLD', 80)
 
+    signal_indicators: str = os.getenv("SIGNAL_INDICATORS", "")
+
+    # AI Scheduler Settings
+    ai_async_enrichment: bool = os.getenv("AI_ASYNC_ENRICHMENT", "true").lower() == "true"
+    ai_max_concurrency: int = int(os.getenv("AI_MAX_CONCURRENCY", "4"))
+    ai_request_timeout: float = float(os.getenv("AI_REQUEST_TIMEOUT", "60"))
+    ai_streaming: bool = os.getenv("AI_STREAMING", "true").lower() == "true"
+    ai_batch_size: int = int(os.getenv("AI_BATCH_SIZE", "1"))
+    ai_batch_window: float = float(os.getenv("AI_BATCH_WINDOW", "0.5"))
+
+    # Monitor Settings
+    monitor_resample: bool = os.getenv("MONITOR_RESAMPLE", "true").lower() == "true"
+    monitor_base_interval: str = os.getenv("MONITOR_BASE_INTERVAL", "")
+    monitor_schedule: str = os.getenv("MONITOR_SCHEDULE", "close")
+    monitor_update_interval: float = float(os.getenv("MONITOR_UPDATE_INTERVAL", "60"))
+    monitor_close_delay: float = float(os.getenv("MONITOR_CLOSE_DELAY", "1"))
+    monitor_intra_candle_seconds: float = float(os.getenv("MONITOR_INTRA_CANDLE_SECONDS", "0"))
+    monitor_time_sync_seconds: float = float(os.getenv("MONITOR_TIME_SYNC_SECONDS", "3600"))
+    profile_cycles: int = int(os.getenv("PROFILE_CYCLES", "0"))
+    profile_dir: str = os.getenv("PROFILE_DIR", "profiles")
+    record_klines_dir: str = os.getenv("RECORD_KLINES_DIR", "")
+    shard_coordinator: str = os.getenv("SHARD_COORDINATOR", "")
+    shard_instance_id: str = os.getenv("SHARD_INSTANCE_ID", "")
+    shard_lease_seconds: float = float(os.getenv("SHARD_LEASE_SECONDS", "180"))
+    shard_key_prefix: str = os.getenv("SHARD_KEY_PREFIX", "monitor:shard")
+    metrics_port: int = int(os.getenv("METRICS_PORT", "9108"))
+    shared_state: str = os.getenv("SHARED_STATE", "")
+    shared_state_prefix: str = os.getenv("SHARED_STATE_PREFIX", "crypto")
+
     # Email Settings
     smtp_server: str = os.getenv("SMTP_SERVER", "smtp.gmail.com")
     smtp_port: int = int(os.getenv("SMTP_PORT", "587"))
@@ -44,6 +75,17 @@ class Settings(BaseSettings):
     klines_cache_ttl: int = int(os.getenv("KLINES_CACHE_TTL", "60"))  # 默认1分钟
     ticker_cache_ttl: int = int(os.getenv("TICKER_CACHE_TTL", "10"))  # 默认10秒
 
+    # API Settings
+    analyze_cache_size: int = int(os.getenv("ANALYZE_CACHE_SIZE", "1024"))
+    analyze_stale_seconds: float = float(os.getenv("ANALYZE_STALE_SECONDS", "30"))
+    batch_max_concurrency: int = int(os.getenv("BATCH_MAX_CONCURRENCY", "8"))
+    batch_max_items: int = int(os.getenv("BATCH_MAX_ITEMS", "500"))
+    signal_stream_buffer: int = int(os.getenv("SIGNAL_STREAM_BUFFER", "100"))
+    signal_stream_policy: str = os.getenv("SIGNAL_STREAM_POLICY", "conflate")
+    signal_stream_heartbeat: float = float(os.getenv("SIGNAL_STREAM_HEARTBEAT", "15"))
+    api_warm_up: bool = os.getenv("API_WARM_UP", "true").lower() == "true"
+    market_metadata_refresh_seconds: float = float(os.getenv("MARKET_METADATA_REFRESH_SECONDS", "3600"))
+
     # Model Settings
     model_path: str = os.getenv("MODEL_PATH", "./models")
     prediction_threshold: float = float(os.getenv("PREDICTION_THRESHOLD", "0.7"))
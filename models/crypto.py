@@ -17,6 +17,11 @@ class PredictionRequest(BaseModel):
     timeframe: str
     indicators: List[str]
 
+class BatchAnalysisRequest(BaseModel):
+    symbols: List[str]
+    intervals: List[str] = ['1h']
+    limit: int = 100
+
 class PredictionResponse(BaseModel):
     symbol: str
     timestamp: datetime
@@ -72,4 +77,10 @@ class TechnicalAnalysis(BaseModel):
     vwap: Optional[float]
     obv: Optional[float]
     force_index: Optional[float]
-    mfi: Optional[float] 
\ No newline at end of file
+    mfi: Optional[float] 
+
+class ScreenerResult(BaseModel):
+    symbol: str
+    interval: str
+    updated_at: datetime
+    values: Dict[str, Optional[float]]
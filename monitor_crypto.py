@@ -1,6 +1,9 @@
 import asyncio
+import signal
 from services.market_monitor import MarketMonitor
 from services.telegram_notifier import TelegramNotifier
+from services import metrics
+from core.config import get_settings
 from datetime import datetime
 import json
 
@@ -11,7 +14,13 @@ async def signal_callback(symbol: str, market_info: dict):
     now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     signals = market_info['signals']
     
-    print(f"\n{now} - {symbol} {market_info['interval']} 市场更新")
+    if market_info.get('ai_preliminary'):
+        update_type = "AI初步信号"
+    elif market_info.get('ai_update'):
+        update_type = "AI分析更新"
+    else:
+        update_type = "市场更新"
+    print(f"\n{now} - {symbol} {market_info['interval']} {update_type}")
     print("=" * 60)
     
     # 打印价格信息
@@ -30,6 +39,8 @@ async def signal_callback(symbol: str, market_info: dict):
     # 打印技术指标
     print("\n技术指标:")
     for indicator, value in signals['technical'].items():
+        if value != value:
+            continue  # 未计算的指标
         if isinstance(value, float):
             print(f"{indicator}: {value:.2f}")
         else:
@@ -46,15 +57,35 @@ async def signal_callback(symbol: str, market_info: dict):
         
     print("-" * 60)
     
+    # AI分析进行中时先不发送通知，等AI初步结果或最终结果再发送
+    if market_info.get('ai_pending') and not market_info.get('ai_preliminary'):
+        print("AI分析进行中，结果稍后推送")
+        return
+    # 初步信号已经通知过，完整分析不再重复发送
+    if market_info.get('ai_preliminary_sent'):
+        return
+
     # 发送通知
     await telegram_notifier.send_signal_notification(symbol, market_info)
 
 async def main():
+    settings = get_settings()
     # 创建市场监控器
     monitor = MarketMonitor()
+
+    # 监控进程的运行指标（Prometheus 从 METRICS_PORT 抓取）
+    metrics_runner = None
+    if settings.metrics_port:
+        metrics_runner = await metrics.start_metrics_server(settings.metrics_port)
+        print(f"运行指标: http://0.0.0.0:{settings.metrics_port}/metrics")
     
     # 添加信号回调
     monitor.add_callback(signal_callback)
+
+    # kill -USR1 <pid> 记录接下来几轮监控的性能分析
+    if hasattr(signal, "SIGUSR1"):
+        cycles = settings.profile_cycles or 3
+        asyncio.get_running_loop().add_signal_handler(signal.SIGUSR1, monitor.enable_profiling, cycles)
     
     # 设置要监控的交易对和时间周期
     symbols = ["SOLUSDT", "ETHUSDT"]  # 监控BTC和ETH
@@ -64,15 +95,17 @@ async def main():
         print("开始市场监控...")
         print("按Ctrl+C停止监控")
         
-        # 启动监控
+        # 启动监控（默认在每根K线收盘后分析，见 MONITOR_SCHEDULE）
         await monitor.start_monitoring(
             symbols=symbols,
-            intervals=intervals,
-            update_interval=60  # 每60秒更新一次
+            intervals=intervals
         )
     except KeyboardInterrupt:
         print("\n停止监控...")
         monitor.stop_monitoring()
+    finally:
+        if metrics_runner is not None:
+            await metrics_runner.cleanup()
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -1,22 +1,44 @@
 from ast import main
 import json
-from typing import Dict, List, Optional
-import aiohttp
+from typing import TYPE_CHECKING, Awaitable, Callable, Dict, List, Optional, Tuple
 from datetime import datetime
 from tenacity import retry, stop_after_attempt, wait_exponential
 from .technical_analysis import TechnicalAnalyzer
+from .key_point_extractor import TREND_PATTERNS, get_key_point_extractor
+from .metrics import stage
 from core.config import get_settings
 import asyncio
 
+if TYPE_CHECKING:
+    import aiohttp
+
+# 分析上下文中用到的指标（包含 get_trend_signal 所需的全部指标）
+AI_INDICATORS = (
+    'sma_20', 'sma_50', 'sma_200', 'ema_20', 'ema_50',
+    'macd', 'macd_signal', 'adx', 'adx_pos', 'adx_neg',
+    'rsi', 'stoch_k', 'stoch_d', 'williams_r',
+    'bb_upper', 'bb_middle', 'bb_lower', 'atr',
+    'obv', 'mfi',
+)
+
 class AIAnalyzer:
     def __init__(self):
         """初始化AI分析器"""
         settings = get_settings()
         self.api_key = settings.deepseek_api_key
-        self.api_base = "https://api.deepseek.com"
+        self.api_base = settings.deepseek_api_base
+        self.streaming = settings.ai_streaming  # 流式接收AI输出
         self.technical_context = {}
         self.technical_analyzer = TechnicalAnalyzer()
+        self.key_point_extractor = get_key_point_extractor()
+        self.session: Optional["aiohttp.ClientSession"] = None  # 共享会话，由AIScheduler设置
         
+    def _calculate_indicators(self, market_info: dict):
+        """计算分析上下文所需的指标，复用信号生成时同一份K线上已算出的结果"""
+        return self.technical_analyzer.calculate_indicators(
+            market_info['klines'], AI_INDICATORS, market_info.get('indicator_context')
+        )
+
     def _prepare_market_context(self, symbol: str, market_info: dict) -> str:
         """准备市场分析上下文"""
         current_price = market_info.get('close', 0)
@@ -56,47 +78,183 @@ class AIAnalyzer:
 """
         return context
 
+    def _prepare_compact_context(self, symbol: str, market_info: dict) -> str:
+        """准备单行的精简市场上下文（批量分析用）"""
+        indicators = market_info.get('indicators', {})
+
+        def fmt(*keys) -> str:
+            values = []
+            for key in keys:
+                value = indicators.get(key)
+                values.append('N/A' if value is None else f"{value:.6g}")
+            return "/".join(values)
+
+        interval = market_info.get('interval') or ''
+        return (
+            f"{symbol} {interval} 价格 {market_info.get('close', 0):.6g} "
+            f"涨跌 {market_info.get('price_change_percent', 0):.2f}% | "
+            f"SMA20/50/200 {fmt('sma_20', 'sma_50', 'sma_200')} | "
+            f"EMA20/50 {fmt('ema_20', 'ema_50')} | "
+            f"MACD/Signal {fmt('macd', 'macd_signal')} | "
+            f"ADX/DI+/DI- {fmt('adx', 'adx_pos', 'adx_neg')} | "
+            f"RSI {fmt('rsi')} | KD {fmt('stoch_k', 'stoch_d')} | W%R {fmt('williams_r')} | "
+            f"BB {fmt('bb_upper', 'bb_middle', 'bb_lower')} | ATR {fmt('atr')} | "
+            f"OBV {fmt('obv')} | MFI {fmt('mfi')}"
+        )
+
+    async def _call_ai_api(
+        self,
+        prompt: str,
+        on_partial: Optional[Callable[[str], Awaitable[None]]] = None,
+        json_mode: bool = False
+    ) -> Dict:
+        """
+        调用 AI API 进行分析
+
+        参数:
+            prompt: 提示词
+            on_partial: 流式模式下每收到完整的一行后调用，参数为目前为止的全部文本
+            json_mode: 要求模型输出JSON（不使用流式）
+        """
+        # 共享会话由调度器设置：不在这里重试（重试会重复推送初步结果，退避时间也计入调度器的超时），由调度器的超时决定
+        if self.session is not None and not self.session.closed:
+            return await self._request_completion(self.session, prompt, on_partial, json_mode)
+        return await self._call_ai_api_with_retry(prompt, on_partial, json_mode)
+
     @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
-    async def _call_ai_api(self, prompt: str) -> Dict:
-        """调用 AI API 进行分析"""
+    async def _call_ai_api_with_retry(
+        self,
+        prompt: str,
+        on_partial: Optional[Callable[[str], Awaitable[None]]] = None,
+        json_mode: bool = False
+    ) -> Dict:
+        """单独调用时使用临时会话，失败后重试"""
+        import aiohttp
         async with aiohttp.ClientSession() as session:
-            async with session.post(
-                f"{self.api_base}/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {self.api_key}",
-                    "Content-Type": "application/json"
-                },
-                json={
-                    "model": "deepseek-chat",
-                    "messages": [
-                        {"role": "system", "content": "你是一位专业的加密货币交易分析师，擅长技术分析和市场研判。"}, 
-                        {"role": "user", "content": prompt}
-                    ],
-                    "temperature": 0.5,  # 降低随机性，使分析更稳定
-                    "max_tokens": 4096,  # 增加输出长度限制
-                    "top_p": 0.9,  # 控制输出多样性
-                    "frequency_penalty": 0.5  # 降低重复内容
+            return await self._request_completion(session, prompt, on_partial, json_mode)
+
+    async def _request_completion(
+        self,
+        session: "aiohttp.ClientSession",
+        prompt: str,
+        on_partial: Optional[Callable[[str], Awaitable[None]]] = None,
+        json_mode: bool = False
+    ) -> Dict:
+        if self.streaming and not json_mode:
+            return await self._stream_completion(session, prompt, on_partial)
+        return await self._post_completion(session, prompt, json_mode)
+
+    def _build_request(self, prompt: str, stream: bool = False, json_mode: bool = False) -> Dict:
+        """构建对话补全请求体"""
+        request = {
+            "model": "deepseek-chat",
+            "messages": [
+                {"role": "system", "content": "你是一位专业的加密货币交易分析师，擅长技术分析和市场研判。"}, 
+                {"role": "user", "content": prompt}
+            ],
+            "temperature": 0.5,  # 降低随机性，使分析更稳定
+            "max_tokens": 4096,  # 增加输出长度限制
+            "top_p": 0.9,  # 控制输出多样性
+            "frequency_penalty": 0.5,  # 降低重复内容
+            "stream": stream
+        }
+        if json_mode:
+            request["response_format"] = {"type": "json_object"}
+        return request
+
+    def _request_headers(self) -> Dict:
+        return {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
+
+    async def _post_completion(
+        self,
+        session: "aiohttp.ClientSession",
+        prompt: str,
+        json_mode: bool = False
+    ) -> Dict:
+        """发送对话补全请求，等待完整结果"""
+        async with session.post(
+            f"{self.api_base}/chat/completions",
+            headers=self._request_headers(),
+            json=self._build_request(prompt, json_mode=json_mode)
+        ) as response:
+            if response.status == 200:
+                result = await response.json()
+                return {
+                    "success": True,
+                    "content": result['choices'][0]['message']['content']
                 }
-            ) as response:
-                if response.status == 200:
-                    result = await response.json()
-                    return {
-                        "success": True,
-                        "content": result['choices'][0]['message']['content']
-                    }
-                else:
-                    error_text = await response.text()
-                    raise Exception(f"API请求失败: {response.status} - {error_text}")
-
-    async def analyze_market(self, symbol: str, market_info: dict) -> Dict:
-        """使用AI分析市场状况"""
+            else:
+                error_text = await response.text()
+                raise Exception(f"API请求失败: {response.status} - {error_text}")
+
+    async def _stream_completion(
+        self,
+        session: "aiohttp.ClientSession",
+        prompt: str,
+        on_partial: Optional[Callable[[str], Awaitable[None]]] = None
+    ) -> Dict:
+        """发送对话补全请求，以SSE方式逐段接收结果"""
+        async with session.post(
+            f"{self.api_base}/chat/completions",
+            headers=self._request_headers(),
+            json=self._build_request(prompt, stream=True)
+        ) as response:
+            if response.status != 200:
+                error_text = await response.text()
+                raise Exception(f"API请求失败: {response.status} - {error_text}")
+
+            parts = []
+            async for raw_line in response.content:
+                line = raw_line.decode('utf-8').strip()
+                # 跳过空行和注释（如 ": keep-alive"）
+                if not line.startswith('data:'):
+                    continue
+                data = line[5:].strip()
+                if data == '[DONE]':
+                    break
+                chunk = json.loads(data)
+                choices = chunk.get('choices') or [{}]
+                delta = (choices[0].get('delta') or {}).get('content')
+                if not delta:
+                    continue
+                parts.append(delta)
+                # 每凑满一行再解析，避免对半个数字做匹配
+                if on_partial is not None and '\n' in delta:
+                    await on_partial(''.join(parts))
+
+            return {
+                "success": True,
+                "content": ''.join(parts)
+            }
+
+    async def analyze_market(
+        self,
+        symbol: str,
+        market_info: dict,
+        on_preliminary: Optional[Callable[[Dict], Awaitable[None]]] = None
+    ) -> Dict:
+        """
+        使用AI分析市场状况
+
+        参数:
+            symbol: 交易对
+            market_info: 市场数据
+            on_preliminary: 流式模式下，一旦从部分输出中识别出趋势和关键价位，
+                            立即以初步结果调用一次（结果中 preliminary=True）
+        """
         if not self.api_key:
             return {"error": "未配置DeepSeek API密钥"}
             
         try:
             # 计算技术指标
+            technical_signals = None
             if 'klines' in market_info:
-                market_info['indicators'] = self.technical_analyzer.calculate_indicators(market_info['klines'])
+                market_info['indicators'] = self._calculate_indicators(market_info)
+                # 在等待AI接口之前读取，避免并发任务覆盖共享的指标结果
+                technical_signals = self.technical_analyzer.get_trend_signal()
             
             # 准备分析上下文
             context = self._prepare_market_context(symbol, market_info)
@@ -134,8 +292,30 @@ class AIAnalyzer:
 请确保分析客观专业，建议具有可操作性，并明确指出数据依据。
 """
 
+            # 流式输出时对部分文本提取关键点，满足条件即推送初步结果
+            on_partial = None
+            if on_preliminary is not None and self.streaming:
+                emitted = False
+
+                async def on_partial(text: str):
+                    nonlocal emitted
+                    if emitted:
+                        return
+                    key_points = self._extract_key_points(text)
+                    if self._is_actionable(key_points):
+                        emitted = True
+                        await on_preliminary({
+                            "success": True,
+                            "preliminary": True,
+                            "analysis": text,
+                            "key_points": key_points,
+                            "timestamp": datetime.now().isoformat(),
+                            "technical_signals": technical_signals
+                        })
+
             # 调用 AI 接口
-            result = await self._call_ai_api(prompt)
+            with stage('ai', symbol, market_info.get('interval')):
+                result = await self._call_ai_api(prompt, on_partial)
             
             # 提取关键点
             key_points = self._extract_key_points(result['content'])
@@ -145,7 +325,7 @@ class AIAnalyzer:
                 "analysis": result['content'],
                 "key_points": key_points,
                 "timestamp": datetime.now().isoformat(),
-                "technical_signals": self.technical_analyzer.get_trend_signal() if 'klines' in market_info else None
+                "technical_signals": technical_signals
             }
                         
         except Exception as e:
@@ -154,81 +334,158 @@ class AIAnalyzer:
                 "timestamp": datetime.now().isoformat()
             }
             
-    def _extract_key_points(self, analysis: str) -> Dict:
-        """从AI分析中提取关键点"""
-        import re
-        
-        def extract_price_levels(text: str, pattern: str) -> List[float]:
-            """提取价格水平"""
-            matches = re.findall(pattern, text)
-            return [float(price) for price in matches if price]
-
-        # 趋势判断
-        trend_patterns = {
-            "强势上涨": 3,
-            "上涨": 2,
-            "震荡偏多": 1,
-            "震荡": 0,
-            "震荡偏空": -1,
-            "下跌": -2,
-            "强势下跌": -3
-        }
-        
-        trend = "震荡"  # 默认
-        trend_score = 0
-        for pattern, score in trend_patterns.items():
-            if pattern in analysis:
-                if abs(score) > abs(trend_score):
-                    trend = pattern
-                    trend_score = score
-
-        # 置信度判断
-        confidence = 50  # 默认中等置信度
-        confidence_patterns = {
-            "明确": 80,
-            "强烈": 85,
-            "很强": 85,
-            "非常": 90,
-            "高概率": 75,
-            "可能": 60,
-            "或许": 55,
-            "不确定": 40
-        }
-        for pattern, value in confidence_patterns.items():
-            if pattern in analysis:
-                confidence = max(confidence, value)
+    async def analyze_batch(self, items: List[Tuple[str, dict]]) -> List[Dict]:
+        """
+        一次请求分析多个交易对
+
+        各交易对只发送精简的指标上下文，分析要求只写一次，并要求模型按
+        JSON结构返回，再拆分为与 analyze_market 相同格式的逐个结果。
+
+        参数:
+            items: [(交易对, 市场数据), ...]
+        返回:
+            与 items 顺序对应的分析结果列表
+        """
+        if not self.api_key:
+            return [{"error": "未配置DeepSeek API密钥"} for _ in items]
+
+        try:
+            contexts = []
+            technical_signals = []
+            for number, (symbol, market_info) in enumerate(items, 1):
+                signals = None
+                if 'klines' in market_info:
+                    market_info['indicators'] = self._calculate_indicators(market_info)
+                    signals = self.technical_analyzer.get_trend_signal()
+                technical_signals.append(signals)
+                contexts.append(f"[{number}] {self._prepare_compact_context(symbol, market_info)}")
+
+            prompt = f"""
+分析时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
+以下是{len(items)}个交易对的技术指标（格式: [编号] 交易对 周期 价格 涨跌 | 指标）：
+
+{chr(10).join(contexts)}
+
+请逐个分析每个交易对的趋势、关键支撑位和阻力位，并给出交易建议（做多/做空/观望）、止损价位和目标价位。
+只输出JSON，格式如下：
+{{"results": [{{
+  "id": 编号,
+  "symbol": "交易对",
+  "trend": "{'/'.join(TREND_PATTERNS)} 之一",
+  "confidence": 0-100的整数,
+  "support_levels": [支撑位],
+  "resistance_levels": [阻力位],
+  "stop_loss": 止损价位,
+  "take_profit_levels": [目标价位],
+  "risk_level": 1-5的整数（5为最高风险）,
+  "analysis": "100字以内的分析和建议"
+}}]}}
+"""
+            with stage('ai_batch'):
+                result = await self._call_ai_api(prompt, json_mode=True)
+            parsed = self._parse_batch_response(result['content'])
+        except Exception as e:
+            return [{
+                "error": f"批量分析过程出错: {str(e)}",
+                "timestamp": datetime.now().isoformat()
+            } for _ in items]
 
-        # 提取价格水平
-        support_levels = extract_price_levels(analysis, r"支撑位?[在于]?[：:]?\s*(\d+\.?\d*)")
-        resistance_levels = extract_price_levels(analysis, r"阻力位?[在于]?[：:]?\s*(\d+\.?\d*)")
-        stop_loss_levels = extract_price_levels(analysis, r"止损[位]?[在于]?[：:]?\s*(\d+\.?\d*)")
-        take_profit_levels = extract_price_levels(analysis, r"目标[位]?[在于]?[：:]?\s*(\d+\.?\d*)")
+        timestamp = datetime.now().isoformat()
+        results = []
+        for number, (symbol, _) in enumerate(items, 1):
+            item = parsed.get(number)
+            if item is None:
+                results.append({
+                    "error": f"批量分析结果缺少 {symbol}",
+                    "timestamp": timestamp
+                })
+                continue
+            results.append({
+                "success": True,
+                "batched": True,
+                "analysis": item.get('analysis') or '',
+                "key_points": self._normalize_batch_item(item),
+                "timestamp": timestamp,
+                "technical_signals": technical_signals[number - 1]
+            })
+        return results
+
+    def _parse_batch_response(self, content: str) -> Dict[int, Dict]:
+        """解析批量分析的JSON结果，返回 编号 -> 结果"""
+        text = content.strip()
+        # 兼容模型用代码块包裹JSON的情况
+        if text.startswith("```"):
+            text = text.strip("`")
+            text = text[text.index("{"):] if "{" in text else text
+        data = json.loads(text)
+        items = data.get('results', []) if isinstance(data, dict) else data
+
+        parsed = {}
+        for position, item in enumerate(items, 1):
+            if not isinstance(item, dict):
+                continue
+            try:
+                number = int(item.get('id', position))
+            except (TypeError, ValueError):
+                number = position
+            parsed[number] = item
+        return parsed
+
+    def _normalize_batch_item(self, item: Dict) -> Dict:
+        """将批量结果整理为与 _extract_key_points 相同的结构"""
+
+        def to_levels(value) -> Optional[List[float]]:
+            if value is None:
+                return None
+            values = value if isinstance(value, list) else [value]
+            levels = []
+            for v in values:
+                try:
+                    levels.append(float(v))
+                except (TypeError, ValueError):
+                    continue
+            return sorted(levels) or None
+
+        trend = item.get('trend')
+        if trend in TREND_PATTERNS:
+            trend_score = TREND_PATTERNS[trend]
+        else:
+            # 趋势不在约定范围内时，从文字中提取
+            key_points = self._extract_key_points(f"{trend or ''} {item.get('analysis') or ''}")
+            trend, trend_score = key_points['trend'], key_points['trend_score']
+
+        try:
+            confidence = max(0, min(int(item.get('confidence', 50)), 100))
+        except (TypeError, ValueError):
+            confidence = 50
+        try:
+            risk_level = max(1, min(int(item.get('risk_level', 3)), 5))
+        except (TypeError, ValueError):
+            risk_level = 3
+        stop_loss = to_levels(item.get('stop_loss'))
 
         return {
             "trend": trend,
-            "trend_score": trend_score,  # 趋势得分：-3到3
-            "confidence": confidence,    # 置信度：0-100
-            "support_levels": sorted(support_levels) if support_levels else None,
-            "resistance_levels": sorted(resistance_levels) if resistance_levels else None,
-            "stop_loss": min(stop_loss_levels) if stop_loss_levels else None,
-            "take_profit_levels": sorted(take_profit_levels) if take_profit_levels else None,
-            "risk_level": self._calculate_risk_level(analysis)  # 风险等级：1-5
+            "trend_score": trend_score,
+            "confidence": confidence,
+            "support_levels": to_levels(item.get('support_levels')),
+            "resistance_levels": to_levels(item.get('resistance_levels')),
+            "stop_loss": min(stop_loss) if stop_loss else None,
+            "take_profit_levels": to_levels(item.get('take_profit_levels')),
+            "risk_level": risk_level
         }
+
+    def _is_actionable(self, key_points: Dict) -> bool:
+        """已识别出明确方向以及支撑或阻力位"""
+        return bool(
+            key_points['trend_score'] != 0 and
+            (key_points['support_levels'] or key_points['resistance_levels'])
+        )
+
+    def _extract_key_points(self, analysis: str) -> Dict:
+        """从AI分析中提取关键点"""
+        return self.key_point_extractor.extract(analysis)
         
     def _calculate_risk_level(self, analysis: str) -> int:
         """计算风险等级（1-5，5为最高风险）"""
-        risk_words = {
-            "高风险": 5,
-            "风险较大": 4,
-            "谨慎": 3,
-            "注意风险": 3,
-            "风险较小": 2,
-            "低风险": 1
-        }
-        
-        risk_level = 3  # 默认中等风险
-        for word, level in risk_words.items():
-            if word in analysis:
-                risk_level = max(risk_level, level)
-                
-        return risk_level
\ No newline at end of file
+        return self.key_point_extractor.risk_level(analysis)
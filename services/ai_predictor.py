@@ -1,8 +1,15 @@
-import requests
-from typing import Dict, List, Optional
+from functools import lru_cache
+from typing import TYPE_CHECKING, Dict, List, Optional
 import json
 import os
+import sys
 from dotenv import load_dotenv
+from .local_model import LocalModel, resolve_model_file
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from core.config import get_settings
+
+if TYPE_CHECKING:
+    import aiohttp
 
 # 加载环境变量
 load_dotenv()
@@ -14,22 +21,42 @@ DEEPSEEK_API_KEY = os.getenv('DEEPSEEK_API_KEY', '')
 ENABLE_AI_ANALYSIS = os.getenv('ENABLE_AI_ANALYSIS', 'true').lower() == 'true'
 
 class AIPredictor:
-    def __init__(self):
+    def __init__(self, model_path: Optional[str] = None):
+        settings = get_settings()
         self.api_key = DEEPSEEK_API_KEY
         self.api_url = "https://api.deepseek.com"  # 示例URL，需要替换为实际的DeepSeek API端点
         self.enabled = ENABLE_AI_ANALYSIS  # AI分析功能开关
-        
+        self.prediction_threshold = settings.prediction_threshold
+        self.session: Optional["aiohttp.ClientSession"] = None
+
+        # 本地模型只加载一次；没有模型文件时使用远程接口
+        self.model: Optional[LocalModel] = None
+        model_file = resolve_model_file(model_path if model_path is not None else settings.model_path)
+        if model_file:
+            try:
+                self.model = LocalModel.load(model_file)
+            except Exception as e:
+                print(f"加载本地模型失败({model_file}): {str(e)}，使用远程接口")
+
     @property
     def is_enabled(self) -> bool:
         """检查AI分析功能是否启用"""
         return self.enabled and bool(self.api_key)
 
+    @property
+    def has_local_model(self) -> bool:
+        return self.model is not None
+
     async def predict(self, data: Dict, indicators: List[str]) -> Optional[Dict]:
         """
-        使用DeepSeek API进行预测
-        
-        如果AI分析功能未启用，返回None
+        预测市场趋势
+
+        有本地模型时直接在进程内推理，否则调用DeepSeek API。
+        如果AI分析功能未启用且没有本地模型，返回禁用状态。
         """
+        if self.has_local_model:
+            return self.predict_batch([data], indicators)[0]
+
         # 检查AI分析功能是否启用
         if not self.is_enabled:
             return {
@@ -37,9 +64,40 @@ class AIPredictor:
                 "confidence": 0,
                 "trend": "未启用AI分析",
                 "recommendation": "未启用AI分析",
+                "indicators": self._select_indicators(data, indicators),
                 "disabled": True
             }
-            
+
+        return await self._predict_remote(data, indicators)
+
+    def predict_batch(self, items: List[Dict], indicators: Optional[List[str]] = None) -> List[Dict]:
+        """
+        使用本地模型批量预测
+
+        参数:
+            items: 预测数据列表，每项包含 indicators 指标字典
+            indicators: 返回结果中附带的指标名称（可选）
+        """
+        if not self.has_local_model:
+            raise RuntimeError("未加载本地模型")
+
+        rows = [item.get("indicators", {}) for item in items]
+        probabilities = self.model.predict_proba(self.model.vectorize(rows))
+
+        results = []
+        for item, prediction in zip(items, probabilities.tolist()):
+            result = self._process_prediction({
+                "prediction": prediction,
+                # 预测方向的概率
+                "confidence": max(prediction, 1 - prediction)
+            })
+            result["indicators"] = self._select_indicators(item, indicators or self.model.features)
+            result["source"] = "local"
+            results.append(result)
+        return results
+
+    async def _predict_remote(self, data: Dict, indicators: List[str]) -> Dict:
+        """调用远程预测接口（异步，不阻塞事件循环）"""
         try:
             headers = {
                 "Authorization": f"Bearer {self.api_key}",
@@ -52,21 +110,42 @@ class AIPredictor:
                 "model": "crypto-prediction"
             }
 
-            response = requests.post(
+            if self.session is None or self.session.closed:
+                import aiohttp  # 只在使用远程接口时加载
+                self.session = aiohttp.ClientSession()
+
+            async with self.session.post(
                 self.api_url,
                 headers=headers,
                 json=payload
-            )
-
-            if response.status_code == 200:
-                result = response.json()
-                return self._process_prediction(result)
-            else:
-                raise Exception(f"API请求失败: {response.status_code}")
+            ) as response:
+                if response.status == 200:
+                    result = await response.json()
+                    processed = self._process_prediction(result)
+                    processed["indicators"] = self._select_indicators(data, indicators)
+                    processed["source"] = "remote"
+                    return processed
+                else:
+                    raise Exception(f"API请求失败: {response.status}")
 
         except Exception as e:
             raise Exception(f"预测过程出错: {str(e)}")
 
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    def _select_indicators(self, data: Dict, names: Optional[List[str]]) -> Dict[str, float]:
+        """从预测数据中取出指定的数值指标"""
+        values = data.get("indicators", {}) or {}
+        selected = {}
+        for name in names or values.keys():
+            value = values.get(name)
+            if isinstance(value, (int, float)) and value == value:
+                selected[name] = float(value)
+        return selected
+
     def _process_prediction(self, result: Dict) -> Dict:
         """
         处理预测结果
@@ -99,13 +178,21 @@ class AIPredictor:
     def _get_recommendation(self, prediction: float, confidence: float) -> str:
         """
         生成交易建议
+
+        上涨概率达到 prediction_threshold 时建议买入，
+        低于 1 - prediction_threshold 时建议卖出。
         """
         if confidence < 0.6:
             return "建议观望"
-        
-        if prediction > 0.6:
+
+        if prediction >= self.prediction_threshold:
             return "建议买入"
-        elif prediction < 0.4:
+        elif prediction <= 1 - self.prediction_threshold:
             return "建议卖出"
         else:
-            return "建议持有" 
\ No newline at end of file
+            return "建议持有"
+
+@lru_cache()
+def get_ai_predictor() -> AIPredictor:
+    """进程内共享的 AIPredictor（第一次调用时加载本地模型）"""
+    return AIPredictor()
@@ -0,0 +1,346 @@
+import asyncio
+import itertools
+import time
+from typing import TYPE_CHECKING, Awaitable, Callable, Dict, List, Optional
+from .ai_analyzer import AIAnalyzer
+from core.config import get_settings
+
+if TYPE_CHECKING:
+    import aiohttp
+
+# 任务未执行完时回调收到的错误
+CANCELLED = 'cancelled'
+STALE = 'stale'
+
+class AIJob:
+    """AI分析任务"""
+
+    def __init__(
+        self,
+        symbol: str,
+        market_info: dict,
+        priority: float = 0,
+        deadline: Optional[float] = None,
+        key: Optional[str] = None,
+        callback: Optional[Callable[[Dict], Awaitable[None]]] = None,
+        preliminary_callback: Optional[Callable[[Dict], Awaitable[None]]] = None
+    ):
+        self.symbol = symbol
+        self.market_info = market_info
+        self.priority = priority      # 优先级（信心指数越高越先执行）
+        self.deadline = deadline      # 过期时间戳（秒），通常为当前K线的收盘时间
+        self.key = key or symbol      # 去重键，同一个键只保留最新的任务
+        self.callback = callback
+        self.preliminary_callback = preliminary_callback
+        self.future: Optional[asyncio.Future] = None
+        self.cancelled = False
+
+    def is_stale(self, now: Optional[float] = None) -> bool:
+        """K线已收盘的任务视为过期"""
+        if self.deadline is None:
+            return False
+        return (now if now is not None else time.time()) >= self.deadline
+
+
+class AIScheduler:
+    """
+    AI分析任务调度器
+
+    - 复用同一个HTTP会话（连接池）
+    - 限制同时进行的AI请求数量
+    - 每个请求单独超时
+    - 按信心指数优先执行
+    - K线收盘后自动取消过期任务
+    - 任务被替换、过期或取消时，回调收到 {'error': 'cancelled'/'stale'}，调用方不会一直等待
+    - 可选批量模式：排队中的多个交易对合并为一次请求
+    """
+
+    def __init__(
+        self,
+        ai_analyzer: Optional[AIAnalyzer] = None,
+        max_concurrency: Optional[int] = None,
+        request_timeout: Optional[float] = None,
+        batch_size: Optional[int] = None,
+        batch_window: Optional[float] = None
+    ):
+        settings = get_settings()
+        self.ai_analyzer = ai_analyzer or AIAnalyzer()
+        self.max_concurrency = max_concurrency or settings.ai_max_concurrency
+        self.request_timeout = request_timeout or settings.ai_request_timeout
+        self.batch_size = batch_size or settings.ai_batch_size
+        self.batch_window = batch_window if batch_window is not None else settings.ai_batch_window
+        self.session: Optional["aiohttp.ClientSession"] = None
+        self.queue: Optional[asyncio.PriorityQueue] = None
+        self.pending: Dict[str, AIJob] = {}
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._running = set()
+        # 执行中的任务 -> 执行它的协程任务（批量模式下多个任务共用一个）
+        self._job_tasks: Dict[AIJob, asyncio.Task] = {}
+        self._callback_tasks = set()
+        self._counter = itertools.count()
+
+    @property
+    def started(self) -> bool:
+        return self._dispatcher is not None
+
+    async def start(self):
+        """启动调度协程和共享会话"""
+        if self.started:
+            return
+        import aiohttp  # 延迟到启动调度时导入
+        self.session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.max_concurrency)
+        )
+        self.ai_analyzer.session = self.session
+        self.queue = asyncio.PriorityQueue()
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+        self._dispatcher = asyncio.create_task(self._dispatch_loop())
+
+    async def close(self):
+        """停止调度器，取消所有未完成的任务（等待取消通知的回调执行完）"""
+        for job in list(self.pending.values()):
+            self._cancel_job(job)
+        tasks = [self._dispatcher, *self._running] if self._dispatcher else list(self._running)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await asyncio.gather(*self._callback_tasks, return_exceptions=True)
+        self._dispatcher = None
+        self._running.clear()
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+        self.ai_analyzer.session = None
+
+    def submit(
+        self,
+        symbol: str,
+        market_info: dict,
+        priority: float = 0,
+        deadline: Optional[float] = None,
+        key: Optional[str] = None,
+        callback: Optional[Callable[[Dict], Awaitable[None]]] = None,
+        preliminary_callback: Optional[Callable[[Dict], Awaitable[None]]] = None
+    ) -> asyncio.Future:
+        """
+        提交AI分析任务
+
+        参数:
+            symbol: 交易对
+            market_info: 传给 AIAnalyzer.analyze_market 的市场数据
+            priority: 优先级，通常为基础分析的信心指数
+            deadline: 过期时间戳（秒），超过后任务被取消
+            key: 去重键，同一个键的旧任务会被新任务替换
+            callback: 分析完成后调用的异步回调，参数为分析结果；
+                任务被替换或取消时为 {'error': 'cancelled'}，过期时为 {'error': 'stale'}
+            preliminary_callback: 流式输出中识别出初步结论时调用的异步回调
+        返回:
+            分析结果的Future
+        """
+        if not self.started:
+            raise RuntimeError("AI调度器未启动，请先调用 start()")
+
+        job = AIJob(symbol, market_info, priority, deadline, key, callback, preliminary_callback)
+        job.future = asyncio.get_running_loop().create_future()
+
+        # 同一交易对/周期只保留最新的任务
+        previous = self.pending.get(job.key)
+        if previous is not None:
+            self._cancel_job(previous)
+        self.pending[job.key] = job
+
+        self.queue.put_nowait((-priority, next(self._counter), job))
+        return job.future
+
+    def cancel_stale(self, now: Optional[float] = None) -> int:
+        """取消所有已过期的排队任务，返回取消数量"""
+        now = now if now is not None else time.time()
+        stale = [job for job in self.pending.values() if job.is_stale(now)]
+        for job in stale:
+            self._cancel_job(job, STALE)
+        return len(stale)
+
+    def _cancel_job(self, job: AIJob, reason: str = CANCELLED):
+        if job.cancelled:
+            return
+        job.cancelled = True
+        if job.future is not None and not job.future.done():
+            job.future.cancel()
+        if self.pending.get(job.key) is job:
+            del self.pending[job.key]
+        # 执行中的请求立即中止，释放并发名额（批量请求中的任务全部取消后才中止）
+        task = self._job_tasks.pop(job, None)
+        if (task is not None and task is not asyncio.current_task()
+                and not any(other is task for other in self._job_tasks.values())):
+            task.cancel()
+        # 调用方可能在等待AI结果时暂缓了通知，取消时也要回调
+        if job.callback is not None:
+            self._spawn_callback(job, job.callback, {"error": reason, "timestamp": None})
+
+    def _is_runnable(self, job: AIJob) -> bool:
+        if job.cancelled:
+            return False
+        if job.is_stale():
+            print(f"[AI调度] {job.key} K线已收盘，取消过期任务")
+            self._cancel_job(job, STALE)
+            return False
+        return True
+
+    async def _dispatch_loop(self):
+        # 有空闲名额时才取任务，保证每次取出的都是当前优先级最高的
+        while True:
+            await self._slots.acquire()
+            try:
+                batch = await self._next_batch()
+            except BaseException:
+                self._slots.release()
+                raise
+            task = asyncio.create_task(self._run_batch(batch))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+            for job in batch:
+                self._job_tasks[job] = task
+            task.add_done_callback(lambda _, batch=batch: self._forget_jobs(batch))
+
+    def _forget_jobs(self, batch: List[AIJob]):
+        for job in batch:
+            self._job_tasks.pop(job, None)
+
+    async def _next_batch(self) -> List[AIJob]:
+        """取出下一个任务；批量模式下再合并排队中的其他任务"""
+        while True:
+            _, _, job = await self.queue.get()
+            if self._is_runnable(job):
+                break
+
+        batch = [job]
+        if self.batch_size <= 1:
+            return batch
+
+        loop = asyncio.get_running_loop()
+        collect_until = loop.time() + self.batch_window
+        while len(batch) < self.batch_size:
+            try:
+                _, _, job = self.queue.get_nowait()
+            except asyncio.QueueEmpty:
+                # 在等待窗口内继续收集同一轮触发的任务
+                remaining = collect_until - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    _, _, job = await asyncio.wait_for(self.queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+            if self._is_runnable(job):
+                batch.append(job)
+        return batch
+
+    async def _run_batch(self, batch: List[AIJob]):
+        try:
+            if len(batch) == 1:
+                await self._run_job(batch[0])
+            else:
+                await self._run_batched_jobs(batch)
+        finally:
+            self._slots.release()
+
+    async def _run_batched_jobs(self, batch: List[AIJob]):
+        """多个交易对合并为一次请求"""
+        print(f"[AI调度] 批量分析 {len(batch)} 个交易对: {', '.join(job.key for job in batch)}")
+        timeout = self.request_timeout
+        deadlines = [job.deadline for job in batch if job.deadline is not None]
+        if deadlines:
+            # 最早收盘的K线收盘时结束等待，过期的任务在下面取消，其余的收到超时错误
+            timeout = min(timeout, max(min(deadlines) - time.time(), 0))
+        try:
+            results = await asyncio.wait_for(
+                self.ai_analyzer.analyze_batch([(job.symbol, job.market_info) for job in batch]),
+                timeout=timeout
+            )
+        except asyncio.CancelledError:
+            raise
+        except asyncio.TimeoutError:
+            results = [{
+                "error": f"AI批量分析超时({timeout:.0f}秒)",
+                "timestamp": None
+            }] * len(batch)
+        except Exception as e:
+            results = [{
+                "error": f"AI批量分析出错: {str(e)}",
+                "timestamp": None
+            }] * len(batch)
+
+        for job, result in zip(batch, results):
+            if job.is_stale():
+                print(f"[AI调度] {job.key} K线已收盘，取消过期任务")
+                self._cancel_job(job, STALE)
+                continue
+            self._complete_job(job, result)
+
+    async def _run_job(self, job: AIJob):
+        timeout = self.request_timeout
+        if job.deadline is not None:
+            timeout = min(timeout, max(job.deadline - time.time(), 0))
+
+        kwargs = {}
+        if job.preliminary_callback is not None:
+            async def on_preliminary(result: Dict):
+                if not job.cancelled:
+                    self._spawn_callback(job, job.preliminary_callback, result)
+            kwargs['on_preliminary'] = on_preliminary
+
+        try:
+            result = await asyncio.wait_for(
+                self.ai_analyzer.analyze_market(job.symbol, job.market_info, **kwargs),
+                timeout=timeout
+            )
+        except asyncio.CancelledError:
+            raise
+        except asyncio.TimeoutError:
+            if job.is_stale():
+                print(f"[AI调度] {job.key} K线已收盘，取消过期任务")
+                self._cancel_job(job, STALE)
+                return
+            result = {
+                "error": f"AI分析超时({timeout:.0f}秒)",
+                "timestamp": None
+            }
+        except Exception as e:
+            result = {
+                "error": f"AI分析出错: {str(e)}",
+                "timestamp": None
+            }
+
+        self._complete_job(job, result)
+
+    def _complete_job(self, job: AIJob, result: Dict):
+        # 任务在执行期间被替换或取消
+        if job.cancelled:
+            return
+        if self.pending.get(job.key) is job:
+            del self.pending[job.key]
+        if not job.future.done():
+            job.future.set_result(result)
+
+        if job.callback is not None:
+            self._spawn_callback(job, job.callback, result)
+
+    def _spawn_callback(self, job: AIJob, callback: Callable[[Dict], Awaitable[None]], result: Dict):
+        # 回调放到独立的任务中执行，避免占用并发名额
+        task = asyncio.create_task(self._run_callback(job, callback, result))
+        self._callback_tasks.add(task)
+        task.add_done_callback(self._callback_tasks.discard)
+
+    async def _run_callback(self, job: AIJob, callback: Callable[[Dict], Awaitable[None]], result: Dict):
+        try:
+            await callback(result)
+        except Exception as e:
+            print(f"[AI调度] {job.key} 回调出错: {str(e)}")
+
+
+class SubmitOnlyScheduler:
+    """只接收AI任务不执行，用于基准测试、压测和回放（结果不依赖AI接口）"""
+
+    def submit(self, *args, **kwargs):
+        pass
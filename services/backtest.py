@@ -0,0 +1,360 @@
+from typing import Dict, List, Optional
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from ta.trend import MACD
+from . import indicator_kernels as kernels
+from .pattern_recognition import PatternRecognition
+from .signal_generator import THRESHOLDS, SignalGenerator
+
+# 行动建议编码，与 SignalGenerator._get_action_recommendation 的文字一一对应
+ACTION_STRONG_BUY = 2
+ACTION_BUY = 1
+ACTION_HOLD = 0
+ACTION_SELL = -1
+ACTION_STRONG_SELL = -2
+ACTION_WAIT = 9
+
+ACTION_LABELS = {
+    ACTION_STRONG_BUY: "强烈建议买入",
+    ACTION_BUY: "建议买入",
+    ACTION_HOLD: "建议持有",
+    ACTION_SELL: "建议卖出",
+    ACTION_STRONG_SELL: "强烈建议卖出",
+    ACTION_WAIT: "建议观望，信号不明确",
+}
+
+
+class BacktestConfig:
+    """回测参数（形态参数、评分阈值、交易成本），未指定的使用实盘 PatternRecognition/SignalGenerator 的值"""
+
+    def __init__(
+        self,
+        doji_size: Optional[float] = None,
+        hammer_ratio: Optional[float] = None,
+        engulfing_ratio: Optional[float] = None,
+        rsi_overbought: Optional[float] = None,
+        rsi_oversold: Optional[float] = None,
+        min_confidence: Optional[float] = None,
+        strong_score: Optional[float] = None,
+        strong_confidence: Optional[float] = None,
+        action_score: Optional[float] = None,
+        fee_rate: float = 0.0004,
+        slippage: float = 0.0002,
+        allow_short: bool = True
+    ):
+        defaults = PatternRecognition()
+        self.doji_size = defaults.doji_size if doji_size is None else doji_size
+        self.hammer_ratio = defaults.hammer_ratio if hammer_ratio is None else hammer_ratio
+        self.engulfing_ratio = defaults.engulfing_ratio if engulfing_ratio is None else engulfing_ratio
+        thresholds = dict(rsi_overbought=rsi_overbought, rsi_oversold=rsi_oversold,
+                          min_confidence=min_confidence, strong_score=strong_score,
+                          strong_confidence=strong_confidence, action_score=action_score)
+        for name in THRESHOLDS:
+            value = thresholds[name]
+            setattr(self, name, getattr(SignalGenerator, name) if value is None else value)
+        self.fee_rate = fee_rate          # 手续费率（按成交额）
+        self.slippage = slippage          # 滑点（按成交价比例）
+        self.allow_short = allow_short    # 卖出信号是否开空，否则只平仓
+
+    def to_dict(self) -> Dict:
+        return dict(self.__dict__)
+
+
+class BacktestEngine:
+    """
+    向量化回测引擎
+
+    对整段历史一次性计算指标和K线形态，把 SignalGenerator 的基础评分
+    (_generate_base_recommendation) 和行动建议 (_get_action_recommendation)
+    改写为数组运算，再按持仓序列模拟交易。
+
+    与实盘的差异：
+    - 实盘每次只用最近 limit 根K线计算指标，RSI/MACD 等递推指标在窗口
+      起点附近会与全量历史的结果略有不同
+    - 只使用技术面评分，不包含AI分析
+    - 第 t 根K线收盘时产生信号并以收盘价成交，持仓从第 t+1 根开始计算收益
+    """
+
+    def __init__(self, config: Optional[BacktestConfig] = None):
+        self.config = config or BacktestConfig()
+
+    def compute_features(self, df: pd.DataFrame) -> Dict[str, np.ndarray]:
+        """计算评分所需的全部序列（只依赖K线，不依赖参数）"""
+        close = df['close'].astype(float)
+        macd = MACD(close=close)
+        close_values = close.to_numpy(dtype=np.float64)
+        return {
+            'open': df['open'].to_numpy(dtype=np.float64),
+            'high': df['high'].to_numpy(dtype=np.float64),
+            'low': df['low'].to_numpy(dtype=np.float64),
+            'close': close_values,
+            'rsi': kernels.rsi(close_values, window=14),
+            'macd': macd.macd().to_numpy(dtype=np.float64),
+            'macd_signal': macd.macd_signal().to_numpy(dtype=np.float64),
+        }
+
+    def pattern_signals(self, f: Dict[str, np.ndarray], config: Optional[BacktestConfig] = None) -> Dict[str, np.ndarray]:
+        """逐根K线识别形态，规则与 PatternRecognition 相同"""
+        config = config or self.config
+        o, h, l, c = f['open'], f['high'], f['low'], f['close']
+
+        body = c - o
+        body_size = np.abs(body)
+        upper_shadow = h - np.maximum(o, c)
+        lower_shadow = np.minimum(o, c) - l
+        total_length = h - l
+        is_bullish = c > o
+
+        def shift(a: np.ndarray, n: int, fill) -> np.ndarray:
+            out = np.empty_like(a)
+            out[:n] = fill
+            out[n:] = a[:-n]
+            return out
+
+        # 单根K线形态
+        long_lower = (lower_shadow > total_length * config.hammer_ratio) & (upper_shadow < body_size * 0.3)
+        hammer = long_lower & is_bullish
+        shooting_star = (upper_shadow > total_length * config.hammer_ratio) & (lower_shadow < body_size * 0.3) & ~is_bullish
+        prev_close = shift(c, 1, np.nan)
+        hanging_man = long_lower & ~is_bullish & (prev_close > c)
+
+        # 两根K线形态
+        p_open, p_close = shift(o, 1, np.nan), prev_close
+        p_bullish = shift(is_bullish, 1, False)
+        p_body_size = shift(body_size, 1, np.nan)
+        has_prev = np.arange(len(c)) >= 1
+        bigger = body_size > p_body_size * config.engulfing_ratio
+        bullish_engulfing = has_prev & ~p_bullish & is_bullish & bigger & (o < p_close) & (c > p_open)
+        bearish_engulfing = (has_prev & p_bullish & ~is_bullish & bigger & (o > p_close) & (c < p_open)
+                             & ~bullish_engulfing)
+
+        # 三根K线形态
+        has_two = np.arange(len(c)) >= 2
+        f_open, f_close = shift(o, 2, np.nan), shift(c, 2, np.nan)
+        f_body, f_body_size = shift(body, 2, np.nan), shift(body_size, 2, np.nan)
+        f_bullish = shift(is_bullish, 2, False)
+        f_low = shift(l, 2, np.nan)
+        s_body, s_low = shift(body, 1, np.nan), shift(l, 1, np.nan)
+        s_total = shift(total_length, 1, np.nan)
+        small_second = np.abs(s_body) < f_body_size * 0.3
+        morning_star = has_two & ~f_bullish & small_second & is_bullish & (c > f_open + f_body / 2)
+        evening_star = has_two & f_bullish & small_second & ~is_bullish & (c < f_close - f_body / 2)
+        tweezer_bottom = (has_two & (np.abs(s_low - l) < s_total * 0.1) & ~p_bullish & is_bullish
+                          & (s_low < f_low))
+
+        bullish = (hammer.astype(np.int8) + bullish_engulfing + morning_star + tweezer_bottom)
+        bearish = (shooting_star.astype(np.int8) + hanging_man + bearish_engulfing + evening_star)
+        return {'bullish': bullish.astype(np.int64), 'bearish': bearish.astype(np.int64)}
+
+    def base_recommendation(self, f: Dict[str, np.ndarray], patterns: Dict[str, np.ndarray],
+                            config: Optional[BacktestConfig] = None) -> Dict[str, np.ndarray]:
+        """向量化的 SignalGenerator._generate_base_recommendation"""
+        config = config or self.config
+        bullish, bearish = patterns['bullish'], patterns['bearish']
+        rsi, macd, macd_signal = f['rsi'], f['macd'], f['macd_signal']
+
+        score = (bullish - bearish) * 2
+        score = score - (rsi > config.rsi_overbought) + (rsi < config.rsi_oversold)
+        # NaN比较为False，与实盘一样记为死叉
+        score = score + np.where(macd > macd_signal, 1, -1)
+
+        # rsi 和 macd 两项始终计入信号数量
+        total_signals = bullish + bearish + 2
+        confidence = np.minimum(np.abs(score) / total_signals * 100, 100)
+        return {'score': score.astype(np.float64), 'confidence': confidence}
+
+    def actions(self, score: np.ndarray, confidence: np.ndarray,
+                config: Optional[BacktestConfig] = None) -> np.ndarray:
+        """向量化的 SignalGenerator._get_action_recommendation，返回行动编码"""
+        config = config or self.config
+        return np.select(
+            [
+                confidence < config.min_confidence,
+                (score >= config.strong_score) & (confidence >= config.strong_confidence),
+                score >= config.action_score,
+                (score <= -config.strong_score) & (confidence >= config.strong_confidence),
+                score <= -config.action_score,
+            ],
+            [ACTION_WAIT, ACTION_STRONG_BUY, ACTION_BUY, ACTION_STRONG_SELL, ACTION_SELL],
+            default=ACTION_HOLD
+        )
+
+    def positions(self, actions: np.ndarray, config: Optional[BacktestConfig] = None) -> np.ndarray:
+        """
+        行动建议转换为目标持仓：买入为1，卖出为-1（不允许做空时为0），
+        持有和观望沿用上一根K线的持仓
+        """
+        config = config or self.config
+        target = np.full(len(actions), np.nan)
+        target[(actions == ACTION_BUY) | (actions == ACTION_STRONG_BUY)] = 1.0
+        target[(actions == ACTION_SELL) | (actions == ACTION_STRONG_SELL)] = -1.0 if config.allow_short else 0.0
+
+        # 向前填充，第一个信号之前为空仓
+        valid = ~np.isnan(target)
+        index = np.where(valid, np.arange(len(target)), 0)
+        np.maximum.accumulate(index, out=index)
+        return np.nan_to_num(target[index])
+
+    def simulate(self, close: np.ndarray, positions: np.ndarray,
+                 config: Optional[BacktestConfig] = None,
+                 periods_per_year: Optional[float] = None, detail: bool = True) -> Dict:
+        """
+        按持仓序列计算收益、回撤和逐笔交易
+
+        detail 为 False 时不生成 trade_list 和 equity（参数扫描时使用）
+        """
+        config = config or self.config
+        n = len(close)
+        if n < 2:
+            return self._empty_result()
+
+        # 第 t 根收盘产生的持仓在第 t+1 根K线上计算收益
+        held = np.empty(n)
+        held[0] = 0.0
+        held[1:] = positions[:-1]
+        bar_return = np.zeros(n)
+        bar_return[1:] = close[1:] / close[:-1] - 1
+
+        cost_rate = config.fee_rate + config.slippage
+        turnover = np.abs(np.diff(held, prepend=0.0))
+        strategy_return = (1 + held * bar_return) * (1 - turnover * cost_rate) - 1
+        equity = np.cumprod(1 + strategy_return)
+        drawdown = equity / np.maximum.accumulate(equity) - 1
+
+        starts, ends, direction, returns = self._trades(held, bar_return, cost_rate)
+        std = strategy_return[1:].std()
+        result = {
+            'bars': n,
+            'total_return': float(equity[-1] - 1),
+            'buy_and_hold_return': float(close[-1] / close[0] - 1),
+            'max_drawdown': float(drawdown.min()),
+            'trades': len(starts),
+            'win_rate': float(np.mean(returns > 0)) if len(starts) else 0.0,
+            'exposure': float(np.mean(held != 0)),
+            'sharpe': 0.0,
+        }
+        if detail:
+            result['trade_list'] = [
+                {
+                    'entry_bar': int(s - 1),   # 建仓信号所在K线
+                    'exit_bar': int(e - 1),    # 平仓信号所在K线
+                    'direction': 'long' if d > 0 else 'short',
+                    'bars': int(e - s),
+                    'return': float(r)
+                }
+                for s, e, d, r in zip(starts, ends, direction, returns)
+            ]
+            result['equity'] = equity
+        if std > 0:
+            scale = np.sqrt(periods_per_year) if periods_per_year else 1.0
+            result['sharpe'] = float(strategy_return[1:].mean() / std * scale)
+        return result
+
+    def _trades(self, held: np.ndarray, bar_return: np.ndarray, cost_rate: float):
+        """把连续相同方向的持仓合并为一笔交易，返回 (开始, 结束, 方向, 收益) 数组"""
+        change = np.flatnonzero(np.diff(held, prepend=0.0, append=0.0) != 0)
+        starts, ends = change[:-1], change[1:]
+        direction = held[starts]
+        keep = direction != 0
+        starts, ends, direction = starts[keep], ends[keep], direction[keep]
+
+        # 每笔交易的毛收益（由累积对数收益求区间连乘），开平仓各扣一次成本
+        log_growth = np.concatenate([[0.0], np.cumsum(np.log1p(held * bar_return))])
+        growth = np.exp(log_growth[ends] - log_growth[starts])
+        returns = growth * (1 - cost_rate) ** 2 - 1
+        return starts, ends, direction, returns
+
+    def _empty_result(self) -> Dict:
+        return {
+            'bars': 0, 'total_return': 0.0, 'buy_and_hold_return': 0.0,
+            'max_drawdown': 0.0, 'trades': 0, 'win_rate': 0.0, 'exposure': 0.0,
+            'sharpe': 0.0, 'trade_list': [], 'equity': np.ones(0)
+        }
+
+    def signals(self, f: Dict[str, np.ndarray], config: Optional[BacktestConfig] = None) -> Dict[str, np.ndarray]:
+        """计算逐根K线的形态、评分、信心指数和行动建议"""
+        config = config or self.config
+        patterns = self.pattern_signals(f, config)
+        base = self.base_recommendation(f, patterns, config)
+        return {**patterns, **base, 'action': self.actions(base['score'], base['confidence'], config)}
+
+    def run(self, df: pd.DataFrame, config: Optional[BacktestConfig] = None) -> Dict:
+        """对整段历史回测"""
+        config = config or self.config
+        f = self.compute_features(df)
+        signals = self.signals(f, config)
+        result = self.simulate(f['close'], self.positions(signals['action'], config), config,
+                               periods_per_year=periods_per_year(df.index))
+        result['signals'] = signals
+        return result
+
+    def walk_forward(
+        self,
+        df: pd.DataFrame,
+        train_bars: int,
+        test_bars: int,
+        candidates: Optional[List[BacktestConfig]] = None,
+        metric: str = 'total_return'
+    ) -> List[Dict]:
+        """
+        滚动窗口回测
+
+        每个窗口用前 train_bars 根K线从 candidates 中选出 metric 最好的参数，
+        再在随后的 test_bars 根K线上检验。没有 candidates 时直接使用当前参数。
+        指标只在全量历史上计算一次，各窗口只做切片。
+        """
+        f = self.compute_features(df)
+        candidates = candidates or [self.config]
+        per_year = periods_per_year(df.index)
+        candidate_actions = [self.signals(f, c)['action'] for c in candidates]
+
+        windows = []
+        for start in range(train_bars, len(df) - 1, test_bars):
+            end = min(start + test_bars, len(df))
+            best, best_score, best_train = 0, None, None
+            if len(candidates) > 1:
+                for i, config in enumerate(candidates):
+                    train = self.simulate(f['close'][start - train_bars:start],
+                                          self.positions(candidate_actions[i][start - train_bars:start], config),
+                                          config, per_year)
+                    if best_score is None or train[metric] > best_score:
+                        best, best_score, best_train = i, train[metric], train
+            config = candidates[best]
+            test = self.simulate(f['close'][start:end],
+                                 self.positions(candidate_actions[best][start:end], config),
+                                 config, per_year)
+            windows.append({
+                'train_start': df.index[start - train_bars],
+                'test_start': df.index[start],
+                'test_end': df.index[end - 1],
+                'config': config.to_dict(),
+                'train': _summary(best_train) if best_train else None,
+                'test': _summary(test),
+            })
+        return windows
+
+
+def _summary(result: Dict) -> Dict:
+    return {k: v for k, v in result.items() if k not in ('trade_list', 'equity', 'signals')}
+
+
+def periods_per_year(index) -> Optional[float]:
+    """根据K线时间索引推算每年的K线数量"""
+    if not isinstance(index, pd.DatetimeIndex) or len(index) < 2:
+        return None
+    step = np.median(np.diff(index.as_unit('ns').asi8[-min(len(index), 1000):]))
+    if step <= 0:
+        return None
+    return 365 * 24 * 3600 * 1e9 / step
+
+
+async def load_history(fetcher, symbol: str, interval: str, start: datetime, end: Optional[datetime] = None) -> pd.DataFrame:
+    """
+    下载回测用的历史K线
+
+    参数:
+        fetcher: FuturesDataFetcher
+        start/end: 起止时间（无时区时按UTC处理）
+    """
+    return await fetcher.get_klines_range(symbol, interval, start, end)
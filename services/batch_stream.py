@@ -0,0 +1,44 @@
+import asyncio
+import json
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Hashable, Iterable, Optional, Tuple
+
+
+async def iter_completed(
+    jobs: Iterable[Tuple[Hashable, Callable[[], Awaitable[Any]]]],
+    max_concurrency: int = 8
+) -> AsyncIterator[Tuple[Hashable, Any, Optional[BaseException]]]:
+    """
+    并发执行多个任务，按完成顺序逐个产出 (key, 结果, 异常)
+
+    同时运行的任务不超过 max_concurrency 个；单个任务失败不影响其他任务。
+    迭代提前结束（例如客户端断开）时取消未完成的任务。
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def run(key, job):
+        async with semaphore:
+            try:
+                return key, await job(), None
+            except Exception as e:
+                return key, None, e
+
+    tasks = [asyncio.ensure_future(run(key, job)) for key, job in jobs]
+    try:
+        for future in asyncio.as_completed(tasks):
+            yield await future
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+def ndjson_line(meta: Dict[str, Any], field: Optional[str] = None, body: Optional[bytes] = None) -> bytes:
+    """
+    生成一行 NDJSON
+
+    body 为已经序列化的JSON，直接拼接到 field 字段，不再重新序列化
+    """
+    line = json.dumps(meta, ensure_ascii=False, separators=(',', ':')).encode()
+    if field is not None and body is not None:
+        separator = b',' if meta else b''
+        line = line[:-1] + separator + json.dumps(field).encode() + b':' + body + b'}'
+    return line + b'\n'
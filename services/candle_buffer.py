@@ -0,0 +1,144 @@
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+import pandas as pd
+from .futures_data_fetcher import FuturesDataFetcher
+
+# 字段顺序与币安K线接口返回的数组一致（不含最后的 ignore 字段）
+FIELDS = (
+    'open_time',
+    'open',
+    'high',
+    'low',
+    'close',
+    'volume',
+    'close_time',
+    'quote_volume',
+    'trades',
+    'taker_buy_volume',
+    'taker_buy_quote_volume',
+)
+INT_FIELDS = ('open_time', 'close_time', 'trades')
+
+
+class CandleBuffer:
+    """
+    固定容量的K线环形缓冲区
+
+    每个字段一个 NumPy 数组，容量固定，内存占用在创建时确定。
+    数组长度为容量的两倍，每次写入同时写到 i 和 i + capacity 两个位置，
+    因此缓冲区中的数据始终是一段连续内存，view() 不需要复制。
+
+    追加和替换最后一根K线都是 O(1)；缓冲区满后追加会覆盖最旧的K线。
+    时间字段为毫秒时间戳。
+    """
+
+    def __init__(self, capacity: int = 1500):
+        if capacity <= 0:
+            raise ValueError("capacity 必须大于0")
+        self.capacity = capacity
+        self._data: Dict[str, np.ndarray] = {
+            field: np.zeros(2 * capacity, dtype=np.int64 if field in INT_FIELDS else np.float64)
+            for field in FIELDS
+        }
+        self._start = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def nbytes(self) -> int:
+        return sum(a.nbytes for a in self._data.values())
+
+    @property
+    def last_open_time(self) -> Optional[int]:
+        return int(self._data['open_time'][self._start + self._size - 1]) if self._size else None
+
+    def view(self, field: str, last: Optional[int] = None) -> np.ndarray:
+        """字段的只读连续视图（从旧到新），last 指定只取最近的N根"""
+        end = self._start + self._size
+        start = self._start if last is None else max(self._start, end - last)
+        view = self._data[field][start:end]
+        view.flags.writeable = False
+        return view
+
+    def last_row(self) -> Optional[Tuple]:
+        if not self._size:
+            return None
+        i = self._start + self._size - 1
+        return tuple(self._data[field][i] for field in FIELDS)
+
+    def append(self, row: Sequence):
+        """追加一根K线，row 的字段顺序同 FIELDS"""
+        if self._size < self.capacity:
+            slot = (self._start + self._size) % self.capacity
+            self._size += 1
+        else:
+            slot = self._start
+            self._start = (self._start + 1) % self.capacity
+        self._write(slot, row)
+
+    def replace_last(self, row: Sequence):
+        """替换最后一根K线（未收盘K线的更新）"""
+        if not self._size:
+            raise IndexError("缓冲区为空")
+        self._write((self._start + self._size - 1) % self.capacity, row)
+
+    def upsert(self, row: Sequence) -> bool:
+        """
+        按开盘时间写入：新K线追加，已有K线覆盖，早于缓冲区的K线忽略
+
+        返回:
+            数据是否发生变化
+        """
+        open_time = int(row[0])
+        last = self.last_open_time
+        if last is None or open_time > last:
+            self.append(row)
+            return True
+
+        times = self.view('open_time')
+        index = int(np.searchsorted(times, open_time))
+        if index >= self._size or times[index] != open_time:
+            return False
+        slot = (self._start + index) % self.capacity
+        if self._row_equals(slot, row):
+            return False
+        self._write(slot, row)
+        return True
+
+    def update(self, rows: Iterable[Sequence]) -> List[int]:
+        """批量写入，返回发生变化的K线开盘时间"""
+        return [int(row[0]) for row in rows if self.upsert(row)]
+
+    def _write(self, slot: int, row: Sequence):
+        for field, value in zip(FIELDS, row):
+            array = self._data[field]
+            value = array.dtype.type(value)
+            array[slot] = value
+            array[slot + self.capacity] = value
+
+    def _row_equals(self, slot: int, row: Sequence) -> bool:
+        return all(self._data[field][slot] == self._data[field].dtype.type(value)
+                   for field, value in zip(FIELDS, row))
+
+    def to_frame(self, last: Optional[int] = None) -> pd.DataFrame:
+        """
+        转换为与 FuturesDataFetcher.get_klines 相同格式的DataFrame（含计算列）
+        """
+        columns = {field: np.array(self.view(field, last)) for field in FIELDS}
+        index = pd.to_datetime(columns.pop('open_time'), unit='ms')
+        columns['close_time'] = pd.to_datetime(columns['close_time'], unit='ms')
+        df = pd.DataFrame(columns, index=pd.Index(index, name='open_time'))
+        return FuturesDataFetcher.add_derived_columns(df)
+
+    @staticmethod
+    def rows_from_frame(df: pd.DataFrame) -> List[Tuple]:
+        """把 get_klines 格式的DataFrame转换为K线数组"""
+        open_time = df.index.as_unit('ms').asi8
+        close_time = pd.DatetimeIndex(df['close_time']).as_unit('ms').asi8
+        columns = [open_time] + [
+            close_time if field == 'close_time' else df[field].to_numpy()
+            for field in FIELDS[1:]
+        ]
+        return list(zip(*columns))
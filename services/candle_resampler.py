@@ -0,0 +1,140 @@
+from typing import Dict, List, Optional, Sequence, Union
+import numpy as np
+import pandas as pd
+from .candle_buffer import FIELDS, CandleBuffer
+from .candle_time import INTERVAL_MS, candle_length, interval_ms, last_closed_open_time
+
+# 高周期K线各字段的合成方式
+AGGREGATIONS = {
+    'open': 'first',
+    'high': 'max',
+    'low': 'min',
+    'close': 'last',
+    'volume': 'sum',
+    'quote_volume': 'sum',
+    'trades': 'sum',
+    'taker_buy_volume': 'sum',
+    'taker_buy_quote_volume': 'sum',
+}
+
+
+def can_resample(base_interval: str, interval: str) -> bool:
+    """interval 是否可以由 base_interval 的K线合成"""
+    if base_interval not in INTERVAL_MS or interval not in INTERVAL_MS:
+        return False
+    return INTERVAL_MS[interval] % INTERVAL_MS[base_interval] == 0
+
+
+def choose_base_interval(intervals: List[str]) -> Optional[str]:
+    """选择能合成所有周期的最短周期，没有时返回 None"""
+    candidates = sorted((i for i in intervals if i in INTERVAL_MS), key=INTERVAL_MS.get)
+    if not candidates or len(candidates) != len(intervals):
+        return None
+    base = candidates[0]
+    return base if all(can_resample(base, i) for i in intervals) else None
+
+
+class CandleResampler:
+    """
+    单个交易对的多周期K线
+
+    只保存一份基础周期K线，高周期K线在本地按 AGGREGATIONS 合成。
+    新的基础K线到达时只重新合成受影响的高周期K线（通常只有最后一根）。
+    各周期的K线都存放在固定容量的 CandleBuffer 中。
+
+    参数:
+        base_interval: 基础周期，例如 '15m'
+        intervals: 需要输出的周期，必须是基础周期的整数倍
+        history: 每个周期保留的K线数量
+    """
+
+    def __init__(self, base_interval: str, intervals: List[str], history: int = 100):
+        for interval in intervals:
+            if not can_resample(base_interval, interval):
+                raise ValueError(f"无法由 {base_interval} 合成 {interval}")
+        self.base_interval = base_interval
+        self.base_ms = interval_ms(base_interval)
+        self.intervals = list(intervals)
+        self.history = history
+        self.base = CandleBuffer(self.required_base_candles)
+        self.buffers: Dict[str, CandleBuffer] = {
+            interval: CandleBuffer(history) for interval in self.intervals if interval != base_interval
+        }
+
+    @property
+    def required_base_candles(self) -> int:
+        """合成 history 根最高周期K线需要的基础K线数量（多一根用于对齐）"""
+        ratio = max(INTERVAL_MS[i] for i in self.intervals + [self.base_interval]) // self.base_ms
+        return (self.history + 1) * ratio
+
+    @property
+    def last_open_time(self) -> Optional[pd.Timestamp]:
+        last = self.base.last_open_time
+        return None if last is None else pd.Timestamp(last, unit='ms')
+
+    def update(self, candles: Union[pd.DataFrame, List[Sequence]]) -> List[str]:
+        """
+        合并新的基础周期K线（与已有K线重叠的部分会被替换）
+
+        参数:
+            candles: get_klines 格式的DataFrame，或接口返回的原始K线数组
+
+        返回:
+            最新K线发生变化的周期列表
+        """
+        rows = CandleBuffer.rows_from_frame(candles) if isinstance(candles, pd.DataFrame) else candles
+        before = {interval: self._buffer(interval).last_row() for interval in self.intervals}
+        changed = self.base.update(rows)
+        if not changed:
+            return []
+
+        first_changed = min(changed)
+        for interval, buffer in self.buffers.items():
+            self._resample(interval_ms(interval), buffer, first_changed)
+        return [interval for interval in self.intervals if self._buffer(interval).last_row() != before[interval]]
+
+    def get(self, interval: str) -> pd.DataFrame:
+        """获取某个周期最近 history 根K线"""
+        return self._buffer(interval).to_frame(last=self.history)
+
+    def view(self, interval: str, field: str) -> np.ndarray:
+        """某个周期某个字段的只读视图（不复制）"""
+        return self._buffer(interval).view(field, last=self.history)
+
+    def _buffer(self, interval: str) -> CandleBuffer:
+        return self.base if interval == self.base_interval else self.buffers[interval]
+
+    def _resample(self, ms: int, buffer: CandleBuffer, first_changed: int):
+        """重新合成从 first_changed 所在周期开始的高周期K线"""
+        times = self.base.view('open_time')
+        first_bucket = first_changed // ms * ms
+        if first_bucket < times[0]:
+            # 基础K线没有覆盖完整周期，第一根高周期K线不完整，跳过
+            first_bucket = -(-int(times[0]) // ms) * ms
+        last_bucket = int(times[-1]) // ms * ms
+        if first_bucket > last_bucket:
+            return
+
+        starts = np.arange(first_bucket, last_bucket + ms, ms, dtype=np.int64)
+        begin = np.searchsorted(times, starts)
+        end = np.r_[begin[1:], len(times)]
+        nonempty = begin < end
+        starts, begin, end = starts[nonempty], begin[nonempty], end[nonempty]
+
+        values = {
+            'open': self.base.view('open')[begin],
+            'high': np.maximum.reduceat(self.base.view('high'), begin),
+            'low': np.minimum.reduceat(self.base.view('low'), begin),
+            'close': self.base.view('close')[end - 1],
+        }
+        for field, how in AGGREGATIONS.items():
+            if how == 'sum':
+                values[field] = np.add.reduceat(self.base.view(field), begin)
+
+        for i, start in enumerate(starts.tolist()):
+            buffer.upsert([
+                start if field == 'open_time' else
+                start + ms - 1 if field == 'close_time' else
+                values[field][i]
+                for field in FIELDS
+            ])
@@ -0,0 +1,113 @@
+"""
+按K线收盘时间调度监控
+
+每个 交易对x周期 在其K线收盘后 close_delay 秒分析一次（使用交易所服务器时间），
+不再每隔固定时间扫描全部交易对。可选的盘中检查按 intra_candle_seconds 的间隔
+（从K线开盘时间算起）分析尚未收盘的K线。
+
+待执行的分析保存在以执行时间排序的最小堆中，取出后立即按同一根K线的时间
+排入下一次，调度时间不随处理耗时漂移。
+"""
+import heapq
+import itertools
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+from .candle_time import candle_length, last_closed_open_time
+
+Pair = Tuple[str, str]
+
+
+class Evaluation(NamedTuple):
+    """一次分析：close_ms 为对应K线的收盘时间，at_close 为 False 时是盘中检查"""
+    symbol: str
+    interval: str
+    close_ms: int
+    at_close: bool
+
+
+def next_close_ms(interval: str, now_ms: int) -> int:
+    """now_ms 时正在形成的K线的收盘时间（大于 now_ms）"""
+    return last_closed_open_time(interval, now_ms) + 2 * candle_length(interval)
+
+
+class CandleScheduler:
+    """
+    交易对x周期 的收盘调度（最小堆）
+
+    参数:
+        close_delay: 收盘后等待的秒数（交易所完成收盘K线的时间）
+        intra_candle_seconds: 盘中检查间隔（秒），0 表示只在收盘后分析
+    """
+
+    def __init__(self, close_delay: float = 1.0, intra_candle_seconds: float = 0.0):
+        self.delay_ms = int(close_delay * 1000)
+        self.intra_ms = int(intra_candle_seconds * 1000)
+        # (执行时间, 序号, 交易对, 周期, 收盘时间, 是否收盘分析, 版本)
+        self._heap: List[Tuple[int, int, str, str, int, bool, int]] = []
+        self._versions: Dict[Pair, int] = {}
+        self._counter = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._versions)
+
+    @property
+    def pairs(self) -> Set[Pair]:
+        return set(self._versions)
+
+    def add(self, symbol: str, interval: str, now_ms: int):
+        """开始调度，并立即分析一次最近已收盘的K线"""
+        pair = (symbol, interval)
+        if pair in self._versions:
+            return
+        # 版本号使重新加入的交易对忽略移除前留在堆中的旧条目
+        version = self._versions[pair] = next(self._counter)
+        close_ms = next_close_ms(interval, now_ms - self.delay_ms) - candle_length(interval)
+        heapq.heappush(self._heap, (now_ms, next(self._counter), symbol, interval, close_ms, True, version))
+
+    def remove(self, symbol: str, interval: str):
+        self._versions.pop((symbol, interval), None)
+
+    def set_pairs(self, pairs: Iterable[Pair], now_ms: int):
+        """调度 pairs 中的 交易对x周期，移除其他的"""
+        pairs = list(pairs)
+        for pair in self._versions.keys() - set(pairs):
+            self.remove(*pair)
+        for symbol, interval in pairs:
+            self.add(symbol, interval, now_ms)
+
+    def next_due_ms(self) -> Optional[int]:
+        """最近一次分析的执行时间（服务器时间，毫秒），没有时返回 None"""
+        while self._heap and not self._valid(self._heap[0]):
+            heapq.heappop(self._heap)
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now_ms: int) -> List[Evaluation]:
+        """取出执行时间不晚于 now_ms 的分析，并排入各自的下一次"""
+        due = []
+        while self._heap and self._heap[0][0] <= now_ms:
+            entry = heapq.heappop(self._heap)
+            if not self._valid(entry):
+                continue
+            event_ms, _, symbol, interval, close_ms, at_close, _ = entry
+            due.append(Evaluation(symbol, interval, close_ms, at_close))
+            self._push(symbol, interval, event_ms)
+        return due
+
+    def _valid(self, entry) -> bool:
+        return self._versions.get((entry[2], entry[3])) == entry[6]
+
+    def _push(self, symbol: str, interval: str, after_ms: int):
+        event_ms, close_ms, at_close = self._next_event(interval, after_ms)
+        version = self._versions[(symbol, interval)]
+        heapq.heappush(self._heap, (event_ms, next(self._counter), symbol, interval, close_ms, at_close, version))
+
+    def _next_event(self, interval: str, after_ms: int) -> Tuple[int, int, bool]:
+        """after_ms 之后的第一次分析：(执行时间, 收盘时间, 是否收盘分析)"""
+        close_ms = next_close_ms(interval, after_ms - self.delay_ms)
+        event = (close_ms + self.delay_ms, close_ms, True)
+        if self.intra_ms:
+            forming_close = next_close_ms(interval, after_ms)
+            open_ms = forming_close - candle_length(interval)
+            tick = open_ms + ((after_ms - open_ms) // self.intra_ms + 1) * self.intra_ms
+            if tick < forming_close and tick < event[0]:
+                event = (tick, forming_close, False)
+        return event
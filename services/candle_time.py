@@ -0,0 +1,42 @@
+# K线时间计算（只依赖标准库，API启动时导入不加载 numpy/pandas）
+
+# 可以本地合成的周期（与UTC零点对齐的固定长度周期），单位毫秒
+INTERVAL_MS = {
+    '1m': 60_000,
+    '3m': 3 * 60_000,
+    '5m': 5 * 60_000,
+    '15m': 15 * 60_000,
+    '30m': 30 * 60_000,
+    '1h': 3_600_000,
+    '2h': 2 * 3_600_000,
+    '4h': 4 * 3_600_000,
+    '6h': 6 * 3_600_000,
+    '8h': 8 * 3_600_000,
+    '12h': 12 * 3_600_000,
+    '1d': 86_400_000,
+}
+
+# 周线从周一（UTC）开盘，1970-01-01 是周四
+WEEK_MS = 7 * 86_400_000
+WEEK_OFFSET_MS = 4 * 86_400_000
+
+
+def interval_ms(interval: str) -> int:
+    """周期长度（毫秒），不支持本地合成的周期抛出 ValueError"""
+    if interval not in INTERVAL_MS:
+        raise ValueError(f"不支持本地合成的周期: {interval}")
+    return INTERVAL_MS[interval]
+
+
+def candle_length(interval: str) -> int:
+    """K线长度（毫秒），在 INTERVAL_MS 之外还支持周线"""
+    if interval == '1w':
+        return WEEK_MS
+    return interval_ms(interval)
+
+
+def last_closed_open_time(interval: str, now_ms: int) -> int:
+    """now_ms 时最近一根已收盘K线的开盘时间（毫秒）"""
+    length = candle_length(interval)
+    offset = WEEK_OFFSET_MS if interval == '1w' else 0
+    return (now_ms - offset) // length * length + offset - length
@@ -0,0 +1,168 @@
+"""
+监控循环的按需性能分析
+
+启用后在接下来的 N 轮监控中，用 cProfile 分别记录每个 交易对/周期 的处理过程，
+每轮结束时写入 pstats 文件:
+
+    <输出目录>/<开始时间>-c<轮次>-<交易对>-<周期>.prof
+
+周期为 fetch 的文件对应该交易对的K线获取与合成。查看热点:
+
+    python -m services.cycle_profiler profiles --top 30 --sort tottime --symbol BTCUSDT
+
+注意 section 内 await 期间同一事件循环中其他任务的耗时也会计入该 section。
+"""
+import argparse
+import cProfile
+import glob
+import os
+import pstats
+import time
+from contextlib import nullcontext
+from typing import Dict, List, Optional, Tuple
+
+_NULL = nullcontext()
+
+
+class _Section:
+    __slots__ = ('profile',)
+
+    def __init__(self, profile: cProfile.Profile):
+        self.profile = profile
+
+    def __enter__(self):
+        self.profile.enable()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.profile.disable()
+        return False
+
+
+class CycleProfiler:
+    """
+    监控循环的性能分析开关
+
+    arm(n) 之后的 n 轮监控被记录；未启用时 section() 返回共享的空上下文，
+    不安装任何 profile 钩子，每轮只多一次布尔判断。
+
+    参数:
+        output_dir: pstats 文件目录
+    """
+
+    def __init__(self, output_dir: str = 'profiles'):
+        self.output_dir = output_dir
+        self.remaining = 0      # 还要记录的轮数
+        self.cycle = 0          # 已记录的轮数
+        self._active = False
+        self._started = ''
+        self._profiles: Dict[Tuple[str, str], cProfile.Profile] = {}
+
+    @property
+    def armed(self) -> bool:
+        return self.remaining > 0
+
+    def arm(self, cycles: int):
+        """记录接下来的 cycles 轮（0 表示关闭）"""
+        self.remaining = max(0, int(cycles))
+        if self.remaining:
+            print(f"性能分析已启用，记录接下来的 {self.remaining} 轮监控")
+
+    def disarm(self):
+        self.remaining = 0
+
+    def begin_cycle(self) -> bool:
+        """一轮监控开始，返回本轮是否记录"""
+        self._active = self.remaining > 0
+        if self._active:
+            self._started = time.strftime('%Y%m%d-%H%M%S')
+            self._profiles = {}
+        return self._active
+
+    def section(self, symbol: str, interval: str):
+        """记录一个 交易对/周期 的处理过程（同一轮内同一标签的多段会累计）"""
+        if not self._active:
+            return _NULL
+        profile = self._profiles.get((symbol, interval))
+        if profile is None:
+            profile = self._profiles[(symbol, interval)] = cProfile.Profile()
+        return _Section(profile)
+
+    def end_cycle(self) -> List[str]:
+        """一轮监控结束，写入本轮的 pstats 文件并返回文件路径"""
+        if not self._active:
+            return []
+        self._active = False
+        self.remaining -= 1
+        self.cycle += 1
+        os.makedirs(self.output_dir, exist_ok=True)
+        paths = []
+        for (symbol, interval), profile in self._profiles.items():
+            path = os.path.join(self.output_dir, f"{self._started}-c{self.cycle:04d}-{symbol}-{interval}.prof")
+            profile.dump_stats(path)
+            paths.append(path)
+        self._profiles = {}
+        print(f"性能分析第 {self.cycle} 轮已写入 {self.output_dir}（{len(paths)} 个文件）")
+        return paths
+
+
+def parse_label(path: str) -> Tuple[str, str]:
+    """从文件名解析 (交易对, 周期)"""
+    name = os.path.splitext(os.path.basename(path))[0]
+    parts = name.rsplit('-', 2)
+    return (parts[1], parts[2]) if len(parts) == 3 else ('', '')
+
+
+def find_profiles(paths: List[str], symbol: Optional[str] = None, interval: Optional[str] = None) -> List[str]:
+    """展开目录并按交易对/周期筛选 pstats 文件"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, '*.prof'))))
+        else:
+            files.append(path)
+    selected = []
+    for path in files:
+        file_symbol, file_interval = parse_label(path)
+        if symbol and file_symbol != symbol.upper():
+            continue
+        if interval and file_interval != interval:
+            continue
+        selected.append(path)
+    return selected
+
+
+def summarize(files: List[str]) -> List[Tuple[str, str, float]]:
+    """各 交易对/周期 的总耗时（秒），从高到低"""
+    totals: Dict[Tuple[str, str], float] = {}
+    for path in files:
+        label = parse_label(path)
+        totals[label] = totals.get(label, 0.0) + pstats.Stats(path).total_tt
+    return sorted(((s, i, t) for (s, i), t in totals.items()), key=lambda row: -row[2])
+
+
+def report(files: List[str], top: int = 20, sort: str = 'cumulative', stream=None):
+    """打印各标签耗时和合并后的热点函数"""
+    if not files:
+        print("没有找到性能分析文件", file=stream)
+        return
+    print(f"{'交易对':<12}{'周期':<8}{'耗时(秒)':>10}", file=stream)
+    for symbol, interval, seconds in summarize(files):
+        print(f"{symbol:<12}{interval:<8}{seconds:>10.4f}", file=stream)
+    print(file=stream)
+    stats = pstats.Stats(files[0], stream=stream)
+    for path in files[1:]:
+        stats.add(path)
+    stats.strip_dirs().sort_stats(sort).print_stats(top)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="监控循环性能分析热点")
+    parser.add_argument("paths", nargs="*", default=["profiles"], help="pstats 文件或目录")
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--sort", default="cumulative", help="cumulative/tottime/calls")
+    parser.add_argument("--symbol", default=None)
+    parser.add_argument("--interval", default=None)
+    args = parser.parse_args()
+
+    report(find_profiles(args.paths, args.symbol, args.interval), top=args.top, sort=args.sort)
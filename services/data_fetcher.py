@@ -1,20 +1,41 @@
-from binance.client import Client
-from binance.exceptions import BinanceAPIException
+import asyncio
 from datetime import datetime, timedelta
+from functools import lru_cache
 import pandas as pd
 from typing import List, Dict, Optional
 from app.core.config import get_settings
-from app.services.cache_service import CacheService
+from app.services.kline_recorder import get_recorder
 
 settings = get_settings()
 
+def _api_error():
+    """python-binance 的异常类型（except 子句只在出现异常时求值，不在导入时加载 binance）"""
+    from binance.exceptions import BinanceAPIException
+    return BinanceAPIException
+
 class DataFetcher:
     def __init__(self):
-        self.client = Client(
-            settings.binance_api_key,
-            settings.binance_api_secret
-        )
-        self.cache = CacheService()
+        # 客户端（创建时会请求交易所）和缓存连接在第一次使用时创建
+        self._client = None
+        self._cache = None
+        self.recorder = get_recorder(settings.record_klines_dir)
+
+    @property
+    def client(self):
+        if self._client is None:
+            from binance.client import Client
+            self._client = Client(
+                settings.binance_api_key,
+                settings.binance_api_secret
+            )
+        return self._client
+
+    @property
+    def cache(self):
+        if self._cache is None:
+            from app.services.cache_service import CacheService
+            self._cache = CacheService()
+        return self._cache
         
     async def get_historical_klines(
         self,
@@ -55,13 +76,20 @@ class DataFetcher:
             end_str = int(end_time.timestamp() * 1000) if end_time else None
             
             # 获取K线数据
-            klines = self.client.get_klines(
+            # 同步客户端放到线程中执行，不阻塞其他请求
+            klines = await asyncio.to_thread(
+                self.client.get_klines,
                 symbol=symbol,
                 interval=interval,
                 limit=limit,
                 startTime=start_str,
                 endTime=end_str
             )
+            if self.recorder is not None:
+                self.recorder.record('spot', symbol.upper(), interval, {
+                    'symbol': symbol, 'interval': interval, 'limit': limit,
+                    'startTime': start_str, 'endTime': end_str
+                }, klines)
             
             # 转换为DataFrame
             df = pd.DataFrame(klines, columns=[
@@ -87,39 +115,29 @@ class DataFetcher:
             
             return df
             
-        except BinanceAPIException as e:
+        except _api_error() as e:
             raise Exception(f"Binance API错误: {str(e)}")
         except Exception as e:
             raise Exception(f"获取数据时出错: {str(e)}")
     
-    async def get_symbol_info(self, symbol: str) -> Dict:
+    async def get_exchange_info(self) -> Dict:
         """
-        获取交易对信息
+        获取完整的交易规则（全部交易对），由 MarketMetadata 建立索引
         """
         try:
-            # 生成缓存键
-            cache_key = self.cache.generate_key("symbol_info", symbol=symbol)
-            
-            # 尝试从缓存获取数据
-            cached_data = await self.cache.get(cache_key)
-            if cached_data:
-                return cached_data
-            
-            info = self.client.get_symbol_info(symbol)
-            result = {
-                'symbol': info['symbol'],
-                'base_asset': info['baseAsset'],
-                'quote_asset': info['quoteAsset'],
-                'status': info['status'],
-                'filters': info['filters']
-            }
-            
-            # 缓存数据
-            await self.cache.set(cache_key, result, settings.cache_ttl)
-            
-            return result
-        except BinanceAPIException as e:
-            raise Exception(f"获取交易对信息失败: {str(e)}")
+            return await asyncio.to_thread(self.client.get_exchange_info)
+        except _api_error() as e:
+            raise Exception(f"获取交易规则失败: {str(e)}")
+
+    async def get_symbol_info(self, symbol: str) -> Dict:
+        """
+        获取交易对信息（读取内存中的 exchangeInfo 快照）
+        """
+        from app.services.market_metadata import get_market_metadata
+        info = await get_market_metadata().get_symbol(symbol)
+        if info is None:
+            raise Exception(f"交易对不存在: {symbol}")
+        return info.to_dict()
     
     async def get_all_tickers(self) -> List[Dict]:
         """
@@ -150,7 +168,7 @@ class DataFetcher:
             await self.cache.set(cache_key, result, settings.ticker_cache_ttl)
             
             return result
-        except BinanceAPIException as e:
+        except _api_error() as e:
             raise Exception(f"获取价格统计失败: {str(e)}")
     
     async def get_recent_trades(self, symbol: str, limit: int = 100) -> List[Dict]:
@@ -182,5 +200,10 @@ class DataFetcher:
             await self.cache.set(cache_key, result, settings.ticker_cache_ttl)
             
             return result
-        except BinanceAPIException as e:
-            raise Exception(f"获取交易记录失败: {str(e)}") 
\ No newline at end of file
+        except _api_error() as e:
+            raise Exception(f"获取交易记录失败: {str(e)}") 
+
+@lru_cache()
+def get_data_fetcher() -> DataFetcher:
+    """进程内共享的 DataFetcher（第一次调用时创建）"""
+    return DataFetcher()
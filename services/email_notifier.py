@@ -8,6 +8,7 @@ import os
 from dotenv import load_dotenv
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from core.config import get_settings
+from .metrics import stage
 
 # 加载环境变量
 load_dotenv()
@@ -56,7 +57,8 @@ class EmailNotifier:
         body = self._create_email_body(symbol, market_info)
         
         # 发送邮件
-        await self._send_email(subject, body)
+        with stage('notify_email', symbol, market_info.get('interval')):
+            await self._send_email(subject, body)
         
     def _create_email_body(self, symbol: str, market_info: dict) -> str:
         """创建邮件正文"""
@@ -92,6 +94,8 @@ class EmailNotifier:
         # 添加技术指标
         body += "<h3>技术指标</h3><ul>"
         for indicator, value in signals['technical'].items():
+            if value != value:
+                continue  # 未计算的指标
             if isinstance(value, float):
                 body += f"<li>{indicator}: {value:.2f}</li>"
             else:
@@ -1,19 +1,25 @@
 from typing import Dict, List, Optional, Union
+import asyncio
 import requests
 import pandas as pd
 import numpy as np
-from datetime import datetime
+from datetime import datetime, timezone
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from core.config import get_settings
+from .metrics import record_upstream, stage
+from .kline_recorder import get_recorder
 
 settings = get_settings()
 
 class FuturesDataFetcher:
-    def __init__(self):
-        self.base_url = "https://fapi.binance.com"
+    def __init__(self, base_url: Optional[str] = None):
         self.settings = get_settings()
+        # 可指向本地模拟服务（services/mock_binance_server.py）
+        self.base_url = (base_url or self.settings.binance_futures_base_url).rstrip("/")
+        # 设置 RECORD_KLINES_DIR 时录制接口返回的原始K线，供 services/replay.py 回放
+        self.recorder = get_recorder(self.settings.record_klines_dir)
         
     async def get_klines(
         self,
@@ -47,6 +53,27 @@ class FuturesDataFetcher:
                 - taker_buy_volume: Taker买入成交量
                 - taker_buy_quote_volume: Taker买入成交额
         """
+        try:
+            data = await self.get_klines_raw(symbol, interval, start_time, end_time, limit)
+            return self.klines_to_frame(data)
+            
+        except Exception as e:
+            raise Exception(f"获取K线数据失败: {str(e)}")
+
+    async def get_klines_raw(
+        self,
+        symbol: str,
+        interval: str,
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None,
+        limit: Optional[int] = None
+    ) -> List[list]:
+        """
+        获取合约K线的原始数组（不构建DataFrame，参数同 get_klines）
+
+        每根K线为 [开盘时间, 开, 高, 低, 收, 成交量, 收盘时间, 成交额, 成交笔数,
+        主动买入成交量, 主动买入成交额, 忽略]，价格和数量为字符串
+        """
         try:
             # 构建请求参数
             # 如果未指定limit，使用配置中的数量
@@ -64,68 +91,146 @@ class FuturesDataFetcher:
             if end_time:
                 params["endTime"] = int(end_time.timestamp() * 1000)
                 
-            # 发送请求
-            response = requests.get(
-                f"{self.base_url}/fapi/v1/klines",
-                params=params
-            )
+            # 发送请求（在线程中执行，不阻塞事件循环）
+            requested_ms = int(datetime.now(timezone.utc).timestamp() * 1000)
+            with stage('fetch', params["symbol"], interval):
+                response = await asyncio.to_thread(
+                    requests.get,
+                    f"{self.base_url}/fapi/v1/klines",
+                    params=params
+                )
+            record_upstream('binance', 'klines', response.status_code, response.headers)
             
             # 检查响应状态
             if response.status_code != 200:
                 raise Exception(f"API请求失败: {response.status_code} - {response.text}")
                 
             # 解析数据
-            data = response.json()
-            
-            # 转换为DataFrame
-            df = pd.DataFrame(data, columns=[
-                'open_time',      # 开盘时间
-                'open',           # 开盘价
-                'high',           # 最高价
-                'low',            # 最低价
-                'close',          # 收盘价
-                'volume',         # 成交量
-                'close_time',     # 收盘时间
-                'quote_volume',   # 成交额
-                'trades',         # 成交笔数
-                'taker_buy_volume',  # 主动买入成交量
-                'taker_buy_quote_volume',  # 主动买入成交额
-                'ignore'          # 忽略
-            ])
-            
-            # 数据类型转换
-            # 转换所有价格和数量为float
-            price_columns = ['open', 'high', 'low', 'close']
-            volume_columns = ['volume', 'quote_volume', 'taker_buy_volume', 'taker_buy_quote_volume']
-            
-            for col in price_columns + volume_columns:
-                df[col] = pd.to_numeric(df[col], errors='coerce')
-            
-            # 转换trades为整数
-            df['trades'] = df['trades'].astype(int)
-                
-            # 时间戳转换
-            df['open_time'] = pd.to_datetime(df['open_time'], unit='ms')
-            df['close_time'] = pd.to_datetime(df['close_time'], unit='ms')
-            
-            # 设置索引
-            df.set_index('open_time', inplace=True)
-            
-            # 删除无用列
-            df.drop('ignore', axis=1, inplace=True)
-            
-            # 添加计算列
-            df['price_change'] = df['close'] - df['open']  # 价格变化
-            df['price_change_percent'] = (df['price_change'] / df['open']) * 100  # 价格变化百分比
-            df['amplitude'] = ((df['high'] - df['low']) / df['open']) * 100  # 振幅
-            df['avg_price'] = df['quote_volume'] / df['volume']  # 平均价格
-            df['buy_ratio'] = df['taker_buy_volume'] / df['volume']  # 主动买入比例
-            
-            return df
+            with stage('parse', params["symbol"], interval):
+                data = response.json()
+            if self.recorder is not None:
+                self.recorder.record('futures', params["symbol"], interval, params, data, requested_ms)
+            return data
             
         except Exception as e:
             raise Exception(f"获取K线数据失败: {str(e)}")
+
+    async def get_server_time(self) -> int:
+        """交易所服务器时间（毫秒）"""
+        with stage('fetch', '', 'time'):
+            response = await asyncio.to_thread(requests.get, f"{self.base_url}/fapi/v1/time")
+        record_upstream('binance', 'time', response.status_code, response.headers)
+        if response.status_code != 200:
+            raise Exception(f"获取服务器时间失败: {response.status_code} - {response.text}")
+        return int(response.json()['serverTime'])
+
+    async def get_exchange_info(self) -> Dict:
+        """合约交易规则（全部交易对），可作为 MarketMetadata 的 loader"""
+        with stage('fetch', '', 'exchange_info'):
+            response = await asyncio.to_thread(requests.get, f"{self.base_url}/fapi/v1/exchangeInfo")
+        record_upstream('binance', 'exchange_info', response.status_code, response.headers)
+        if response.status_code != 200:
+            raise Exception(f"获取交易规则失败: {response.status_code} - {response.text}")
+        return response.json()
+
+    async def get_clock_offset(self) -> int:
+        """服务器时间减本地时间（毫秒），按请求往返的中点估计"""
+        sent = datetime.now(timezone.utc).timestamp() * 1000
+        server_ms = await self.get_server_time()
+        received = datetime.now(timezone.utc).timestamp() * 1000
+        return int(server_ms - (sent + received) / 2)
+
+    def klines_to_frame(self, data: List[list]) -> pd.DataFrame:
+        """把原始K线数组转换为DataFrame"""
+        # 转换为DataFrame
+        df = pd.DataFrame(data, columns=[
+            'open_time',      # 开盘时间
+            'open',           # 开盘价
+            'high',           # 最高价
+            'low',            # 最低价
+            'close',          # 收盘价
+            'volume',         # 成交量
+            'close_time',     # 收盘时间
+            'quote_volume',   # 成交额
+            'trades',         # 成交笔数
+            'taker_buy_volume',  # 主动买入成交量
+            'taker_buy_quote_volume',  # 主动买入成交额
+            'ignore'          # 忽略
+        ])
+        
+        # 数据类型转换
+        # 转换所有价格和数量为float
+        price_columns = ['open', 'high', 'low', 'close']
+        volume_columns = ['volume', 'quote_volume', 'taker_buy_volume', 'taker_buy_quote_volume']
+        
+        for col in price_columns + volume_columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+        
+        # 转换trades为整数
+        df['trades'] = df['trades'].astype(int)
             
+        # 时间戳转换
+        df['open_time'] = pd.to_datetime(df['open_time'], unit='ms')
+        df['close_time'] = pd.to_datetime(df['close_time'], unit='ms')
+        
+        # 设置索引
+        df.set_index('open_time', inplace=True)
+        
+        # 删除无用列
+        df.drop('ignore', axis=1, inplace=True)
+        
+        # 添加计算列
+        return self.add_derived_columns(df)
+
+    @staticmethod
+    def add_derived_columns(df: pd.DataFrame) -> pd.DataFrame:
+        """添加由OHLCV计算的列（本地合成的K线也使用）"""
+        df['price_change'] = df['close'] - df['open']  # 价格变化
+        df['price_change_percent'] = (df['price_change'] / df['open']) * 100  # 价格变化百分比
+        df['amplitude'] = ((df['high'] - df['low']) / df['open']) * 100  # 振幅
+        df['avg_price'] = df['quote_volume'] / df['volume']  # 平均价格
+        df['buy_ratio'] = df['taker_buy_volume'] / df['volume']  # 主动买入比例
+        return df
+
+    async def get_klines_range(
+        self,
+        symbol: str,
+        interval: str,
+        start_time: datetime,
+        end_time: Optional[datetime] = None,
+        raw: bool = False
+    ) -> Union[pd.DataFrame, List[list]]:
+        """
+        分页获取一段时间内的全部K线（每次最多1500根）
+
+        参数:
+            start_time/end_time: 起止时间（无时区时按UTC处理）
+            raw: 为 True 时返回原始K线数组
+        """
+        if start_time.tzinfo is None:
+            start_time = start_time.replace(tzinfo=timezone.utc)
+        end_time = end_time or datetime.now(timezone.utc)
+        if end_time.tzinfo is None:
+            end_time = end_time.replace(tzinfo=timezone.utc)
+
+        rows = {}
+        cursor = start_time
+        while cursor < end_time:
+            data = await self.get_klines_raw(symbol, interval, start_time=cursor, end_time=end_time, limit=1500)
+            if not data:
+                break
+            for row in data:
+                rows[int(row[0])] = row
+            next_cursor = datetime.fromtimestamp((int(data[-1][0]) + 1) / 1000, tz=timezone.utc)
+            if next_cursor <= cursor or len(data) < 1500:
+                break
+            cursor = next_cursor
+
+        data = [rows[t] for t in sorted(rows)]
+        if raw:
+            return data
+        return self.klines_to_frame(data) if data else pd.DataFrame()
+
     def get_available_intervals(self) -> List[str]:
         """
         返回所有可用的时间间隔
@@ -0,0 +1,195 @@
+from typing import Tuple
+import numpy as np
+import pandas as pd
+
+# 安装了 numba 时顺序递推部分即时编译，否则使用 NumPy/pandas 向量化实现
+try:
+    from numba import njit
+    HAS_NUMBA = True
+except ImportError:
+    njit = None
+    HAS_NUMBA = False
+
+BACKEND = 'numba' if HAS_NUMBA else 'numpy'
+
+# 以下实现与 ta 库的计算规则一致（包括 ADX 的平滑方式），输入为连续的 float64 数组
+
+
+def _psar_loop(high, low, close, step, max_step):
+    n = close.shape[0]
+    psar = close.copy()
+    psar_up = np.full(n, np.nan)
+    psar_down = np.full(n, np.nan)
+    if n == 0:
+        return psar, psar_up, psar_down
+
+    up_trend = True
+    af = step
+    up_trend_high = high[0]
+    down_trend_low = low[0]
+    for i in range(2, n):
+        reversal = False
+        if up_trend:
+            value = psar[i - 1] + af * (up_trend_high - psar[i - 1])
+            if low[i] < value:
+                reversal = True
+                value = up_trend_high
+                down_trend_low = low[i]
+                af = step
+            else:
+                if high[i] > up_trend_high:
+                    up_trend_high = high[i]
+                    af = min(af + step, max_step)
+                if low[i - 2] < value:
+                    value = low[i - 2]
+                elif low[i - 1] < value:
+                    value = low[i - 1]
+        else:
+            value = psar[i - 1] - af * (psar[i - 1] - down_trend_low)
+            if high[i] > value:
+                reversal = True
+                value = down_trend_low
+                up_trend_high = high[i]
+                af = step
+            else:
+                if low[i] < down_trend_low:
+                    down_trend_low = low[i]
+                    af = min(af + step, max_step)
+                if high[i - 2] > value:
+                    value = high[i - 2]
+                elif high[i - 1] > value:
+                    value = high[i - 1]
+        psar[i] = value
+        up_trend = up_trend != reversal
+        if up_trend:
+            psar_up[i] = value
+        else:
+            psar_down[i] = value
+    return psar, psar_up, psar_down
+
+
+def _ewm_loop(values, alpha):
+    out = np.empty(values.shape[0])
+    if values.shape[0] == 0:
+        return out
+    out[0] = values[0]
+    for i in range(1, values.shape[0]):
+        out[i] = (1.0 - alpha) * out[i - 1] + alpha * values[i]
+    return out
+
+
+if HAS_NUMBA:
+    _psar_loop = njit(cache=True, nogil=True)(_psar_loop)
+    _ewm_loop = njit(cache=True, nogil=True)(_ewm_loop)
+
+
+def ewm(values: np.ndarray, alpha: float) -> np.ndarray:
+    """指数加权平均（adjust=False，从第一个值开始递推）"""
+    if HAS_NUMBA:
+        return _ewm_loop(values, alpha)
+    return pd.Series(values).ewm(alpha=alpha, adjust=False).mean().to_numpy(copy=True)
+
+
+def _wilder_sum(values: np.ndarray, window: int) -> np.ndarray:
+    """
+    ta 的 ADX 平滑：s[0] = values[1:window+1] 之和，
+    s[i] = s[i-1] - s[i-1]/window + values[window+i]，最后一个值为0
+    """
+    n = values.shape[0]
+    seed = np.empty(n - window)
+    seed[0] = values[1:window + 1].sum()
+    seed[1:] = values[window + 1:] * window
+    return np.append(ewm(seed, 1.0 / window), 0.0)
+
+
+def rsi(close: np.ndarray, window: int = 14) -> np.ndarray:
+    """RSI（Wilder 平滑）"""
+    diff = np.empty_like(close)
+    diff[0] = np.nan
+    np.subtract(close[1:], close[:-1], out=diff[1:])
+    up = ewm(np.where(diff > 0, diff, 0.0), 1.0 / window)
+    down = ewm(np.where(diff < 0, -diff, 0.0), 1.0 / window)
+    up[:window - 1] = np.nan
+    down[:window - 1] = np.nan
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(down == 0, 100.0, 100.0 - 100.0 / (1.0 + up / down))
+
+
+def adx(high: np.ndarray, low: np.ndarray, close: np.ndarray, window: int = 14) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """返回 (ADX, +DI, -DI)，K线数量不足 2*window 时全部为NaN"""
+    n = close.shape[0]
+    if n < 2 * window:
+        empty = np.full(n, np.nan)
+        return empty, empty.copy(), empty.copy()
+
+    prev_close = close[:-1]
+    true_range = np.empty(n)
+    true_range[0] = np.nan
+    true_range[1:] = np.maximum(high[1:], prev_close) - np.minimum(low[1:], prev_close)
+
+    diff_up = np.empty(n)
+    diff_down = np.empty(n)
+    diff_up[0] = diff_down[0] = np.nan
+    np.subtract(high[1:], high[:-1], out=diff_up[1:])
+    np.subtract(low[:-1], low[1:], out=diff_down[1:])
+    pos = np.where((diff_up > diff_down) & (diff_up > 0), diff_up, 0.0)
+    neg = np.where((diff_down > diff_up) & (diff_down > 0), diff_down, 0.0)
+
+    trs = _wilder_sum(true_range, window)
+    dip = _wilder_sum(pos, window)
+    din = _wilder_sum(neg, window)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        di_pos = np.where(trs != 0, 100 * dip / trs, 0.0)
+        di_neg = np.where(trs != 0, 100 * din / trs, 0.0)
+        total = di_pos + di_neg
+        dx = np.where(total != 0, 100 * np.abs((di_pos - di_neg) / total), 0.0)
+
+    m = trs.shape[0]
+    seed = np.empty(m - window)
+    seed[0] = dx[:window].mean()
+    seed[1:] = dx[window:m - 1]
+    adx_values = np.zeros(n)
+    adx_values[2 * window - 1:] = ewm(seed, 1.0 / window)
+
+    adx_pos = np.zeros(n)
+    adx_neg = np.zeros(n)
+    adx_pos[window + 1:] = di_pos[1:m - 1]
+    adx_neg[window + 1:] = di_neg[1:m - 1]
+    return adx_values, adx_pos, adx_neg
+
+
+def psar(
+    high: np.ndarray,
+    low: np.ndarray,
+    close: np.ndarray,
+    step: float = 0.02,
+    max_step: float = 0.2
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """返回 (PSAR, 上升趋势PSAR, 下降趋势PSAR)"""
+    return _psar_loop(high, low, close, step, max_step)
+
+
+def obv(close: np.ndarray, volume: np.ndarray) -> np.ndarray:
+    """能量潮"""
+    signed = volume.copy()
+    signed[1:][close[1:] < close[:-1]] *= -1
+    return np.cumsum(signed)
+
+
+def mfi(high: np.ndarray, low: np.ndarray, close: np.ndarray, volume: np.ndarray, window: int = 14) -> np.ndarray:
+    """资金流量指数"""
+    typical = (high + low + close) / 3.0
+    direction = np.zeros(typical.shape[0])
+    direction[1:] = np.sign(typical[1:] - typical[:-1])
+    flow = typical * volume * direction
+
+    result = np.full(typical.shape[0], np.nan)
+    if typical.shape[0] < window:
+        return result
+    windows = np.lib.stride_tricks.sliding_window_view(flow, window)
+    positive = np.where(windows >= 0, windows, 0.0).sum(axis=1)
+    negative = -np.where(windows < 0, windows, 0.0).sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result[window - 1:] = 100 - 100 / (1 + positive / negative)
+    return result
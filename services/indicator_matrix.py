@@ -0,0 +1,205 @@
+import re
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from .indicator_snapshot import INDICATOR_INDEX, INDICATOR_NAMES, SNAPSHOT_DTYPE, IndicatorSnapshot, to_float
+
+# 筛选条件，例如 "rsi<30"、"adx >= 25"
+FILTER_PATTERN = re.compile(r'^\s*([a-z0-9_]+)\s*(<=|>=|==|!=|<|>)\s*(-?[0-9.]+(?:e-?[0-9]+)?)\s*$', re.IGNORECASE)
+OPERATORS = {
+    '<': np.less,
+    '<=': np.less_equal,
+    '>': np.greater,
+    '>=': np.greater_equal,
+    '==': np.equal,
+    '!=': np.not_equal,
+}
+
+Condition = Tuple[str, str, float]
+
+
+def parse_filters(expression: str) -> List[Condition]:
+    """
+    解析逗号分隔的筛选条件，例如 "rsi<30,adx>25"
+
+    条件无效或指标不存在时抛出 ValueError
+    """
+    conditions = []
+    for part in filter(None, (p.strip() for p in expression.split(','))):
+        match = FILTER_PATTERN.match(part)
+        if not match:
+            raise ValueError(f"无效的筛选条件: {part}")
+        name, op, value = match.group(1).lower(), match.group(2), float(match.group(3))
+        if name not in INDICATOR_INDEX:
+            raise ValueError(f"未知指标: {name}")
+        conditions.append((name, op, value))
+    return conditions
+
+
+class IndicatorMatrix:
+    """
+    全部监控交易对的指标矩阵（周期 x 指标 x 交易对）
+
+    每个交易对的指标更新后写入对应位置，筛选和排序在整列上向量化完成。
+    同一指标的所有交易对在内存中连续存放。
+
+    参数:
+        capacity: 初始交易对容量（不足时按倍数扩容）
+    """
+
+    def __init__(self, capacity: int = 256):
+        self.symbols: List[str] = []
+        self.intervals: List[str] = []
+        self._symbol_index: Dict[str, int] = {}
+        self._interval_index: Dict[str, int] = {}
+        self._capacity = capacity
+        self.values = np.full((0, len(INDICATOR_NAMES), capacity), np.nan, dtype=SNAPSHOT_DTYPE)
+        self.updated_at = np.full((0, capacity), np.nan)
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    @property
+    def nbytes(self) -> int:
+        return self.values.nbytes + self.updated_at.nbytes
+
+    def update(self, symbol: str, interval: str, indicators, timestamp: Optional[float] = None):
+        """写入某个交易对某个周期的最新指标（IndicatorSnapshot 或字典）"""
+        if not isinstance(indicators, IndicatorSnapshot):
+            indicators = IndicatorSnapshot.from_dict(indicators)
+        row = self._symbol_slot(symbol)
+        column = self._interval_slot(interval)
+        self.values[column, :, row] = indicators.values
+        self.updated_at[column, row] = time.time() if timestamp is None else timestamp
+
+    def remove(self, symbol: str):
+        """删除交易对（用最后一个交易对填补空位）"""
+        row = self._symbol_index.pop(symbol, None)
+        if row is None:
+            return
+        last = len(self.symbols) - 1
+        if row != last:
+            moved = self.symbols[last]
+            self.symbols[row] = moved
+            self._symbol_index[moved] = row
+            self.values[:, :, row] = self.values[:, :, last]
+            self.updated_at[:, row] = self.updated_at[:, last]
+        self.symbols.pop()
+        self.values[:, :, last] = np.nan
+        self.updated_at[:, last] = np.nan
+
+    def get(self, symbol: str, interval: str) -> Optional[IndicatorSnapshot]:
+        row = self._symbol_index.get(symbol)
+        column = self._interval_index.get(interval)
+        if row is None or column is None or np.isnan(self.updated_at[column, row]):
+            return None
+        return IndicatorSnapshot(self.values[column, :, row].copy())
+
+    def updated(self, symbol: str, interval: str) -> float:
+        """某个交易对某个周期最后更新的时间戳，没有时为 NaN"""
+        row = self._symbol_index.get(symbol)
+        column = self._interval_index.get(interval)
+        if row is None or column is None:
+            return float('nan')
+        return float(self.updated_at[column, row])
+
+    def column(self, interval: str, name: str) -> np.ndarray:
+        """某个周期某个指标在所有交易对上的值（视图，顺序同 symbols）"""
+        return self.values[self._interval_index[interval], INDICATOR_INDEX[name], :len(self.symbols)]
+
+    def query(
+        self,
+        interval: str,
+        conditions: Sequence[Condition] = (),
+        sort_by: Optional[str] = None,
+        descending: bool = True,
+        limit: Optional[int] = None,
+        fields: Optional[Sequence[str]] = None
+    ) -> List[Dict]:
+        """
+        按条件筛选并排序
+
+        参数:
+            interval: 周期
+            conditions: [(指标, 运算符, 数值), ...]，全部满足才入选；指标缺失视为不满足
+            sort_by: 排序指标（缺失值排在最后）
+            fields: 返回的指标，默认为条件和排序中用到的指标
+
+        返回:
+            [{'symbol', 'interval', 'updated_at', 'values': {指标: 值}}, ...]
+        """
+        column = self._interval_index.get(interval)
+        if column is None or not self.symbols:
+            return []
+        count = len(self.symbols)
+        block = self.values[column, :, :count]
+
+        mask = ~np.isnan(self.updated_at[column, :count])
+        for name, op, value in conditions:
+            mask &= OPERATORS[op](block[INDICATOR_INDEX[name]], value)
+        rows = np.flatnonzero(mask)
+
+        if sort_by is not None:
+            keys = block[INDICATOR_INDEX[sort_by], rows]
+            # argsort 把 NaN 排在最后
+            rows = rows[np.argsort(-keys if descending else keys, kind='stable')]
+        if limit is not None:
+            rows = rows[:limit]
+
+        if fields is None:
+            fields = list(dict.fromkeys([c[0] for c in conditions] + ([sort_by] if sort_by else [])))
+        indices = [INDICATOR_INDEX[name] for name in fields]
+        selected = block[np.ix_(indices, rows)].T
+        updated = self.updated_at[column, rows].tolist()
+
+        return [
+            {
+                'symbol': self.symbols[row],
+                'interval': interval,
+                'updated_at': updated[i],
+                'values': {name: (None if v != v else to_float(v)) for name, v in zip(fields, selected[i])}
+            }
+            for i, row in enumerate(rows.tolist())
+        ]
+
+    def _symbol_slot(self, symbol: str) -> int:
+        row = self._symbol_index.get(symbol)
+        if row is not None:
+            return row
+        row = len(self.symbols)
+        if row >= self._capacity:
+            self._grow(self._capacity * 2)
+        self.symbols.append(symbol)
+        self._symbol_index[symbol] = row
+        return row
+
+    def _interval_slot(self, interval: str) -> int:
+        column = self._interval_index.get(interval)
+        if column is not None:
+            return column
+        column = len(self.intervals)
+        self.intervals.append(interval)
+        self._interval_index[interval] = column
+        self.values = np.concatenate(
+            [self.values, np.full((1, len(INDICATOR_NAMES), self._capacity), np.nan, dtype=SNAPSHOT_DTYPE)]
+        )
+        self.updated_at = np.concatenate([self.updated_at, np.full((1, self._capacity), np.nan)])
+        return column
+
+    def _grow(self, capacity: int):
+        values = np.full((len(self.intervals), len(INDICATOR_NAMES), capacity), np.nan, dtype=SNAPSHOT_DTYPE)
+        values[:, :, :self._capacity] = self.values
+        updated_at = np.full((len(self.intervals), capacity), np.nan)
+        updated_at[:, :self._capacity] = self.updated_at
+        self.values, self.updated_at, self._capacity = values, updated_at, capacity
+
+
+_matrix: Optional[IndicatorMatrix] = None
+
+
+def get_indicator_matrix() -> IndicatorMatrix:
+    """进程内共享的指标矩阵"""
+    global _matrix
+    if _matrix is None:
+        _matrix = IndicatorMatrix()
+    return _matrix
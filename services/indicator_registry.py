@@ -0,0 +1,281 @@
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from ta.trend import (
+    SMAIndicator, EMAIndicator, MACD, IchimokuIndicator
+)
+from ta.momentum import (
+    StochasticOscillator, WilliamsRIndicator,
+    ROCIndicator, AwesomeOscillatorIndicator
+)
+from ta.volatility import (
+    BollingerBands, AverageTrueRange, DonchianChannel
+)
+from ta.volume import (
+    VolumeWeightedAveragePrice, ForceIndexIndicator
+)
+from . import indicator_kernels as kernels
+from .indicator_snapshot import INDICATOR_NAMES, IndicatorSnapshot
+
+
+class Indicator:
+    """
+    注册表中的一个计算单元
+
+    参数:
+        name: 计算单元名称
+        outputs: 产出的指标字段（INDICATOR_NAMES 中的名称）
+        compute: compute(context) -> {字段: 完整序列}
+        depends: 依赖的其他指标字段，计算前先保证它们已经算出
+    """
+
+    __slots__ = ('name', 'outputs', 'compute', 'depends')
+
+    def __init__(self, name: str, outputs: Tuple[str, ...], compute: Callable, depends: Tuple[str, ...] = ()):
+        self.name = name
+        self.outputs = outputs
+        self.compute = compute
+        self.depends = depends
+
+    def __repr__(self) -> str:
+        return f"Indicator({self.name!r}, outputs={self.outputs})"
+
+
+REGISTRY: Dict[str, Indicator] = {}
+PRODUCERS: Dict[str, Indicator] = {}   # 指标字段 -> 计算单元
+
+
+def register(name: str, outputs: Tuple[str, ...], depends: Tuple[str, ...] = ()):
+    """注册计算单元的装饰器"""
+    def decorator(compute: Callable) -> Callable:
+        indicator = Indicator(name, outputs, compute, depends)
+        REGISTRY[name] = indicator
+        for output in outputs:
+            PRODUCERS[output] = indicator
+        return compute
+    return decorator
+
+
+def resolve(names: Iterable[str]) -> List[Indicator]:
+    """
+    按依赖顺序返回计算指定指标所需的全部计算单元
+
+    未知指标抛出 ValueError
+    """
+    ordered: List[Indicator] = []
+    seen = set()
+
+    def visit(name: str):
+        indicator = PRODUCERS.get(name)
+        if indicator is None:
+            raise ValueError(f"未知指标: {name}")
+        if indicator.name in seen:
+            return
+        seen.add(indicator.name)
+        for dependency in indicator.depends:
+            visit(dependency)
+        ordered.append(indicator)
+
+    for name in names:
+        visit(name)
+    return ordered
+
+
+class IndicatorContext:
+    """
+    一根K线（一个tick）上的指标计算上下文
+
+    指标在第一次读取时计算，结果缓存到上下文中；同一份K线上的多个使用方
+    共享一个上下文，每个计算单元最多计算一次。
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        self._series: Dict[str, pd.Series] = {}
+        self._arrays: Dict[str, np.ndarray] = {}
+        self.computed: List[str] = []   # 已计算的单元，按计算顺序
+
+    def array(self, column: str) -> np.ndarray:
+        """K线列的连续 float64 数组（供指标内核使用）"""
+        if column not in self._arrays:
+            self._arrays[column] = np.ascontiguousarray(self.df[column].to_numpy(dtype=np.float64))
+        return self._arrays[column]
+
+    def wrap(self, values: np.ndarray) -> pd.Series:
+        return pd.Series(values, index=self.df.index)
+
+    def series(self, name: str) -> pd.Series:
+        """指标的完整序列"""
+        if name not in self._series:
+            for indicator in resolve([name]):
+                if indicator.name not in self.computed:
+                    self._series.update(indicator.compute(self))
+                    self.computed.append(indicator.name)
+        return self._series[name]
+
+    def value(self, name: str) -> float:
+        """指标的最新值"""
+        return self.series(name).iloc[-1]
+
+    def fill(self, snapshot: IndicatorSnapshot, names: Iterable[str]) -> IndicatorSnapshot:
+        """把指定指标的最新值写入快照"""
+        for name in names:
+            snapshot[name] = self.value(name)
+        return snapshot
+
+    def snapshot(self, names: Optional[Iterable[str]] = None) -> IndicatorSnapshot:
+        """指定指标的快照（默认全部），未计算的字段为NaN"""
+        return self.fill(IndicatorSnapshot(), INDICATOR_NAMES if names is None else names)
+
+
+# 趋势指标
+@register('sma_20', ('sma_20',))
+def _sma_20(ctx: IndicatorContext) -> Dict[str, pd.Series]:
+    return {'sma_20': SMAIndicator(close=ctx.df['close'], window=20).sma_indicator()}
+
+
+@register('sma_50', ('sma_50',))
+def _sma_50(ctx: IndicatorContext) -> Dict[str, pd.Series]:
+    return {'sma_50': SMAIndicator(close=ctx.df['close'], window=50).sma_indicator()}
+
+
+@register('sma_200', ('sma_200',))
+def _sma_200(ctx: IndicatorContext) -> Dict[str, pd.Series]:
+    return {'sma_200': SMAIndicator(close=ctx.df['close'], window=200).sma_indicator()}
+
+
+@register('ema_20', ('ema_20',))
+def _ema_20(ctx: IndicatorContext) -> Dict[str, pd.Series]:
+    return {'ema_20': EMAIndicator(close=ctx.df['close'], window=20).ema_indicator()}
+
+
+@register('ema_50', ('ema_50',))
+def _ema_50(ctx: IndicatorContext) -> Dict[str, pd.Series]:
+    return {'ema_50': EMAIndicator(close=ctx.df['close'], window=50).ema_indicator()}
+
+
+@register('macd', ('macd', 'macd_signal'))
+def _macd(ctx: IndicatorContext) -> Dict[str, pd.Series]:
+    macd = MACD(close=ctx.df['close'])
+    return {'macd': macd.macd(), 'macd_signal': macd.macd_signal()}
+
+
+@register('macd_hist', ('macd_hist',), depends=('macd', 'macd_signal'))
+def _macd_hist(ctx: IndicatorContext) -> Dict[str, pd.Series]:
+    # 与 MACD.macd_diff() 相同
+    return {'macd_hist': ctx.series('macd') - ctx.series('macd_signal')}
+
+
+@register('adx', ('adx', 'adx_pos', 'adx_neg'))
+def _adx(ctx: IndicatorContext) -> Dict[str, pd.Series]:
+    adx, adx_pos, adx_neg = kernels.adx(ctx.array('high'), ctx.array('low'), ctx.array('close'))
+    return {'adx': ctx.wrap(adx), 'adx_pos': ctx.wrap(adx_pos), 'adx_neg': ctx.wrap(adx_neg)}
+
+
+@register('ichimoku', ('ichimoku_a', 'ichimoku_b', 'ichimoku_base', 'ichimoku_conv'))
+def _ichimoku(ctx: IndicatorContext) -> Dict[str, pd.Series]:
+    ichimoku = IchimokuIndicator(high=ctx.df['high'], low=ctx.df['low'])
+    return {
+        'ichimoku_a': ichimoku.ichimoku_a(),
+        'ichimoku_b': ichimoku.ichimoku_b(),
+        'ichimoku_base': ichimoku.ichimoku_base_line(),
+        'ichimoku_conv': ichimoku.ichimoku_conversion_line(),
+    }
+
+
+@register('psar', ('psar', 'psar_up', 'psar_down'))
+def _psar(ctx: IndicatorContext) -> Dict[str, pd.Series]:
+    psar, psar_up, psar_down = kernels.psar(ctx.array('high'), ctx.array('low'), ctx.array('close'))
+    return {'psar': ctx.wrap(psar), 'psar_up': ctx.wrap(psar_up), 'psar_down': ctx.wrap(psar_down)}
+
+
+# 动量指标
+@register('rsi', ('rsi',))
+def _rsi(ctx: IndicatorContext) -> Dict[str, pd.Series]:
+    return {'rsi': ctx.wrap(kernels.rsi(ctx.array('close'), window=14))}
+
+
+@register('stoch', ('stoch_k', 'stoch_d'))
+def _stoch(ctx: IndicatorContext) -> Dict[str, pd.Series]:
+    df = ctx.df
+    stoch = StochasticOscillator(high=df['high'], low=df['low'], close=df['close'])
+    return {'stoch_k': stoch.stoch(), 'stoch_d': stoch.stoch_signal()}
+
+
+@register('williams_r', ('williams_r',))
+def _williams_r(ctx: IndicatorContext) -> Dict[str, pd.Series]:
+    df = ctx.df
+    williams = WilliamsRIndicator(high=df['high'], low=df['low'], close=df['close'])
+    return {'williams_r': williams.williams_r()}
+
+
+@register('roc', ('roc',))
+def _roc(ctx: IndicatorContext) -> Dict[str, pd.Series]:
+    return {'roc': ROCIndicator(close=ctx.df['close']).roc()}
+
+
+@register('ao', ('ao',))
+def _ao(ctx: IndicatorContext) -> Dict[str, pd.Series]:
+    ao = AwesomeOscillatorIndicator(high=ctx.df['high'], low=ctx.df['low'])
+    return {'ao': ao.awesome_oscillator()}
+
+
+# 波动率指标
+@register('bollinger', ('bb_upper', 'bb_middle', 'bb_lower'))
+def _bollinger(ctx: IndicatorContext) -> Dict[str, pd.Series]:
+    bb = BollingerBands(close=ctx.df['close'])
+    return {
+        'bb_upper': bb.bollinger_hband(),
+        'bb_middle': bb.bollinger_mavg(),
+        'bb_lower': bb.bollinger_lband(),
+    }
+
+
+@register('bb_width', ('bb_width',), depends=('bb_upper', 'bb_middle', 'bb_lower'))
+def _bb_width(ctx: IndicatorContext) -> Dict[str, pd.Series]:
+    # 与 BollingerBands.bollinger_wband() 相同
+    width = (ctx.series('bb_upper') - ctx.series('bb_lower')) / ctx.series('bb_middle') * 100
+    return {'bb_width': width}
+
+
+@register('atr', ('atr',))
+def _atr(ctx: IndicatorContext) -> Dict[str, pd.Series]:
+    df = ctx.df
+    atr = AverageTrueRange(high=df['high'], low=df['low'], close=df['close'])
+    return {'atr': atr.average_true_range()}
+
+
+@register('donchian', ('dc_upper', 'dc_middle', 'dc_lower'))
+def _donchian(ctx: IndicatorContext) -> Dict[str, pd.Series]:
+    df = ctx.df
+    dc = DonchianChannel(high=df['high'], low=df['low'], close=df['close'])
+    return {
+        'dc_upper': dc.donchian_channel_hband(),
+        'dc_middle': dc.donchian_channel_mband(),
+        'dc_lower': dc.donchian_channel_lband(),
+    }
+
+
+# 成交量指标
+@register('vwap', ('vwap',))
+def _vwap(ctx: IndicatorContext) -> Dict[str, pd.Series]:
+    df = ctx.df
+    vwap = VolumeWeightedAveragePrice(high=df['high'], low=df['low'], close=df['close'], volume=df['volume'])
+    return {'vwap': vwap.volume_weighted_average_price()}
+
+
+@register('obv', ('obv',))
+def _obv(ctx: IndicatorContext) -> Dict[str, pd.Series]:
+    return {'obv': ctx.wrap(kernels.obv(ctx.array('close'), ctx.array('volume')))}
+
+
+@register('force_index', ('force_index',))
+def _force_index(ctx: IndicatorContext) -> Dict[str, pd.Series]:
+    fi = ForceIndexIndicator(close=ctx.df['close'], volume=ctx.df['volume'])
+    return {'force_index': fi.force_index()}
+
+
+@register('mfi', ('mfi',))
+def _mfi(ctx: IndicatorContext) -> Dict[str, pd.Series]:
+    mfi = kernels.mfi(ctx.array('high'), ctx.array('low'), ctx.array('close'), ctx.array('volume'))
+    return {'mfi': ctx.wrap(mfi)}
@@ -0,0 +1,105 @@
+from collections.abc import Mapping
+from typing import Dict, Iterator, List, Optional, Sequence
+import numpy as np
+
+# 指标字段（与 models.crypto.TechnicalAnalysis 一致），顺序固定
+INDICATOR_NAMES = (
+    # 趋势指标
+    'sma_20', 'sma_50', 'sma_200', 'ema_20', 'ema_50',
+    'macd', 'macd_signal', 'macd_hist',
+    'adx', 'adx_pos', 'adx_neg',
+    'ichimoku_a', 'ichimoku_b', 'ichimoku_base', 'ichimoku_conv',
+    'psar', 'psar_up', 'psar_down',
+    # 动量指标
+    'rsi', 'stoch_k', 'stoch_d', 'williams_r', 'roc', 'ao',
+    # 波动率指标
+    'bb_upper', 'bb_middle', 'bb_lower', 'bb_width', 'atr',
+    'dc_upper', 'dc_middle', 'dc_lower',
+    # 成交量指标
+    'vwap', 'obv', 'force_index', 'mfi',
+)
+INDICATOR_INDEX = {name: i for i, name in enumerate(INDICATOR_NAMES)}
+SNAPSHOT_DTYPE = np.float32
+# 监控每根K线至少计算的指标（基础建议所需）
+BASE_INDICATORS = ('rsi', 'macd', 'macd_signal')
+
+
+def monitored_indicators(extra: str) -> Optional[List[str]]:
+    """监控计算的指标：基础指标加上 SIGNAL_INDICATORS 中额外指定的，"all" 表示全部（返回 None）"""
+    extra = [name.strip() for name in extra.split(',') if name.strip()]
+    if 'all' in extra:
+        return None
+    return list(dict.fromkeys(list(BASE_INDICATORS) + extra))
+
+
+class IndicatorSnapshot(Mapping):
+    """
+    固定字段的指标快照
+
+    数据存放在一个 float32 数组中（按 INDICATOR_NAMES 排列，缺失为NaN），
+    可以像字典一样读取（取值时转换为Python float），多个快照可以用 stack()
+    合并为矩阵。只在API边界通过 to_dict() 转换为字典或pydantic模型。
+    """
+
+    __slots__ = ('values',)
+
+    def __init__(self, values: Optional[np.ndarray] = None):
+        if values is None:
+            values = np.full(len(INDICATOR_NAMES), np.nan, dtype=SNAPSHOT_DTYPE)
+        self.values = values
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, float]) -> "IndicatorSnapshot":
+        snapshot = cls()
+        for name, value in data.items():
+            if name in INDICATOR_INDEX and value is not None:
+                snapshot[name] = value
+        return snapshot
+
+    def __getitem__(self, name: str) -> float:
+        return to_float(self.values[INDICATOR_INDEX[name]])
+
+    def __setitem__(self, name: str, value: float):
+        self.values[INDICATOR_INDEX[name]] = value
+
+    def __contains__(self, name) -> bool:
+        return name in INDICATOR_INDEX
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(INDICATOR_NAMES)
+
+    def __len__(self) -> int:
+        return len(INDICATOR_NAMES)
+
+    def __repr__(self) -> str:
+        return f"IndicatorSnapshot({self.to_dict()})"
+
+    def __reduce__(self):
+        return (IndicatorSnapshot, (self.values.copy(),))
+
+    def copy(self) -> "IndicatorSnapshot":
+        return IndicatorSnapshot(self.values.copy())
+
+    def to_dict(self, nan_as_none: bool = False) -> Dict[str, Optional[float]]:
+        """转换为字典，nan_as_none 为 True 时缺失值为 None（用于JSON和pydantic）"""
+        values = [to_float(v) for v in self.values]
+        if nan_as_none:
+            return {name: (None if v != v else v) for name, v in zip(INDICATOR_NAMES, values)}
+        return dict(zip(INDICATOR_NAMES, values))
+
+
+def to_float(value: np.float32) -> float:
+    """按 float32 的最短表示转换为 float，避免 0.1 变成 0.10000000149011612"""
+    return float(str(value))
+
+
+def stack(snapshots: Sequence[IndicatorSnapshot]) -> np.ndarray:
+    """把多个快照合并为 (数量 x 指标数) 的 float32 矩阵"""
+    if not snapshots:
+        return np.empty((0, len(INDICATOR_NAMES)), dtype=SNAPSHOT_DTYPE)
+    return np.stack([s.values for s in snapshots])
+
+
+def unstack(matrix: np.ndarray) -> List[IndicatorSnapshot]:
+    """把矩阵的每一行包装为快照（共享内存，不复制）"""
+    return [IndicatorSnapshot(row) for row in matrix]
@@ -0,0 +1,177 @@
+import re
+from typing import Dict, List, Optional
+
+# 趋势关键词及得分（-3到3），同分时以先出现在表中的为准
+TREND_PATTERNS = {
+    "强势上涨": 3,
+    "上涨": 2,
+    "震荡偏多": 1,
+    "震荡": 0,
+    "震荡偏空": -1,
+    "下跌": -2,
+    "强势下跌": -3
+}
+
+# 置信度关键词（0-100）
+CONFIDENCE_PATTERNS = {
+    "明确": 80,
+    "强烈": 85,
+    "很强": 85,
+    "非常": 90,
+    "高概率": 75,
+    "可能": 60,
+    "或许": 55,
+    "不确定": 40
+}
+
+# 风险关键词（1-5，5为最高风险）
+RISK_PATTERNS = {
+    "高风险": 5,
+    "风险较大": 4,
+    "谨慎": 3,
+    "注意风险": 3,
+    "风险较小": 2,
+    "低风险": 1
+}
+
+# 价格水平: 名称 -> 关键词部分的正则
+PRICE_PATTERNS = {
+    "support": r"支撑位?[在于]?[：:]?\s*",
+    "resistance": r"阻力位?[在于]?[：:]?\s*",
+    "stop_loss": r"止损[位]?[在于]?[：:]?\s*",
+    "take_profit": r"目标[位]?[在于]?[：:]?\s*",
+}
+
+DEFAULT_TREND = "震荡"
+DEFAULT_CONFIDENCE = 50
+DEFAULT_RISK_LEVEL = 3
+
+
+class KeyPointExtractor:
+    """
+    AI分析文本关键点提取器
+
+    所有趋势、置信度、风险关键词以及价格水平合并为一个预编译的正则，
+    用一次 finditer 扫描整段文本。正则的每个分支都以固定字符开头，
+    引擎可以直接跳到候选位置。
+
+    关键词之间的重叠按逐个做子串判断的语义处理：
+    - 同一位置优先匹配最长的关键词，并计入它包含的较短关键词
+      （"强势上涨"同时计入"上涨"）
+    - 跨越边界的重叠（"注意风险较大"中的"注意风险"和"风险较大"）
+      预先合并成组合关键词加入正则，因此不重叠的扫描也不会漏掉
+    """
+
+    def __init__(self):
+        # 关键词 -> [(类别, 值, 在表中的顺序)]
+        self.keywords: Dict[str, List[tuple]] = {}
+        for category, table in (("trend", TREND_PATTERNS),
+                                ("confidence", CONFIDENCE_PATTERNS),
+                                ("risk", RISK_PATTERNS)):
+            for order, (word, value) in enumerate(table.items()):
+                self.keywords.setdefault(word, []).append((category, value, order))
+
+        words = sorted(self._with_overlaps(self.keywords), key=len, reverse=True)
+
+        # 命中某个(组合)关键词时计入的全部结果
+        self.hits: Dict[str, List[tuple]] = {
+            word: [
+                (category, value, order, keyword)
+                for keyword, entries in self.keywords.items() if keyword in word
+                for category, value, order in entries
+            ]
+            for word in words
+        }
+
+        # 价格在前，关键词按长度降序，保证同一位置优先匹配最长的关键词
+        alternatives = [
+            f"{prefix}(?P<{name}>\\d+\\.?\\d*)" for name, prefix in PRICE_PATTERNS.items()
+        ]
+        alternatives.extend(re.escape(word) for word in words)
+        self.pattern = re.compile("|".join(alternatives))
+
+    @staticmethod
+    def _with_overlaps(keywords) -> set:
+        """
+        补充跨越边界重叠的组合关键词
+
+        关键词的某个后缀是另一个关键词的前缀时（"注意风险" + "风险较大"），
+        把两者拼成"注意风险较大"，重复直到不再产生新词。
+        """
+        max_length = sum(len(word) for word in keywords)
+        result = set(keywords)
+        queue = list(keywords)
+        while queue:
+            word = queue.pop()
+            for i in range(1, len(word)):
+                suffix = word[i:]
+                for other in keywords:
+                    if len(other) > len(suffix) and other.startswith(suffix):
+                        merged = word[:i] + other
+                        # 周期性重叠会无限延长，超过总长度后不再合并
+                        if merged not in result and len(merged) <= max_length:
+                            result.add(merged)
+                            queue.append(merged)
+        return result
+
+    def scan(self, text: str) -> Dict:
+        """单次扫描，返回每个类别的匹配结果"""
+        words = set()
+        prices = {name: [] for name in PRICE_PATTERNS}
+
+        for match in self.pattern.finditer(text):
+            name = match.lastgroup
+            if name is None:
+                words.add(match.group())
+            else:
+                prices[name].append(float(match.group(name)))
+
+        found = {"trend": [], "confidence": [], "risk": []}
+        for word in words:
+            for category, value, order, keyword in self.hits[word]:
+                found[category].append((value, order, keyword))
+        return {**found, "prices": prices}
+
+    def extract(self, analysis: str) -> Dict:
+        """从AI分析中提取关键点"""
+        result = self.scan(analysis)
+        prices = result["prices"]
+        trend, trend_score = self._pick_trend(result["trend"])
+
+        return {
+            "trend": trend,
+            "trend_score": trend_score,  # 趋势得分：-3到3
+            "confidence": max([DEFAULT_CONFIDENCE] + [v for v, _, _ in result["confidence"]]),  # 置信度：0-100
+            "support_levels": sorted(prices["support"]) if prices["support"] else None,
+            "resistance_levels": sorted(prices["resistance"]) if prices["resistance"] else None,
+            "stop_loss": min(prices["stop_loss"]) if prices["stop_loss"] else None,
+            "take_profit_levels": sorted(prices["take_profit"]) if prices["take_profit"] else None,
+            "risk_level": self._pick_risk(result["risk"])  # 风险等级：1-5
+        }
+
+    def risk_level(self, analysis: str) -> int:
+        """计算风险等级（1-5，5为最高风险）"""
+        return self._pick_risk(self.scan(analysis)["risk"])
+
+    def _pick_trend(self, hits: List[tuple]) -> tuple:
+        # 取绝对值最大的得分，同分取表中靠前的
+        trend, trend_score, best_order = DEFAULT_TREND, 0, -1
+        for score, order, word in hits:
+            if abs(score) > abs(trend_score) or (
+                abs(score) == abs(trend_score) and trend_score != 0 and order < best_order
+            ):
+                trend, trend_score, best_order = word, score, order
+        return trend, trend_score
+
+    def _pick_risk(self, hits: List[tuple]) -> int:
+        return max([DEFAULT_RISK_LEVEL] + [level for level, _, _ in hits])
+
+
+_default_extractor: Optional[KeyPointExtractor] = None
+
+def get_key_point_extractor() -> KeyPointExtractor:
+    """获取共享的提取器实例（正则只编译一次）"""
+    global _default_extractor
+    if _default_extractor is None:
+        _default_extractor = KeyPointExtractor()
+    return _default_extractor
@@ -0,0 +1,134 @@
+import json
+import os
+import struct
+import time
+import zlib
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional
+
+# 索引记录：请求时间(ms)、数据文件偏移、帧长度
+INDEX_RECORD = struct.Struct('<qQI')
+
+
+class KlineRecorder:
+    """
+    K线响应录制（只追加）
+
+    按UTC日期分段，每段两个文件:
+        klines-YYYYMMDD.dat  逐条写入 zlib 压缩的JSON帧
+        klines-YYYYMMDD.idx  定长索引（请求时间、偏移、长度），按时间有序，可二分查找
+
+    每条记录包含来源、交易对、周期、请求参数和接口返回的原始K线数组。
+    每条写入后立即 flush，进程中断时最多丢失正在写的一条。
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.records = 0
+        self._day = None
+        self._data = None
+        self._index = None
+        os.makedirs(directory, exist_ok=True)
+
+    def record(self, source: str, symbol: str, interval: str, params: Dict, rows: List[list],
+               time_ms: Optional[int] = None):
+        time_ms = int(time.time() * 1000) if time_ms is None else time_ms
+        payload = json.dumps({
+            'source': source,
+            'symbol': symbol,
+            'interval': interval,
+            'params': params,
+            'time_ms': time_ms,
+            'rows': rows,
+        }, separators=(',', ':'), default=str).encode()
+        frame = zlib.compress(payload, 6)
+
+        self._open(time_ms)
+        offset = self._data.tell()
+        self._data.write(frame)
+        self._data.flush()
+        self._index.write(INDEX_RECORD.pack(time_ms, offset, len(frame)))
+        self._index.flush()
+        self.records += 1
+
+    def _open(self, time_ms: int):
+        day = datetime.fromtimestamp(time_ms / 1000, tz=timezone.utc).strftime('%Y%m%d')
+        if day == self._day:
+            return
+        self.close()
+        base = os.path.join(self.directory, f"klines-{day}")
+        self._data = open(base + '.dat', 'ab')
+        self._index = open(base + '.idx', 'ab')
+        self._day = day
+
+    def close(self):
+        for f in (self._data, self._index):
+            if f is not None:
+                f.close()
+        self._data = self._index = self._day = None
+
+
+_recorders: Dict[str, KlineRecorder] = {}
+
+
+def get_recorder(directory: Optional[str]) -> Optional[KlineRecorder]:
+    """同一目录在进程内共享一个录制器（目录为空时返回 None）"""
+    if not directory:
+        return None
+    directory = os.path.abspath(directory)
+    if directory not in _recorders:
+        _recorders[directory] = KlineRecorder(directory)
+    return _recorders[directory]
+
+
+class KlineArchive:
+    """读取 KlineRecorder 写入的录制数据"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def segments(self) -> List[str]:
+        names = sorted(n[:-4] for n in os.listdir(self.directory) if n.startswith('klines-') and n.endswith('.idx'))
+        return [os.path.join(self.directory, n) for n in names]
+
+    def records(
+        self,
+        start_ms: Optional[int] = None,
+        end_ms: Optional[int] = None,
+        source: Optional[str] = None,
+        symbols: Optional[List[str]] = None
+    ) -> Iterator[Dict]:
+        """按请求时间顺序返回 [start_ms, end_ms) 内的记录"""
+        wanted = {s.upper() for s in symbols} if symbols else None
+        for base in self.segments():
+            with open(base + '.idx', 'rb') as f:
+                index = f.read()
+            count = len(index) // INDEX_RECORD.size
+            entries = [INDEX_RECORD.unpack_from(index, i * INDEX_RECORD.size) for i in range(count)]
+            first = 0 if start_ms is None else _bisect(entries, start_ms)
+            with open(base + '.dat', 'rb') as data:
+                for time_ms, offset, length in entries[first:]:
+                    if end_ms is not None and time_ms >= end_ms:
+                        return
+                    data.seek(offset)
+                    frame = data.read(length)
+                    if len(frame) < length:
+                        # 最后一条未写完整
+                        break
+                    record = json.loads(zlib.decompress(frame))
+                    if source is not None and record['source'] != source:
+                        continue
+                    if wanted is not None and record['symbol'] not in wanted:
+                        continue
+                    yield record
+
+
+def _bisect(entries, start_ms: int) -> int:
+    low, high = 0, len(entries)
+    while low < high:
+        mid = (low + high) // 2
+        if entries[mid][0] < start_ms:
+            low = mid + 1
+        else:
+            high = mid
+    return low
@@ -0,0 +1,202 @@
+import json
+import os
+from typing import Dict, List, Optional
+import numpy as np
+
+class LocalModel:
+    """
+    本地预测模型（纯NumPy推理）
+
+    模型文件为JSON，支持两种类型：
+
+    线性（逻辑回归）:
+        {"type": "linear", "features": [...], "mean": [...], "scale": [...],
+         "weights": [...], "bias": 0.0}
+
+    梯度提升树:
+        {"type": "gbdt", "features": [...], "base_score": 0.0, "learning_rate": 0.1,
+         "trees": [{"feature": [...], "threshold": [...], "left": [...],
+                    "right": [...], "value": [...]}, ...]}
+        每棵树按节点数组存储，feature 为 -1 的节点是叶子，value 为叶子输出；
+        特征缺失（NaN）时走左子树。
+
+    输出均为上涨概率（0-1）。所有样本一次性向量化计算。
+    """
+
+    def __init__(self, spec: Dict):
+        self.type = spec.get("type", "linear")
+        self.features: List[str] = list(spec["features"])
+        self._feature_index = {name: i for i, name in enumerate(self.features)}
+
+        if self.type == "linear":
+            n = len(self.features)
+            self.mean = np.asarray(spec.get("mean", [0.0] * n), dtype=np.float64)
+            self.scale = np.asarray(spec.get("scale", [1.0] * n), dtype=np.float64)
+            self.scale[self.scale == 0] = 1.0
+            self.weights = np.asarray(spec["weights"], dtype=np.float64)
+            self.bias = float(spec.get("bias", 0.0))
+        elif self.type == "gbdt":
+            self.base_score = float(spec.get("base_score", 0.0))
+            self.learning_rate = float(spec.get("learning_rate", 1.0))
+            self._load_trees(spec["trees"])
+        else:
+            raise ValueError(f"不支持的模型类型: {self.type}")
+
+    @classmethod
+    def load(cls, path: str) -> "LocalModel":
+        """从JSON文件加载模型"""
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def to_dict(self) -> Dict:
+        if self.type == "linear":
+            return {
+                "type": "linear",
+                "features": self.features,
+                "mean": self.mean.tolist(),
+                "scale": self.scale.tolist(),
+                "weights": self.weights.tolist(),
+                "bias": self.bias
+            }
+        return {
+            "type": "gbdt",
+            "features": self.features,
+            "base_score": self.base_score,
+            "learning_rate": self.learning_rate,
+            "trees": self._trees
+        }
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f)
+
+    def _load_trees(self, trees: List[Dict]):
+        # 所有树填充到相同长度的二维数组，便于同时遍历
+        self._trees = trees
+        size = max(len(tree["feature"]) for tree in trees)
+        count = len(trees)
+        self.tree_feature = np.full((count, size), -1, dtype=np.int64)
+        self.tree_threshold = np.zeros((count, size), dtype=np.float64)
+        self.tree_left = np.zeros((count, size), dtype=np.int64)
+        self.tree_right = np.zeros((count, size), dtype=np.int64)
+        self.tree_value = np.zeros((count, size), dtype=np.float64)
+        for i, tree in enumerate(trees):
+            n = len(tree["feature"])
+            self.tree_feature[i, :n] = tree["feature"]
+            self.tree_threshold[i, :n] = tree["threshold"]
+            self.tree_left[i, :n] = tree["left"]
+            self.tree_right[i, :n] = tree["right"]
+            self.tree_value[i, :n] = tree["value"]
+        self.max_depth = self._depth(trees)
+
+    @staticmethod
+    def _depth(trees: List[Dict]) -> int:
+        depth = 0
+        for tree in trees:
+            stack = [(0, 0)]
+            while stack:
+                node, level = stack.pop()
+                depth = max(depth, level)
+                if tree["feature"][node] >= 0:
+                    stack.append((tree["left"][node], level + 1))
+                    stack.append((tree["right"][node], level + 1))
+        return depth
+
+    def vectorize(self, rows: List[Dict[str, float]]) -> np.ndarray:
+        """将指标字典列表转换为特征矩阵，缺失值为NaN"""
+        X = np.full((len(rows), len(self.features)), np.nan, dtype=np.float64)
+        for i, row in enumerate(rows):
+            for name, value in row.items():
+                j = self._feature_index.get(name)
+                if j is not None and value is not None:
+                    X[i, j] = value
+        return X
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        """批量计算上涨概率"""
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X[np.newaxis, :]
+        if self.type == "linear":
+            z = self._linear_margin(X)
+        else:
+            z = self._gbdt_margin(X)
+        return 1.0 / (1.0 + np.exp(-z))
+
+    def _linear_margin(self, X: np.ndarray) -> np.ndarray:
+        # 缺失特征按均值处理（标准化后为0）
+        scaled = (X - self.mean) / self.scale
+        scaled = np.nan_to_num(scaled, nan=0.0, posinf=0.0, neginf=0.0)
+        return scaled @ self.weights + self.bias
+
+    def _gbdt_margin(self, X: np.ndarray) -> np.ndarray:
+        count = self.tree_feature.shape[0]
+        rows = np.arange(X.shape[0])
+        trees = np.arange(count)[:, np.newaxis]
+        node = np.zeros((count, X.shape[0]), dtype=np.int64)
+
+        for _ in range(self.max_depth):
+            feature = self.tree_feature[trees, node]
+            is_leaf = feature < 0
+            if is_leaf.all():
+                break
+            x = X[rows, np.where(is_leaf, 0, feature)]
+            go_left = np.isnan(x) | (x <= self.tree_threshold[trees, node])
+            next_node = np.where(go_left, self.tree_left[trees, node], self.tree_right[trees, node])
+            node = np.where(is_leaf, node, next_node)
+
+        leaf_values = self.tree_value[trees, node]
+        return self.base_score + self.learning_rate * leaf_values.sum(axis=0)
+
+
+def train_linear_model(
+    X: np.ndarray,
+    y: np.ndarray,
+    features: List[str],
+    epochs: int = 500,
+    learning_rate: float = 0.1,
+    l2: float = 1e-3
+) -> LocalModel:
+    """
+    用批量梯度下降训练逻辑回归模型
+
+    参数:
+        X: 特征矩阵 (样本数 x 特征数)，允许NaN
+        y: 标签（1为上涨，0为下跌）
+        features: 特征名称，与 X 的列对应
+    """
+    X = np.asarray(X, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    mean = np.nanmean(X, axis=0)
+    scale = np.nanstd(X, axis=0)
+    scale[~np.isfinite(scale) | (scale == 0)] = 1.0
+    mean = np.nan_to_num(mean)
+    Z = np.nan_to_num((X - mean) / scale)
+
+    weights = np.zeros(Z.shape[1])
+    bias = 0.0
+    for _ in range(epochs):
+        p = 1.0 / (1.0 + np.exp(-(Z @ weights + bias)))
+        error = p - y
+        weights -= learning_rate * (Z.T @ error / len(y) + l2 * weights)
+        bias -= learning_rate * error.mean()
+
+    return LocalModel({
+        "type": "linear",
+        "features": features,
+        "mean": mean.tolist(),
+        "scale": scale.tolist(),
+        "weights": weights.tolist(),
+        "bias": bias
+    })
+
+
+def resolve_model_file(model_path: str) -> Optional[str]:
+    """model_path 可以是模型文件或目录（目录下查找 predictor.json）"""
+    if not model_path:
+        return None
+    if os.path.isdir(model_path):
+        candidate = os.path.join(model_path, "predictor.json")
+        return candidate if os.path.isfile(candidate) else None
+    return model_path if os.path.isfile(model_path) else None
@@ -0,0 +1,202 @@
+"""
+交易所交易对元数据（exchangeInfo 快照）
+
+一次请求完整的 exchangeInfo，在内存中按交易对、基础资产、计价资产和状态建立索引，
+并解析价格/数量精度（PRICE_FILTER、LOT_SIZE）。查询交易对只读内存，不再逐个请求交易所。
+
+快照超过 refresh_seconds 后，下一次读取在后台刷新（读取仍返回旧快照，不等待）；
+刷新时与旧快照比较，未变化的交易对沿用原对象，只记录新增、下架和变化的交易对。
+刷新失败时继续使用旧快照，retry_seconds 后再次尝试。
+"""
+import asyncio
+import time
+from functools import lru_cache
+from typing import Awaitable, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+
+class SymbolInfo(NamedTuple):
+    """一个交易对的元数据（价格和数量精度为 0 表示交易所没有提供对应的过滤器）"""
+    symbol: str
+    base_asset: str
+    quote_asset: str
+    status: str
+    tick_size: float
+    min_price: float
+    step_size: float
+    min_qty: float
+    filters: Tuple[Dict, ...]
+
+    def to_dict(self) -> Dict:
+        result = self._asdict()
+        result['filters'] = list(self.filters)
+        return result
+
+
+class SnapshotDiff(NamedTuple):
+    added: List[str]
+    removed: List[str]
+    changed: List[str]
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.changed)
+
+
+def parse_symbol(raw: Dict) -> SymbolInfo:
+    """把 exchangeInfo 中的一个交易对转换为 SymbolInfo"""
+    filters = {f.get('filterType'): f for f in raw.get('filters', [])}
+    price = filters.get('PRICE_FILTER', {})
+    lot = filters.get('LOT_SIZE', {})
+    return SymbolInfo(
+        symbol=raw['symbol'],
+        base_asset=raw['baseAsset'],
+        quote_asset=raw['quoteAsset'],
+        status=raw['status'],
+        tick_size=float(price.get('tickSize', 0)),
+        min_price=float(price.get('minPrice', 0)),
+        step_size=float(lot.get('stepSize', 0)),
+        min_qty=float(lot.get('minQty', 0)),
+        filters=tuple(raw.get('filters', [])),
+    )
+
+
+class MarketSnapshot:
+    """某一时刻的 exchangeInfo 及其索引（创建后不再修改，可在多个请求间共享）"""
+
+    def __init__(self, symbols: Iterable[SymbolInfo], loaded_at: Optional[float] = None):
+        self.loaded_at = time.monotonic() if loaded_at is None else loaded_at
+        self.by_symbol: Dict[str, SymbolInfo] = {}
+        self.by_base: Dict[str, List[str]] = {}
+        self.by_quote: Dict[str, List[str]] = {}
+        self.by_status: Dict[str, List[str]] = {}
+        for info in sorted(symbols, key=lambda item: item.symbol):
+            self.by_symbol[info.symbol] = info
+            self.by_base.setdefault(info.base_asset, []).append(info.symbol)
+            self.by_quote.setdefault(info.quote_asset, []).append(info.symbol)
+            self.by_status.setdefault(info.status, []).append(info.symbol)
+
+    @classmethod
+    def from_exchange_info(cls, exchange_info: Dict, previous: Optional["MarketSnapshot"] = None) -> "MarketSnapshot":
+        """由 exchangeInfo 响应创建快照，与 previous 相同的交易对沿用原对象"""
+        old = previous.by_symbol if previous is not None else {}
+        symbols = []
+        for raw in exchange_info.get('symbols', []):
+            info = parse_symbol(raw)
+            kept = old.get(info.symbol)
+            symbols.append(kept if kept == info else info)
+        return cls(symbols)
+
+    def __len__(self) -> int:
+        return len(self.by_symbol)
+
+    def get(self, symbol: str) -> Optional[SymbolInfo]:
+        return self.by_symbol.get(symbol.upper())
+
+    def symbols(
+        self,
+        status: Optional[str] = None,
+        base_asset: Optional[str] = None,
+        quote_asset: Optional[str] = None
+    ) -> List[str]:
+        """按条件筛选交易对（按名称排序），条件为 None 时不筛选"""
+        selected = None
+        for index, value in ((self.by_status, status), (self.by_base, base_asset), (self.by_quote, quote_asset)):
+            if value is None:
+                continue
+            matched = index.get(value.upper(), [])
+            if selected is None:
+                selected = matched
+            else:
+                matched = set(matched)
+                selected = [s for s in selected if s in matched]
+        return list(self.by_symbol) if selected is None else list(selected)
+
+    def age(self, now: Optional[float] = None) -> float:
+        return (time.monotonic() if now is None else now) - self.loaded_at
+
+    def diff(self, other: "MarketSnapshot") -> SnapshotDiff:
+        """从本快照到 other 的变化"""
+        old, new = self.by_symbol, other.by_symbol
+        return SnapshotDiff(
+            added=sorted(new.keys() - old.keys()),
+            removed=sorted(old.keys() - new.keys()),
+            changed=sorted(s for s in new.keys() & old.keys() if new[s] != old[s]),
+        )
+
+
+class MarketMetadata:
+    """
+    交易对元数据服务
+
+    参数:
+        loader: 返回 exchangeInfo 响应的协程函数
+        refresh_seconds: 快照超过该时间后在后台刷新，0 表示不自动刷新
+        retry_seconds: 后台刷新失败后再次尝试的间隔
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[], Awaitable[Dict]],
+        refresh_seconds: float = 3600.0,
+        retry_seconds: float = 60.0
+    ):
+        self.loader = loader
+        self.refresh_seconds = refresh_seconds
+        self.retry_seconds = retry_seconds
+        self.snapshot: Optional[MarketSnapshot] = None
+        self.last_diff: Optional[SnapshotDiff] = None
+        self._lock = asyncio.Lock()
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._next_refresh = 0.0
+
+    async def refresh(self) -> SnapshotDiff:
+        """请求 exchangeInfo 并替换快照，返回与旧快照的差异"""
+        async with self._lock:
+            return await self._load()
+
+    async def _load(self) -> SnapshotDiff:
+        exchange_info = await self.loader()
+        previous = self.snapshot
+        snapshot = MarketSnapshot.from_exchange_info(exchange_info, previous)
+        diff = (previous or MarketSnapshot([])).diff(snapshot)
+        self.snapshot = snapshot
+        self.last_diff = diff
+        self._next_refresh = snapshot.loaded_at + self.refresh_seconds
+        if previous is not None and diff:
+            print(f"交易对元数据更新: 新增 {len(diff.added)}，下架 {len(diff.removed)}，变化 {len(diff.changed)}")
+        return diff
+
+    async def get_snapshot(self) -> MarketSnapshot:
+        """当前快照；尚未加载时加载（并发请求只加载一次），过期时在后台刷新"""
+        snapshot = self.snapshot
+        if snapshot is None:
+            async with self._lock:
+                if self.snapshot is None:
+                    await self._load()
+            return self.snapshot
+        if self.refresh_seconds and time.monotonic() >= self._next_refresh and not self._refreshing():
+            self._refresh_task = asyncio.create_task(self._refresh_in_background())
+        return snapshot
+
+    def _refreshing(self) -> bool:
+        return self._refresh_task is not None and not self._refresh_task.done()
+
+    async def _refresh_in_background(self):
+        try:
+            await self.refresh()
+        except Exception as e:
+            self._next_refresh = time.monotonic() + self.retry_seconds
+            print(f"刷新交易对元数据失败，继续使用旧数据: {str(e)}")
+
+    async def get_symbol(self, symbol: str) -> Optional[SymbolInfo]:
+        return (await self.get_snapshot()).get(symbol)
+
+    async def symbols(self, **conditions) -> List[str]:
+        return (await self.get_snapshot()).symbols(**conditions)
+
+
+@lru_cache()
+def get_market_metadata() -> MarketMetadata:
+    """进程内共享的交易对元数据（现货，由 DataFetcher 加载）"""
+    from app.core.config import get_settings
+    from .data_fetcher import get_data_fetcher
+    return MarketMetadata(get_data_fetcher().get_exchange_info, get_settings().market_metadata_refresh_seconds)
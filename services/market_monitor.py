@@ -1,21 +1,63 @@
 import asyncio
-from typing import Dict, List, Optional, Callable
-from datetime import datetime, timedelta
+import time
+from typing import Dict, List, Optional, Callable, Tuple
+from datetime import datetime, timedelta, timezone
 import pandas as pd
 from .futures_data_fetcher import FuturesDataFetcher
 from .signal_generator import SignalGenerator
+from .ai_scheduler import AIScheduler
+from .candle_resampler import CandleResampler, can_resample, choose_base_interval
+from .indicator_matrix import get_indicator_matrix
+from .signal_hub import get_signal_hub
+from .shared_state import create_indicator_store, create_signal_bus
+from .metrics import CLOSE_TO_SIGNAL_SECONDS, CYCLE_SECONDS, stage
+from .cycle_profiler import CycleProfiler
+from .shard_coordinator import create_shard_member
+from .candle_scheduler import CandleScheduler, Evaluation
+from .candle_time import candle_length
+from core.config import get_settings
 
 class MarketMonitor:
     def __init__(self):
+        settings = get_settings()
         self.data_fetcher = FuturesDataFetcher()
         self.signal_generator = SignalGenerator()
         self.monitoring = False
         self.callbacks = []
+        self.klines_history = 100  # 每个周期用于分析的K线数量
+        # 多周期K线由一份基础周期K线在本地合成，每个交易对只请求一次；
+        # K线直接写入固定容量的环形缓冲区，分析时才转换为DataFrame
+        self.resamplers: Dict[str, CandleResampler] = {}
+        # 全部交易对的最新指标，供筛选接口查询；SHARED_STATE 启用时同时写入 Redis，API 进程从中同步
+        self.indicator_matrix = get_indicator_matrix()
+        self.indicator_store = create_indicator_store(settings)
+        # 每条信号发布一次，由 WebSocket/SSE 接口推送给订阅的客户端；
+        # SHARED_STATE 启用时发布到 Redis，由 API 进程转发给它的订阅者
+        self.signal_hub = get_signal_hub()
+        self.signal_bus = create_signal_bus(settings)
+        # 按需性能分析：PROFILE_CYCLES 或 enable_profiling() 启用，记录接下来的 N 轮
+        self.profiler = CycleProfiler(settings.profile_dir)
+        if settings.profile_cycles > 0:
+            self.profiler.arm(settings.profile_cycles)
+        # 分片：多个实例各自只分析一致性哈希分配到的 交易对x周期（SHARD_COORDINATOR）
+        self.shard = create_shard_member(settings)
+        # 交易所服务器时间减本地时间（毫秒），收盘调度按服务器时间计算
+        self.clock_offset_ms = 0
+        self._wakeup: Optional[asyncio.Event] = None
+        # AI分析异步调度：技术分析结果先推送，AI结果完成后再次推送
+        self.ai_scheduler = None
+        if settings.ai_async_enrichment:
+            self.ai_scheduler = AIScheduler(self.signal_generator.ai_analyzer)
+            self.signal_generator.ai_scheduler = self.ai_scheduler
         
     def add_callback(self, callback: Callable[[str, Dict], None]):
         """添加信号回调函数"""
         self.callbacks.append(callback)
         
+    def enable_profiling(self, cycles: int):
+        """记录接下来 cycles 轮监控的性能分析（0 表示关闭）"""
+        self.profiler.arm(cycles)
+
     def remove_callback(self, callback: Callable[[str, Dict], None]):
         """移除信号回调函数"""
         if callback in self.callbacks:
@@ -25,7 +67,8 @@ class MarketMonitor:
         self,
         symbols: List[str],
         intervals: List[str],
-        update_interval: int = 60
+        update_interval: Optional[float] = None,
+        cycles: Optional[int] = None
     ):
         """
         开始市场监控
@@ -33,48 +76,318 @@ class MarketMonitor:
         参数:
             symbols: 要监控的交易对列表
             intervals: 要监控的时间周期列表
-            update_interval: 更新间隔（秒）
+            update_interval: 每隔固定秒数扫描全部交易对；为 None 时按 MONITOR_SCHEDULE，
+                默认（close）每个交易对x周期在K线收盘后分析一次
+            cycles: 运行指定轮数后停止（None 表示一直运行，用于压测和回放；收盘调度时每次唤醒算一轮）
         """
+        settings = get_settings()
+        if update_interval is None and settings.monitor_schedule == 'fixed':
+            update_interval = settings.monitor_update_interval
         self.monitoring = True
+        self._wakeup = asyncio.Event()
+        if self.ai_scheduler is not None:
+            await self.ai_scheduler.start()
         
+        try:
+            if update_interval is None:
+                await self._run_scheduled(symbols, intervals, cycles)
+            else:
+                await self._run_fixed(symbols, intervals, update_interval, cycles)
+        finally:
+            if self.shard is not None:
+                try:
+                    await self.shard.leave()
+                except Exception as e:
+                    # 释放失败时租约到期后由其他实例接管
+                    print(f"退出分片失败: {str(e)}")
+            if self.ai_scheduler is not None:
+                await self.ai_scheduler.close()
+
+    async def _run_fixed(self, symbols: List[str], intervals: List[str], update_interval: float, cycles: Optional[int]):
+        """每隔 update_interval 秒扫描全部交易对"""
+        completed = 0
         while self.monitoring:
             try:
-                for symbol in symbols:
-                    for interval in intervals:
-                        # 获取K线数据
-                        df = await self.data_fetcher.get_klines(
-                            symbol=symbol,
-                            interval=interval,
-                            limit=100  # 获取足够的历史数据用于分析
-                        )
-                        print("获取K线数据 {} {}".format(symbol, interval))
-                        # 生成信号（异步AI分析集成）
-                        signals = await self.signal_generator.generate_signals(df)
-                        print("生成信号 {} {}".format(symbol, interval))
-                        # 添加基本市场信息
-                        latest = df.iloc[-1]
-                        market_info = {
-                            'symbol': symbol,
-                            'interval': interval,
-                            'timestamp': latest.name,
-                            'price': latest['close'],
-                            'price_change': latest['price_change'],
-                            'price_change_percent': latest['price_change_percent'],
-                            'volume': latest['volume'],
-                            'signals': signals
-                        }
-                        
-                        # 调用回调函数
-                        for callback in self.callbacks:
-                            await callback(symbol, market_info)
-                            
+                # 清理K线已收盘的AI任务
+                if self.ai_scheduler is not None:
+                    self.ai_scheduler.cancel_stale()
+
+                plan = await self._plan(symbols, intervals)
+                cycle_start = time.perf_counter()
+                profiler = self.profiler
+                profiler.begin_cycle()
+                for symbol, symbol_intervals, base_interval in plan:
+                    try:
+                        # 获取K线数据（只返回最新K线有变化的周期）
+                        with profiler.section(symbol, 'fetch'):
+                            frames = await self._fetch_klines(symbol, symbol_intervals, base_interval)
+                        for interval, df in frames.items():
+                            with profiler.section(symbol, interval):
+                                await self._analyze(symbol, interval, df)
+                    except Exception as e:
+                        # 单个交易对失败不影响本轮其他交易对
+                        print(f"监控错误 {symbol}: {str(e)}")
+                profiler.end_cycle()
+                CYCLE_SECONDS.labels().observe(time.perf_counter() - cycle_start)
+                completed += 1
+                if cycles is not None and completed >= cycles:
+                    self.monitoring = False
+                    break
+
                 # 等待下一次更新
                 await asyncio.sleep(update_interval)
                 
             except Exception as e:
                 print(f"监控错误: {str(e)}")
                 await asyncio.sleep(5)  # 发生错误时等待5秒后重试
+
+    async def _run_scheduled(self, symbols: List[str], intervals: List[str], cycles: Optional[int]):
+        """每个 交易对x周期 在K线收盘后（及可选的盘中检查时）分析"""
+        settings = get_settings()
+        scheduler = CandleScheduler(settings.monitor_close_delay, settings.monitor_intra_candle_seconds)
+        pairs = [(symbol, interval) for symbol in symbols for interval in intervals]
+        completed = 0
+        synced_at = None
+        while self.monitoring:
+            try:
+                if synced_at is None or time.monotonic() - synced_at >= settings.monitor_time_sync_seconds:
+                    await self._sync_clock()
+                    synced_at = time.monotonic()
+                scheduler.set_pairs(pairs, self._server_ms())
+                due_ms = scheduler.next_due_ms()
+                if due_ms is None:
+                    break
+                if self.shard is not None:
+                    # 等待期间也按时续期心跳和租约
+                    due_ms = min(due_ms, self._server_ms() + int(self.shard.lease_seconds * 1000 / 3))
+                await self._wait_until(due_ms)
+                if not self.monitoring:
+                    break
+
+                evaluations = scheduler.pop_due(self._server_ms())
+                if not evaluations:
+                    if self.shard is not None:
+                        await self._plan(symbols, intervals)
+                    continue
+                if self.ai_scheduler is not None:
+                    self.ai_scheduler.cancel_stale()
+                await self._evaluate(symbols, intervals, evaluations)
+                completed += 1
+                if cycles is not None and completed >= cycles:
+                    self.monitoring = False
+                    break
+
+            except Exception as e:
+                print(f"监控错误: {str(e)}")
+                await asyncio.sleep(5)  # 发生错误时等待5秒后重试
+
+    async def _evaluate(self, symbols: List[str], intervals: List[str], evaluations: List[Evaluation]):
+        """执行到期的分析：每个交易对请求一次K线，收盘分析只使用已收盘的K线"""
+        due: Dict[str, Dict[str, Evaluation]] = {}
+        for evaluation in evaluations:
+            due.setdefault(evaluation.symbol, {})[evaluation.interval] = evaluation
+        cycle_start = time.perf_counter()
+        profiler = self.profiler
+        profiler.begin_cycle()
+        for symbol, owned_intervals, base_interval in await self._plan(symbols, intervals):
+            symbol_due = {i: e for i, e in due.get(symbol, {}).items() if i in owned_intervals}
+            if not symbol_due:
+                continue
+            try:
+                with profiler.section(symbol, 'fetch'):
+                    # 本地合成时按全部周期更新同一个合成器，否则只请求到期的周期
+                    frames = await self._fetch_klines(
+                        symbol, owned_intervals if base_interval else list(symbol_due), base_interval
+                    )
+                resampler = self.resamplers.get(symbol) if base_interval else None
+                for interval, evaluation in symbol_due.items():
+                    df = frames.get(interval)
+                    if df is None and resampler is not None:
+                        # 合成器只返回最新K线有变化的周期，到期的周期没有变化（已在之前的更新中合成）时也要分析
+                        df = resampler.get(interval)
+                    if df is not None and evaluation.at_close:
+                        df = df[df.index < pd.Timestamp(evaluation.close_ms, unit='ms')]
+                    if df is None or df.empty:
+                        continue
+                    with profiler.section(symbol, interval):
+                        await self._analyze(symbol, interval, df, self._ai_deadline(evaluation))
+                    if evaluation.at_close:
+                        CLOSE_TO_SIGNAL_SECONDS.labels(interval).observe(
+                            (self._server_ms() - evaluation.close_ms) / 1000
+                        )
+            except Exception as e:
+                # 单个交易对失败不影响其他交易对
+                print(f"监控错误 {symbol}: {str(e)}")
+        profiler.end_cycle()
+        CYCLE_SECONDS.labels().observe(time.perf_counter() - cycle_start)
+
+    def _ai_deadline(self, evaluation: Evaluation) -> float:
+        """AI结果的过期时间（本地时间戳，秒）：当前正在形成的K线的收盘时间"""
+        close_ms = evaluation.close_ms
+        if evaluation.at_close:
+            close_ms += candle_length(evaluation.interval)
+        return (close_ms - self.clock_offset_ms) / 1000
+
+    async def _sync_clock(self):
+        """校准与交易所服务器的时间偏差，失败时沿用上次的偏差"""
+        try:
+            self.clock_offset_ms = await self.data_fetcher.get_clock_offset()
+        except Exception as e:
+            print(f"获取交易所服务器时间失败: {str(e)}")
+
+    def _server_ms(self) -> int:
+        """交易所服务器的当前时间（毫秒）"""
+        return int(self._now().timestamp() * 1000) + self.clock_offset_ms
+
+    async def _wait_until(self, server_ms: int):
+        """等待到服务器时间 server_ms，stop_monitoring() 时提前返回"""
+        delay = (server_ms - self._server_ms()) / 1000
+        if delay > 0:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _analyze(self, symbol: str, interval: str, df: pd.DataFrame, ai_deadline: Optional[float] = None):
+        """分析一个交易对一个周期的K线并通知，ai_deadline 为AI结果的过期时间（默认为最后一根K线的收盘时间）"""
+        print("获取K线数据 {} {}".format(symbol, interval))
+        # 添加基本市场信息
+        latest = df.iloc[-1]
+        market_info = {
+            'symbol': symbol,
+            'interval': interval,
+            'timestamp': latest.name,
+            'price': latest['close'],
+            'price_change': latest['price_change'],
+            'price_change_percent': latest['price_change_percent'],
+            'volume': latest['volume'],
+        }
+        # 生成信号（AI分析异步补充）
+        on_ai_preliminary, on_ai_complete = self._make_ai_callbacks(symbol, market_info)
+        signals = await self.signal_generator.generate_signals(
+            df,
+            symbol=symbol,
+            interval=interval,
+            on_ai_complete=on_ai_complete,
+            on_ai_preliminary=on_ai_preliminary,
+            deadline=ai_deadline
+        )
+        print("生成信号 {} {}".format(symbol, interval))
+        self.indicator_matrix.update(symbol, interval, signals['technical'])
+        if self.indicator_store is not None:
+            try:
+                await self.indicator_store.save(symbol, interval, signals['technical'])
+            except Exception as e:
+                print(f"写入共享指标失败 {symbol} {interval}: {str(e)}")
+        market_info['signals'] = signals
+        market_info['ai_pending'] = bool(signals['ai'].get('pending'))
+
+        # 调用回调函数
+        await self._dispatch(symbol, market_info)
+
+    def _now(self) -> datetime:
+        """当前时间（回放时为录制时的时间）"""
+        return datetime.now(timezone.utc)
+
+    async def _plan(self, symbols: List[str], intervals: List[str]) -> List[Tuple[str, List[str], Optional[str]]]:
+        """本轮要分析的 (交易对, 周期列表, 基础周期)；分片时只包含本实例持有租约的 交易对x周期"""
+        base_interval = self._base_interval(intervals)
+        if self.shard is None:
+            return [(symbol, intervals, base_interval) for symbol in symbols]
+
+        # 本地合成时同一交易对的周期分给同一实例，每个交易对仍只请求一份基础K线
+        pairs = [(s, i) for s in symbols for i in intervals]
+        owned: Dict[str, List[str]] = {}
+        for symbol, interval in await self.shard.assign(pairs, by_symbol=base_interval is not None):
+            owned.setdefault(symbol, []).append(interval)
+        # 不再负责的交易对不保留K线缓冲区
+        for symbol in set(self.resamplers) - set(owned):
+            del self.resamplers[symbol]
+        return [(symbol, owned_intervals, self._base_interval(owned_intervals))
+                for symbol, owned_intervals in owned.items()]
+
+    def _base_interval(self, intervals: List[str]) -> Optional[str]:
+        """确定用于合成的基础周期，无法合成时返回 None（各周期分别请求）"""
+        settings = get_settings()
+        if not settings.monitor_resample:
+            return None
+        base_interval = settings.monitor_base_interval
+        if base_interval and all(can_resample(base_interval, i) for i in intervals):
+            return base_interval
+        return choose_base_interval(intervals)
+
+    async def _fetch_klines(self, symbol: str, intervals: List[str], base_interval: Optional[str]) -> Dict[str, pd.DataFrame]:
+        """获取各周期K线，返回 周期 -> DataFrame"""
+        if base_interval is None:
+            frames = {}
+            for interval in intervals:
+                frames[interval] = await self.data_fetcher.get_klines(
+                    symbol=symbol,
+                    interval=interval,
+                    limit=self.klines_history  # 获取足够的历史数据用于分析
+                )
+            return frames
+
+        resampler = self.resamplers.get(symbol)
+        if (resampler is None or resampler.base_interval != base_interval or
+                resampler.intervals != list(intervals)):
+            resampler = CandleResampler(base_interval, intervals, history=self.klines_history)
+            self.resamplers[symbol] = resampler
+
+        now = self._now()
+        last_open = resampler.last_open_time
+        elapsed = None
+        if last_open is not None:
+            elapsed = int((now - last_open.tz_localize('UTC')).total_seconds() * 1000) // resampler.base_ms
+        if elapsed is None or elapsed + 2 > 1500:
+            # 首次运行或中断太久：下载合成所需的全部基础K线
+            start = now - timedelta(milliseconds=resampler.base_ms * resampler.required_base_candles)
+            candles = await self.data_fetcher.get_klines_range(symbol, base_interval, start, raw=True)
+        else:
+            # 只请求上次最后一根（可能尚未收盘）之后的K线
+            candles = await self.data_fetcher.get_klines_raw(symbol=symbol, interval=base_interval, limit=elapsed + 2)
+
+        with stage('resample', symbol, base_interval):
+            changed = resampler.update(candles)
+        return {interval: resampler.get(interval) for interval in intervals if interval in changed}
+
+    def _make_ai_callbacks(self, symbol: str, market_info: Dict):
+        """生成AI初步结果和最终结果的回调，使用补充了AI结果的信号再次通知"""
+        state = {'preliminary_sent': False}
+
+        async def _on_ai_preliminary(signals: Dict):
+            state['preliminary_sent'] = True
+            updated = dict(market_info)
+            updated['signals'] = signals
+            updated['ai_pending'] = True
+            updated['ai_preliminary'] = True
+            updated['ai_update'] = True
+            await self._dispatch(symbol, updated)
+
+        async def _on_ai_complete(signals: Dict):
+            updated = dict(market_info)
+            updated['signals'] = signals
+            updated['ai_pending'] = False
+            updated['ai_update'] = True
+            updated['ai_preliminary_sent'] = state['preliminary_sent']
+            await self._dispatch(symbol, updated)
+
+        return _on_ai_preliminary, _on_ai_complete
+
+    async def _dispatch(self, symbol: str, market_info: Dict):
+        """发布到信号中心（或 Redis）并调用所有回调函数"""
+        if self.signal_bus is None:
+            self.signal_hub.publish(symbol, market_info)
+        else:
+            try:
+                await self.signal_bus.publish(symbol, market_info)
+            except Exception as e:
+                print(f"发布监控信号失败 {symbol}: {str(e)}")
+        for callback in self.callbacks:
+            await callback(symbol, market_info)
                 
     def stop_monitoring(self):
         """停止市场监控"""
         self.monitoring = False
+        if self._wakeup is not None:
+            self._wakeup.set()
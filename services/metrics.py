@@ -0,0 +1,241 @@
+import time
+from bisect import bisect_left
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# 耗时直方图的默认分桶（秒）
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    """指标基类：按标签值缓存子指标，更新时只做一次字典查找"""
+
+    kind = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), registry: Optional["MetricsRegistry"] = None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        (registry if registry is not None else REGISTRY).register(self)
+
+    def labels(self, *values: str):
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} 需要标签 {self.labelnames}")
+            child = self._children[values] = self._new_child()
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _label_text(self, values: Tuple[str, ...], extra: str = '') -> str:
+        pairs = [f'{k}="{_escape(v)}"' for k, v in zip(self.labelnames, values)]
+        if extra:
+            pairs.append(extra)
+        return '{' + ','.join(pairs) + '}' if pairs else ''
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        for values, child in sorted(self._children.items()):
+            lines.extend(self._render_child(values, child))
+        return lines
+
+    def _render_child(self, values, child) -> List[str]:
+        return [f'{self.name}{self._label_text(values)} {_format_value(child.value)}']
+
+
+class _Value:
+    __slots__ = ('value',)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+    def set(self, value: float):
+        self.value = value
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def _new_child(self):
+        return _Value()
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def _new_child(self):
+        return _Value()
+
+
+class _Timer:
+    __slots__ = ('histogram', 'start')
+
+    def __init__(self, histogram: "_HistogramValue"):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.histogram.observe(time.perf_counter() - self.start)
+        return False
+
+
+class _HistogramValue:
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def time(self) -> _Timer:
+        """计时上下文，退出时记录耗时"""
+        return _Timer(self)
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS, registry: Optional["MetricsRegistry"] = None):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def time(self, *values: str) -> _Timer:
+        return self.labels(*values).time()
+
+    def _render_child(self, values, child) -> List[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float('inf'),), child.counts):
+            cumulative += count
+            le = 'le="' + _format_value(bound) + '"'
+            lines.append(f'{self.name}_bucket{self._label_text(values, le)} {cumulative}')
+        labels = self._label_text(values)
+        lines.append(f'{self.name}_sum{labels} {_format_value(child.sum)}')
+        lines.append(f'{self.name}_count{labels} {child.count}')
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric):
+        self.metrics[metric.name] = metric
+
+    def render(self) -> str:
+        """Prometheus 文本格式"""
+        lines = []
+        for metric in self.metrics.values():
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# 流水线各阶段：fetch（请求交易所）、parse（解析响应）、resample（合成高周期K线）、
+# indicators、patterns、ai（DeepSeek 请求）、notify_telegram、notify_email
+STAGE_SECONDS = Histogram(
+    'pipeline_stage_seconds', '监控流水线各阶段耗时（秒）', ('stage', 'symbol', 'interval')
+)
+STAGE_ERRORS = Counter(
+    'pipeline_stage_errors_total', '监控流水线各阶段的异常次数', ('stage', 'symbol', 'interval')
+)
+CYCLE_SECONDS = Histogram('monitor_cycle_seconds', '一轮监控（全部交易对和周期）的耗时（秒）')
+CLOSE_TO_SIGNAL_SECONDS = Histogram(
+    'monitor_close_to_signal_seconds', 'K线收盘到生成信号的延迟（秒，按收盘调度时）', ('interval',)
+)
+CACHE_REQUESTS = Counter('cache_requests_total', '缓存请求次数（result 为 hit/miss/stale）', ('cache', 'result'))
+UPSTREAM_REQUESTS = Counter('upstream_requests_total', '上游接口请求次数', ('upstream', 'endpoint', 'status'))
+UPSTREAM_WEIGHT = Gauge('upstream_used_weight', '上游接口最近返回的已用权重（Binance X-MBX-USED-WEIGHT-*）', ('upstream', 'window'))
+
+
+class stage:
+    """
+    记录一个流水线阶段的耗时
+
+        with stage('indicators', symbol, interval):
+            ...
+
+    开销约为两次 perf_counter 和一次字典查找
+    """
+
+    __slots__ = ('_histogram', '_key', '_start')
+
+    def __init__(self, name: str, symbol: Optional[str] = None, interval: Optional[str] = None):
+        self._key = (name, symbol or '', interval or '')
+        self._histogram = STAGE_SECONDS.labels(*self._key)
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._histogram.observe(time.perf_counter() - self._start)
+        if exc_type is not None:
+            STAGE_ERRORS.labels(*self._key).inc()
+        return False
+
+
+def record_upstream(upstream: str, endpoint: str, status: int, headers: Optional[Dict[str, str]] = None):
+    """记录一次上游请求以及响应头中的权重使用量"""
+    UPSTREAM_REQUESTS.labels(upstream, endpoint, str(status)).inc()
+    if headers:
+        for name, value in headers.items():
+            lowered = name.lower()
+            if lowered.startswith('x-mbx-used-weight-'):
+                try:
+                    UPSTREAM_WEIGHT.labels(upstream, lowered[len('x-mbx-used-weight-'):]).set(float(value))
+                except ValueError:
+                    pass
+
+
+def render() -> str:
+    return REGISTRY.render()
+
+
+async def start_metrics_server(port: int, host: str = '0.0.0.0'):
+    """
+    在单独的端口上提供 GET /metrics（监控进程没有 API，用于 Prometheus 抓取）
+
+    返回 aiohttp 的 AppRunner，停止时调用 cleanup()；port 为 0 时由系统分配（runner.addresses）
+    """
+    from aiohttp import web  # 只在启用时导入
+
+    async def handle(request: web.Request) -> web.Response:
+        return web.Response(body=render().encode(), headers={'Content-Type': CONTENT_TYPE})
+
+    app = web.Application()
+    app.router.add_get('/metrics', handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
@@ -0,0 +1,137 @@
+import argparse
+import asyncio
+import json
+import time
+from typing import Optional
+from aiohttp import web
+
+DEFAULT_CONTENT = """1. 技术面分析
+短期趋势判断为强势上涨，MACD金叉且RSI未进入超买区域，上涨动能明确。
+
+2. 市场结构分析
+关键支撑位: 95.5
+次级支撑位: 92.0
+关键阻力位: 108.0
+成交量温和放大，市场情绪偏乐观。
+
+3. 交易建议
+建议做多，入场区间 96-98。
+止损位: 93.5
+目标位: 105.0
+第二目标位: 110.0
+仓位控制在三成以内。
+
+4. 风险提示
+注意风险，若跌破 92.0 则上涨结构失效。
+"""
+
+class MockAIServer:
+    """
+    本地模拟的DeepSeek对话补全接口，用于测试
+
+    同时支持普通响应和SSE流式响应（请求体中 stream=true），
+    可以设置每个片段的字符数和发送间隔来模拟大模型的生成速度。
+    """
+
+    def __init__(
+        self,
+        content: str = DEFAULT_CONTENT,
+        chunk_size: int = 8,
+        chunk_delay: float = 0.02,
+        host: str = "127.0.0.1",
+        port: int = 0
+    ):
+        self.content = content
+        self.chunk_size = chunk_size
+        self.chunk_delay = chunk_delay
+        self.host = host
+        self.port = port
+        self.requests = []  # 收到的请求体，便于测试检查
+        self._runner: Optional[web.AppRunner] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def create_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/chat/completions", self._handle_completions)
+        return app
+
+    async def start(self) -> str:
+        """启动服务，返回可用作 DEEPSEEK_API_BASE 的地址"""
+        self._runner = web.AppRunner(self.create_app())
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        # 端口为0时由系统分配
+        self.port = self._runner.addresses[0][1]
+        return self.base_url
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def _handle_completions(self, request: web.Request) -> web.StreamResponse:
+        body = await request.json()
+        self.requests.append(body)
+
+        if not body.get("stream"):
+            await asyncio.sleep(self.chunk_delay * len(self._chunks()))
+            return web.json_response({
+                "id": "mock",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": self.content},
+                    "finish_reason": "stop"
+                }]
+            })
+
+        response = web.StreamResponse(headers={
+            "Content-Type": "text/event-stream",
+            "Cache-Control": "no-cache"
+        })
+        await response.prepare(request)
+        await response.write(b": keep-alive\n\n")
+        for chunk in self._chunks():
+            await asyncio.sleep(self.chunk_delay)
+            event = {
+                "id": "mock",
+                "object": "chat.completion.chunk",
+                "choices": [{"index": 0, "delta": {"content": chunk}, "finish_reason": None}]
+            }
+            await response.write(f"data: {json.dumps(event, ensure_ascii=False)}\n\n".encode("utf-8"))
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+    def _chunks(self):
+        return [
+            self.content[i:i + self.chunk_size]
+            for i in range(0, len(self.content), self.chunk_size)
+        ]
+
+
+async def _serve(args):
+    server = MockAIServer(chunk_size=args.chunk_size, chunk_delay=args.delay, host=args.host, port=args.port)
+    url = await server.start()
+    print(f"模拟AI服务已启动: {url} (设置 DEEPSEEK_API_BASE={url})")
+    try:
+        while True:
+            await asyncio.sleep(3600)
+    finally:
+        await server.stop()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="本地模拟DeepSeek接口（支持SSE）")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--chunk-size", type=int, default=8)
+    parser.add_argument("--delay", type=float, default=0.02, help="每个片段的发送间隔（秒）")
+    try:
+        asyncio.run(_serve(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
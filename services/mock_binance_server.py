@@ -0,0 +1,359 @@
+import argparse
+import asyncio
+import json
+import random
+import time
+import zlib
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from aiohttp import web
+from benchmarks.synthetic import format_klines, synthetic_arrays
+from .candle_resampler import INTERVAL_MS
+
+FIELDS = ('open', 'high', 'low', 'close', 'volume', 'quote_volume', 'trades',
+          'taker_buy_volume', 'taker_buy_quote_volume')
+
+
+def klines_weight(limit: int) -> int:
+    """/fapi/v1/klines 的请求权重（与 Binance 文档一致）"""
+    if limit < 100:
+        return 1
+    if limit < 500:
+        return 2
+    if limit <= 1000:
+        return 5
+    return 10
+
+
+class _Series:
+    """一个交易对一个周期的K线，第 i 根的开盘时间为 start_ms + i * interval_ms"""
+
+    __slots__ = ('start_ms', 'interval_ms', 'arrays')
+
+    def __init__(self, start_ms: int, interval_ms: int, arrays: Dict[str, np.ndarray]):
+        self.start_ms = start_ms
+        self.interval_ms = interval_ms
+        self.arrays = arrays
+
+    def __len__(self) -> int:
+        return len(self.arrays['close'])
+
+    def rows(self, first: int, last: int, now_ms: int) -> List[list]:
+        """第 first 到 last-1 根K线；包含当前时间的那根按已经过的时间比例只返回一部分"""
+        arrays = {field: values[first:last] for field, values in self.arrays.items()}
+        open_time = self.start_ms + np.arange(first, last, dtype=np.int64) * self.interval_ms
+        if last > first and open_time[-1] + self.interval_ms > now_ms:
+            arrays = {field: values.copy() for field, values in arrays.items()}
+            progress = max(0.0, min(1.0, (now_ms - open_time[-1]) / self.interval_ms))
+            open_ = arrays['open'][-1]
+            close = open_ + (arrays['close'][-1] - open_) * progress
+            arrays['close'][-1] = close
+            arrays['high'][-1] = max(open_ + (arrays['high'][-1] - open_) * progress, open_, close)
+            arrays['low'][-1] = min(open_ + (arrays['low'][-1] - open_) * progress, open_, close)
+            for field in ('volume', 'quote_volume', 'taker_buy_volume', 'taker_buy_quote_volume'):
+                arrays[field][-1] *= progress
+            arrays['trades'][-1] = int(arrays['trades'][-1] * progress)
+        return format_klines(arrays, open_time, self.interval_ms)
+
+
+class MockBinanceServer:
+    """
+    本地模拟的 Binance U本位合约行情接口，用于压测和测试
+
+    提供 /fapi/v1/klines、/fapi/v1/ticker/24hr、/fapi/v1/ticker/price 和 /fapi/v1/exchangeInfo。
+    K线默认由交易对和周期决定的种子合成（同一参数每次启动结果相同），
+    最新一根K线随时间逐步成形；也可以传入录制的K线，按时间平移到当前时间后返回。
+
+    参数:
+        symbols: 可用的交易对（None 表示接受任意交易对）
+        recorded: {(交易对, 周期): 原始K线数组}，优先于合成数据
+        history: 合成K线在启动时刻之前的数量
+        latency/jitter: 每个请求的固定延迟和额外随机延迟（秒）
+        error_rate: 返回 503 的请求比例
+        weight_limit: 每分钟权重上限，超过返回 429（0 表示不限制）
+        seed: 合成数据和错误注入的随机种子
+    """
+
+    def __init__(
+        self,
+        symbols: Optional[Sequence[str]] = None,
+        recorded: Optional[Dict[Tuple[str, str], List[list]]] = None,
+        history: int = 2000,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        weight_limit: int = 2400,
+        seed: int = 0,
+        cache_size: int = 256,
+        host: str = "127.0.0.1",
+        port: int = 0
+    ):
+        self.recorded = {(s.upper(), i): rows for (s, i), rows in (recorded or {}).items()}
+        symbols = list(symbols or []) + [s for s, _ in self.recorded]
+        self.symbols = list(dict.fromkeys(s.upper() for s in symbols)) or None
+        self._symbol_set = set(self.symbols) if self.symbols else None
+        self.history = history
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.weight_limit = weight_limit
+        self.seed = seed
+        self.cache_size = cache_size
+        self.host = host
+        self.port = port
+        self.started_ms = int(time.time() * 1000)
+        self.stats = {'requests': 0, 'errors': 0, 'rate_limited': 0}
+        self._random = random.Random(seed)
+        self._series: "OrderedDict[Tuple[str, str], _Series]" = OrderedDict()
+        self._weight_minute = 0
+        self._weight_used = 0
+        self._runner: Optional[web.AppRunner] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def create_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/fapi/v1/klines", self._handle_klines)
+        app.router.add_get("/fapi/v1/ticker/24hr", self._handle_ticker)
+        app.router.add_get("/fapi/v1/ticker/price", self._handle_price)
+        app.router.add_get("/fapi/v1/exchangeInfo", self._handle_exchange_info)
+        app.router.add_get("/fapi/v1/time", self._handle_time)
+        return app
+
+    async def start(self) -> str:
+        """启动服务，返回可用作 BINANCE_FUTURES_BASE_URL 的地址"""
+        self._runner = web.AppRunner(self.create_app())
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        # 端口为0时由系统分配
+        self.port = self._runner.addresses[0][1]
+        return self.base_url
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def series(self, symbol: str, interval: str) -> _Series:
+        """交易对一个周期的K线（按最近使用缓存，淘汰后重新生成的结果相同）"""
+        key = (symbol, interval)
+        series = self._series.get(key)
+        if series is not None:
+            self._series.move_to_end(key)
+            return series
+
+        ms = INTERVAL_MS[interval]
+        current = self.started_ms // ms * ms
+        rows = self.recorded.get(key)
+        if rows:
+            # 录制的最后一根K线对齐到启动时的当前K线
+            arrays = {field: np.array([float(row[i + 1]) for row in rows]) for i, field in enumerate(FIELDS[:5])}
+            arrays.update({field: np.array([float(row[i]) for row in rows])
+                           for i, field in zip((7, 8, 9, 10), FIELDS[5:])})
+            arrays['trades'] = arrays['trades'].astype(np.int64)
+            series = _Series(current - (len(rows) - 1) * ms, ms, arrays)
+        else:
+            seed = zlib.crc32(f"{symbol}:{interval}".encode()) ^ self.seed
+            price = 10 ** (1 + zlib.crc32(symbol.encode()) % 4)
+            series = _Series(current - self.history * ms, ms, synthetic_arrays(self.history * 2, seed, price))
+        self._series[key] = series
+        while len(self._series) > self.cache_size:
+            self._series.popitem(last=False)
+        return series
+
+    def klines(self, symbol: str, interval: str, start_time: Optional[int] = None,
+               end_time: Optional[int] = None, limit: int = 500, now_ms: Optional[int] = None) -> List[list]:
+        """与 /fapi/v1/klines 相同的查询语义"""
+        now_ms = int(time.time() * 1000) if now_ms is None else now_ms
+        series = self.series(symbol, interval)
+        ms = series.interval_ms
+        limit = max(1, min(limit, 1500))
+        # 只返回开盘时间不晚于当前时间（和 endTime）的K线
+        stop = min(len(series), (now_ms - series.start_ms) // ms + 1)
+        if end_time is not None:
+            stop = min(stop, (end_time - series.start_ms) // ms + 1)
+        if start_time is not None:
+            first = max(0, -((series.start_ms - start_time) // ms))
+            last = min(stop, first + limit)
+        else:
+            last = stop
+            first = max(0, last - limit)
+        if last <= first:
+            return []
+        return series.rows(first, last, now_ms)
+
+    def ticker(self, symbol: str, now_ms: Optional[int] = None) -> Dict:
+        rows = self.klines(symbol, '1h', limit=24, now_ms=now_ms)
+        open_, last = float(rows[0][1]), float(rows[-1][4])
+        change = last - open_
+        return {
+            'symbol': symbol,
+            'priceChange': f"{change:.4f}",
+            'priceChangePercent': f"{change / open_ * 100:.3f}",
+            'lastPrice': rows[-1][4],
+            'openPrice': rows[0][1],
+            'highPrice': f"{max(float(r[2]) for r in rows):.4f}",
+            'lowPrice': f"{min(float(r[3]) for r in rows):.4f}",
+            'volume': f"{sum(float(r[5]) for r in rows):.3f}",
+            'quoteVolume': f"{sum(float(r[7]) for r in rows):.4f}",
+            'openTime': rows[0][0],
+            'closeTime': rows[-1][6],
+            'count': sum(int(r[8]) for r in rows),
+        }
+
+    async def _before(self, weight: int) -> Optional[web.Response]:
+        """模拟延迟、错误和权重限制，返回非 None 时直接作为响应"""
+        self.stats['requests'] += 1
+        delay = self.latency + (self._random.random() * self.jitter if self.jitter else 0.0)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        minute = int(time.time()) // 60
+        if minute != self._weight_minute:
+            self._weight_minute = minute
+            self._weight_used = 0
+        self._weight_used += weight
+        if self.weight_limit and self._weight_used > self.weight_limit:
+            self.stats['rate_limited'] += 1
+            return self._json({'code': -1003, 'msg': 'Too many requests; current limit is exceeded.'},
+                              status=429, extra={'Retry-After': str(60 - int(time.time()) % 60)})
+        if self.error_rate and self._random.random() < self.error_rate:
+            self.stats['errors'] += 1
+            return self._json({'code': -1001, 'msg': 'Internal error; unable to process your request. Please try again.'},
+                              status=503)
+        return None
+
+    def _json(self, body, status: int = 200, extra: Optional[Dict[str, str]] = None) -> web.Response:
+        headers = {'X-MBX-USED-WEIGHT-1M': str(self._weight_used)}
+        if extra:
+            headers.update(extra)
+        return web.Response(text=json.dumps(body, separators=(',', ':')), status=status,
+                            content_type='application/json', headers=headers)
+
+    def _check_symbol(self, symbol: str) -> Optional[web.Response]:
+        if not symbol or (self._symbol_set is not None and symbol not in self._symbol_set):
+            return self._json({'code': -1121, 'msg': 'Invalid symbol.'}, status=400)
+        return None
+
+    async def _handle_klines(self, request: web.Request) -> web.Response:
+        query = request.query
+        limit = int(query.get('limit', 500))
+        rejected = await self._before(klines_weight(limit))
+        if rejected is not None:
+            return rejected
+        symbol = query.get('symbol', '').upper()
+        interval = query.get('interval', '')
+        invalid = self._check_symbol(symbol)
+        if invalid is not None:
+            return invalid
+        if interval not in INTERVAL_MS:
+            return self._json({'code': -1120, 'msg': 'Invalid interval.'}, status=400)
+        start_time = int(query['startTime']) if 'startTime' in query else None
+        end_time = int(query['endTime']) if 'endTime' in query else None
+        return self._json(self.klines(symbol, interval, start_time, end_time, limit))
+
+    async def _handle_ticker(self, request: web.Request) -> web.Response:
+        symbol = request.query.get('symbol', '').upper()
+        rejected = await self._before(1 if symbol else 40)
+        if rejected is not None:
+            return rejected
+        if not symbol:
+            return self._json([self.ticker(s) for s in self.symbols or []])
+        invalid = self._check_symbol(symbol)
+        return invalid if invalid is not None else self._json(self.ticker(symbol))
+
+    async def _handle_price(self, request: web.Request) -> web.Response:
+        symbol = request.query.get('symbol', '').upper()
+        rejected = await self._before(1 if symbol else 2)
+        if rejected is not None:
+            return rejected
+        now_ms = int(time.time() * 1000)
+
+        def price(s):
+            return {'symbol': s, 'price': self.klines(s, '1m', limit=1, now_ms=now_ms)[-1][4], 'time': now_ms}
+
+        if not symbol:
+            return self._json([price(s) for s in self.symbols or []])
+        invalid = self._check_symbol(symbol)
+        return invalid if invalid is not None else self._json(price(symbol))
+
+    async def _handle_time(self, request: web.Request) -> web.Response:
+        rejected = await self._before(1)
+        return rejected if rejected is not None else self._json({'serverTime': int(time.time() * 1000)})
+
+    async def _handle_exchange_info(self, request: web.Request) -> web.Response:
+        rejected = await self._before(1)
+        if rejected is not None:
+            return rejected
+        return self._json({
+            'timezone': 'UTC',
+            'serverTime': int(time.time() * 1000),
+            'rateLimits': [{'rateLimitType': 'REQUEST_WEIGHT', 'interval': 'MINUTE',
+                            'intervalNum': 1, 'limit': self.weight_limit}],
+            'symbols': [{
+                'symbol': s,
+                'pair': s,
+                'contractType': 'PERPETUAL',
+                'status': 'TRADING',
+                'baseAsset': s[:-4] if s.endswith('USDT') else s,
+                'quoteAsset': 'USDT',
+                'pricePrecision': 4,
+                'quantityPrecision': 3,
+                'filters': [
+                    {'filterType': 'PRICE_FILTER', 'tickSize': '0.0001', 'minPrice': '0.0001', 'maxPrice': '1000000'},
+                    {'filterType': 'LOT_SIZE', 'stepSize': '0.001', 'minQty': '0.001', 'maxQty': '1000000'},
+                ],
+            } for s in self.symbols or []],
+        })
+
+
+def load_recorded(path: str) -> Dict[Tuple[str, str], List[list]]:
+    """
+    读取录制的K线
+
+    文件为JSON：{"BTCUSDT": {"15m": [[开盘时间, 开, 高, ...], ...]}, ...}
+    """
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    return {(symbol, interval): rows for symbol, intervals in data.items() for interval, rows in intervals.items()}
+
+
+def symbol_names(count: int) -> List[str]:
+    """压测用的交易对名称"""
+    return [f"SYM{i:04d}USDT" for i in range(count)]
+
+
+async def _serve(args):
+    server = MockBinanceServer(
+        symbols=symbol_names(args.symbols) if args.symbols else None,
+        recorded=load_recorded(args.recorded) if args.recorded else None,
+        latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+        weight_limit=args.weight_limit, seed=args.seed, host=args.host, port=args.port
+    )
+    url = await server.start()
+    print(f"模拟Binance合约接口已启动: {url} (设置 BINANCE_FUTURES_BASE_URL={url})")
+    try:
+        while True:
+            await asyncio.sleep(3600)
+    finally:
+        await server.stop()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="本地模拟Binance合约行情接口")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--symbols", type=int, default=0, help="生成 SYM0000USDT 起的交易对数量，0表示接受任意交易对")
+    parser.add_argument("--recorded", default=None, help="录制的K线JSON文件")
+    parser.add_argument("--latency", type=float, default=0.0, help="每个请求的固定延迟（秒）")
+    parser.add_argument("--jitter", type=float, default=0.0, help="额外随机延迟的上限（秒）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="返回503的请求比例")
+    parser.add_argument("--weight-limit", type=int, default=2400, help="每分钟权重上限，0表示不限制")
+    parser.add_argument("--seed", type=int, default=0)
+    try:
+        asyncio.run(_serve(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
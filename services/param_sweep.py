@@ -0,0 +1,256 @@
+"""
+形态参数与评分阈值的并行扫描
+
+用法:
+    python -m services.param_sweep --symbols BTCUSDT,ETHUSDT --interval 15m --days 180 \
+        --samples 10000 --output results/sweep.csv
+
+各交易对的K线和指标只计算一次，放入共享内存后由进程池读取；
+同一组形态参数的组合在一个任务内复用形态识别结果，
+同一组RSI阈值复用评分结果，只有行动阈值和交易成本逐个计算。
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+from multiprocessing.shared_memory import SharedMemory
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from .backtest import BacktestConfig, BacktestEngine, load_history, periods_per_year
+
+# 影响形态识别结果的参数（doji_size 目前未参与任何形态的判断）
+PATTERN_PARAMS = ('doji_size', 'hammer_ratio', 'engulfing_ratio')
+# 影响基础评分的参数
+SCORE_PARAMS = ('rsi_overbought', 'rsi_oversold')
+# 放入共享内存的特征序列
+FEATURE_KEYS = ('open', 'high', 'low', 'close', 'rsi', 'macd', 'macd_signal')
+# 汇总时取各交易对平均值的指标
+METRICS = ('total_return', 'sharpe', 'max_drawdown', 'win_rate', 'exposure')
+
+DEFAULT_SPACE = {
+    'hammer_ratio': [0.5, 0.55, 0.6, 0.65, 0.7],
+    'engulfing_ratio': [1.0, 1.1, 1.2, 1.3, 1.5],
+    'rsi_overbought': [65, 70, 75, 80],
+    'rsi_oversold': [20, 25, 30, 35],
+    'min_confidence': [30, 40, 50, 60],
+    'action_score': [1, 2, 3],
+    'strong_score': [3, 4, 5],
+    'strong_confidence': [60, 70, 80],
+}
+
+
+def grid(space: Dict[str, List]) -> List[Dict]:
+    """参数网格的全部组合"""
+    names = list(space)
+    return [dict(zip(names, values)) for values in itertools.product(*(space[n] for n in names))]
+
+
+def random_samples(space: Dict[str, object], count: int, seed: Optional[int] = None) -> List[Dict]:
+    """
+    随机抽样参数组合
+
+    space 的取值为列表时从中随机选择，为 (最小值, 最大值) 元组时均匀抽样。
+    结果去重，列表空间的组合总数不足 count 时返回全部组合。
+    """
+    rng = random.Random(seed)
+    samples, seen = [], set()
+    attempts = 0
+    while len(samples) < count and attempts < count * 20:
+        attempts += 1
+        params = {}
+        for name, values in space.items():
+            if isinstance(values, tuple):
+                params[name] = rng.uniform(*values)
+            else:
+                params[name] = rng.choice(values)
+        key = tuple(params.values())
+        if key not in seen:
+            seen.add(key)
+            samples.append(params)
+    return samples
+
+
+class SharedFeatures:
+    """把各交易对的特征序列放入共享内存，每个交易对一个 (特征数 x K线数) 的数组"""
+
+    def __init__(self, features: Dict[str, Dict[str, np.ndarray]]):
+        self.handles: Dict[str, Tuple[str, int]] = {}
+        self._blocks: List[SharedMemory] = []
+        for symbol, f in features.items():
+            n = len(f['close'])
+            shm = SharedMemory(create=True, size=max(len(FEATURE_KEYS) * n * 8, 1))
+            array = np.ndarray((len(FEATURE_KEYS), n), dtype=np.float64, buffer=shm.buf)
+            for i, key in enumerate(FEATURE_KEYS):
+                array[i] = f[key]
+            self._blocks.append(shm)
+            self.handles[symbol] = (shm.name, n)
+
+    def close(self):
+        for shm in self._blocks:
+            shm.close()
+            shm.unlink()
+        self._blocks = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# 工作进程内的共享内存视图
+_worker_features: Dict[str, Dict[str, np.ndarray]] = {}
+_worker_blocks: List[SharedMemory] = []
+
+
+def _init_worker(handles: Dict[str, Tuple[str, int]]):
+    for symbol, (name, n) in handles.items():
+        # 进程池的工作进程与主进程共用资源跟踪器，共享内存由主进程释放
+        shm = SharedMemory(name=name)
+        array = np.ndarray((len(FEATURE_KEYS), n), dtype=np.float64, buffer=shm.buf)
+        _worker_features[symbol] = {key: array[i] for i, key in enumerate(FEATURE_KEYS)}
+        _worker_blocks.append(shm)
+
+
+def _evaluate(task) -> List[Tuple[int, str, Dict]]:
+    """
+    在一个交易对上评估一组参数（同一任务内的形态参数相同）
+    """
+    symbol, param_sets, base, per_year = task
+    f = _worker_features[symbol]
+    engine = BacktestEngine()
+    patterns = None
+    scores = {}
+
+    results = []
+    for index, params in param_sets:
+        config = BacktestConfig(**{**base, **params})
+        if patterns is None:
+            patterns = engine.pattern_signals(f, config)
+        score_key = tuple(getattr(config, name) for name in SCORE_PARAMS)
+        if score_key not in scores:
+            scores[score_key] = engine.base_recommendation(f, patterns, config)
+        rec = scores[score_key]
+        actions = engine.actions(rec['score'], rec['confidence'], config)
+        result = engine.simulate(f['close'], engine.positions(actions, config), config, per_year, detail=False)
+        results.append((index, symbol, result))
+    return results
+
+
+class ParameterSweep:
+    """
+    多交易对参数扫描
+
+    参数:
+        workers: 进程数，默认为CPU核数
+        chunk_size: 每个任务包含的参数组合数
+        metric: 排序指标（各交易对的平均值）
+        base: 所有组合共用的回测参数，例如手续费和滑点
+    """
+
+    def __init__(self, workers: Optional[int] = None, chunk_size: int = 250,
+                 metric: str = 'sharpe', base: Optional[Dict] = None):
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.metric = metric
+        self.base = base or {}
+
+    def _tasks(self, param_sets: List[Dict], per_year: Dict[str, Optional[float]]) -> List[Tuple]:
+        # 按形态参数分组，组内再按 chunk_size 切分
+        defaults = BacktestConfig(**self.base)
+        groups: Dict[Tuple, List[Tuple[int, Dict]]] = {}
+        for index, params in enumerate(param_sets):
+            key = tuple(params.get(name, getattr(defaults, name)) for name in PATTERN_PARAMS)
+            groups.setdefault(key, []).append((index, params))
+
+        tasks = []
+        for members in groups.values():
+            for start in range(0, len(members), self.chunk_size):
+                chunk = members[start:start + self.chunk_size]
+                for symbol in per_year:
+                    tasks.append((symbol, chunk, self.base, per_year[symbol]))
+        return tasks
+
+    def run(self, data: Dict[str, pd.DataFrame], param_sets: List[Dict], output: Optional[str] = None) -> pd.DataFrame:
+        """
+        执行扫描
+
+        参数:
+            data: 交易对 -> K线DataFrame
+            param_sets: 参数组合列表
+            output: 结果CSV路径（可选），另存各交易对明细到 *_by_symbol.csv
+
+        返回:
+            按 metric 从高到低排序的结果
+        """
+        engine = BacktestEngine()
+        features = {symbol: engine.compute_features(df) for symbol, df in data.items()}
+        per_year = {symbol: periods_per_year(df.index) for symbol, df in data.items()}
+        tasks = self._tasks(param_sets, per_year)
+
+        rows = []
+        with SharedFeatures(features) as shared:
+            with ProcessPoolExecutor(self.workers, initializer=_init_worker, initargs=(shared.handles,)) as pool:
+                for results in pool.map(_evaluate, tasks):
+                    for index, symbol, result in results:
+                        rows.append({'param_id': index, 'symbol': symbol, **result})
+
+        detail = pd.DataFrame(rows)
+        params = pd.DataFrame(param_sets)
+        params.index.name = 'param_id'
+        summary = detail.groupby('param_id').agg(
+            **{name: (name, 'mean') for name in METRICS},
+            trades=('trades', 'sum'),
+            worst_return=('total_return', 'min')
+        )
+        ranked = params.join(summary).sort_values(self.metric, ascending=False)
+        ranked.insert(0, 'rank', np.arange(1, len(ranked) + 1))
+
+        if output:
+            os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+            ranked.to_csv(output)
+            stem, ext = os.path.splitext(output)
+            detail.sort_values(['param_id', 'symbol']).to_csv(f"{stem}_by_symbol{ext or '.csv'}", index=False)
+        return ranked
+
+
+async def _load(symbols: List[str], interval: str, days: int) -> Dict[str, pd.DataFrame]:
+    from .futures_data_fetcher import FuturesDataFetcher
+
+    fetcher = FuturesDataFetcher()
+    start = datetime.now(timezone.utc) - timedelta(days=days)
+    data = {}
+    for symbol in symbols:
+        data[symbol] = await load_history(fetcher, symbol, interval, start)
+        print(f"{symbol}: {len(data[symbol])} 根K线")
+    return data
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="形态参数与评分阈值的并行扫描")
+    parser.add_argument("--symbols", required=True, help="逗号分隔的交易对")
+    parser.add_argument("--interval", default="15m")
+    parser.add_argument("--days", type=int, default=180)
+    parser.add_argument("--samples", type=int, default=0, help="随机抽样数量，0表示完整网格")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--metric", default="sharpe")
+    parser.add_argument("--fee", type=float, default=0.0004)
+    parser.add_argument("--slippage", type=float, default=0.0002)
+    parser.add_argument("--output", default="results/sweep.csv")
+    args = parser.parse_args()
+
+    data = asyncio.run(_load([s.strip().upper() for s in args.symbols.split(",")], args.interval, args.days))
+    param_sets = random_samples(DEFAULT_SPACE, args.samples, args.seed) if args.samples else grid(DEFAULT_SPACE)
+    sweep = ParameterSweep(workers=args.workers, metric=args.metric,
+                           base={'fee_rate': args.fee, 'slippage': args.slippage})
+    started = time.perf_counter()
+    ranked = sweep.run(data, param_sets, output=args.output)
+    print(f"{len(param_sets)} 组参数 x {len(data)} 个交易对，用时 {time.perf_counter() - started:.1f}秒")
+    print(ranked.head(10).to_string())
+    print(f"结果已写入 {args.output}")
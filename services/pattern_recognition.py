@@ -3,11 +3,11 @@ import numpy as np
 from typing import Dict, List, Optional
 
 class PatternRecognition:
-    def __init__(self):
+    def __init__(self, doji_size: float = 0.1, hammer_ratio: float = 0.6, engulfing_ratio: float = 1.2):
         # 设置形态识别的参数
-        self.doji_size = 0.1  # 十字线实体与影线比例阈值
-        self.hammer_ratio = 0.6  # 锤子线下影线与整体长度的比例阈值
-        self.engulfing_ratio = 1.2  # 吞没形态的最小比例
+        self.doji_size = doji_size  # 十字线实体与影线比例阈值
+        self.hammer_ratio = hammer_ratio  # 锤子线下影线与整体长度的比例阈值
+        self.engulfing_ratio = engulfing_ratio  # 吞没形态的最小比例
         
     def analyze_patterns(self, df: pd.DataFrame) -> Dict[str, List[str]]:
         """
@@ -0,0 +1,202 @@
+"""
+回放录制的K线
+
+把 RECORD_KLINES_DIR 录制的合约K线响应按原来的顺序交给 MarketMonitor，
+监控的时钟使用录制时的请求时间，因此拉取方式（首次下载完整历史或增量请求）
+和生成的信号与录制时一致。AI分析只提交不执行，同一份录制每次回放的结果相同。
+
+用法:
+    python -m services.replay recordings --intervals 15m,1h,4h             # 尽快回放
+    python -m services.replay recordings --intervals 15m,1h,4h --speed 60  # 按录制时间的60倍速回放
+    python -m services.replay recordings --symbols BTCUSDT --output signals.jsonl
+
+回放时的周期、MONITOR_RESAMPLE 和 MONITOR_BASE_INTERVAL 需要与录制时相同。
+"""
+import argparse
+import asyncio
+import contextlib
+import hashlib
+import io
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Deque, Dict, Iterable, List, Optional, Tuple
+from .ai_scheduler import SubmitOnlyScheduler
+from .futures_data_fetcher import FuturesDataFetcher
+from .kline_recorder import KlineArchive
+from .market_monitor import MarketMonitor
+from .signal_hub import encode_market_info
+
+
+class ReplayFetcher(FuturesDataFetcher):
+    """按录制顺序返回K线响应的 FuturesDataFetcher"""
+
+    def __init__(self, records: Iterable[Dict]):
+        super().__init__()
+        self.recorder = None
+        self.queues: Dict[Tuple[str, str], Deque[Dict]] = {}
+        for record in records:
+            self.queues.setdefault((record['symbol'], record['interval']), deque()).append(record)
+        self.served = 0
+        self.mismatches = 0   # 请求数量与录制时不同的次数（说明回放配置与录制时不一致）
+
+    @property
+    def symbols(self) -> List[str]:
+        return sorted({symbol for symbol, _ in self.queues})
+
+    def next_time(self, symbol: str) -> Optional[int]:
+        """该交易对下一条录制响应的请求时间，没有时返回 None"""
+        times = [queue[0]['time_ms'] for (s, _), queue in self.queues.items() if s == symbol and queue]
+        return min(times) if times else None
+
+    async def get_klines_raw(
+        self,
+        symbol: str,
+        interval: str,
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None,
+        limit: Optional[int] = None
+    ) -> List[list]:
+        queue = self.queues.get((symbol.upper(), interval))
+        if not queue:
+            raise Exception(f"录制数据中没有更多 {symbol} {interval} 的K线")
+        record = queue.popleft()
+        if limit is not None and record['params'].get('limit') != min(limit, 1500):
+            self.mismatches += 1
+        self.served += 1
+        return record['rows']
+
+
+class ReplayMonitor(MarketMonitor):
+    """
+    使用录制数据和录制时钟运行的 MarketMonitor
+
+    参数:
+        speed: 相对录制时间的回放倍速，None 表示不等待（尽快回放）
+    """
+
+    def __init__(self, records: Iterable[Dict], speed: Optional[float] = None):
+        super().__init__()
+        self.data_fetcher = ReplayFetcher(records)
+        self.ai_scheduler = None
+        self.signal_generator.ai_scheduler = SubmitOnlyScheduler()
+        # 回放的信号和指标不写入共享状态（否则实时订阅者会收到历史信号）
+        self.signal_bus = None
+        self.indicator_store = None
+        # 离线回放不加入分片（否则会抢占实时监控实例的租约，结果也取决于分到的交易对）
+        self.shard = None
+        self.speed = speed
+        self.virtual_now: Optional[datetime] = None
+        self._first_ms: Optional[int] = None
+        self._wall_start = 0.0
+        self._symbols: List[str] = []
+        self._finished = set()
+
+    def _now(self) -> datetime:
+        return self.virtual_now or datetime.now(timezone.utc)
+
+    async def run(self, symbols: List[str], intervals: List[str]):
+        """回放到录制数据用完为止"""
+        self._symbols = list(symbols)
+        await self.start_monitoring(symbols, intervals, update_interval=0)
+
+    async def _fetch_klines(self, symbol: str, intervals: List[str], base_interval: Optional[str]):
+        time_ms = self.data_fetcher.next_time(symbol)
+        if time_ms is None:
+            self._finished.add(symbol)
+            if self._finished.issuperset(self._symbols):
+                self.stop_monitoring()
+            return {}
+        await self._pace(time_ms)
+        self.virtual_now = datetime.fromtimestamp(time_ms / 1000, tz=timezone.utc)
+        return await super()._fetch_klines(symbol, intervals, base_interval)
+
+    async def _pace(self, time_ms: int):
+        if self._first_ms is None:
+            self._first_ms = time_ms
+            self._wall_start = time.perf_counter()
+        if self.speed:
+            delay = self._wall_start + (time_ms - self._first_ms) / 1000 / self.speed - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+
+async def replay(
+    directory: str,
+    intervals: List[str],
+    symbols: Optional[List[str]] = None,
+    speed: Optional[float] = None,
+    start_ms: Optional[int] = None,
+    end_ms: Optional[int] = None,
+    quiet: bool = True
+) -> Dict:
+    """
+    回放录制目录，返回信号（每条为 encode_market_info 的JSON）和摘要
+
+    返回的 digest 为全部信号的 SHA-256，可用于比较两次回放是否一致。
+    """
+    records = KlineArchive(directory).records(start_ms, end_ms, source='futures', symbols=symbols)
+    monitor = ReplayMonitor(records, speed=speed)
+    signals: List[str] = []
+
+    async def collect(symbol: str, market_info: Dict):
+        signals.append(encode_market_info(market_info))
+
+    monitor.add_callback(collect)
+    symbols = [s.upper() for s in symbols] if symbols else monitor.data_fetcher.symbols
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()) if quiet else contextlib.nullcontext():
+        await monitor.run(symbols, intervals)
+
+    digest = hashlib.sha256()
+    for line in signals:
+        digest.update(line.encode())
+        digest.update(b'\n')
+    return {
+        'signals': signals,
+        'digest': digest.hexdigest(),
+        'responses': monitor.data_fetcher.served,
+        'mismatches': monitor.data_fetcher.mismatches,
+        'seconds': time.perf_counter() - started,
+    }
+
+
+def _parse_time(value: Optional[str]) -> Optional[int]:
+    if not value:
+        return None
+    moment = datetime.fromisoformat(value)
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return int(moment.timestamp() * 1000)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="回放录制的K线")
+    parser.add_argument("directory", help="RECORD_KLINES_DIR 录制目录")
+    parser.add_argument("--intervals", default="15m,1h,4h", help="录制时监控的周期")
+    parser.add_argument("--symbols", default=None, help="逗号分隔，默认录制中的全部交易对")
+    parser.add_argument("--speed", type=float, default=None, help="回放倍速，默认不等待")
+    parser.add_argument("--start", default=None, help="开始时间（ISO格式，UTC）")
+    parser.add_argument("--end", default=None, help="结束时间（ISO格式，UTC）")
+    parser.add_argument("--output", default=None, help="把信号写入JSONL文件")
+    parser.add_argument("--verbose", action="store_true", help="显示监控日志")
+    args = parser.parse_args()
+
+    result = asyncio.run(replay(
+        args.directory,
+        args.intervals.split(","),
+        symbols=args.symbols.split(",") if args.symbols else None,
+        speed=args.speed,
+        start_ms=_parse_time(args.start),
+        end_ms=_parse_time(args.end),
+        quiet=not args.verbose
+    ))
+    print(f"回放 {result['responses']} 条K线响应，生成 {len(result['signals'])} 条信号，用时 {result['seconds']:.1f}秒")
+    if result['mismatches']:
+        print(f"警告: {result['mismatches']} 次请求与录制时不同，请检查周期和合成配置")
+    print(f"信号摘要: {result['digest']}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            for line in result['signals']:
+                f.write(line + "\n")
+        print(f"信号已写入 {args.output}")
@@ -0,0 +1,132 @@
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Hashable, Optional, Tuple
+from .metrics import CACHE_REQUESTS
+
+# get_or_compute 返回的命中状态
+HIT = 'hit'
+MISS = 'miss'
+STALE = 'stale'
+
+
+class CacheEntry:
+    """已序列化的响应"""
+
+    __slots__ = ('version', 'body', 'etag', 'expires_at')
+
+    def __init__(self, version: Hashable, body: bytes, expires_at: float):
+        self.version = version
+        self.body = body
+        self.etag = make_etag(body)
+        self.expires_at = expires_at
+
+    def max_age(self, now: Optional[float] = None) -> int:
+        return max(0, int(self.expires_at - (time.time() if now is None else now)))
+
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match 请求头是否包含该ETag（支持多个值、弱校验和 *）"""
+    if not if_none_match:
+        return False
+    for tag in if_none_match.split(','):
+        tag = tag.strip()
+        if tag == '*' or tag == etag or tag == 'W/' + etag:
+            return True
+    return False
+
+
+class ResponseCache:
+    """
+    按版本失效的响应缓存
+
+    每个 key（例如交易对+周期+数量）只保留最新版本（例如最近收盘K线时间）的响应。
+    请求的版本比缓存新时：在 expires_at 之后的 stale_seconds 内先返回旧响应，
+    同时在后台计算新版本；超过这个时间则等待计算完成。同一个 key 的并发计算只执行一次。
+
+    参数:
+        max_entries: 最多缓存的 key 数量（按最近使用淘汰）
+        stale_seconds: 过期后仍可返回旧响应的时间（秒）
+        name: 指标 cache_requests_total 中的 cache 标签
+    """
+
+    def __init__(self, max_entries: int = 1024, stale_seconds: float = 30, name: str = 'response'):
+        self.name = name
+        self.max_entries = max_entries
+        self.stale_seconds = stale_seconds
+        self._entries: "OrderedDict[Hashable, CacheEntry]" = OrderedDict()
+        self._pending: Dict[Tuple[Hashable, Hashable], asyncio.Task] = {}
+        self.stats = {HIT: 0, MISS: 0, STALE: 0}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, version: Hashable) -> Optional[CacheEntry]:
+        entry = self._entries.get(key)
+        return entry if entry is not None and entry.version == version else None
+
+    async def get_or_compute(
+        self,
+        key: Hashable,
+        version: Hashable,
+        compute: Callable[[], Awaitable[bytes]],
+        expires_at: float
+    ) -> Tuple[CacheEntry, str]:
+        """
+        返回 (响应, 命中状态)
+
+        参数:
+            compute: 计算该版本响应体的协程函数
+            expires_at: 该版本的过期时间（时间戳），即下一个版本出现的时间
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            if entry.version == version:
+                self._count(HIT)
+                return entry, HIT
+            if time.time() < entry.expires_at + self.stale_seconds:
+                # 先返回旧版本，后台刷新
+                self._start(key, version, compute, expires_at)
+                self._count(STALE)
+                return entry, STALE
+
+        self._count(MISS)
+        return await asyncio.shield(self._start(key, version, compute, expires_at)), MISS
+
+    def _count(self, status: str):
+        self.stats[status] += 1
+        CACHE_REQUESTS.labels(self.name, status).inc()
+
+    def _start(self, key, version, compute, expires_at) -> asyncio.Task:
+        pending_key = (key, version)
+        task = self._pending.get(pending_key)
+        if task is None:
+            task = asyncio.ensure_future(self._compute(key, version, compute, expires_at))
+            self._pending[pending_key] = task
+            task.add_done_callback(lambda t: self._finish(pending_key, t))
+        return task
+
+    async def _compute(self, key, version, compute, expires_at) -> CacheEntry:
+        entry = CacheEntry(version, await compute(), expires_at)
+        current = self._entries.get(key)
+        # 不用较慢的旧版本覆盖已有的新版本
+        if current is None or current.expires_at <= entry.expires_at:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def _finish(self, pending_key, task: asyncio.Task):
+        self._pending.pop(pending_key, None)
+        if not task.cancelled() and task.exception() is not None:
+            print(f"缓存计算失败 {pending_key[0]}: {task.exception()}")
+
+    def clear(self):
+        self._entries.clear()
@@ -0,0 +1,242 @@
+"""
+多个监控实例分片监控 交易对x周期
+
+每个实例定期发送心跳（带过期时间的成员租约），用全部存活实例构建一致性哈希环，
+只认领哈希到自己的 交易对x周期。认领通过带过期时间的租约完成：
+同一时刻每个 交易对x周期 的租约只属于一个实例，因此不会被重复分析。
+
+实例退出时释放租约；实例异常退出时，心跳和租约过期后其他实例自动接管。
+成员变化时原实例在下一轮释放不再属于自己的租约，新实例随后认领，
+交接期间（最多一轮监控或一个租约时间）这些 交易对x周期 暂时无人分析，但不会同时被两个实例分析；
+接管的实例从头下载K线，会再推送一次原实例已推送过的最新K线的信号。
+
+协调方式:
+    RedisCoordinator   多个进程/机器通过 Redis 协调
+    MemoryCoordinator  同一进程内的多个实例（测试和压测）
+"""
+import asyncio
+import hashlib
+import os
+import socket
+import time
+from bisect import bisect
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+Pair = Tuple[str, str]
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), 'big')
+
+
+def pair_key(pair: Pair) -> str:
+    symbol, interval = pair
+    return f"{symbol}:{interval}"
+
+
+class HashRing:
+    """一致性哈希环，每个成员放置 replicas 个虚拟节点"""
+
+    def __init__(self, members: Iterable[str], replicas: int = 256):
+        self.members = sorted(set(members))
+        points = sorted((_hash(f"{member}#{i}"), member) for member in self.members for i in range(replicas))
+        self._hashes = [h for h, _ in points]
+        self._owners = [member for _, member in points]
+
+    def owner(self, key: str) -> Optional[str]:
+        if not self._owners:
+            return None
+        index = bisect(self._hashes, _hash(key)) % len(self._hashes)
+        return self._owners[index]
+
+
+class MemoryCoordinator:
+    """进程内协调（测试和压测用），clock 返回秒"""
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self.clock = clock
+        self._members: Dict[str, float] = {}
+        self._leases: Dict[str, Tuple[str, float]] = {}
+
+    async def heartbeat(self, instance_id: str, ttl: float) -> List[str]:
+        """续期成员租约，返回存活的实例"""
+        now = self.clock()
+        self._members[instance_id] = now + ttl
+        self._members = {member: expires for member, expires in self._members.items() if expires > now}
+        return sorted(self._members)
+
+    async def claim(self, instance_id: str, keys: Sequence[str], ttl: float) -> List[str]:
+        """认领或续期租约，返回成功持有的键"""
+        now = self.clock()
+        held = []
+        for key in keys:
+            owner, expires = self._leases.get(key, (None, 0.0))
+            if owner == instance_id or owner is None or expires <= now:
+                self._leases[key] = (instance_id, now + ttl)
+                held.append(key)
+        return held
+
+    async def release(self, instance_id: str, keys: Iterable[str]):
+        for key in keys:
+            if self._leases.get(key, (None, 0.0))[0] == instance_id:
+                del self._leases[key]
+
+    async def leave(self, instance_id: str):
+        self._members.pop(instance_id, None)
+
+
+# 使用 Redis 服务器时间判断成员是否过期，避免各实例时钟不一致
+_HEARTBEAT_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now)
+redis.call('ZADD', KEYS[1], now + tonumber(ARGV[2]), ARGV[1])
+redis.call('PEXPIRE', KEYS[1], ARGV[2])
+return redis.call('ZRANGE', KEYS[1], 0, -1)
+"""
+
+_CLAIM_SCRIPT = """
+local held = {}
+for i, key in ipairs(KEYS) do
+    local owner = redis.call('GET', key)
+    if owner == ARGV[1] then
+        redis.call('PEXPIRE', key, ARGV[2])
+        held[#held + 1] = i
+    elseif not owner then
+        redis.call('SET', key, ARGV[1], 'PX', ARGV[2])
+        held[#held + 1] = i
+    end
+end
+return held
+"""
+
+_RELEASE_SCRIPT = """
+for _, key in ipairs(KEYS) do
+    if redis.call('GET', key) == ARGV[1] then
+        redis.call('DEL', key)
+    end
+end
+return 0
+"""
+
+
+class RedisCoordinator:
+    """
+    通过 Redis 协调
+
+    成员保存在有序集合 <prefix>:members（分数为过期时间），
+    租约为 <prefix>:lease:<交易对>:<周期>，值为持有的实例。
+    Redis 命令在线程中执行，不阻塞事件循环。
+    """
+
+    def __init__(self, client, prefix: str = 'monitor:shard'):
+        self.client = client
+        self.prefix = prefix
+        self._heartbeat = client.register_script(_HEARTBEAT_SCRIPT)
+        self._claim = client.register_script(_CLAIM_SCRIPT)
+        self._release = client.register_script(_RELEASE_SCRIPT)
+
+    def _lease(self, key: str) -> str:
+        return f"{self.prefix}:lease:{key}"
+
+    async def heartbeat(self, instance_id: str, ttl: float) -> List[str]:
+        members = await asyncio.to_thread(
+            self._heartbeat, keys=[f"{self.prefix}:members"], args=[instance_id, int(ttl * 1000)]
+        )
+        return sorted(m.decode() if isinstance(m, bytes) else m for m in members)
+
+    async def claim(self, instance_id: str, keys: Sequence[str], ttl: float) -> List[str]:
+        if not keys:
+            return []
+        held = await asyncio.to_thread(
+            self._claim, keys=[self._lease(key) for key in keys], args=[instance_id, int(ttl * 1000)]
+        )
+        return [keys[i - 1] for i in held]
+
+    async def release(self, instance_id: str, keys: Iterable[str]):
+        keys = [self._lease(key) for key in keys]
+        if keys:
+            await asyncio.to_thread(self._release, keys=keys, args=[instance_id])
+
+    async def leave(self, instance_id: str):
+        await asyncio.to_thread(self.client.zrem, f"{self.prefix}:members", instance_id)
+
+
+class ShardMember:
+    """
+    一个监控实例在分片中的成员身份
+
+    每轮监控开始时调用 assign()，返回本轮由本实例分析的 交易对x周期。
+    lease_seconds 需要大于一轮监控的耗时（含等待间隔），否则租约会在分析前过期。
+    """
+
+    def __init__(
+        self,
+        coordinator,
+        instance_id: Optional[str] = None,
+        lease_seconds: float = 180.0,
+        replicas: int = 256
+    ):
+        self.coordinator = coordinator
+        self.instance_id = instance_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.lease_seconds = lease_seconds
+        self.replicas = replicas
+        self.owned: Set[str] = set()
+        self._ring: Optional[HashRing] = None
+
+    async def join(self) -> List[str]:
+        """发送心跳，返回存活的实例"""
+        members = await self.coordinator.heartbeat(self.instance_id, self.lease_seconds)
+        if self._ring is None or self._ring.members != members:
+            self._ring = HashRing(members, self.replicas)
+        return members
+
+    async def assign(self, pairs: Sequence[Pair], by_symbol: bool = False) -> List[Pair]:
+        """
+        续期心跳和租约，按 pairs 的顺序返回本实例持有的 交易对x周期
+
+        by_symbol 为 True 时按交易对哈希，同一交易对的各周期分配给同一实例
+        （各周期由一份基础K线合成时避免多个实例重复请求同一交易对）；租约仍按 交易对x周期。
+        """
+        await self.join()
+        keys = [pair_key(pair) for pair in pairs]
+        wanted = [key for pair, key in zip(pairs, keys)
+                  if self._ring.owner(pair[0] if by_symbol else key) == self.instance_id]
+        # 先释放不再属于自己的租约，新的负责实例才能认领
+        released = self.owned.difference(wanted)
+        if released:
+            await self.coordinator.release(self.instance_id, released)
+        self.owned = set(await self.coordinator.claim(self.instance_id, wanted, self.lease_seconds))
+        return [pair for pair, key in zip(pairs, keys) if key in self.owned]
+
+    async def leave(self):
+        """退出分片并释放全部租约"""
+        await self.coordinator.release(self.instance_id, self.owned)
+        await self.coordinator.leave(self.instance_id)
+        self.owned = set()
+        self._ring = None
+
+
+def create_shard_member(settings) -> Optional[ShardMember]:
+    """按 SHARD_COORDINATOR 配置创建分片成员，未启用时返回 None"""
+    kind = settings.shard_coordinator
+    if not kind:
+        return None
+    if kind == 'redis':
+        import redis
+        client = redis.Redis(
+            host=settings.redis_host,
+            port=settings.redis_port,
+            password=settings.redis_password or None,
+            db=settings.redis_db
+        )
+        coordinator = RedisCoordinator(client, settings.shard_key_prefix)
+    elif kind == 'memory':
+        coordinator = _memory_coordinator
+    else:
+        raise ValueError(f"未知的 SHARD_COORDINATOR: {kind}")
+    return ShardMember(coordinator, settings.shard_instance_id or None, settings.shard_lease_seconds)
+
+
+# SHARD_COORDINATOR=memory 时同一进程内的实例共享
+_memory_coordinator = MemoryCoordinator()
@@ -0,0 +1,160 @@
+"""
+API 与监控进程之间共享的状态（Redis）
+
+监控程序（monitor_crypto.py）和 API 运行在不同的进程中，进程内的指标矩阵和信号中心互相看不到。
+SHARED_STATE=redis 时:
+    指标  监控每次更新指标后写入 Redis 哈希 <prefix>:indicators:<周期>
+          （交易对 -> 时间戳 + 指标数组），并递增该周期的版本号 <prefix>:indicators:<周期>:version；
+          API 在 /screener 查询前比较版本号，有变化时才读取整个周期，把比本地新的指标写入本进程的矩阵。
+    信号  监控把每条 market_info 序列化一次后发布到频道 <prefix>:signals；
+          API 启动后订阅该频道，转发给本进程的 SignalHub，由 WebSocket/SSE 推送给客户端。
+"""
+import asyncio
+import struct
+import time
+from typing import Dict, Optional, Tuple
+import numpy as np
+from .indicator_matrix import IndicatorMatrix
+from .indicator_snapshot import INDICATOR_NAMES, SNAPSHOT_DTYPE, IndicatorSnapshot
+from .signal_hub import SignalHub, encode_market_info
+
+_TIMESTAMP = struct.Struct('<d')
+_ENTRY_SIZE = _TIMESTAMP.size + len(INDICATOR_NAMES) * np.dtype(SNAPSHOT_DTYPE).itemsize
+
+
+def encode_indicators(indicators, timestamp: float) -> bytes:
+    """时间戳（float64）加按 INDICATOR_NAMES 排列的指标数组"""
+    if not isinstance(indicators, IndicatorSnapshot):
+        indicators = IndicatorSnapshot.from_dict(indicators)
+    return _TIMESTAMP.pack(timestamp) + indicators.values.astype(SNAPSHOT_DTYPE, copy=False).tobytes()
+
+
+def decode_indicators(data: bytes) -> Optional[Tuple[float, IndicatorSnapshot]]:
+    """encode_indicators 的逆过程，指标字段与本进程不一致（版本不同）时返回 None"""
+    if len(data) != _ENTRY_SIZE:
+        return None
+    timestamp, = _TIMESTAMP.unpack_from(data)
+    values = np.frombuffer(data, dtype=SNAPSHOT_DTYPE, offset=_TIMESTAMP.size).copy()
+    return timestamp, IndicatorSnapshot(values)
+
+
+class RedisIndicatorStore:
+    """
+    在 Redis 中共享各交易对的最新指标
+
+    参数:
+        client: redis.asyncio.Redis（不解码响应）
+        prefix: 键前缀
+    """
+
+    def __init__(self, client, prefix: str = 'crypto'):
+        self.client = client
+        self.prefix = prefix
+        self._versions: Dict[str, bytes] = {}
+
+    def _key(self, interval: str) -> str:
+        return f"{self.prefix}:indicators:{interval}"
+
+    async def save(self, symbol: str, interval: str, indicators, timestamp: Optional[float] = None):
+        """写入一个交易对一个周期的最新指标（IndicatorSnapshot 或字典）"""
+        key = self._key(interval)
+        data = encode_indicators(indicators, time.time() if timestamp is None else timestamp)
+        async with self.client.pipeline(transaction=True) as pipeline:
+            pipeline.hset(key, symbol, data)
+            pipeline.incr(f"{key}:version")
+            await pipeline.execute()
+
+    async def sync(self, matrix: IndicatorMatrix, interval: str) -> int:
+        """把 Redis 中比 matrix 新的指标写入 matrix，返回写入的数量；版本号未变时只读取版本号"""
+        key = self._key(interval)
+        version = await self.client.get(f"{key}:version")
+        if version is None or version == self._versions.get(interval):
+            return 0
+        entries = await self.client.hgetall(key)
+        self._versions[interval] = version
+        updated = 0
+        for symbol, data in entries.items():
+            decoded = decode_indicators(data)
+            if decoded is None:
+                continue
+            timestamp, snapshot = decoded
+            symbol = symbol.decode() if isinstance(symbol, bytes) else symbol
+            # 本地（例如 /analyze）更新过且更新的保留本地的值
+            if not timestamp <= matrix.updated(symbol, interval):
+                matrix.update(symbol, interval, snapshot, timestamp)
+                updated += 1
+        return updated
+
+
+class RedisSignalBus:
+    """
+    通过 Redis 发布/订阅转发监控信号
+
+    消息格式为 "交易对\n周期\nJSON"，订阅方不需要解析JSON就能按交易对和周期分发。
+    发布/订阅不保存消息：API 断开期间的信号不会补发。
+
+    参数:
+        client: redis.asyncio.Redis
+        prefix: 频道前缀
+        retry_seconds: 订阅断开后重连的间隔
+    """
+
+    def __init__(self, client, prefix: str = 'crypto', retry_seconds: float = 5.0):
+        self.client = client
+        self.channel = f"{prefix}:signals"
+        self.retry_seconds = retry_seconds
+
+    async def publish(self, symbol: str, market_info: Dict) -> int:
+        """发布一条 market_info，返回收到的订阅进程数量"""
+        message = encode_market_info(market_info)
+        return await self.client.publish(self.channel, f"{symbol.upper()}\n{market_info.get('interval') or ''}\n{message}")
+
+    async def relay(self, hub: SignalHub):
+        """订阅频道并转发给 hub，断开后每隔 retry_seconds 重连，直到任务被取消"""
+        while True:
+            try:
+                async with self.client.pubsub() as pubsub:
+                    await pubsub.subscribe(self.channel)
+                    async for item in pubsub.listen():
+                        if item['type'] != 'message':
+                            continue
+                        data = item['data']
+                        symbol, interval, message = (data.decode() if isinstance(data, bytes) else data).split('\n', 2)
+                        hub.publish_encoded(symbol, interval or None, message)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"订阅监控信号失败，{self.retry_seconds:.0f}秒后重连: {str(e)}")
+            await asyncio.sleep(self.retry_seconds)
+
+
+def create_redis_client(settings):
+    """按 Redis 配置创建异步客户端（连接在第一次读写时建立）"""
+    import redis.asyncio as redis
+    return redis.Redis(
+        host=settings.redis_host,
+        port=settings.redis_port,
+        password=settings.redis_password or None,
+        db=settings.redis_db
+    )
+
+
+def _enabled(settings) -> bool:
+    kind = settings.shared_state
+    if kind and kind != 'redis':
+        raise ValueError(f"未知的 SHARED_STATE: {kind}")
+    return bool(kind)
+
+
+def create_indicator_store(settings) -> Optional[RedisIndicatorStore]:
+    """按 SHARED_STATE 配置创建共享指标存储，未启用时返回 None"""
+    if not _enabled(settings):
+        return None
+    return RedisIndicatorStore(create_redis_client(settings), settings.shared_state_prefix)
+
+
+def create_signal_bus(settings) -> Optional[RedisSignalBus]:
+    """按 SHARED_STATE 配置创建信号转发，未启用时返回 None"""
+    if not _enabled(settings):
+        return None
+    return RedisSignalBus(create_redis_client(settings), settings.shared_state_prefix)
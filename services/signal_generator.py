@@ -1,22 +1,55 @@
-from typing import Dict, List, Optional
+from typing import Awaitable, Callable, Dict, List, Optional
 import pandas as pd
 from .pattern_recognition import PatternRecognition
 from .technical_analysis import TechnicalAnalyzer
 from .ai_analyzer import AIAnalyzer
+from .indicator_registry import resolve
+from .indicator_snapshot import monitored_indicators
+from .metrics import stage
 from core.config import get_settings
 
+# 评分和行动建议的阈值（回测以 SignalGenerator 上的值为默认参数，参数扫描的结果可直接设置到实例上）
+THRESHOLDS = ('rsi_overbought', 'rsi_oversold', 'min_confidence', 'action_score', 'strong_score', 'strong_confidence')
+
 class SignalGenerator:
-    def __init__(self):
+    # RSI超买/超卖阈值
+    rsi_overbought = 70
+    rsi_oversold = 30
+    # 行动建议阈值
+    min_confidence = 40      # 低于该信心指数时观望
+    action_score = 2         # 买入/卖出的最低得分
+    strong_score = 4         # 强烈买入/卖出的最低得分
+    strong_confidence = 70   # 强烈买入/卖出的最低信心指数
+
+    def __init__(self, ai_scheduler=None):
         self.pattern_recognizer = PatternRecognition()
         self.technical_analyzer = TechnicalAnalyzer()
         self.ai_analyzer = AIAnalyzer()
+        # 设置后AI分析通过调度器异步执行，技术分析结果立即返回
+        self.ai_scheduler = ai_scheduler
+        # 每根K线计算的指标：基础建议所需指标加上配置中额外指定的指标（用于通知和筛选）
+        self.indicator_names = self._indicator_names(get_settings().signal_indicators)
         
-    async def generate_signals(self, df: pd.DataFrame) -> Dict:
+    async def generate_signals(
+        self,
+        df: pd.DataFrame,
+        symbol: Optional[str] = None,
+        interval: Optional[str] = None,
+        on_ai_complete: Optional[Callable[[Dict], Awaitable[None]]] = None,
+        on_ai_preliminary: Optional[Callable[[Dict], Awaitable[None]]] = None,
+        deadline: Optional[float] = None
+    ) -> Dict:
         """
         生成交易信号（集成AI分析）
         
         参数:
             df: 包含OHLCV数据的DataFrame
+            symbol: 交易对（可选）
+            interval: 时间周期（可选）
+            on_ai_complete: 异步AI分析完成后的回调，参数为更新后的信号字典
+            on_ai_preliminary: 流式AI输出中识别出趋势和价位后的回调，参数为初步信号字典
+            deadline: AI结果的过期时间戳（秒），默认为最后一根K线的收盘时间；
+                只传入已收盘K线时由调用方传入正在形成的K线的收盘时间
         返回:
             包含交易信号的字典
         """
@@ -27,10 +60,12 @@ class SignalGenerator:
             'recommendation': {} # 综合建议
         }
         # 获取形态识别信号
-        patterns = self.pattern_recognizer.analyze_patterns(df)
+        with stage('patterns', symbol, interval):
+            patterns = self.pattern_recognizer.analyze_patterns(df)
         signals['patterns'] = patterns
         # 获取技术指标
-        indicators = self.technical_analyzer.calculate_indicators(df)
+        with stage('indicators', symbol, interval):
+            indicators = self.technical_analyzer.calculate_indicators(df, self.indicator_names)
         signals['technical'] = indicators
         # 先生成基础技术分析建议
         base_recommendation = self._generate_base_recommendation(patterns, indicators)
@@ -43,44 +78,62 @@ class SignalGenerator:
         settings = get_settings()
         confidence_threshold = settings.ai_confidence_threshold
         if base_recommendation['confidence'] >= confidence_threshold:
-            try:
-                # 准备市场数据
-                latest_data = {
-                    'close': df['close'].iloc[-1],
-                    'high': df['high'].iloc[-1],
-                    'low': df['low'].iloc[-1],
-                    'volume': df['volume'].iloc[-1],
-                    'price_change': df['close'].iloc[-1] - df['close'].iloc[-2],
-                    'price_change_percent': ((df['close'].iloc[-1] - df['close'].iloc[-2]) / df['close'].iloc[-2]) * 100,
-                    'indicators': indicators,
-                    'klines': df
-                }
-                
-                # 调用AI分析
-                print("调用AI分析")
-                symbol = df.get('symbol', 'Unknown')
-                ai_result = await self.ai_analyzer.analyze_market(symbol, latest_data)
-                
-                if ai_result.get('error'):
-                    signals['ai'] = {
-                        'error': ai_result['error'],
-                        'disabled': False,
-                        'timestamp': ai_result.get('timestamp')
-                    }
-                else:
-                    signals['ai'] = {
-                        'analysis': ai_result['analysis'],
-                        'key_points': ai_result['key_points'],
-                        'technical_signals': ai_result.get('technical_signals'),
-                        'timestamp': ai_result['timestamp'],
-                        'disabled': False
-                    }
-            except Exception as e:
+            # 准备市场数据
+            latest_data = {
+                'close': df['close'].iloc[-1],
+                'high': df['high'].iloc[-1],
+                'low': df['low'].iloc[-1],
+                'volume': df['volume'].iloc[-1],
+                'price_change': df['close'].iloc[-1] - df['close'].iloc[-2],
+                'price_change_percent': ((df['close'].iloc[-1] - df['close'].iloc[-2]) / df['close'].iloc[-2]) * 100,
+                'indicators': indicators,
+                'indicator_context': self.technical_analyzer.context,
+                'klines': df,
+                'interval': interval
+            }
+            symbol = symbol or df.get('symbol', 'Unknown')
+
+            if self.ai_scheduler is not None:
+                # 异步AI分析：先返回技术分析结果，AI结果通过回调补充
+                async def _on_ai_result(ai_result: Dict):
+                    if on_ai_complete is not None:
+                        await on_ai_complete(self._with_ai_result(signals, ai_result))
+
+                async def _on_ai_preliminary(ai_result: Dict):
+                    if on_ai_preliminary is not None:
+                        await on_ai_preliminary(self._with_ai_result(signals, ai_result))
+
+                if deadline is None and 'close_time' in df.columns:
+                    # 当前K线收盘后AI结果即过期
+                    deadline = pd.Timestamp(df['close_time'].iloc[-1]).timestamp()
+
+                print("提交AI分析任务")
+                self.ai_scheduler.submit(
+                    symbol,
+                    latest_data,
+                    priority=base_recommendation['confidence'],
+                    deadline=deadline,
+                    key=f"{symbol}_{interval}",
+                    callback=_on_ai_result,
+                    preliminary_callback=_on_ai_preliminary if on_ai_preliminary is not None else None
+                )
                 signals['ai'] = {
-                    'error': str(e),
+                    'pending': True,
                     'disabled': False,
                     'timestamp': None
                 }
+            else:
+                try:
+                    # 调用AI分析
+                    print("调用AI分析")
+                    ai_result = await self.ai_analyzer.analyze_market(symbol, latest_data)
+                    signals['ai'] = self._format_ai_result(ai_result)
+                except Exception as e:
+                    signals['ai'] = {
+                        'error': str(e),
+                        'disabled': False,
+                        'timestamp': None
+                    }
         else:
             signals['ai'] = {
                 'disabled': True,
@@ -90,6 +143,46 @@ class SignalGenerator:
         # 生成综合建议（含AI分析）
         signals['recommendation'] = self._generate_recommendation(patterns, indicators, signals['ai'])
         return signals
+
+    def set_thresholds(self, **params):
+        """设置评分和行动建议阈值（例如参数扫描得到的最优参数，其他参数忽略）"""
+        for name in THRESHOLDS:
+            if name in params:
+                setattr(self, name, params[name])
+
+    @staticmethod
+    def _indicator_names(extra: str) -> Optional[List[str]]:
+        """解析额外指标配置，"all" 表示全部指标（返回 None）"""
+        names = monitored_indicators(extra)
+        if names is not None:
+            resolve(names)  # 提前检查指标名称
+        return names
+
+    def _with_ai_result(self, signals: Dict, ai_result: Dict) -> Dict:
+        """返回补充了AI结果的新信号字典（不修改已推送的信号）"""
+        updated = dict(signals)
+        updated['ai'] = self._format_ai_result(ai_result)
+        updated['recommendation'] = self._generate_recommendation(
+            signals['patterns'], signals['technical'], updated['ai']
+        )
+        return updated
+
+    def _format_ai_result(self, ai_result: Dict) -> Dict:
+        """将AIAnalyzer的返回结果整理为信号中的AI部分"""
+        if ai_result.get('error'):
+            return {
+                'error': ai_result['error'],
+                'disabled': False,
+                'timestamp': ai_result.get('timestamp')
+            }
+        return {
+            'analysis': ai_result['analysis'],
+            'key_points': ai_result['key_points'],
+            'technical_signals': ai_result.get('technical_signals'),
+            'timestamp': ai_result['timestamp'],
+            'preliminary': ai_result.get('preliminary', False),
+            'disabled': False
+        }
         
     def _generate_base_recommendation(self, patterns: Dict, indicators: Dict) -> Dict:
         """生成基础技术分析建议"""
@@ -117,10 +210,10 @@ class SignalGenerator:
         # RSI指标评分
         if 'rsi' in indicators:
             rsi = indicators['rsi']
-            if rsi > 70:
+            if rsi > self.rsi_overbought:
                 score -= 1
                 reasons.append(f"RSI超买: {rsi:.2f}")
-            elif rsi < 30:
+            elif rsi < self.rsi_oversold:
                 score += 1
                 reasons.append(f"RSI超卖: {rsi:.2f}")
 
@@ -238,16 +331,16 @@ class SignalGenerator:
         
     def _get_action_recommendation(self, score: float, confidence: float) -> str:
         """根据得分和信心指数生成行动建议"""
-        if confidence < 40:
+        if confidence < self.min_confidence:
             return "建议观望，信号不明确"
             
-        if score >= 4 and confidence >= 70:
+        if score >= self.strong_score and confidence >= self.strong_confidence:
             return "强烈建议买入"
-        elif score >= 2:
+        elif score >= self.action_score:
             return "建议买入"
-        elif score <= -4 and confidence >= 70:
+        elif score <= -self.strong_score and confidence >= self.strong_confidence:
             return "强烈建议卖出"
-        elif score <= -2:
+        elif score <= -self.action_score:
             return "建议卖出"
         else:
             return "建议持有"
@@ -0,0 +1,186 @@
+import asyncio
+import json
+from collections import OrderedDict
+from collections.abc import Mapping
+from datetime import date, datetime
+from typing import Dict, Hashable, Iterable, Optional, Set
+import numpy as np
+from .indicator_snapshot import IndicatorSnapshot
+
+# 缓冲区满时的处理方式
+DROP_OLDEST = 'drop'     # 丢弃最早的消息
+CONFLATE = 'conflate'    # 同一交易对同一周期只保留最新一条，缓冲区满时再丢弃最早的
+POLICIES = (DROP_OLDEST, CONFLATE)
+
+
+def _json_default(value):
+    if isinstance(value, IndicatorSnapshot):
+        return value.to_dict(nan_as_none=True)
+    if isinstance(value, Mapping):
+        return dict(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (set, tuple)):
+        return list(value)
+    return str(value)
+
+
+def encode_market_info(market_info: Dict) -> str:
+    """把监控产生的 market_info 序列化为一行JSON"""
+    return json.dumps(market_info, default=_json_default, ensure_ascii=False, separators=(',', ':'))
+
+
+class Subscription:
+    """
+    单个客户端的订阅
+
+    消息放在有界缓冲区中，客户端消费过慢时按 policy 丢弃或合并，
+    不会阻塞发布方，也不会无限占用内存。
+    """
+
+    def __init__(
+        self,
+        hub: "SignalHub",
+        symbols: Optional[Iterable[str]] = None,
+        intervals: Optional[Iterable[str]] = None,
+        buffer_size: int = 100,
+        policy: str = CONFLATE
+    ):
+        if policy not in POLICIES:
+            raise ValueError(f"未知的缓冲策略: {policy}")
+        self.hub = hub
+        self.symbols: Optional[Set[str]] = {s.upper() for s in symbols} if symbols else None
+        self.intervals: Optional[Set[str]] = set(intervals) if intervals else None
+        self.buffer_size = max(1, buffer_size)
+        self.policy = policy
+        self.dropped = 0      # 丢弃或被合并的消息数量
+        self.closed = False
+        self._buffer: "OrderedDict[Hashable, str]" = OrderedDict()
+        self._event = asyncio.Event()
+        self._sequence = 0
+
+    def __len__(self) -> int:
+        return len(self._buffer)
+
+    def push(self, key: Hashable, message: str):
+        """放入一条消息（由 SignalHub 调用，不阻塞）"""
+        if self.policy == CONFLATE and key in self._buffer:
+            self._buffer[key] = message
+            self.dropped += 1
+            return
+        if len(self._buffer) >= self.buffer_size:
+            self._buffer.popitem(last=False)
+            self.dropped += 1
+        if self.policy != CONFLATE:
+            self._sequence += 1
+            key = self._sequence
+        self._buffer[key] = message
+        self._event.set()
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[str]:
+        """
+        取出最早的一条消息
+
+        超时返回 None（用于发送心跳），订阅关闭后抛出 StopAsyncIteration
+        """
+        while not self._buffer:
+            if self.closed:
+                raise StopAsyncIteration
+            self._event.clear()
+            try:
+                await asyncio.wait_for(self._event.wait(), timeout)
+            except asyncio.TimeoutError:
+                return None
+        return self._buffer.popitem(last=False)[1]
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> str:
+        return await self.get()
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.hub.unsubscribe(self)
+            self._event.set()
+
+
+class SignalHub:
+    """
+    监控信号的发布/订阅中心
+
+    MarketMonitor 每产生一条 market_info 调用一次 publish：只序列化一次，
+    再按交易对分发到订阅者的缓冲区。WebSocket/SSE 接口从订阅中读取并推送，
+    不会为每个客户端重复分析。监控运行在单独的进程中时，信号经 Redis 转发
+    （shared_state.RedisSignalBus），由 API 进程调用 publish_encoded 分发。
+    """
+
+    def __init__(self):
+        self._by_symbol: Dict[str, Set[Subscription]] = {}
+        self._all: Set[Subscription] = set()   # 不按交易对过滤的订阅
+        self.published = 0
+
+    def __len__(self) -> int:
+        return len(self._all) + sum(len(s) for s in self._by_symbol.values())
+
+    def subscribe(
+        self,
+        symbols: Optional[Iterable[str]] = None,
+        intervals: Optional[Iterable[str]] = None,
+        buffer_size: int = 100,
+        policy: str = CONFLATE
+    ) -> Subscription:
+        subscription = Subscription(self, symbols, intervals, buffer_size, policy)
+        if subscription.symbols is None:
+            self._all.add(subscription)
+        else:
+            for symbol in subscription.symbols:
+                self._by_symbol.setdefault(symbol, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        if subscription.symbols is None:
+            self._all.discard(subscription)
+            return
+        for symbol in subscription.symbols:
+            subscribers = self._by_symbol.get(symbol)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._by_symbol[symbol]
+
+    def publish(self, symbol: str, market_info: Dict) -> int:
+        """发布一条市场信息，返回收到的订阅数量（没有订阅者时不序列化）"""
+        symbol = symbol.upper()
+        targeted = self._by_symbol.get(symbol, ())
+        if not targeted and not self._all:
+            return 0
+        return self.publish_encoded(symbol, market_info.get('interval'), encode_market_info(market_info))
+
+    def publish_encoded(self, symbol: str, interval: Optional[str], message: str) -> int:
+        """发布一条已序列化的市场信息（例如从其他进程转发来的），返回收到的订阅数量"""
+        symbol = symbol.upper()
+        targeted = self._by_symbol.get(symbol, ())
+        self.published += 1
+        key = (symbol, interval)
+        delivered = 0
+        for subscribers in (targeted, self._all):
+            for subscription in subscribers:
+                if subscription.intervals is None or interval in subscription.intervals:
+                    subscription.push(key, message)
+                    delivered += 1
+        return delivered
+
+
+_hub: Optional[SignalHub] = None
+
+
+def get_signal_hub() -> SignalHub:
+    """进程内共享的信号中心"""
+    global _hub
+    if _hub is None:
+        _hub = SignalHub()
+    return _hub
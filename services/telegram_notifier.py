@@ -1,4 +1,3 @@
-import aiohttp
 from typing import Dict, Optional
 from datetime import datetime
 import sys
@@ -6,6 +5,7 @@ import os
 from dotenv import load_dotenv
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from core.config import get_settings
+from .metrics import stage
 
 # 加载环境变量
 load_dotenv()
@@ -51,8 +51,9 @@ class TelegramNotifier:
         message = self._create_message(symbol, market_info)
         
         # 发送到所有配置的聊天
-        for chat_id in self.chat_ids:
-            await self._send_message(chat_id, message)
+        with stage('notify_telegram', symbol, market_info.get('interval')):
+            for chat_id in self.chat_ids:
+                await self._send_message(chat_id, message)
             
     def _create_message(self, symbol: str, market_info: dict) -> str:
         """创建Telegram消息"""
@@ -89,6 +90,8 @@ class TelegramNotifier:
         ])
         
         for indicator, value in signals['technical'].items():
+            if value != value:
+                continue  # 未计算的指标
             if isinstance(value, float):
                 message.append(f"{indicator}: `{value:.2f}`")
             else:
@@ -140,6 +143,7 @@ class TelegramNotifier:
         
     async def _send_message(self, chat_id: str, message: str):
         """发送Telegram消息"""
+        import aiohttp
         try:
             # 创建SSL上下文
             ssl_context = aiohttp.TCPConnector(
@@ -0,0 +1,111 @@
+import asyncio
+import json
+import time
+from services.ai_analyzer import AIAnalyzer
+from services.ai_scheduler import AIScheduler
+from services.mock_ai_server import MockAIServer
+from test_ai_scheduler import FakeAnalyzer
+
+class FakeBatchAnalyzer(FakeAnalyzer):
+    """记录批量请求的模拟分析器"""
+
+    def __init__(self, delay: float = 0.05):
+        super().__init__(delay)
+        self.batches = []
+
+    async def analyze_batch(self, items):
+        self.batches.append([symbol for symbol, _ in items])
+        await asyncio.sleep(self.delay)
+        return [{"analysis": symbol, "key_points": {}, "batched": True} for symbol, _ in items]
+
+def test_scheduler_batches_queued_jobs():
+    async def run():
+        analyzer = FakeBatchAnalyzer()
+        scheduler = AIScheduler(analyzer, max_concurrency=1, request_timeout=5, batch_size=3, batch_window=0.05)
+        await scheduler.start()
+        symbols = ["A", "B", "C", "D", "E"]
+        futures = [scheduler.submit(s, {}, priority=i) for i, s in enumerate(symbols)]
+        results = await asyncio.gather(*futures)
+        await scheduler.close()
+        return analyzer, results
+
+    analyzer, results = asyncio.run(run())
+    # 按优先级从高到低，每批最多3个
+    assert analyzer.batches == [["E", "D", "C"], ["B", "A"]]
+    assert [r["analysis"] for r in results] == ["A", "B", "C", "D", "E"]
+
+def test_batch_stops_at_deadline():
+    async def run():
+        analyzer = FakeBatchAnalyzer(delay=2)
+        scheduler = AIScheduler(analyzer, max_concurrency=1, request_timeout=5, batch_size=2, batch_window=0.05)
+        await scheduler.start()
+        results = []
+
+        async def callback(result):
+            results.append(result)
+
+        started = time.perf_counter()
+        deadline = time.time() + 0.3
+        scheduler.submit("A", {}, deadline=deadline, callback=callback)
+        scheduler.submit("B", {}, deadline=deadline + 60, callback=callback)
+        while len(results) < 2 and time.perf_counter() - started < 3:
+            await asyncio.sleep(0.01)
+        elapsed = time.perf_counter() - started
+        await scheduler.close()
+        return results, elapsed
+
+    results, elapsed = asyncio.run(run())
+    # 批量请求不超过最早的收盘时间，已收盘的任务取消，未收盘的收到超时错误
+    assert elapsed < 1
+    assert results[0]["error"] == "stale"
+    assert "超时" in results[1]["error"]
+
+def test_analyze_batch_splits_json_response():
+    response = {"results": [
+        {"id": 2, "symbol": "ETHUSDT", "trend": "下跌", "confidence": 70,
+         "support_levels": [3000, 2950.5], "resistance_levels": [3200],
+         "stop_loss": 3250, "take_profit_levels": [3000], "risk_level": 4,
+         "analysis": "跌破均线，建议做空"},
+        {"id": 1, "symbol": "BTCUSDT", "trend": "偏强", "confidence": "85",
+         "support_levels": 60000, "resistance_levels": None,
+         "stop_loss": None, "take_profit_levels": [65000, 64000], "risk_level": 9,
+         "analysis": "强势上涨，回踩做多"}
+    ]}
+
+    async def run():
+        server = MockAIServer(content=json.dumps(response, ensure_ascii=False), chunk_delay=0)
+        base_url = await server.start()
+        try:
+            analyzer = AIAnalyzer()
+            analyzer.api_key = "test"
+            analyzer.api_base = base_url
+            results = await analyzer.analyze_batch([
+                ("BTCUSDT", {"close": 63000, "interval": "1h"}),
+                ("ETHUSDT", {"close": 3100, "interval": "1h"}),
+                ("SOLUSDT", {"close": 150, "interval": "1h"}),
+            ])
+        finally:
+            await server.stop()
+        return results, server.requests
+
+    results, requests = asyncio.run(run())
+    assert len(requests) == 1
+    assert requests[0]["response_format"] == {"type": "json_object"}
+    assert requests[0]["stream"] is False
+
+    btc, eth, sol = results
+    assert btc["key_points"]["trend"] == "强势上涨"   # 从分析文字中提取
+    assert btc["key_points"]["confidence"] == 85
+    assert btc["key_points"]["support_levels"] == [60000.0]
+    assert btc["key_points"]["take_profit_levels"] == [64000.0, 65000.0]
+    assert btc["key_points"]["risk_level"] == 5
+    assert eth["key_points"]["trend_score"] == -2
+    assert eth["key_points"]["support_levels"] == [2950.5, 3000.0]
+    assert eth["key_points"]["stop_loss"] == 3250.0
+    assert "SOLUSDT" in sol["error"]
+
+if __name__ == "__main__":
+    test_scheduler_batches_queued_jobs()
+    test_batch_stops_at_deadline()
+    test_analyze_batch_splits_json_response()
+    print("批量AI分析测试通过")
@@ -0,0 +1,72 @@
+import asyncio
+import os
+import tempfile
+import time
+import numpy as np
+from services.ai_predictor import AIPredictor
+from services.local_model import LocalModel, train_linear_model
+
+FEATURES = ["rsi", "macd", "adx"]
+
+def make_model_dir() -> str:
+    # 用合成数据训练：RSI低、MACD为正时更可能上涨
+    rng = np.random.default_rng(0)
+    X = np.column_stack([rng.uniform(10, 90, 2000), rng.normal(0, 1, 2000), rng.uniform(5, 50, 2000)])
+    y = ((50 - X[:, 0]) / 20 + X[:, 1] + rng.normal(0, 0.5, 2000) > 0).astype(float)
+    model = train_linear_model(X, y, FEATURES)
+    path = tempfile.mkdtemp()
+    model.save(os.path.join(path, "predictor.json"))
+    return path
+
+def test_local_model_predict():
+    predictor = AIPredictor(model_path=make_model_dir())
+    assert predictor.has_local_model
+
+    bullish = {"indicators": {"rsi": 20, "macd": 1.5, "adx": 30, "sma_20": 100}}
+    bearish = {"indicators": {"rsi": 85, "macd": -1.5, "adx": 30}}
+    result = asyncio.run(predictor.predict(bullish, ["rsi", "macd"]))
+    assert result["source"] == "local"
+    assert result["prediction"] > 0.9
+    assert result["recommendation"] == "建议买入"
+    assert result["indicators"] == {"rsi": 20.0, "macd": 1.5}
+
+    results = predictor.predict_batch([bullish, bearish, {"indicators": {}}])
+    assert results[1]["recommendation"] == "建议卖出"
+    # 全部缺失时按均值处理
+    assert 0.2 < results[2]["prediction"] < 0.8
+
+    items = [bullish] * 10000
+    started = time.perf_counter()
+    predictor.predict_batch(items)
+    per_item = (time.perf_counter() - started) / len(items)
+    # 批量推理每条约几微秒，上限留出慢机器的余量
+    assert per_item < 100e-6
+
+def test_gbdt_model():
+    # 两棵深度不同的树: rsi<=30 -> +1 否则 -1；macd<=0 -> (adx<=25 -> -0.5 否则 -1) 否则 +0.5
+    model = LocalModel({
+        "type": "gbdt",
+        "features": FEATURES,
+        "base_score": 0.0,
+        "learning_rate": 1.0,
+        "trees": [
+            {"feature": [0, -1, -1], "threshold": [30, 0, 0],
+             "left": [1, 0, 0], "right": [2, 0, 0], "value": [0, 1.0, -1.0]},
+            {"feature": [1, 2, -1, -1, -1], "threshold": [0, 25, 0, 0, 0],
+             "left": [1, 3, 0, 0, 0], "right": [2, 4, 0, 0, 0], "value": [0, 0, 0.5, -0.5, -1.0]},
+        ]
+    })
+    X = model.vectorize([
+        {"rsi": 20, "macd": 1, "adx": 10},
+        {"rsi": 50, "macd": -1, "adx": 10},
+        {"rsi": 50, "macd": -1, "adx": 40},
+        {"macd": 1},
+    ])
+    margin = np.log(model.predict_proba(X) / (1 - model.predict_proba(X)))
+    # 缺失的 rsi 走左子树
+    assert np.allclose(margin, [1.5, -1.5, -2.0, 1.5])
+
+if __name__ == "__main__":
+    test_local_model_predict()
+    test_gbdt_model()
+    print("本地预测模型测试通过")
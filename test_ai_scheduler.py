@@ -0,0 +1,117 @@
+import asyncio
+import time
+from services.ai_scheduler import AIScheduler
+
+class FakeAnalyzer:
+    """模拟AI分析器，不访问网络"""
+
+    def __init__(self, delay: float = 0.05):
+        self.delay = delay
+        self.session = None
+        self.running = 0
+        self.max_running = 0
+        self.order = []
+
+    async def analyze_market(self, symbol: str, market_info: dict):
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        self.order.append(symbol)
+        try:
+            await asyncio.sleep(market_info.get('delay', self.delay))
+        finally:
+            self.running -= 1
+        return {"analysis": symbol, "key_points": {}, "timestamp": time.time()}
+
+def test_concurrency_and_priority():
+    async def run():
+        analyzer = FakeAnalyzer()
+        scheduler = AIScheduler(analyzer, max_concurrency=2, request_timeout=5)
+        await scheduler.start()
+        # 先占满两个并发名额，后续任务按优先级排队
+        futures = [scheduler.submit(f"BUSY{i}", {}, priority=100) for i in range(2)]
+        futures += [
+            scheduler.submit(symbol, {}, priority=priority)
+            for symbol, priority in [("LOW", 10), ("HIGH", 90), ("MID", 50)]
+        ]
+        await asyncio.gather(*futures)
+        await scheduler.close()
+        return analyzer
+
+    analyzer = asyncio.run(run())
+    assert analyzer.max_running == 2
+    assert analyzer.order[2:] == ["HIGH", "MID", "LOW"]
+
+def test_stale_and_timeout():
+    async def run():
+        analyzer = FakeAnalyzer()
+        scheduler = AIScheduler(analyzer, max_concurrency=1, request_timeout=0.1)
+        await scheduler.start()
+        results = []
+
+        async def callback(result):
+            results.append(result)
+
+        stale = scheduler.submit("STALE", {}, deadline=time.time() - 1, callback=callback)
+        slow = scheduler.submit("SLOW", {'delay': 1}, callback=callback)
+        await asyncio.sleep(0.3)
+        await scheduler.close()
+        return stale, slow, results
+
+    stale, slow, results = asyncio.run(run())
+    assert stale.cancelled()
+    assert "超时" in slow.result()["error"]
+    # 过期任务也回调，调用方不会一直等待AI结果
+    assert [r["error"] for r in results][0] == "stale"
+    assert len(results) == 2
+
+def test_replace_pending_job():
+    async def run():
+        analyzer = FakeAnalyzer()
+        scheduler = AIScheduler(analyzer, max_concurrency=1, request_timeout=5)
+        await scheduler.start()
+        results = []
+
+        async def callback(result):
+            results.append(result)
+
+        scheduler.submit("BUSY", {})
+        old = scheduler.submit("BTCUSDT", {}, key="BTCUSDT_1h", callback=callback)
+        new = scheduler.submit("BTCUSDT", {}, key="BTCUSDT_1h", callback=callback)
+        await new
+        queued = scheduler.submit("ETHUSDT", {'delay': 1}, callback=callback)
+        await scheduler.close()
+        return old, new, queued, results
+
+    old, new, queued, results = asyncio.run(run())
+    assert old.cancelled() and queued.cancelled()
+    assert new.result()["analysis"] == "BTCUSDT"
+    # 被替换的任务和停止时未完成的任务都收到取消回调
+    assert [r.get("error") for r in results] == ["cancelled", None, "cancelled"]
+
+def test_replace_running_job():
+    async def run():
+        analyzer = FakeAnalyzer(delay=2)
+        scheduler = AIScheduler(analyzer, max_concurrency=1, request_timeout=5)
+        await scheduler.start()
+        old = scheduler.submit("BTCUSDT", {}, key="BTCUSDT_1h")
+        await asyncio.sleep(0.05)
+        assert analyzer.running == 1
+        # 执行中的任务被替换时中止请求，新任务立即开始
+        started = time.perf_counter()
+        new = scheduler.submit("BTCUSDT", {'delay': 0.05}, key="BTCUSDT_1h")
+        await new
+        elapsed = time.perf_counter() - started
+        await scheduler.close()
+        return old, new, elapsed
+
+    old, new, elapsed = asyncio.run(run())
+    assert old.cancelled()
+    assert new.result()["analysis"] == "BTCUSDT"
+    assert elapsed < 0.5
+
+if __name__ == "__main__":
+    test_concurrency_and_priority()
+    test_stale_and_timeout()
+    test_replace_pending_job()
+    test_replace_running_job()
+    print("AI调度器测试通过")
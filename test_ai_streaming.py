@@ -0,0 +1,81 @@
+import asyncio
+import time
+from services.ai_analyzer import AIAnalyzer
+from services.mock_ai_server import MockAIServer, DEFAULT_CONTENT
+
+def make_analyzer(base_url: str, streaming: bool) -> AIAnalyzer:
+    analyzer = AIAnalyzer()
+    analyzer.api_key = "test"
+    analyzer.api_base = base_url
+    analyzer.streaming = streaming
+    return analyzer
+
+def test_streaming_preliminary_signal():
+    async def run():
+        # 在结论之后追加大量无关内容，模拟完整的长篇输出
+        content = DEFAULT_CONTENT + "补充说明。\n" * 200
+        server = MockAIServer(content=content, chunk_size=16, chunk_delay=0.002)
+        base_url = await server.start()
+        started = time.perf_counter()
+        preliminary = {}
+
+        async def on_preliminary(result):
+            preliminary['elapsed'] = time.perf_counter() - started
+            preliminary['result'] = result
+
+        try:
+            analyzer = make_analyzer(base_url, streaming=True)
+            result = await analyzer.analyze_market("BTCUSDT", {}, on_preliminary=on_preliminary)
+        finally:
+            await server.stop()
+        return result, preliminary, time.perf_counter() - started, server.requests
+
+    result, preliminary, total, requests = asyncio.run(run())
+    assert requests[0]["stream"] is True
+    assert result["analysis"].endswith("补充说明。\n")
+    assert result["key_points"]["trend"] == "强势上涨"
+
+    kp = preliminary['result']['key_points']
+    assert preliminary['result']['preliminary'] is True
+    assert kp['trend_score'] == 3
+    assert kp['support_levels'] == [92.0, 95.5]
+    assert preliminary['elapsed'] < total / 2
+    print(f"初步信号耗时: {preliminary['elapsed']:.3f}s, 完整输出耗时: {total:.3f}s")
+
+def test_non_streaming_response():
+    async def run():
+        server = MockAIServer(chunk_delay=0)
+        base_url = await server.start()
+        try:
+            analyzer = make_analyzer(base_url, streaming=False)
+            return await analyzer.analyze_market("ETHUSDT", {})
+        finally:
+            await server.stop()
+
+    result = asyncio.run(run())
+    assert result["analysis"] == DEFAULT_CONTENT
+    assert result["key_points"]["stop_loss"] == 93.5
+
+def test_shared_session_does_not_retry():
+    # 调度器设置共享会话时失败立即返回，由调度器的超时决定，不在分析器内退避重试
+    async def run():
+        import aiohttp
+        server = MockAIServer()
+        base_url = await server.start()
+        await server.stop()
+        async with aiohttp.ClientSession() as session:
+            analyzer = make_analyzer(base_url, streaming=True)
+            analyzer.session = session
+            started = time.perf_counter()
+            result = await analyzer.analyze_market("BTCUSDT", {})
+            return result, time.perf_counter() - started
+
+    result, elapsed = asyncio.run(run())
+    assert "error" in result
+    assert elapsed < 1
+
+if __name__ == "__main__":
+    test_streaming_preliminary_signal()
+    test_non_streaming_response()
+    test_shared_session_does_not_retry()
+    print("流式AI分析测试通过")
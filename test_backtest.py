@@ -0,0 +1,107 @@
+import time
+import numpy as np
+import pandas as pd
+from services.backtest import ACTION_LABELS, BacktestConfig, BacktestEngine
+from services.pattern_recognition import PatternRecognition
+from services.signal_generator import SignalGenerator
+
+def make_ohlcv(n: int, seed: int = 7) -> pd.DataFrame:
+    """生成随机游走的1分钟K线"""
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.002, n)))
+    open_ = np.r_[close[0], close[:-1]] * (1 + rng.normal(0, 0.0005, n))
+    high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.001, n)))
+    low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 0.001, n)))
+    index = pd.date_range("2024-01-01", periods=n, freq="1min")
+    return pd.DataFrame({
+        "open": open_, "high": high, "low": low, "close": close,
+        "volume": rng.uniform(10, 100, n)
+    }, index=index)
+
+def test_matches_signal_generator():
+    df = make_ohlcv(3000)
+    engine = BacktestEngine()
+    f = engine.compute_features(df)
+    signals = engine.signals(f)
+
+    generator = SignalGenerator()
+    recognizer = PatternRecognition()
+    for t in list(range(0, 5)) + list(range(40, 3000, 7)):
+        window = df.iloc[max(0, t - 2):t + 1].copy()
+        if len(window) < 2:
+            # 实盘的上吊线识别至少需要两根K线
+            continue
+        patterns = recognizer.analyze_patterns(window)
+        assert signals["bullish"][t] == len(patterns["bullish"]), t
+        assert signals["bearish"][t] == len(patterns["bearish"]), t
+
+        indicators = {"rsi": f["rsi"][t], "macd": f["macd"][t], "macd_signal": f["macd_signal"][t]}
+        base = generator._generate_base_recommendation(patterns, indicators)
+        assert signals["score"][t] == base["score"], t
+        assert np.isclose(signals["confidence"][t], base["confidence"]), t
+        assert ACTION_LABELS[int(signals["action"][t])] == base["action"], t
+
+def test_swept_thresholds_apply_to_signal_generator():
+    df = make_ohlcv(1000)
+    params = {"rsi_overbought": 60, "rsi_oversold": 40, "min_confidence": 30, "action_score": 1, "fee_rate": 0.001}
+    engine = BacktestEngine(BacktestConfig(**params))
+    f = engine.compute_features(df)
+    signals = engine.signals(f)
+    assert BacktestConfig().rsi_overbought == SignalGenerator.rsi_overbought
+
+    # 参数扫描的结果直接设置到实盘的 SignalGenerator 上
+    generator = SignalGenerator()
+    generator.set_thresholds(**params)
+    no_patterns = {"bullish": [], "bearish": []}
+    checked = 0
+    for t in range(40, 1000):
+        if signals["bullish"][t] or signals["bearish"][t]:
+            continue
+        indicators = {"rsi": f["rsi"][t], "macd": f["macd"][t], "macd_signal": f["macd_signal"][t]}
+        base = generator._generate_base_recommendation(no_patterns, indicators)
+        assert signals["score"][t] == base["score"], t
+        assert ACTION_LABELS[int(signals["action"][t])] == base["action"], t
+        checked += 1
+    assert checked > 500
+    assert SignalGenerator().rsi_overbought == 70
+
+def test_costs_and_positions():
+    engine = BacktestEngine(BacktestConfig(fee_rate=0.001, slippage=0.0, allow_short=False))
+    close = np.array([100.0, 110.0, 121.0, 121.0, 110.0])
+    actions = np.array([1, 0, 9, -1, 0])
+    positions = engine.positions(actions)
+    assert positions.tolist() == [1, 1, 1, 0, 0]
+
+    result = engine.simulate(close, positions)
+    # 开仓和平仓各收一次手续费
+    assert np.isclose(result["total_return"], 1.21 * 0.999 * 0.999 - 1)
+    assert result["trades"] == 1
+    trade = result["trade_list"][0]
+    assert (trade["entry_bar"], trade["exit_bar"], trade["direction"]) == (0, 3, "long")
+    assert np.isclose(trade["return"], result["total_return"])
+
+def test_year_of_minutes_runs_fast():
+    df = make_ohlcv(365 * 24 * 60)
+    engine = BacktestEngine()
+    start = time.perf_counter()
+    result = engine.run(df)
+    elapsed = time.perf_counter() - start
+    assert result["bars"] == len(df)
+    assert elapsed < 10, elapsed
+
+def test_walk_forward():
+    df = make_ohlcv(5000)
+    engine = BacktestEngine()
+    candidates = [BacktestConfig(min_confidence=c) for c in (40, 60, 80)]
+    windows = engine.walk_forward(df, train_bars=2000, test_bars=1000, candidates=candidates)
+    assert len(windows) == 3
+    assert windows[0]["test_start"] == df.index[2000]
+    assert all(w["train"] is not None and w["test"]["bars"] <= 1000 for w in windows)
+
+if __name__ == "__main__":
+    test_matches_signal_generator()
+    test_swept_thresholds_apply_to_signal_generator()
+    test_costs_and_positions()
+    test_year_of_minutes_runs_fast()
+    test_walk_forward()
+    print("回测引擎测试通过")
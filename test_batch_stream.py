@@ -0,0 +1,52 @@
+import asyncio
+import json
+import time
+from services.batch_stream import iter_completed, ndjson_line
+
+def test_yields_in_completion_order():
+    async def job(delay, fail=False):
+        await asyncio.sleep(delay)
+        if fail:
+            raise RuntimeError("接口错误")
+        return delay
+
+    async def run():
+        jobs = [("slow", lambda: job(0.2)), ("fast", lambda: job(0.01)), ("bad", lambda: job(0.05, True))]
+        start = time.perf_counter()
+        results = [(key, result, error, time.perf_counter() - start) async for key, result, error in iter_completed(jobs)]
+        return results, time.perf_counter() - start
+
+    results, total = asyncio.run(run())
+    assert [r[0] for r in results] == ["fast", "bad", "slow"]
+    assert results[0][3] < 0.1                 # 第一个结果立即返回
+    assert isinstance(results[1][2], RuntimeError)
+    assert total < 0.3                         # 总时间取决于最慢的任务
+
+def test_concurrency_limit():
+    running = []
+    peak = []
+
+    async def job():
+        running.append(1)
+        peak.append(len(running))
+        await asyncio.sleep(0.01)
+        running.pop()
+        return True
+
+    async def run():
+        return [r async for r in iter_completed([(i, job) for i in range(20)], max_concurrency=3)]
+
+    assert len(asyncio.run(run())) == 20
+    assert max(peak) == 3
+
+def test_ndjson_line():
+    line = ndjson_line({"symbol": "BTCUSDT", "interval": "1h"}, "analysis", b'{"rsi":50.5}')
+    assert line.endswith(b"\n")
+    assert json.loads(line) == {"symbol": "BTCUSDT", "interval": "1h", "analysis": {"rsi": 50.5}}
+    assert json.loads(ndjson_line({"symbol": "X", "error": "超时"})) == {"symbol": "X", "error": "超时"}
+
+if __name__ == "__main__":
+    test_yields_in_completion_order()
+    test_concurrency_limit()
+    test_ndjson_line()
+    print("批量流式输出测试通过")
@@ -0,0 +1,45 @@
+import copy
+import numpy as np
+from benchmarks.bench_pipeline import STAGES, compare, load_baseline, run_scenario, save_baseline
+from benchmarks.synthetic import REGIME_VOLATILITY, regimes, synthetic_frame, synthetic_klines
+
+def test_synthetic_is_seeded_and_valid():
+    assert synthetic_klines(200, seed=7) == synthetic_klines(200, seed=7)
+    assert synthetic_klines(200, seed=7) != synthetic_klines(200, seed=8)
+
+    df = synthetic_frame(2000, seed=1)
+    assert len(df) == 2000 and df.index.is_monotonic_increasing
+    assert (df["high"] >= df[["open", "close"]].max(axis=1)).all()
+    assert (df["low"] <= df[["open", "close"]].min(axis=1)).all()
+    assert (df["volume"] > 0).all()
+
+    # 各波动率状态都会出现
+    states = regimes(5000, np.random.default_rng(0))
+    assert set(states.tolist()) == set(range(len(REGIME_VOLATILITY)))
+
+def test_run_and_compare(tmp_path):
+    results = run_scenario(100, 2, repeat=1)
+    assert set(results) == set(STAGES)
+    for item in results.values():
+        assert item["candles"] == 100 and item["symbols"] == 2
+        assert item["seconds"] > 0 and item["peak_kib"] > 0
+
+    current = {"meta": {}, "results": {f"small/{k}": v for k, v in results.items()}}
+    path = str(tmp_path / "baseline.json")
+    save_baseline(path, current)
+    baseline = load_baseline(path)
+    assert compare(baseline, current) == []
+
+    slower = copy.deepcopy(current)
+    slower["results"]["small/indicators"]["us_per_candle"] *= 1.5
+    regressions = compare(baseline, slower, threshold=0.2)
+    assert len(regressions) == 1 and regressions[0].startswith("small/indicators")
+    assert load_baseline(str(tmp_path / "missing.json")) is None
+
+if __name__ == "__main__":
+    import tempfile
+    from pathlib import Path
+    test_synthetic_is_seeded_and_valid()
+    with tempfile.TemporaryDirectory() as tmp:
+        test_run_and_compare(Path(tmp))
+    print("流水线基准测试通过")
@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+from services.candle_buffer import FIELDS, CandleBuffer
+from services.futures_data_fetcher import FuturesDataFetcher
+
+def make_row(i: int, close: float = None) -> list:
+    """接口格式的原始K线（价格为字符串）"""
+    open_time = 1_700_000_000_000 + i * 60_000
+    close = 100.0 + i if close is None else close
+    return [open_time, str(close - 1), str(close + 1), str(close - 2), str(close), "10.5",
+            open_time + 59_999, str(10.5 * close), 42 + i, "5.25", str(5.25 * close), "0"]
+
+def test_ring_wraps_and_stays_contiguous():
+    buffer = CandleBuffer(capacity=5)
+    for i in range(12):
+        buffer.append(make_row(i))
+    assert len(buffer) == 5
+
+    closes = buffer.view("close")
+    assert closes.tolist() == [107.0, 108.0, 109.0, 110.0, 111.0]
+    # 视图是连续内存且不复制
+    assert closes.flags["C_CONTIGUOUS"]
+    assert np.shares_memory(closes, buffer._data["close"])
+    assert not closes.flags["WRITEABLE"]
+    assert buffer.view("close", last=2).tolist() == [110.0, 111.0]
+
+    buffer.replace_last(make_row(11, close=200.0))
+    assert buffer.view("close")[-1] == 200.0
+    assert buffer.view("trades").tolist() == [49, 50, 51, 52, 53]
+
+def test_upsert():
+    buffer = CandleBuffer(capacity=10)
+    assert buffer.update([make_row(i) for i in range(5)]) == [make_row(i)[0] for i in range(5)]
+    assert not buffer.upsert(make_row(3))                   # 没有变化
+    assert buffer.upsert(make_row(3, close=50.0))           # 覆盖已有K线
+    assert buffer.view("close")[3] == 50.0
+    assert not buffer.upsert(make_row(-1))                  # 早于缓冲区
+    assert buffer.upsert(make_row(5))
+    assert len(buffer) == 6
+
+def test_to_frame_matches_fetcher():
+    rows = [make_row(i) for i in range(30)]
+    buffer = CandleBuffer(capacity=20)
+    buffer.update(rows)
+
+    expected = FuturesDataFetcher().klines_to_frame(rows[-20:])
+    pd.testing.assert_frame_equal(buffer.to_frame(), expected)
+    pd.testing.assert_frame_equal(buffer.to_frame(last=5), expected.iloc[-5:])
+
+    # DataFrame 转回K线数组后内容不变
+    again = CandleBuffer(capacity=20)
+    again.update(CandleBuffer.rows_from_frame(expected))
+    for field in FIELDS:
+        assert np.array_equal(again.view(field), buffer.view(field))
+
+def test_memory_is_fixed():
+    buffer = CandleBuffer(capacity=1500)
+    size = buffer.nbytes
+    for i in range(5000):
+        buffer.upsert(make_row(i))
+    assert buffer.nbytes == size == 2 * 1500 * 8 * len(FIELDS)
+
+if __name__ == "__main__":
+    test_ring_wraps_and_stays_contiguous()
+    test_upsert()
+    test_to_frame_matches_fetcher()
+    test_memory_is_fixed()
+    print("K线缓冲区测试通过")
@@ -0,0 +1,100 @@
+import numpy as np
+import pandas as pd
+from services.candle_resampler import CandleResampler, choose_base_interval
+from services.futures_data_fetcher import FuturesDataFetcher
+
+def make_klines(n: int, interval_minutes: int = 15, start: str = "2024-01-01 00:00", seed: int = 3) -> pd.DataFrame:
+    """生成与 FuturesDataFetcher.get_klines 格式相同的K线"""
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1, n))
+    open_ = np.r_[100, close[:-1]]
+    volume = rng.uniform(10, 100, n)
+    quote_volume = volume * close
+    index = pd.date_range(start, periods=n, freq=f"{interval_minutes}min", name="open_time")
+    df = pd.DataFrame({
+        "open": open_,
+        "high": np.maximum(open_, close) + rng.uniform(0, 1, n),
+        "low": np.minimum(open_, close) - rng.uniform(0, 1, n),
+        "close": close,
+        "volume": volume,
+        "close_time": index + pd.Timedelta(minutes=interval_minutes) - pd.Timedelta(milliseconds=1),
+        "quote_volume": quote_volume,
+        "trades": rng.integers(100, 1000, n),
+        "taker_buy_volume": volume * 0.5,
+        "taker_buy_quote_volume": quote_volume * 0.5,
+    }, index=index)
+    return FuturesDataFetcher.add_derived_columns(df)
+
+def expected_candle(base: pd.DataFrame, start: str, minutes: int) -> dict:
+    rows = base[(base.index >= pd.Timestamp(start)) & (base.index < pd.Timestamp(start) + pd.Timedelta(minutes=minutes))]
+    return {
+        "open": rows["open"].iloc[0],
+        "high": rows["high"].max(),
+        "low": rows["low"].min(),
+        "close": rows["close"].iloc[-1],
+        "volume": rows["volume"].sum(),
+        "trades": rows["trades"].sum(),
+        "taker_buy_volume": rows["taker_buy_volume"].sum(),
+        "taker_buy_quote_volume": rows["taker_buy_quote_volume"].sum(),
+    }
+
+def test_aggregation():
+    # 从 00:30 开始，第一根1h和4h K线不完整，应被丢弃
+    base = make_klines(200, start="2024-01-01 00:30")
+    resampler = CandleResampler("15m", ["15m", "1h", "4h"], history=100)
+    assert resampler.update(base) == ["15m", "1h", "4h"]
+
+    hourly = resampler.get("1h")
+    assert hourly.index[0] == pd.Timestamp("2024-01-01 01:00")
+    four_hourly = resampler.get("4h")
+    assert four_hourly.index[0] == pd.Timestamp("2024-01-01 04:00")
+    assert list(hourly.columns) == list(base.columns)
+
+    for frame, minutes in ((hourly, 60), (four_hourly, 240)):
+        start = frame.index[3]
+        candle = frame.loc[start]
+        for field, value in expected_candle(base, start, minutes).items():
+            assert np.isclose(candle[field], value), field
+        assert candle["close_time"] == start + pd.Timedelta(minutes=minutes) - pd.Timedelta(milliseconds=1)
+        assert np.isclose(candle["price_change"], candle["close"] - candle["open"])
+        assert np.isclose(candle["buy_ratio"], candle["taker_buy_volume"] / candle["volume"])
+
+    assert len(resampler.get("15m")) == 100
+
+def test_incremental_update_matches_full():
+    full = make_klines(400)
+    resampler = CandleResampler("15m", ["15m", "1h", "4h"], history=50)
+    resampler.update(full.iloc[:300])
+
+    # 未收盘的K线先到达，随后被最终数据替换
+    in_progress = full.iloc[300:301].copy()
+    in_progress["close"] -= 0.5
+    assert resampler.update(full.iloc[299:300]) == []          # 没有变化
+    assert resampler.update(in_progress) == ["15m", "1h", "4h"]
+    for i in range(300, 400):
+        resampler.update(full.iloc[i - 1:i + 1])
+
+    reference = CandleResampler("15m", ["15m", "1h", "4h"], history=50)
+    reference.update(full)
+    for interval in ("15m", "1h", "4h"):
+        pd.testing.assert_frame_equal(resampler.get(interval), reference.get(interval))
+
+def test_changed_intervals():
+    full = make_klines(17)   # 00:00 - 04:00
+    resampler = CandleResampler("15m", ["15m", "1h", "4h"], history=10)
+    resampler.update(full.iloc[:16])
+    # 新的15m K线开启了新的1h和4h K线
+    assert resampler.update(full.iloc[16:17]) == ["15m", "1h", "4h"]
+
+def test_choose_base_interval():
+    assert choose_base_interval(["15m", "1h", "4h"]) == "15m"
+    assert choose_base_interval(["1h", "15m"]) == "15m"
+    assert choose_base_interval(["3m", "5m"]) is None
+    assert choose_base_interval(["1h", "1w"]) is None
+
+if __name__ == "__main__":
+    test_aggregation()
+    test_incremental_update_matches_full()
+    test_changed_intervals()
+    test_choose_base_interval()
+    print("多周期合成测试通过")
@@ -0,0 +1,213 @@
+import asyncio
+import contextlib
+import io
+import time
+from collections import Counter
+from core.config import get_settings
+from services.ai_scheduler import AIScheduler, SubmitOnlyScheduler
+from services.candle_scheduler import CandleScheduler, Evaluation, next_close_ms
+from services.futures_data_fetcher import FuturesDataFetcher
+from services.market_monitor import MarketMonitor
+from services.mock_binance_server import MockBinanceServer
+from test_ai_scheduler import FakeAnalyzer
+
+MINUTE = 60_000
+HOUR = 3_600_000
+
+def test_evaluations_follow_candle_closes():
+    start = 1_700_006_400_000 + 5   # 4h K线开盘后 5ms
+    scheduler = CandleScheduler(close_delay=1.0)
+    scheduler.set_pairs([("A", "1m"), ("A", "4h"), ("B", "15m")], start)
+    # 加入时立即分析最近已收盘的K线（开盘后1秒内仍是上一根）
+    first = scheduler.pop_due(start)
+    assert sorted((e.interval, e.close_ms) for e in first) == [
+        ("15m", start - 5 - 15 * MINUTE), ("1m", start - 5 - MINUTE), ("4h", start - 5 - 4 * HOUR)
+    ]
+
+    counts = Counter()
+    while scheduler.next_due_ms() <= start + 4 * HOUR:
+        now = scheduler.next_due_ms()
+        for evaluation in scheduler.pop_due(now):
+            assert evaluation.at_close and now == evaluation.close_ms + 1000
+            counts[evaluation.interval] += 1
+    # 4小时内：固定60秒扫描时每个交易对x周期都要分析240次
+    assert counts == {"1m": 240, "15m": 16, "4h": 1}
+
+    # 移除后重新加入不会留下重复的调度
+    scheduler.remove("A", "1m")
+    scheduler.add("A", "1m", now)
+    for due_ms in (now, now + MINUTE):
+        assert Counter((e.symbol, e.interval) for e in scheduler.pop_due(due_ms))[("A", "1m")] == 1
+    assert next_close_ms("1w", 0) == 4 * 86_400_000
+
+def test_intra_candle_checks():
+    start = 1_700_006_400_000 + 2000
+    scheduler = CandleScheduler(close_delay=1.0, intra_candle_seconds=900)
+    scheduler.add("A", "1h", start)
+    scheduler.pop_due(start)
+    events = []
+    while len(events) < 5:
+        now = scheduler.next_due_ms()
+        events += [(now - start + 2000, e.at_close) for e in scheduler.pop_due(now)]
+    assert events == [(900_000, False), (1_800_000, False), (2_700_000, False), (HOUR + 1000, True), (HOUR + 900_000, False)]
+
+class VirtualClockFetcher(FuturesDataFetcher):
+    """直接从 MockBinanceServer 生成K线（不走HTTP），服务器时间比本地快 offset_ms"""
+
+    def __init__(self, server, clock, offset_ms):
+        super().__init__(base_url="http://unused")
+        self.recorder = None
+        self.server = server
+        self.clock = clock
+        self.offset_ms = offset_ms
+        self.requests = Counter()
+
+    async def get_server_time(self):
+        return self.clock() + self.offset_ms
+
+    async def get_klines_raw(self, symbol, interval, start_time=None, end_time=None, limit=None):
+        self.requests[symbol] += 1
+        return self.server.klines(
+            symbol, interval,
+            int(start_time.timestamp() * 1000) if start_time else None,
+            int(end_time.timestamp() * 1000) if end_time else None,
+            min(limit or 500, 1500),
+            now_ms=self.clock() + self.offset_ms
+        )
+
+class VirtualClockMonitor(MarketMonitor):
+    """本地时间只在等待时前进"""
+
+    def __init__(self, server, offset_ms):
+        super().__init__()
+        self.virtual_ms = server.started_ms
+        self.data_fetcher = VirtualClockFetcher(server, lambda: self.virtual_ms, offset_ms)
+        self.ai_scheduler = None
+        self.signal_generator.ai_scheduler = SubmitOnlyScheduler()
+
+    def _now(self):
+        from datetime import datetime, timezone
+        return datetime.fromtimestamp(self.virtual_ms / 1000, tz=timezone.utc)
+
+    async def _wait_until(self, server_ms):
+        self.virtual_ms = max(self.virtual_ms, server_ms - self.clock_offset_ms)
+
+def test_monitor_analyses_closed_candles_on_schedule():
+    server = MockBinanceServer(symbols=["BTCUSDT", "ETHUSDT"])
+    monitor = VirtualClockMonitor(server, offset_ms=2500)
+    analyses = []
+
+    async def collect(symbol, market_info):
+        analyses.append((symbol, market_info["interval"], market_info["timestamp"], monitor._server_ms()))
+
+    monitor.add_callback(collect)
+    with contextlib.redirect_stdout(io.StringIO()):
+        # 启动时一次 + 2小时内8次15m收盘
+        asyncio.run(monitor.start_monitoring(["BTCUSDT", "ETHUSDT"], ["15m", "1h"], cycles=9))
+
+    # 按真实时间测得的偏差接近模拟的2.5秒
+    assert abs(monitor.clock_offset_ms - 2500) < 1000
+    counts = Counter((symbol, interval) for symbol, interval, _, _ in analyses)
+    assert counts == {("BTCUSDT", "15m"): 9, ("ETHUSDT", "15m"): 9, ("BTCUSDT", "1h"): 3, ("ETHUSDT", "1h"): 3}
+    for symbol, interval, timestamp, server_ms in analyses[2 * 2:]:
+        length = 15 * MINUTE if interval == "15m" else HOUR
+        open_ms = int(timestamp.value // 1_000_000)
+        # 分析的是刚收盘的K线，在收盘后约1秒（服务器时间）
+        assert open_ms % length == 0
+        assert 0 < server_ms - (open_ms + length) <= 2000
+    # 每个交易对每次收盘只请求一次（首次下载历史需要分页）
+    assert all(count <= 9 + 2 for count in monitor.data_fetcher.requests.values())
+
+def test_stop_interrupts_wait():
+    server = MockBinanceServer(symbols=["BTCUSDT"])
+
+    async def run():
+        monitor = MarketMonitor()
+        monitor.data_fetcher = VirtualClockFetcher(server, lambda: int(time.time() * 1000), 0)
+        monitor.ai_scheduler = None
+        monitor.signal_generator.ai_scheduler = SubmitOnlyScheduler()
+        task = asyncio.create_task(monitor.start_monitoring(["BTCUSDT"], ["4h"]))
+        await asyncio.sleep(0.5)
+        started = time.perf_counter()
+        monitor.stop_monitoring()
+        await asyncio.wait_for(task, 2)
+        return time.perf_counter() - started
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        assert asyncio.run(run()) < 1
+
+def test_due_interval_without_new_candles():
+    # 本地合成时，到期周期的K线已在之前的更新中合成（没有变化）也要分析，不丢失收盘
+    server = MockBinanceServer(symbols=["BTCUSDT"])
+    monitor = VirtualClockMonitor(server, offset_ms=0)
+    analyses = []
+
+    async def collect(symbol, market_info):
+        analyses.append((market_info["interval"], market_info["timestamp"]))
+
+    async def run():
+        monitor.add_callback(collect)
+        intervals = ["15m", "1h"]
+        close_ms = next_close_ms("1h", monitor._server_ms()) - HOUR
+        await monitor._evaluate(["BTCUSDT"], intervals, [Evaluation("BTCUSDT", "15m", close_ms, True)])
+        # 同一时刻的第二次分析没有新的K线
+        await monitor._evaluate(["BTCUSDT"], intervals, [Evaluation("BTCUSDT", "1h", close_ms, True)])
+        return close_ms
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        close_ms = asyncio.run(run())
+    assert [interval for interval, _ in analyses] == ["15m", "1h"]
+    assert analyses[1][1].value // 1_000_000 == close_ms - HOUR
+
+class StreamingFakeAnalyzer(FakeAnalyzer):
+    """接受流式初步结果回调、返回完整关键点的模拟AI分析器"""
+
+    async def analyze_market(self, symbol, market_info, on_preliminary=None):
+        result = await super().analyze_market(symbol, market_info)
+        result["key_points"] = {"trend_score": 1, "confidence": 60}
+        return result
+
+def test_close_evaluation_runs_ai():
+    # 收盘分析只传入已收盘的K线，AI任务在正在形成的K线收盘前有效，不会一提交就过期
+    server = MockBinanceServer(symbols=["BTCUSDT"])
+    settings = get_settings()
+    threshold = settings.ai_confidence_threshold
+    results = []
+
+    async def collect(symbol, market_info):
+        if market_info.get("ai_update"):
+            results.append(market_info["signals"]["ai"])
+
+    async def run():
+        ai_scheduler = AIScheduler(StreamingFakeAnalyzer(), request_timeout=5)
+        await ai_scheduler.start()
+        monitor = MarketMonitor()
+        monitor.data_fetcher = VirtualClockFetcher(server, lambda: int(time.time() * 1000), 0)
+        monitor.ai_scheduler = None
+        monitor.signal_generator.ai_scheduler = ai_scheduler
+        monitor.add_callback(collect)
+        try:
+            await monitor.start_monitoring(["BTCUSDT"], ["15m", "1h"], cycles=1)
+            deadline = time.time() + 2
+            while len(results) < 2 and time.time() < deadline:
+                await asyncio.sleep(0.01)
+        finally:
+            await ai_scheduler.close()
+
+    settings.ai_confidence_threshold = 0
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            asyncio.run(run())
+    finally:
+        settings.ai_confidence_threshold = threshold
+    assert len(results) == 2
+    assert all("error" not in ai and ai["analysis"] == "BTCUSDT" for ai in results)
+
+if __name__ == "__main__":
+    test_evaluations_follow_candle_closes()
+    test_intra_candle_checks()
+    test_monitor_analyses_closed_candles_on_schedule()
+    test_stop_interrupts_wait()
+    test_due_interval_without_new_candles()
+    test_close_evaluation_runs_ai()
+    print("收盘调度测试通过")
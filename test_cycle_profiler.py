@@ -0,0 +1,47 @@
+import io
+import os
+import sys
+from services.cycle_profiler import CycleProfiler, find_profiles, parse_label, report
+from services.technical_analysis import TechnicalAnalyzer
+from test_candle_resampler import make_klines
+
+def test_disabled_installs_no_hook():
+    profiler = CycleProfiler()
+    assert not profiler.begin_cycle()
+    with profiler.section("BTCUSDT", "1h"):
+        assert sys.getprofile() is None
+    assert profiler.end_cycle() == []
+
+def test_records_next_cycles(tmp_path):
+    profiler = CycleProfiler(str(tmp_path))
+    profiler.arm(1)
+    df = make_klines(300)
+
+    assert profiler.begin_cycle()
+    for symbol in ("BTCUSDT", "ETHUSDT"):
+        with profiler.section(symbol, "1h"):
+            TechnicalAnalyzer().calculate_indicators(df)
+    paths = profiler.end_cycle()
+    assert len(paths) == 2 and all(os.path.exists(p) for p in paths)
+    assert parse_label(paths[0]) == ("BTCUSDT", "1h")
+
+    # 只记录 arm 指定的轮数
+    assert not profiler.armed
+    assert not profiler.begin_cycle()
+    assert profiler.end_cycle() == []
+
+    files = find_profiles([str(tmp_path)], symbol="ethusdt")
+    assert len(files) == 1
+    out = io.StringIO()
+    report(find_profiles([str(tmp_path)]), top=10, sort="cumulative", stream=out)
+    text = out.getvalue()
+    assert "BTCUSDT" in text and "ETHUSDT" in text
+    assert "calculate_indicators" in text
+
+if __name__ == "__main__":
+    import tempfile
+    from pathlib import Path
+    test_disabled_installs_no_hook()
+    with tempfile.TemporaryDirectory() as tmp:
+        test_records_next_cycles(Path(tmp))
+    print("性能分析测试通过")
@@ -0,0 +1,78 @@
+import time
+import numpy as np
+import pytest
+from ta.momentum import RSIIndicator
+from ta.trend import ADXIndicator, PSARIndicator
+from ta.volume import MFIIndicator, OnBalanceVolumeIndicator
+from services import indicator_kernels as kernels
+from services.technical_analysis import TechnicalAnalyzer
+from test_candle_resampler import make_klines
+
+def arrays(df):
+    return [df[c].to_numpy(dtype=np.float64) for c in ("high", "low", "close", "volume")]
+
+def assert_matches(values, expected):
+    assert np.allclose(values, np.asarray(expected, dtype=np.float64), rtol=1e-9, atol=1e-9, equal_nan=True)
+
+@pytest.mark.parametrize("n", [30, 250, 2000])
+def test_kernels_match_ta(n):
+    # ta 的 PSAR 按标签写入，只在整数索引上得到正确结果
+    df = make_klines(n).reset_index(drop=True)
+    high, low, close, volume = arrays(df)
+
+    assert_matches(kernels.rsi(close), RSIIndicator(close=df["close"], window=14).rsi())
+
+    adx = ADXIndicator(high=df["high"], low=df["low"], close=df["close"])
+    for values, expected in zip(kernels.adx(high, low, close), (adx.adx(), adx.adx_pos(), adx.adx_neg())):
+        assert_matches(values, expected)
+
+    psar = PSARIndicator(high=df["high"], low=df["low"], close=df["close"])
+    for values, expected in zip(kernels.psar(high, low, close), (psar.psar(), psar.psar_up(), psar.psar_down())):
+        assert_matches(values, expected)
+
+    assert_matches(kernels.obv(close, volume), OnBalanceVolumeIndicator(close=df["close"], volume=df["volume"]).on_balance_volume())
+    mfi = MFIIndicator(high=df["high"], low=df["low"], close=df["close"], volume=df["volume"])
+    assert_matches(kernels.mfi(high, low, close, volume), mfi.money_flow_index())
+
+def test_ewm_backends_agree():
+    values = np.random.default_rng(1).normal(size=500)
+    assert np.allclose(kernels.ewm(values, 1 / 14), kernels._ewm_loop(values, 1 / 14), rtol=1e-12)
+
+def test_short_history():
+    high, low, close, volume = arrays(make_klines(10))
+    assert np.isnan(kernels.adx(high, low, close)[0]).all()
+    assert np.isnan(kernels.mfi(high, low, close, volume)).all()
+    assert np.isnan(kernels.rsi(close)).all()
+
+def test_analyzer_uses_kernels():
+    df = make_klines(500)
+    indicators = TechnicalAnalyzer().calculate_indicators(df, ["psar", "adx", "rsi", "obv", "mfi"])
+    high, low, close, volume = arrays(df)
+    assert np.isclose(indicators["psar"], kernels.psar(high, low, close)[0][-1], rtol=1e-6)
+    assert np.isclose(indicators["mfi"], kernels.mfi(high, low, close, volume)[-1], rtol=1e-6)
+
+def test_kernels_are_faster():
+    df = make_klines(5000).reset_index(drop=True)
+    high, low, close, volume = arrays(df)
+
+    start = time.perf_counter()
+    kernels.psar(high, low, close)
+    kernels.adx(high, low, close)
+    kernels.mfi(high, low, close, volume)
+    fast = time.perf_counter() - start
+
+    start = time.perf_counter()
+    PSARIndicator(high=df["high"], low=df["low"], close=df["close"]).psar()
+    ADXIndicator(high=df["high"], low=df["low"], close=df["close"]).adx()
+    MFIIndicator(high=df["high"], low=df["low"], close=df["close"], volume=df["volume"]).money_flow_index()
+    slow = time.perf_counter() - start
+    assert fast * 10 < slow, (fast, slow)
+
+if __name__ == "__main__":
+    for n in (30, 250, 2000):
+        test_kernels_match_ta(n)
+    test_ewm_backends_agree()
+    test_short_history()
+    test_analyzer_uses_kernels()
+    test_kernels_are_faster()
+    print(f"指标内核测试通过（{kernels.BACKEND}）")
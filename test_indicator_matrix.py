@@ -0,0 +1,74 @@
+import time
+import numpy as np
+import pytest
+from services.indicator_matrix import IndicatorMatrix, parse_filters
+from services.indicator_snapshot import IndicatorSnapshot
+
+def fill(matrix: IndicatorMatrix, count: int, seed: int = 5):
+    rng = np.random.default_rng(seed)
+    data = {}
+    for i in range(count):
+        symbol = f"S{i:04d}USDT"
+        values = {"rsi": float(rng.uniform(0, 100)), "adx": float(rng.uniform(0, 60))}
+        if i % 50 == 0:
+            values.pop("adx")        # 部分交易对缺少指标
+        matrix.update(symbol, "1h", IndicatorSnapshot.from_dict(values), timestamp=1_700_000_000 + i)
+        data[symbol] = values
+    return data
+
+def test_filter_and_rank():
+    matrix = IndicatorMatrix(capacity=4)   # 触发扩容
+    data = fill(matrix, 1000)
+    matrix.update("S0001USDT", "4h", {"rsi": 10.0})
+
+    results = matrix.query("1h", parse_filters("rsi<30, adx>25"), sort_by="adx")
+    expected = sorted(
+        (s for s, v in data.items() if v["rsi"] < 30 and v.get("adx", 0) > 25),
+        key=lambda s: -data[s]["adx"]
+    )
+    assert [r["symbol"] for r in results] == expected
+    assert set(results[0]["values"]) == {"rsi", "adx"}
+    assert np.isclose(results[0]["values"]["adx"], data[expected[0]]["adx"], rtol=1e-6)
+
+    # 缺失值排在最后，升序和数量限制
+    ranked = matrix.query("1h", sort_by="adx", descending=False, limit=len(data))
+    assert ranked[-1]["values"]["adx"] is None
+    assert np.isclose(ranked[0]["values"]["adx"], min(v["adx"] for v in data.values() if "adx" in v), rtol=1e-6)
+
+    four_hour = matrix.query("4h", fields=["rsi"])
+    assert [(r["symbol"], r["values"]["rsi"]) for r in four_hour] == [("S0001USDT", 10.0)]
+    assert matrix.query("1d") == []
+
+def test_remove_and_get():
+    matrix = IndicatorMatrix()
+    fill(matrix, 10)
+    matrix.remove("S0003USDT")
+    assert len(matrix) == 9
+    assert matrix.get("S0003USDT", "1h") is None
+    assert matrix.get("S0009USDT", "1h") is not None
+    assert "S0003USDT" not in [r["symbol"] for r in matrix.query("1h")]
+
+def test_parse_filters():
+    assert parse_filters("rsi<30,adx >= 25.5") == [("rsi", "<", 30.0), ("adx", ">=", 25.5)]
+    assert parse_filters("") == []
+    with pytest.raises(ValueError):
+        parse_filters("unknown<1")
+    with pytest.raises(ValueError):
+        parse_filters("rsi~30")
+
+def test_query_speed():
+    matrix = IndicatorMatrix()
+    fill(matrix, 5000)
+    conditions = parse_filters("rsi<30,adx>25")
+    start = time.perf_counter()
+    for _ in range(100):
+        matrix.query("1h", conditions, sort_by="adx", limit=20)
+    elapsed = (time.perf_counter() - start) / 100
+    assert elapsed < 0.002, elapsed
+
+if __name__ == "__main__":
+    test_filter_and_rank()
+    test_remove_and_get()
+    test_parse_filters()
+    test_query_speed()
+    print("指标矩阵测试通过")
@@ -0,0 +1,90 @@
+import asyncio
+import time
+import numpy as np
+import pytest
+from services.indicator_registry import REGISTRY, IndicatorContext, resolve
+from services.indicator_snapshot import BASE_INDICATORS, INDICATOR_NAMES
+from services.signal_generator import SignalGenerator
+from services.technical_analysis import TechnicalAnalyzer
+from test_candle_resampler import make_klines
+
+def test_registry_covers_schema():
+    assert set(n for i in REGISTRY.values() for n in i.outputs) == set(INDICATOR_NAMES)
+    # 依赖排在使用方之前
+    assert [i.name for i in resolve(["macd_hist", "rsi"])] == ["macd", "macd_hist", "rsi"]
+    assert [i.name for i in resolve(["bb_width"])] == ["bollinger", "bb_width"]
+    with pytest.raises(ValueError):
+        resolve(["unknown"])
+
+def test_selected_matches_full():
+    df = make_klines(300)
+    full = TechnicalAnalyzer().calculate_indicators(df)
+    assert not np.isnan(full["ichimoku_a"])
+
+    analyzer = TechnicalAnalyzer()
+    selected = analyzer.calculate_indicators(df, BASE_INDICATORS)
+    assert analyzer.context.computed == ["rsi", "macd"]
+    for name in INDICATOR_NAMES:
+        if name in BASE_INDICATORS:
+            assert selected[name] == full[name]
+        else:
+            assert np.isnan(selected[name])
+
+    # 派生指标与 ta 的结果一致
+    derived = TechnicalAnalyzer().calculate_indicators(df, ["macd_hist", "bb_width"])
+    assert np.isclose(derived["macd_hist"], full["macd_hist"])
+    assert np.isclose(derived["bb_width"], full["bb_width"])
+
+    # 趋势信号按需补充缺少的指标
+    assert analyzer.get_trend_signal() == TechnicalAnalyzer.get_trend_signal(
+        _with_indicators(TechnicalAnalyzer(), df)
+    )
+    assert "adx" in analyzer.context.computed and "ichimoku" not in analyzer.context.computed
+
+def _with_indicators(analyzer: TechnicalAnalyzer, df) -> TechnicalAnalyzer:
+    analyzer.calculate_indicators(df)
+    return analyzer
+
+def test_context_is_memoized():
+    df = make_klines(300)
+    context = IndicatorContext(df)
+    first = TechnicalAnalyzer().calculate_indicators(df, ["rsi", "macd"], context)
+    second = TechnicalAnalyzer().calculate_indicators(df, ["rsi", "macd_hist"], context)
+    assert context.computed == ["rsi", "macd", "macd_hist"]
+    assert first["rsi"] == second["rsi"]
+    # 不同的K线不复用上下文
+    other = TechnicalAnalyzer()
+    other.calculate_indicators(make_klines(300, seed=9), ["rsi"], context)
+    assert other.context is not context
+
+def test_signal_generator_computes_only_inputs():
+    generator = SignalGenerator()
+    generator.ai_analyzer.api_key = ""   # 不调用AI接口
+    generator.indicator_names = list(BASE_INDICATORS)
+    signals = asyncio.run(generator.generate_signals(make_klines(300), symbol="BTCUSDT", interval="1m"))
+    assert generator.technical_analyzer.context.computed == ["rsi", "macd"]
+    assert not np.isnan(signals["technical"]["rsi"])
+    assert SignalGenerator._indicator_names("adx, atr") == ["rsi", "macd", "macd_signal", "adx", "atr"]
+    assert SignalGenerator._indicator_names("all") is None
+    with pytest.raises(ValueError):
+        SignalGenerator._indicator_names("rsi2")
+
+def test_selected_is_faster():
+    df = make_klines(1000)
+    start = time.perf_counter()
+    for _ in range(5):
+        TechnicalAnalyzer().calculate_indicators(df)
+    full = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(5):
+        TechnicalAnalyzer().calculate_indicators(df, BASE_INDICATORS)
+    selected = time.perf_counter() - start
+    assert selected < full / 3, (selected, full)
+
+if __name__ == "__main__":
+    test_registry_covers_schema()
+    test_selected_matches_full()
+    test_context_is_memoized()
+    test_signal_generator_computes_only_inputs()
+    test_selected_is_faster()
+    print("指标注册表测试通过")
@@ -0,0 +1,53 @@
+import pickle
+import numpy as np
+from models.crypto import TechnicalAnalysis
+from services.indicator_snapshot import INDICATOR_NAMES, IndicatorSnapshot, stack, unstack
+from services.technical_analysis import TechnicalAnalyzer
+from test_candle_resampler import make_klines
+
+def test_schema_matches_model():
+    fields = [f for f in TechnicalAnalysis.model_fields if f not in ("symbol", "timestamp")]
+    assert list(INDICATOR_NAMES) == fields
+
+def test_snapshot_behaves_like_dict():
+    analyzer = TechnicalAnalyzer()
+    snapshot = analyzer.calculate_indicators(make_klines(250))
+    assert isinstance(snapshot, IndicatorSnapshot)
+    assert set(snapshot.keys()) == set(INDICATOR_NAMES)
+    assert "rsi" in snapshot and "trend" not in snapshot
+    assert isinstance(snapshot["rsi"], float)
+    assert snapshot.get("missing", "N/A") == "N/A"
+    assert analyzer.get_trend_signal()
+
+    # float32 取值按最短表示转换
+    snapshot["sma_20"] = 0.1
+    assert snapshot["sma_20"] == 0.1
+
+    # 缺失值在API边界转换为 None
+    empty = IndicatorSnapshot.from_dict({"rsi": 25.5})
+    data = empty.to_dict(nan_as_none=True)
+    assert data["rsi"] == 25.5 and data["macd"] is None
+    model = TechnicalAnalysis(symbol="BTCUSDT", timestamp="2024-01-01T00:00:00", **data)
+    assert model.rsi == 25.5
+
+    restored = pickle.loads(pickle.dumps(empty))
+    assert np.array_equal(restored.values, empty.values, equal_nan=True)
+
+def test_stack_is_compact():
+    snapshots = [IndicatorSnapshot.from_dict({"rsi": float(i), "adx": 10.0 + i}) for i in range(3000)]
+    matrix = stack(snapshots)
+    assert matrix.shape == (3000, len(INDICATOR_NAMES))
+    assert matrix.dtype == np.float32
+    # 3000个交易对不到500KB
+    assert matrix.nbytes < 500 * 1024
+    assert np.array_equal(matrix[:, INDICATOR_NAMES.index("rsi")], np.arange(3000, dtype=np.float32))
+
+    rows = unstack(matrix)
+    rows[5]["rsi"] = 99.0
+    assert matrix[5, INDICATOR_NAMES.index("rsi")] == 99.0
+
+if __name__ == "__main__":
+    test_schema_matches_model()
+    test_snapshot_behaves_like_dict()
+    test_stack_is_compact()
+    print("指标快照测试通过")
@@ -0,0 +1,43 @@
+from services.key_point_extractor import KeyPointExtractor
+from benchmarks.bench_key_points import (
+    DEFAULT_CORPUS, legacy_extract_key_points, load_corpus
+)
+
+extractor = KeyPointExtractor()
+
+def test_overlapping_keywords():
+    # 较长的关键词优先，同时计入被包含的较短关键词
+    kp = extractor.extract("短线强势上涨，中期震荡偏多")
+    assert kp["trend"] == "强势上涨"
+    assert kp["trend_score"] == 3
+
+    # 跨越边界的重叠：同时命中"注意风险"(3)和"风险较大"(4)
+    assert extractor.risk_level("请注意风险较大的时段") == 4
+    # "很强烈"同时命中"很强"和"强烈"
+    assert extractor.extract("多头信号很强烈")["confidence"] == 85
+
+def test_tie_breaking_follows_table_order():
+    # 同分时与原实现一致，取表中靠前的"上涨"
+    kp = extractor.extract("前期下跌后开始上涨")
+    assert (kp["trend"], kp["trend_score"]) == ("上涨", 2)
+
+def test_price_levels():
+    kp = extractor.extract("支撑位: 95.5 支撑位在92 阻力位：108 止损: 90 止损位 91 目标位: 110 目标 120")
+    assert kp["support_levels"] == [92.0, 95.5]
+    assert kp["resistance_levels"] == [108.0]
+    assert kp["stop_loss"] == 90.0
+    assert kp["take_profit_levels"] == [110.0, 120.0]
+
+def test_matches_legacy_on_corpus():
+    for text in load_corpus(DEFAULT_CORPUS):
+        assert extractor.extract(text) == legacy_extract_key_points(text)
+        # 截断后的部分文本（流式输出）也保持一致
+        for end in range(0, len(text), 37):
+            assert extractor.extract(text[:end]) == legacy_extract_key_points(text[:end])
+
+if __name__ == "__main__":
+    test_overlapping_keywords()
+    test_tie_breaking_follows_table_order()
+    test_price_levels()
+    test_matches_legacy_on_corpus()
+    print("关键点提取测试通过")
@@ -0,0 +1,74 @@
+import asyncio
+import contextlib
+import io
+from services.futures_data_fetcher import FuturesDataFetcher
+from services.market_metadata import MarketMetadata, MarketSnapshot
+from services.mock_binance_server import MockBinanceServer, symbol_names
+
+def test_snapshot_indexes():
+    server = MockBinanceServer(symbols=["ETHUSDT", "BTCUSDT", "ETHBTC"])
+
+    async def run():
+        url = await server.start()
+        try:
+            return await FuturesDataFetcher(base_url=url).get_exchange_info()
+        finally:
+            await server.stop()
+
+    exchange_info = asyncio.run(run())
+    exchange_info['symbols'][2].update(quoteAsset='BTC', baseAsset='ETH', status='BREAK')
+    snapshot = MarketSnapshot.from_exchange_info(exchange_info)
+    assert len(snapshot) == 3
+    assert snapshot.symbols() == ["BTCUSDT", "ETHBTC", "ETHUSDT"]
+    assert snapshot.symbols(status="TRADING") == ["BTCUSDT", "ETHUSDT"]
+    assert snapshot.symbols(base_asset="eth") == ["ETHBTC", "ETHUSDT"]
+    assert snapshot.symbols(base_asset="ETH", status="TRADING") == ["ETHUSDT"]
+    assert snapshot.symbols(quote_asset="USDT", status="HALT") == []
+
+    info = snapshot.get("btcusdt")
+    assert (info.base_asset, info.quote_asset, info.tick_size, info.step_size) == ("BTC", "USDT", 0.0001, 0.001)
+    assert info.to_dict()["filters"][0]["filterType"] == "PRICE_FILTER"
+    assert snapshot.get("XRPUSDT") is None
+
+def test_lookups_use_one_request_and_refresh_by_diff():
+    server = MockBinanceServer(symbols=symbol_names(50))
+
+    async def run():
+        url = await server.start()
+        try:
+            metadata = MarketMetadata(FuturesDataFetcher(base_url=url).get_exchange_info, refresh_seconds=0.2)
+            # 并发的第一次读取只请求一次 exchangeInfo，之后的查询只读内存
+            infos = await asyncio.gather(*(metadata.get_symbol(s) for s in server.symbols))
+            assert [info.symbol for info in infos] == server.symbols
+            assert len(await metadata.symbols(status="TRADING")) == 50
+            assert server.stats['requests'] == 1
+            first = metadata.snapshot
+
+            # 过期后读取仍立即返回旧快照，后台刷新只保留变化的部分
+            server.symbols = server.symbols[1:] + ["NEWUSDT"]
+            await asyncio.sleep(0.25)
+            assert await metadata.get_snapshot() is first
+            await asyncio.sleep(0.1)
+            assert server.stats['requests'] == 2
+            assert metadata.last_diff == (["NEWUSDT"], [symbol_names(50)[0]], [])
+            assert metadata.snapshot.get(server.symbols[0]) is first.get(server.symbols[0])
+            assert (await metadata.get_symbol(symbol_names(50)[0])) is None
+
+            # 刷新失败时继续使用旧快照，retry_seconds 内不再重试
+            server.error_rate = 1.0
+            second = metadata.snapshot
+            await asyncio.sleep(0.25)
+            for _ in range(3):
+                assert await metadata.get_snapshot() is second
+                await asyncio.sleep(0.05)
+            assert server.stats['requests'] == 3
+        finally:
+            await server.stop()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        asyncio.run(run())
+
+if __name__ == "__main__":
+    test_snapshot_indexes()
+    test_lookups_use_one_request_and_refresh_by_diff()
+    print("交易对元数据测试通过")
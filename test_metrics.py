@@ -0,0 +1,99 @@
+import asyncio
+import time
+import pytest
+from services import metrics
+from services.metrics import Counter, Histogram, MetricsRegistry, record_upstream, stage
+from services.response_cache import ResponseCache
+from services.technical_analysis import TechnicalAnalyzer
+from test_candle_resampler import make_klines
+
+def test_render_format():
+    registry = MetricsRegistry()
+    requests = Counter('demo_requests_total', '请求次数', ('path',), registry=registry)
+    latency = Histogram('demo_seconds', '耗时', buckets=(0.1, 1.0), registry=registry)
+    requests.labels('/a"b').inc()
+    requests.labels('/a"b').inc(2)
+    latency.labels().observe(0.05)
+    latency.labels().observe(0.5)
+    latency.labels().observe(5)
+
+    text = registry.render()
+    assert '# TYPE demo_requests_total counter' in text
+    assert 'demo_requests_total{path="/a\\"b"} 3' in text
+    assert 'demo_seconds_bucket{le="0.1"} 1' in text
+    assert 'demo_seconds_bucket{le="1"} 2' in text
+    assert 'demo_seconds_bucket{le="+Inf"} 3' in text
+    assert 'demo_seconds_count 3' in text
+    with pytest.raises(ValueError):
+        requests.labels()
+
+def test_stage_and_upstream():
+    with stage('parse', 'TESTUSDT', '1m'):
+        pass
+    with pytest.raises(RuntimeError):
+        with stage('parse', 'TESTUSDT', '1m'):
+            raise RuntimeError('boom')
+    assert metrics.STAGE_SECONDS.labels('parse', 'TESTUSDT', '1m').count == 2
+    assert metrics.STAGE_ERRORS.labels('parse', 'TESTUSDT', '1m').value == 1
+
+    record_upstream('binance', 'klines', 200, {'X-MBX-USED-WEIGHT-1M': '42', 'Content-Type': 'application/json'})
+    assert metrics.UPSTREAM_WEIGHT.labels('binance', '1m').value == 42
+    text = metrics.render()
+    assert 'upstream_used_weight{upstream="binance",window="1m"} 42' in text
+    assert 'pipeline_stage_errors_total{stage="parse",symbol="TESTUSDT",interval="1m"} 1' in text
+
+def test_cache_requests():
+    cache = ResponseCache(name='test')
+
+    async def run():
+        async def compute():
+            return b'{}'
+        await cache.get_or_compute('k', 1, compute, time.time() + 60)
+        await cache.get_or_compute('k', 1, compute, time.time() + 60)
+
+    asyncio.run(run())
+    assert metrics.CACHE_REQUESTS.labels('test', 'miss').value == 1
+    assert metrics.CACHE_REQUESTS.labels('test', 'hit').value == 1
+
+def test_stage_overhead():
+    # 计时本身的开销应远小于被计时的阶段（低于1%）
+    df = make_klines(300)
+    start = time.perf_counter()
+    TechnicalAnalyzer().calculate_indicators(df)
+    indicators = time.perf_counter() - start
+
+    n = 1000
+    start = time.perf_counter()
+    for _ in range(n):
+        with stage('overhead', 'TESTUSDT', '1m'):
+            pass
+    overhead = (time.perf_counter() - start) / n
+    assert overhead < indicators * 0.01
+
+def test_metrics_server():
+    # 监控进程在单独的端口上提供 /metrics
+    async def run():
+        import aiohttp
+        metrics.CYCLE_SECONDS.labels().observe(0.5)
+        runner = await metrics.start_metrics_server(0, host='127.0.0.1')
+        try:
+            port = runner.addresses[0][1]
+            async with aiohttp.ClientSession() as session:
+                async with session.get(f"http://127.0.0.1:{port}/metrics") as response:
+                    assert response.status == 200
+                    assert response.headers['Content-Type'] == metrics.CONTENT_TYPE
+                    return await response.text()
+        finally:
+            await runner.cleanup()
+
+    text = asyncio.run(run())
+    assert text == metrics.render()
+    assert 'monitor_cycle_seconds_count' in text
+
+if __name__ == "__main__":
+    test_render_format()
+    test_stage_and_upstream()
+    test_cache_requests()
+    test_stage_overhead()
+    test_metrics_server()
+    print("运行指标测试通过")
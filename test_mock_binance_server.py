@@ -0,0 +1,97 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+import aiohttp
+import pytest
+from services.futures_data_fetcher import FuturesDataFetcher
+from services.mock_binance_server import MockBinanceServer, klines_weight
+from benchmarks.load_monitor import run_load_test
+
+MINUTE = 60_000
+
+def test_klines_query_semantics():
+    server = MockBinanceServer(symbols=["BTCUSDT"], history=500)
+    now = server.started_ms
+    latest = server.klines("BTCUSDT", "1m", limit=10, now_ms=now)
+    assert len(latest) == 10
+    assert latest[-1][0] == now // MINUTE * MINUTE
+    assert all(b[0] - a[0] == MINUTE for a, b in zip(latest, latest[1:]))
+
+    start = latest[0][0] - 5 * MINUTE + 1
+    page = server.klines("BTCUSDT", "1m", start_time=start, limit=3, now_ms=now)
+    assert [row[0] for row in page] == [latest[0][0] - 4 * MINUTE + i * MINUTE for i in range(3)]
+    assert server.klines("BTCUSDT", "1m", end_time=latest[0][0], limit=2, now_ms=now)[-1][0] == latest[0][0]
+
+    # 同一参数生成的数据相同；当前K线随时间成形
+    assert MockBinanceServer(symbols=["BTCUSDT"], history=500).klines("BTCUSDT", "1m", limit=10, now_ms=now)[:-1] == latest[:-1]
+    opening = server.klines("BTCUSDT", "1m", limit=1, now_ms=latest[-1][0])[0]
+    assert opening[1] == opening[4] and float(opening[5]) == 0
+    row = latest[-1]
+    assert float(row[2]) >= max(float(row[1]), float(row[4])) and float(row[3]) <= min(float(row[1]), float(row[4]))
+
+def test_recorded_candles_are_shifted_to_now():
+    recorded = [[1_000 * MINUTE + i * MINUTE, "1", "2", "0.5", "1.5", "10", 1_000 * MINUTE + (i + 1) * MINUTE - 1,
+                 "15", 3, "5", "7.5", "0"] for i in range(5)]
+    server = MockBinanceServer(recorded={("ethusdt", "1m"): recorded})
+    assert server.symbols == ["ETHUSDT"]
+    rows = server.klines("ETHUSDT", "1m", limit=10, now_ms=server.started_ms + 2 * MINUTE)
+    assert len(rows) == 5
+    assert rows[-1][0] == server.started_ms // MINUTE * MINUTE
+    assert rows[0][1:6] == ["1.0000", "2.0000", "0.5000", "1.5000", "10.000"]
+
+def test_http_errors_and_weight():
+    assert [klines_weight(n) for n in (99, 100, 500, 1000, 1500)] == [1, 2, 5, 5, 10]
+
+    async def run():
+        server = MockBinanceServer(symbols=["BTCUSDT"], weight_limit=12, error_rate=0.0)
+        url = await server.start()
+        try:
+            async with aiohttp.ClientSession() as session:
+                async with session.get(f"{url}/fapi/v1/klines", params={"symbol": "BTCUSDT", "interval": "1m", "limit": "600"}) as r:
+                    assert r.status == 200
+                    assert r.headers["X-MBX-USED-WEIGHT-1M"] == "5"
+                    assert len(await r.json()) == 600
+                async with session.get(f"{url}/fapi/v1/klines", params={"symbol": "NOPE", "interval": "1m"}) as r:
+                    assert r.status == 400
+                async with session.get(f"{url}/fapi/v1/exchangeInfo") as r:
+                    assert [s["symbol"] for s in (await r.json())["symbols"]] == ["BTCUSDT"]
+                async with session.get(f"{url}/fapi/v1/ticker/24hr", params={"symbol": "BTCUSDT"}) as r:
+                    assert (await r.json())["symbol"] == "BTCUSDT"
+                async with session.get(f"{url}/fapi/v1/klines", params={"symbol": "BTCUSDT", "interval": "1m", "limit": "1500"}) as r:
+                    assert r.status == 429
+            assert server.stats["rate_limited"] == 1
+        finally:
+            await server.stop()
+
+    asyncio.run(run())
+
+def test_fetcher_and_monitor_against_server():
+    async def run():
+        server = MockBinanceServer(symbols=["BTCUSDT"], error_rate=0.0)
+        url = await server.start()
+        try:
+            fetcher = FuturesDataFetcher(base_url=url + "/")
+            assert fetcher.base_url == url
+            start = datetime.now(timezone.utc) - timedelta(minutes=1600 * 15)
+            rows = await fetcher.get_klines_range("BTCUSDT", "15m", start, raw=True)
+            assert len(rows) == 1600
+            with pytest.raises(Exception):
+                await fetcher.get_klines_raw("NOPE", "1m")
+        finally:
+            await server.stop()
+
+        result = await run_load_test(symbols=20, intervals=["15m", "1h"], cycles=2, error_rate=0.1, weight_limit=0, seed=1)
+        assert result["fetches"] == 40
+        assert 0 < result["fetch_errors"] < 40
+        # 出错的交易对不影响其他交易对：第一轮成功的交易对每个周期至少分析一次
+        assert result["analyses"] >= 2 * (20 - result["fetch_errors"])
+        assert result["server"]["errors"] >= result["fetch_errors"]
+        assert result["fetch_ms"]["p99"] >= result["fetch_ms"]["p50"] > 0
+
+    asyncio.run(run())
+
+if __name__ == "__main__":
+    test_klines_query_semantics()
+    test_recorded_candles_are_shifted_to_now()
+    test_http_errors_and_weight()
+    test_fetcher_and_monitor_against_server()
+    print("模拟Binance接口测试通过")
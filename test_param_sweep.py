@@ -0,0 +1,45 @@
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+from services.backtest import BacktestConfig, BacktestEngine
+from services.param_sweep import ParameterSweep, grid, random_samples
+from test_backtest import make_ohlcv
+
+def test_grid_and_random_samples():
+    space = {"hammer_ratio": [0.5, 0.6], "min_confidence": [30, 40, 50]}
+    assert len(grid(space)) == 6
+    # 组合总数不足时返回全部不重复的组合
+    assert len(random_samples(space, 100, seed=1)) == 6
+    samples = random_samples({"strong_score": (3.0, 5.0)}, 10, seed=1)
+    assert all(3.0 <= s["strong_score"] <= 5.0 for s in samples)
+
+def test_sweep_matches_single_backtest():
+    data = {"AAA": make_ohlcv(3000, seed=1), "BBB": make_ohlcv(3000, seed=2)}
+    param_sets = grid({
+        "hammer_ratio": [0.5, 0.6],
+        "rsi_overbought": [70, 75],
+        "min_confidence": [30, 50],
+    })
+    base = {"fee_rate": 0.001, "slippage": 0.0005}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        output = os.path.join(tmp, "sweep.csv")
+        ranked = ParameterSweep(workers=2, chunk_size=3, base=base).run(data, param_sets, output=output)
+        assert os.path.exists(output)
+        detail = pd.read_csv(os.path.join(tmp, "sweep_by_symbol.csv"))
+
+    assert list(ranked["rank"]) == list(range(1, len(param_sets) + 1))
+    assert ranked["sharpe"].is_monotonic_decreasing
+    assert len(detail) == len(param_sets) * len(data)
+
+    engine = BacktestEngine()
+    for param_id in (0, 5):
+        config = BacktestConfig(**base, **param_sets[param_id])
+        expected = np.mean([engine.run(df, config)["total_return"] for df in data.values()])
+        assert np.isclose(ranked.loc[param_id, "total_return"], expected)
+
+if __name__ == "__main__":
+    test_grid_and_random_samples()
+    test_sweep_matches_single_backtest()
+    print("参数扫描测试通过")
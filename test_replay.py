@@ -0,0 +1,92 @@
+import asyncio
+import contextlib
+import io
+import os
+from services.ai_scheduler import SubmitOnlyScheduler
+from services.kline_recorder import KlineArchive, KlineRecorder
+from services.market_monitor import MarketMonitor
+from services.mock_binance_server import MockBinanceServer
+from core.config import get_settings
+from services.replay import ReplayMonitor, replay
+from services.signal_hub import encode_market_info
+
+def test_archive_is_indexed_by_time(tmp_path):
+    recorder = KlineRecorder(str(tmp_path))
+    day = 1_704_067_200_000
+    for i in range(5):
+        recorder.record("futures", "BTCUSDT", "1m", {"limit": 2}, [[i]], time_ms=day + i * 1000)
+    recorder.record("spot", "ETHUSDT", "1m", {"limit": 2}, [[9]], time_ms=day + 86_400_000)
+    recorder.close()
+    assert sorted(os.listdir(tmp_path)) == ["klines-20240101.dat", "klines-20240101.idx",
+                                            "klines-20240102.dat", "klines-20240102.idx"]
+
+    archive = KlineArchive(str(tmp_path))
+    assert [r["rows"][0][0] for r in archive.records(day + 2000, day + 4000)] == [2, 3]
+    assert [r["symbol"] for r in archive.records(source="spot")] == ["ETHUSDT"]
+
+    # 只追加：重新打开后继续写入；未写完整的最后一帧被忽略
+    recorder = KlineRecorder(str(tmp_path))
+    recorder.record("futures", "BTCUSDT", "1m", {"limit": 2}, [[5]], time_ms=day + 5000)
+    recorder.close()
+    with open(tmp_path / "klines-20240101.dat", "r+b") as f:
+        f.truncate(os.path.getsize(tmp_path / "klines-20240101.dat") - 3)
+    assert [r["rows"][0][0] for r in archive.records(symbols=["btcusdt"])] == [0, 1, 2, 3, 4]
+
+def test_replay_matches_recorded_run(tmp_path):
+    symbols, intervals = ["BTCUSDT", "ETHUSDT"], ["15m", "1h"]
+
+    async def record():
+        server = MockBinanceServer(symbols=symbols, weight_limit=0)
+        url = await server.start()
+        live = []
+
+        async def collect(symbol, market_info):
+            live.append(encode_market_info(market_info))
+
+        try:
+            monitor = MarketMonitor()
+            monitor.data_fetcher.base_url = url
+            monitor.data_fetcher.recorder = KlineRecorder(str(tmp_path))
+            monitor.ai_scheduler = None
+            monitor.signal_generator.ai_scheduler = SubmitOnlyScheduler()
+            monitor.add_callback(collect)
+            with contextlib.redirect_stdout(io.StringIO()):
+                await monitor.start_monitoring(symbols, intervals, update_interval=0.05, cycles=3)
+            monitor.data_fetcher.recorder.close()
+        finally:
+            await server.stop()
+        return live
+
+    live = asyncio.run(record())
+    assert len(live) >= 4
+
+    first = asyncio.run(replay(str(tmp_path), intervals))
+    second = asyncio.run(replay(str(tmp_path), intervals, speed=1000))
+    assert first["signals"] == live
+    assert first["digest"] == second["digest"]
+    assert first["mismatches"] == 0
+
+    only_btc = asyncio.run(replay(str(tmp_path), intervals, symbols=["BTCUSDT"]))
+    assert only_btc["signals"] == [s for s in live if '"symbol":"BTCUSDT"' in s]
+
+def test_replay_does_not_publish_shared_state():
+    # SHARED_STATE=redis、SHARD_COORDINATOR=redis 时回放也不写入共享的信号频道和指标，不加入分片
+    settings = get_settings()
+    shared_state, coordinator = settings.shared_state, settings.shard_coordinator
+    settings.shared_state = settings.shard_coordinator = "redis"
+    try:
+        monitor = ReplayMonitor([])
+    finally:
+        settings.shared_state, settings.shard_coordinator = shared_state, coordinator
+    assert monitor.signal_bus is None and monitor.indicator_store is None
+    assert monitor.shard is None
+
+if __name__ == "__main__":
+    import tempfile
+    from pathlib import Path
+    with tempfile.TemporaryDirectory() as tmp:
+        test_archive_is_indexed_by_time(Path(tmp))
+    with tempfile.TemporaryDirectory() as tmp:
+        test_replay_matches_recorded_run(Path(tmp))
+    test_replay_does_not_publish_shared_state()
+    print("录制回放测试通过")
@@ -0,0 +1,105 @@
+import asyncio
+import time
+from services.candle_resampler import last_closed_open_time
+from services.response_cache import HIT, MISS, STALE, ResponseCache, etag_matches
+
+def test_last_closed_candle():
+    now = 1_700_000_123_456
+    assert last_closed_open_time("1h", now) == 1_699_995_600_000
+    assert last_closed_open_time("1m", 1_700_000_040_000) == 1_699_999_980_000
+    # 周线从周一开盘：2023-11-14 是周二，上一根已收盘周线开盘于 2023-11-06（周一）
+    assert last_closed_open_time("1w", now) == 1_699_228_800_000
+
+def test_hit_miss_and_coalescing():
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return b'{"rsi": 50}'
+
+    async def run():
+        cache = ResponseCache()
+        expires = time.time() + 60
+        results = await asyncio.gather(*[cache.get_or_compute("BTC", 1, compute, expires) for _ in range(20)])
+        assert len(calls) == 1
+        assert {status for _, status in results} == {MISS}
+        entry, status = await cache.get_or_compute("BTC", 1, compute, expires)
+        assert status == HIT and entry.body == b'{"rsi": 50}'
+        assert etag_matches(entry.etag, entry.etag)
+        assert etag_matches(f'"other", W/{entry.etag}', entry.etag)
+        assert not etag_matches('"other"', entry.etag)
+        return cache
+
+    cache = asyncio.run(run())
+    assert cache.stats[HIT] == 1 and cache.stats[MISS] == 20
+
+def test_stale_while_revalidate():
+    async def run():
+        cache = ResponseCache(stale_seconds=30)
+
+        async def old():
+            return b"old"
+
+        async def new():
+            await asyncio.sleep(0.01)
+            return b"new"
+
+        # 旧版本刚过期：先返回旧结果，后台刷新
+        await cache.get_or_compute("BTC", 1, old, expires_at=time.time() - 1)
+        entry, status = await cache.get_or_compute("BTC", 2, new, expires_at=time.time() + 60)
+        assert (entry.body, status) == (b"old", STALE)
+        await asyncio.sleep(0.05)
+        entry, status = await cache.get_or_compute("BTC", 2, new, expires_at=time.time() + 60)
+        assert (entry.body, status) == (b"new", HIT)
+
+        # 过期太久则等待新结果
+        await cache.get_or_compute("ETH", 1, old, expires_at=time.time() - 60)
+        entry, status = await cache.get_or_compute("ETH", 2, new, expires_at=time.time() + 60)
+        assert (entry.body, status) == (b"new", MISS)
+
+    asyncio.run(run())
+
+def test_errors_are_not_cached():
+    async def run():
+        cache = ResponseCache()
+
+        async def fail():
+            raise RuntimeError("boom")
+
+        try:
+            await cache.get_or_compute("BTC", 1, fail, time.time() + 60)
+        except RuntimeError:
+            pass
+        else:
+            raise AssertionError("应当抛出异常")
+        assert len(cache) == 0 and not cache._pending
+
+    asyncio.run(run())
+
+def test_lru_and_hit_speed():
+    async def run():
+        cache = ResponseCache(max_entries=100)
+
+        async def compute():
+            return b"{}"
+
+        for i in range(150):
+            await cache.get_or_compute(i, 1, compute, time.time() + 60)
+        assert len(cache) == 100 and cache.get(0, 1) is None and cache.get(149, 1) is not None
+
+        start = time.perf_counter()
+        for _ in range(10000):
+            await cache.get_or_compute(149, 1, compute, time.time() + 60)
+        return (time.perf_counter() - start) / 10000
+
+    # 命中路径每次请求远小于1毫秒
+    assert asyncio.run(run()) < 0.0001
+
+if __name__ == "__main__":
+    test_last_closed_candle()
+    test_hit_miss_and_coalescing()
+    test_stale_while_revalidate()
+    test_errors_are_not_cached()
+    test_lru_and_hit_speed()
+    print("响应缓存测试通过")
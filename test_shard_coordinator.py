@@ -0,0 +1,167 @@
+import asyncio
+import contextlib
+import io
+from collections import Counter
+import pytest
+from services.ai_scheduler import SubmitOnlyScheduler
+from services.market_monitor import MarketMonitor
+from services.mock_binance_server import MockBinanceServer, symbol_names
+from services.shard_coordinator import HashRing, MemoryCoordinator, RedisCoordinator, ShardMember
+
+PAIRS = [(symbol, interval) for symbol in symbol_names(60) for interval in ("1m", "5m")]
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def test_hash_ring_moves_only_departed_keys():
+    keys = [f"SYM{i}USDT:1m" for i in range(2000)]
+    ring = HashRing(["a", "b", "c", "d"])
+    owners = {key: ring.owner(key) for key in keys}
+    counts = Counter(owners.values())
+    assert min(counts.values()) > 2000 / 4 * 0.7
+
+    smaller = HashRing(["a", "b", "d"])
+    moved = [key for key in keys if smaller.owner(key) != owners[key]]
+    assert moved and all(owners[key] == "c" for key in moved)
+    assert HashRing([]).owner("x") is None
+
+def test_members_split_pairs_and_take_over():
+    async def run():
+        clock = FakeClock()
+        coordinator = MemoryCoordinator(clock)
+        members = [ShardMember(coordinator, name, lease_seconds=10) for name in ("a", "b", "c")]
+        for member in members:
+            await member.join()
+
+        def check(assigned, expected_pairs=PAIRS):
+            owners = Counter(pair for pairs in assigned for pair in pairs)
+            assert set(owners) == set(expected_pairs)
+            assert max(owners.values()) == 1
+
+        assigned = [await m.assign(PAIRS) for m in members]
+        check(assigned)
+        assert all(assigned)
+
+        # 按交易对分配时同一交易对的周期在同一实例
+        by_symbol = ShardMember(MemoryCoordinator(clock), "solo")
+        assert await by_symbol.assign(PAIRS, by_symbol=True) == PAIRS
+        # 分配方式改变后，原持有者先释放租约，下一轮完成交接
+        for m in members:
+            await m.assign(PAIRS, by_symbol=True)
+        split = [await m.assign(PAIRS, by_symbol=True) for m in members]
+        check(split)
+        for pairs in split:
+            symbols = {s for s, _ in pairs}
+            assert sorted(pairs) == sorted((s, i) for s in symbols for i in ("1m", "5m"))
+
+        # c 停止心跳：租约到期前其他实例不能认领它的交易对，到期后接管
+        a, b, c = members
+        c_pairs = await c.assign(PAIRS)
+        clock.now += 6
+        before = [await a.assign(PAIRS), await b.assign(PAIRS)]
+        assert not set(c_pairs) & {p for pairs in before for p in pairs}
+        clock.now += 6
+        after = [await a.assign(PAIRS), await b.assign(PAIRS)]
+        check(after)
+
+        # 新实例加入：原实例下一轮先释放，新实例随后认领
+        d = ShardMember(coordinator, "d", lease_seconds=10)
+        await d.join()
+        assert await d.assign(PAIRS) == []
+        kept = [await a.assign(PAIRS), await b.assign(PAIRS)]
+        taken = await d.assign(PAIRS)
+        assert taken
+        check(kept + [taken])
+
+        # 正常退出立即释放
+        await d.leave()
+        check([await a.assign(PAIRS), await b.assign(PAIRS)])
+
+    asyncio.run(run())
+
+def test_sharded_monitors_do_not_overlap():
+    symbols = symbol_names(12)
+    intervals = ["15m", "1h"]
+
+    async def run():
+        server = MockBinanceServer(symbols=symbols, weight_limit=0)
+        url = await server.start()
+        coordinator = MemoryCoordinator()
+        monitors, analyzed = [], []
+        try:
+            for name in ("a", "b", "c"):
+                monitor = MarketMonitor()
+                monitor.data_fetcher.base_url = url
+                monitor.ai_scheduler = None
+                monitor.signal_generator.ai_scheduler = SubmitOnlyScheduler()
+                monitor.shard = ShardMember(coordinator, name)
+                await monitor.shard.join()
+                seen = set()
+
+                async def collect(symbol, market_info, seen=seen):
+                    seen.add((symbol, market_info["interval"]))
+
+                monitor.add_callback(collect)
+                monitors.append(monitor)
+                analyzed.append(seen)
+            with contextlib.redirect_stdout(io.StringIO()):
+                await asyncio.gather(*(
+                    m.start_monitoring(symbols, intervals, update_interval=0, cycles=1) for m in monitors
+                ))
+        finally:
+            await server.stop()
+        return coordinator, analyzed
+
+    coordinator, analyzed = asyncio.run(run())
+    owners = Counter(pair for seen in analyzed for pair in seen)
+    assert set(owners) == {(s, i) for s in symbols for i in intervals}
+    assert max(owners.values()) == 1
+    assert sum(1 for seen in analyzed if seen) >= 2
+    # 停止后退出分片并释放租约
+    assert asyncio.run(coordinator.heartbeat("z", 1)) == ["z"]
+    assert not coordinator._leases
+
+def _local_redis():
+    import redis
+    client = redis.Redis(socket_connect_timeout=0.2)
+    try:
+        client.ping()
+    except redis.exceptions.ConnectionError:
+        return None
+    return client
+
+def test_redis_coordinator():
+    client = _local_redis()
+    if client is None:
+        pytest.skip("本地没有 Redis")
+    prefix = "test:monitor:shard"
+    for key in client.scan_iter(f"{prefix}:*"):
+        client.delete(key)
+
+    async def run():
+        coordinator = RedisCoordinator(client, prefix)
+        a = ShardMember(coordinator, "a", lease_seconds=5)
+        b = ShardMember(coordinator, "b", lease_seconds=5)
+        await a.join()
+        await b.join()
+        assert await coordinator.heartbeat("a", 5) == ["a", "b"]
+        first, second = await a.assign(PAIRS), await b.assign(PAIRS)
+        assert first and second and not set(first) & set(second)
+        assert set(first) | set(second) == set(PAIRS)
+        await a.leave()
+        assert await b.assign(PAIRS) == PAIRS
+        await b.leave()
+
+    asyncio.run(run())
+
+if __name__ == "__main__":
+    test_hash_ring_moves_only_departed_keys()
+    test_members_split_pairs_and_take_over()
+    test_sharded_monitors_do_not_overlap()
+    if _local_redis() is not None:
+        test_redis_coordinator()
+    print("分片监控测试通过")
@@ -0,0 +1,105 @@
+import asyncio
+import math
+import numpy as np
+import pytest
+from services.indicator_matrix import IndicatorMatrix
+from services.indicator_snapshot import monitored_indicators
+from services.shared_state import RedisIndicatorStore, RedisSignalBus, decode_indicators, encode_indicators
+from services.signal_hub import SignalHub
+
+PREFIX = "test:shared"
+
+def test_indicator_encoding():
+    data = encode_indicators({"rsi": 25.5, "adx": 31.0}, 1_700_000_000.25)
+    timestamp, snapshot = decode_indicators(data)
+    assert timestamp == 1_700_000_000.25
+    assert snapshot["rsi"] == 25.5 and snapshot["adx"] == 31.0
+    assert math.isnan(snapshot["atr"])
+    # 指标字段不一致（其他版本写入）时忽略
+    assert decode_indicators(data[:-4]) is None
+
+    matrix = IndicatorMatrix()
+    assert math.isnan(matrix.updated("BTCUSDT", "1h"))
+    matrix.update("BTCUSDT", "1h", snapshot, timestamp)
+    assert matrix.updated("BTCUSDT", "1h") == timestamp
+
+def test_monitored_indicators():
+    assert monitored_indicators("") == ["rsi", "macd", "macd_signal"]
+    assert monitored_indicators("adx, rsi") == ["rsi", "macd", "macd_signal", "adx"]
+    assert monitored_indicators("adx,all") is None
+
+def _local_redis():
+    import redis
+    client = redis.Redis(socket_connect_timeout=0.2)
+    try:
+        client.ping()
+    except redis.exceptions.ConnectionError:
+        return None
+    for key in client.scan_iter(f"{PREFIX}:*"):
+        client.delete(key)
+    return client
+
+def test_redis_indicator_store():
+    if _local_redis() is None:
+        pytest.skip("本地没有 Redis")
+
+    async def run():
+        import redis.asyncio as redis
+        client = redis.Redis()
+        monitor_store = RedisIndicatorStore(client, PREFIX)
+        api_store = RedisIndicatorStore(client, PREFIX)
+        api_matrix = IndicatorMatrix()
+
+        # 监控进程写入，API 进程同步
+        for i in range(100):
+            await monitor_store.save(f"S{i:03d}USDT", "1h", {"rsi": float(i)}, timestamp=1000.0 + i)
+        assert await api_store.sync(api_matrix, "1h") == 100
+        assert api_matrix.get("S042USDT", "1h")["rsi"] == 42
+        # 版本号未变时不再读取
+        assert await api_store.sync(api_matrix, "1h") == 0
+        assert await api_store.sync(api_matrix, "4h") == 0
+
+        # 本地更新的值比共享的新时保留本地的值
+        api_matrix.update("S001USDT", "1h", {"rsi": 99.0}, timestamp=5000.0)
+        await monitor_store.save("S002USDT", "1h", {"rsi": 2.5}, timestamp=2000.0)
+        assert await api_store.sync(api_matrix, "1h") == 1
+        assert api_matrix.get("S001USDT", "1h")["rsi"] == 99
+        assert api_matrix.get("S002USDT", "1h")["rsi"] == 2.5
+        await client.aclose()
+
+    asyncio.run(run())
+
+def test_redis_signal_relay():
+    if _local_redis() is None:
+        pytest.skip("本地没有 Redis")
+
+    async def run():
+        import redis.asyncio as redis
+        monitor_bus = RedisSignalBus(redis.Redis(), PREFIX)
+        api_client = redis.Redis()
+        api_hub = SignalHub()
+        subscription = api_hub.subscribe(symbols=["BTCUSDT"])
+        relay = asyncio.create_task(RedisSignalBus(api_client, PREFIX).relay(api_hub))
+        # 等待订阅生效
+        while await monitor_bus.client.pubsub_numsub(monitor_bus.channel) == [(monitor_bus.channel.encode(), 0)]:
+            await asyncio.sleep(0.01)
+
+        # 监控进程发布，API 进程的订阅者收到
+        await monitor_bus.publish("ETHUSDT", {"symbol": "ETHUSDT", "interval": "1h", "price": 1.0})
+        await monitor_bus.publish("BTCUSDT", {"symbol": "BTCUSDT", "interval": "1h", "price": np.float64(2.0)})
+        message = await asyncio.wait_for(subscription.get(), 2)
+        assert '"price":2.0' in message and len(subscription) == 0
+        relay.cancel()
+        await asyncio.gather(relay, return_exceptions=True)
+        await monitor_bus.client.aclose()
+        await api_client.aclose()
+
+    asyncio.run(run())
+
+if __name__ == "__main__":
+    test_indicator_encoding()
+    test_monitored_indicators()
+    if _local_redis() is not None:
+        test_redis_indicator_store()
+        test_redis_signal_relay()
+    print("共享状态测试通过")
@@ -0,0 +1,153 @@
+import asyncio
+import json
+import time
+import numpy as np
+import pandas as pd
+import pytest
+from services import signal_hub as hub_module
+from services.indicator_snapshot import IndicatorSnapshot
+from services.signal_hub import CONFLATE, DROP_OLDEST, SignalHub
+
+def market_info(symbol="BTCUSDT", interval="1h", price=100.0):
+    return {
+        "symbol": symbol,
+        "interval": interval,
+        "timestamp": pd.Timestamp("2024-01-01 00:00"),
+        "price": np.float64(price),
+        "signals": {"technical": IndicatorSnapshot.from_dict({"rsi": 25.5})},
+        "ai_pending": False,
+    }
+
+def test_filters_and_encoding():
+    hub = SignalHub()
+    btc = hub.subscribe(symbols=["btcusdt"])
+    hourly = hub.subscribe(intervals=["1h"])
+    everything = hub.subscribe()
+
+    assert hub.publish("BTCUSDT", market_info()) == 3
+    assert hub.publish("ETHUSDT", market_info("ETHUSDT", "4h")) == 1
+    assert (len(btc), len(hourly), len(everything)) == (1, 1, 2)
+
+    message = json.loads(asyncio.run(btc.get()))
+    assert message["signals"]["technical"]["rsi"] == 25.5
+    assert message["signals"]["technical"]["macd"] is None
+    assert message["timestamp"] == "2024-01-01T00:00:00"
+
+    btc.close()
+    assert hub.publish("BTCUSDT", market_info()) == 2
+    assert len(hub) == 2
+
+def test_publish_encoded():
+    # 从其他进程转发来的消息不再序列化，按交易对和周期分发
+    hub = SignalHub()
+    btc = hub.subscribe(symbols=["BTCUSDT"], intervals=["1h"])
+    message = hub_module.encode_market_info(market_info())
+    assert hub.publish_encoded("btcusdt", "1h", message) == 1
+    assert hub.publish_encoded("BTCUSDT", "4h", message) == 0
+    assert asyncio.run(btc.get()) == message
+
+def test_no_subscribers_skips_encoding(monkeypatch):
+    calls = []
+    monkeypatch.setattr(hub_module, "encode_market_info", lambda info: calls.append(info) or "{}")
+    hub = SignalHub()
+    assert hub.publish("BTCUSDT", market_info()) == 0
+    for _ in range(100):
+        hub.subscribe()
+    hub.publish("BTCUSDT", market_info())
+    assert len(calls) == 1          # 只序列化一次
+
+def test_slow_consumer_policies():
+    hub = SignalHub()
+    dropping = hub.subscribe(buffer_size=3, policy=DROP_OLDEST)
+    conflating = hub.subscribe(buffer_size=3, policy=CONFLATE)
+    for i in range(10):
+        hub.publish("BTCUSDT", market_info(price=i))
+    hub.publish("ETHUSDT", market_info("ETHUSDT"))
+
+    async def drain(subscription):
+        return [json.loads(m) async for m in _take(subscription, len(subscription))]
+
+    assert [m["price"] for m in asyncio.run(drain(dropping))] == [8.0, 9.0, 100.0]
+    assert dropping.dropped == 8
+    # 同一交易对同一周期只保留最新一条
+    assert [(m["symbol"], m["price"]) for m in asyncio.run(drain(conflating))] == [("BTCUSDT", 9.0), ("ETHUSDT", 100.0)]
+    with pytest.raises(ValueError):
+        hub.subscribe(policy="block")
+
+async def _take(subscription, count):
+    for _ in range(count):
+        yield await subscription.get()
+
+def test_fan_out_latency():
+    async def run():
+        hub = SignalHub()
+        subscriptions = [hub.subscribe(symbols=["BTCUSDT"] if i % 2 else None) for i in range(2000)]
+        received = []
+
+        async def consume(subscription):
+            message = await subscription.get()
+            received.append(time.perf_counter())
+            return message
+
+        consumers = [asyncio.create_task(consume(s)) for s in subscriptions]
+        await asyncio.sleep(0)
+        start = time.perf_counter()
+        hub.publish("BTCUSDT", market_info())
+        await asyncio.gather(*consumers)
+        assert len(received) == 2000
+        return max(received) - start
+
+    assert asyncio.run(run()) < 0.1
+
+def test_heartbeat_and_close():
+    async def run():
+        hub = SignalHub()
+        subscription = hub.subscribe()
+        assert await subscription.get(timeout=0.01) is None
+        subscription.close()
+        with pytest.raises(StopAsyncIteration):
+            await subscription.get()
+        assert len(hub) == 0
+
+    asyncio.run(run())
+
+def test_websocket_heartbeat_and_disconnect():
+    # 接口按 app 包导入，在子进程中运行
+    import shutil
+    from benchmarks.bench_startup import _package_dir, _run
+    package_dir = _package_dir()
+    try:
+        _run("""
+import os, time
+os.environ["SIGNAL_STREAM_HEARTBEAT"] = "0.1"
+os.environ["API_WARM_UP"] = "false"
+import app.api.endpoints as endpoints
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+app = FastAPI()
+app.include_router(endpoints.router)
+hub = endpoints.signal_hub
+with TestClient(app) as client:
+    with client.websocket_connect("/ws/signals?symbols=BTCUSDT") as ws:
+        assert len(hub) == 1
+        # 空闲时发送心跳
+        assert ws.receive_text() == endpoints.WS_HEARTBEAT
+        hub.publish("BTCUSDT", {"interval": "1h", "price": 1.0})
+        assert ws.receive_text() == '{"interval":"1h","price":1.0}'
+    # 客户端断开后没有新信号也立即取消订阅
+    deadline = time.time() + 2
+    while len(hub) and time.time() < deadline:
+        time.sleep(0.01)
+    assert len(hub) == 0
+""", package_dir)
+    finally:
+        shutil.rmtree(package_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    test_filters_and_encoding()
+    test_publish_encoded()
+    test_slow_consumer_policies()
+    test_fan_out_latency()
+    test_heartbeat_and_close()
+    test_websocket_heartbeat_and_disconnect()
+    print("信号推送测试通过")
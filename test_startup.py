@@ -0,0 +1,62 @@
+import shutil
+from benchmarks.bench_startup import _package_dir, _run, parse_importtime, top_imports
+
+# 禁止网络连接，确认导入和预热在离线时也能完成
+NO_NETWORK = """
+import socket
+def _refuse(*args, **kwargs):
+    raise OSError("network disabled")
+socket.socket.connect = _refuse
+socket.create_connection = _refuse
+"""
+
+HEAVY = ("pandas", "ta", "aiohttp", "binance", "redis", "requests")
+
+def test_api_import_is_lazy_and_offline():
+    package_dir = _package_dir()
+    try:
+        _run(NO_NETWORK + f"""
+import sys
+import app.api.endpoints as endpoints
+loaded = [m for m in {HEAVY!r} if m in sys.modules]
+assert not loaded, loaded
+assert endpoints.router.on_startup
+""", package_dir)
+
+        # 预热加载指标计算和本地模型；离线时交易所客户端留到第一次请求再创建
+        _run(NO_NETWORK + """
+import asyncio, sys
+import app.api.endpoints as endpoints
+asyncio.run(endpoints.warm_up())
+assert "pandas" in sys.modules and "ta" in sys.modules
+fetcher = endpoints.get_data_fetcher()
+assert fetcher is endpoints.get_data_fetcher()
+assert fetcher._client is None and fetcher._cache is not None
+""", package_dir)
+
+        _run(NO_NETWORK + """
+import sys
+import monitor_crypto
+from services.market_monitor import MarketMonitor
+MarketMonitor()
+assert "aiohttp" not in sys.modules
+""", package_dir)
+    finally:
+        shutil.rmtree(package_dir, ignore_errors=True)
+
+def test_importtime_parsing():
+    output = "\n".join([
+        "import time: self [us] | cumulative | imported package",
+        "import time:       100 |        100 |   numpy.core",
+        "import time:       200 |        300 | numpy",
+        "import time:        50 |         50 |     pandas.io",
+        "import time:       400 |        450 |   pandas.core",
+        "import time:       100 |        550 | pandas",
+    ])
+    assert parse_importtime(output)[1] == (0, "numpy", 0.3)
+    assert top_imports(output, exclude={"numpy"}, top=2) == [("pandas", 0.55), ("pandas.core", 0.45)]
+
+if __name__ == "__main__":
+    test_api_import_is_lazy_and_offline()
+    test_importtime_parsing()
+    print("启动测试通过")